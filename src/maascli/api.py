@@ -51,6 +51,18 @@ def http_request(url, method, body=None, headers=None, insecure=False):
         )
 
 
+def get_next_page_uri(response):
+    """Return the URI of the page following the one in `response`.
+
+    :return: The URI from the ``rel="next"`` link in the ``Link`` header, or
+        `None` if there's no next page.
+    """
+    match = re.search(r'<([^>]*)>\s*;\s*rel="next"', response.get("link", ""))
+    if match is None:
+        return None
+    return match.group(1)
+
+
 def fetch_api_description(url, insecure=False):
     """Obtain the description of remote API given its base URL."""
     url_describe = urljoin(url, "describe/")
@@ -137,6 +149,12 @@ class Action(Command):
         response, content = http_request(
             uri, self.method, body=body, headers=headers, insecure=insecure
         )
+        # Paginated listings link to their next page. Fetch all the pages,
+        # and show them as one.
+        if response.status == http.client.OK:
+            response, content = self.fetch_next_pages(
+                response, content, insecure
+            )
 
         # Compare API hashes to see if our version of the API is old.
         self.compare_api_hashes(self.profile, response)
@@ -150,6 +168,31 @@ class Action(Command):
         if response.status // 100 != 2:
             raise CommandError(2)
 
+    def fetch_next_pages(self, response, content, insecure=False):
+        """Fetch the pages following the one in `response`, if any.
+
+        :return: A ``(response, content)`` tuple, with the objects from all
+            the pages in `content`. If fetching a page fails, its response
+            is returned instead.
+        """
+        next_uri = get_next_page_uri(response)
+        if next_uri is None:
+            return response, content
+        objects = json.loads(content.decode("utf-8"))
+        while next_uri is not None:
+            headers = {}
+            if self.credentials is not None:
+                self.sign(next_uri, headers, self.credentials)
+            response, content = http_request(
+                next_uri, "GET", headers=headers, insecure=insecure
+            )
+            if response.status != http.client.OK:
+                return response, content
+            objects.extend(json.loads(content.decode("utf-8")))
+            next_uri = get_next_page_uri(response)
+        content = json.dumps(objects, indent=4).encode("utf-8")
+        return response, content
+
     @staticmethod
     def compare_api_hashes(profile, response):
         """Compare the local and remote API hashes.
@@ -32,7 +32,7 @@ from maascli.testing.config import make_configs
 from maascli.utils import handler_command_name, safe_name
 from maastesting.factory import factory
 from maastesting.fixtures import CaptureStandardIO
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from maastesting.testcase import MAASTestCase
 
 
@@ -152,6 +152,18 @@ class TestFunctions(MAASTestCase):
         )
         self.assertEqual(error_expected, "%s" % error)
 
+    def test_get_next_page_uri_returns_next_link(self):
+        response = httplib2.Response(
+            {"link": '<http://example.com/api/2.0/m/?after=2>; rel="next"'}
+        )
+        self.assertEqual(
+            "http://example.com/api/2.0/m/?after=2",
+            api.get_next_page_uri(response),
+        )
+
+    def test_get_next_page_uri_returns_None_without_next_link(self):
+        self.assertIsNone(api.get_next_page_uri(httplib2.Response({})))
+
     def test_get_action_class_returns_None_for_unknown_handler(self):
         handler = {"name": factory.make_name("handler")}
         action = {"name": "create"}
@@ -220,6 +232,63 @@ class TestAction(MAASTestCase):
             (" foo ", " bar "), api.Action.name_value_pair(" foo = bar ")
         )
 
+    def make_action(self):
+        action_class = type(
+            "TestAction",
+            (api.Action,),
+            {
+                "profile": {"credentials": None},
+                "handler": {"params": [], "uri": "http://example.com/"},
+                "action": {"method": "GET", "op": None},
+            },
+        )
+        return action_class(ArgumentParser())
+
+    def make_page(self, objects, next_uri=None):
+        response = httplib2.Response({})
+        response.status = http.client.OK
+        if next_uri is not None:
+            response["link"] = '<%s>; rel="next"' % next_uri
+        return response, json.dumps(objects).encode("utf-8")
+
+    def test_fetch_next_pages_returns_single_page(self):
+        response, content = self.make_page([1, 2])
+        request = self.patch(httplib2.Http, "request")
+        self.assertEqual(
+            (response, content),
+            self.make_action().fetch_next_pages(response, content),
+        )
+        self.assertThat(request, MockNotCalled())
+
+    def test_fetch_next_pages_fetches_all_pages(self):
+        next_uri = factory.make_simple_http_url()
+        response, content = self.make_page([1, 2], next_uri)
+        last_response, last_content = self.make_page([3])
+        request = self.patch(httplib2.Http, "request")
+        request.return_value = last_response, last_content
+        response, content = self.make_action().fetch_next_pages(
+            response, content
+        )
+        self.assertIs(last_response, response)
+        self.assertEqual([1, 2, 3], json.loads(content.decode("utf-8")))
+        self.assertThat(
+            request,
+            MockCalledOnceWith(next_uri, "GET", body=None, headers={}),
+        )
+
+    def test_fetch_next_pages_returns_failed_page(self):
+        response, content = self.make_page(
+            [1, 2], factory.make_simple_http_url()
+        )
+        error_response = httplib2.Response({})
+        error_response.status = http.client.FORBIDDEN
+        request = self.patch(httplib2.Http, "request")
+        request.return_value = error_response, b"Forbidden"
+        self.assertEqual(
+            (error_response, b"Forbidden"),
+            self.make_action().fetch_next_pages(response, content),
+        )
+
     def test_compare_api_hashes_prints_nothing_if_hashes_match(self):
         example_hash = factory.make_name("hash")
         profile = {"description": {"hash": example_hash}}
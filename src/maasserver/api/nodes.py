@@ -11,13 +11,17 @@ __all__ = [
 from base64 import b64decode
 from itertools import chain
 import json
+from operator import attrgetter
 
 import bson
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db.models import Prefetch
 from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from formencode.validators import Int, StringBool
+from piston3.emitters import JSONEmitter
+from piston3.handler import typemapper
 from piston3.utils import rc
 
 from maasserver.api.support import (
@@ -184,6 +188,10 @@ NODES_PREFETCH = [
     "virtualmachine",
 ]
 
+# The number of nodes fetched and serialised at a time when listing a page of
+# nodes.
+NODES_PAGE_CHUNK_SIZE = 100
+
 
 def store_node_power_parameters(node, request):
     """Store power parameters in request.
@@ -294,6 +302,21 @@ def is_registered(request, ignore_statuses=None):
     return interfaces.exists()
 
 
+def set_node_parents(nodes):
+    """Set the node of the prefetched interfaces and block devices of `nodes`.
+
+    This way no extra queries are needed to get their node.
+
+    :return: `nodes`.
+    """
+    for node in nodes:
+        for interface in node.interface_set.all():
+            interface.node = node
+        for block_device in node.blockdevice_set.all():
+            block_device.node = node
+    return nodes
+
+
 def get_cached_script_results(node):
     """Load script results into cache and return the cached list."""
     if not hasattr(node, "_cached_script_results"):
@@ -814,6 +837,14 @@ class NodesHandler(OperationsHandler):
         @param (string) "not_pod_type": [required=false] Only nodes that don't
         belong a pod of the specified type will be returned.
 
+        @param (int) "limit" [required=false] Only return this many nodes,
+        sorted by id. A ``Link`` header with a ``rel="next"`` URL for the next
+        page is included when there are more nodes.
+
+        @param (int) "after" [required=false] Only nodes with an id greater
+        than this will be returned. It's set in the URLs for the next pages
+        when ``limit`` is used.
+
         @success (http-status-code) "200" 200
 
         @success (json) "success_json" A JSON object containing a list of node
@@ -822,7 +853,40 @@ class NodesHandler(OperationsHandler):
         text
 
         """
+        data = request.GET.copy()
+        limit = get_optional_param(data, "limit", validator=Int(min=1))
+        after = get_optional_param(
+            data, "after", default=0, validator=Int(min=0)
+        )
+        data.pop("limit", None)
+        data.pop("after", None)
+        querysets = self._get_node_querysets(request, data)
+        if limit is not None:
+            return self._read_page(request, querysets, limit, after)
+        for nodes in querysets:
+            set_node_parents(nodes)
+        if len(querysets) == 1:
+            return querysets[0]
+        else:
+            return list(chain.from_iterable(querysets))
+
+    def _get_nodes(self, request, data):
+        """Return the nodes visible to the user, filtered by `data`."""
+        form = ReadNodesForm(data=data)
+        if not form.is_valid():
+            raise MAASAPIValidationError(form.errors)
+        nodes = self.base_model.objects.get_nodes(
+            request.user, NodePermission.view
+        )
+        nodes, _, _ = form.filter_nodes(nodes)
+        nodes = nodes.select_related(*NODES_SELECT_RELATED)
+        nodes = prefetch_queryset(nodes, NODES_PREFETCH).order_by("id")
+        return nodes.annotate(
+            virtualmachine_id=Coalesce("virtualmachine__id", None)
+        )
 
+    def _get_node_querysets(self, request, data):
+        """Return the querysets of nodes to list, grouped by type."""
         if self.base_model == Node:
             # Avoid circular dependencies
             from maasserver.api.devices import DevicesHandler
@@ -832,39 +896,62 @@ class NodesHandler(OperationsHandler):
                 RegionControllersHandler,
             )
 
-            racks = RackControllersHandler().read(request).order_by("id")
-            nodes = list(
-                chain(
-                    DevicesHandler().read(request).order_by("id"),
-                    MachinesHandler().read(request).order_by("id"),
-                    racks,
-                    RegionControllersHandler()
-                    .read(request)
-                    .exclude(id__in=racks)
-                    .order_by("id"),
-                )
-            )
-            return nodes
+            racks = RackControllersHandler()._get_nodes(request, data)
+            return [
+                DevicesHandler()._get_nodes(request, data),
+                MachinesHandler()._get_nodes(request, data),
+                racks,
+                RegionControllersHandler()
+                ._get_nodes(request, data)
+                .exclude(id__in=racks),
+            ]
         else:
-            form = ReadNodesForm(data=request.GET)
-            if not form.is_valid():
-                raise MAASAPIValidationError(form.errors)
-            nodes = self.base_model.objects.get_nodes(
-                request.user, NodePermission.view
+            return [self._get_nodes(request, data)]
+
+    def _read_page(self, request, querysets, limit, after):
+        """Return a page of the `limit` nodes with an id after `after`.
+
+        Only the ids of the nodes are fetched at first. The nodes themselves
+        are fetched and serialised `NODES_PAGE_CHUNK_SIZE` at a time, so that
+        only that many nodes, and their prefetched objects, are in memory at
+        once.
+        """
+        ids = sorted(
+            chain.from_iterable(
+                nodes.filter(id__gt=after)
+                .prefetch_related(None)
+                .values_list("id", flat=True)[: limit + 1]
+                for nodes in querysets
+            )
+        )
+        page_ids, more_ids = ids[:limit], ids[limit:]
+        objects = []
+        for start in range(0, len(page_ids), NODES_PAGE_CHUNK_SIZE):
+            chunk_ids = page_ids[start : start + NODES_PAGE_CHUNK_SIZE]
+            nodes = []
+            for queryset in querysets:
+                nodes.extend(
+                    set_node_parents(queryset.filter(id__in=chunk_ids))
+                )
+            nodes.sort(key=attrgetter("id"))
+            emitter = JSONEmitter(nodes, typemapper, self, self.fields, False)
+            objects.extend(
+                json.dumps(
+                    obj, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4
+                )
+                for obj in emitter.construct()
             )
-            nodes, _, _ = form.filter_nodes(nodes)
-            nodes = nodes.select_related(*NODES_SELECT_RELATED)
-            nodes = prefetch_queryset(nodes, NODES_PREFETCH).order_by("id")
-            nodes = nodes.annotate(
-                virtualmachine_id=Coalesce("virtualmachine__id", None)
+        response = HttpResponse(
+            "[%s]" % ", ".join(objects),
+            content_type="application/json; charset=utf-8",
+        )
+        if more_ids:
+            query = request.GET.copy()
+            query["after"] = page_ids[-1]
+            response["Link"] = '<%s>; rel="next"' % (
+                request.build_absolute_uri("?" + query.urlencode())
             )
-            # Set related node parents so no extra queries are needed.
-            for node in nodes:
-                for interface in node.interface_set.all():
-                    interface.node = node
-                for block_device in node.blockdevice_set.all():
-                    block_device.node = node
-            return nodes
+        return response
 
     @operation(idempotent=True)
     def is_registered(self, request):
@@ -92,7 +92,7 @@ class NodeResultsHandler(OperationsHandler):
                     SCRIPT_STATUS.TIMEDOUT,
                     SCRIPT_STATUS.ABORTED,
                 )
-            ):
+            ).select_related("script_output"):
                 if names is not None and script_result.name not in names:
                     continue
                 # MAAS stores stdout, stderr, and the combined output. The
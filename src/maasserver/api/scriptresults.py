@@ -37,14 +37,18 @@ def fmt_time(dt):
         return format_datetime(dt)
 
 
-def filter_script_results(script_set, filters, hardware_type=None):
-    if filters is None:
-        script_results = list(script_set)
-    else:
-        script_results = []
+def filter_script_results(
+    script_set, filters, hardware_type=None, include_output=False
+):
+    script_results = script_set.scriptresult_set.all()
+    if include_output:
+        # Load the output along with the results instead of one by one.
+        script_results = script_results.select_related("script_output")
+    if filters is not None:
+        filtered_script_results = []
         # ScriptResults don't always have a Script associated with them.
         # e.g commissioning scripts.
-        for script_result in script_set:
+        for script_result in script_results:
             if script_result.script is None:
                 tags = []
             else:
@@ -55,7 +59,8 @@ def filter_script_results(script_set, filters, hardware_type=None):
                     or f in tags
                     or (f.isdigit() and int(f) == script_result.id)
                 ):
-                    script_results.append(script_result)
+                    filtered_script_results.append(script_result)
+        script_results = filtered_script_results
     if hardware_type is not None:
         script_results = [
             script_result
@@ -219,7 +224,10 @@ class NodeScriptResultHandler(OperationsHandler):
     def results(cls, script_set):
         results = []
         for script_result in filter_script_results(
-            script_set, script_set.filters, script_set.hardware_type
+            script_set,
+            script_set.filters,
+            script_set.hardware_type,
+            script_set.include_output,
         ):
             # Don't show password parameter values over the API.
             for parameter in script_result.parameters.values():
@@ -432,7 +440,7 @@ class NodeScriptResultHandler(OperationsHandler):
 
         bin_regex = re.compile(r".+\.tar(\..+)?")
         for script_result in filter_script_results(
-            script_set, filters, hardware_type
+            script_set, filters, hardware_type, include_output=True
         ):
             mtime = time.mktime(script_result.updated.timetuple())
             if bin_regex.search(script_result.name) is not None:
@@ -14,7 +14,7 @@ from django.test import RequestFactory
 from django.urls import reverse
 from testtools.matchers import Contains, Equals, Not
 
-from maasserver import eventloop, middleware
+from maasserver import eventloop
 from maasserver.api import auth
 from maasserver.api import machines as machines_module
 from maasserver.api.machines import AllocationOptions, get_allocation_options
@@ -489,12 +489,6 @@ class TestMachinesAPI(APITestCase.ForUser):
 
     @skip("LP:1840491")
     def test_GET_machines_issues_constant_number_of_queries(self):
-        # Patch middleware so it does not affect query counting.
-        self.patch(
-            middleware.ExternalComponentsMiddleware,
-            "_check_rack_controller_connectivity",
-        )
-
         for _ in range(10):
             node = factory.make_Node_with_Interface_on_Subnet()
             factory.make_VirtualBlockDevice(node=node)
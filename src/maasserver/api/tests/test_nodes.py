@@ -6,6 +6,7 @@
 
 import http.client
 import json
+from operator import itemgetter
 import random
 
 from django.conf import settings
@@ -469,6 +470,76 @@ class TestNodesAPI(APITestCase.ForUser):
             extract_system_ids(parsed_result),
         )
 
+    def test_GET_with_limit_returns_first_page(self):
+        nodes = [factory.make_Node() for _ in range(3)]
+        response = self.client.get(reverse("nodes_handler"), {"limit": 2})
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET)
+        )
+        self.assertSequenceEqual(
+            [node.system_id for node in nodes[:2]],
+            extract_system_ids(parsed_result),
+        )
+        self.assertEqual(
+            '<http://testserver%s?limit=2&after=%d>; rel="next"'
+            % (reverse("nodes_handler"), nodes[1].id),
+            response["Link"],
+        )
+
+    def test_GET_with_limit_and_after_returns_next_page(self):
+        nodes = [factory.make_Node() for _ in range(3)]
+        response = self.client.get(
+            reverse("nodes_handler"), {"limit": 2, "after": nodes[1].id}
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        parsed_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET)
+        )
+        self.assertSequenceEqual(
+            [nodes[2].system_id], extract_system_ids(parsed_result)
+        )
+        self.assertNotIn("Link", response)
+
+    def test_GET_with_limit_pages_through_all_nodes(self):
+        self.become_admin()
+        nodes = [
+            factory.make_Node(node_type=node_type, owner=self.user)
+            for node_type, _ in NODE_TYPE_CHOICES
+        ]
+        response = self.client.get(reverse("nodes_handler"))
+        expected_result = json.loads(
+            response.content.decode(settings.DEFAULT_CHARSET)
+        )
+        parsed_result = []
+        url = "%s?limit=%d" % (reverse("nodes_handler"), len(nodes) - 1)
+        while url is not None:
+            response = self.client.get(url)
+            self.assertEqual(http.client.OK, response.status_code)
+            parsed_result.extend(
+                json.loads(response.content.decode(settings.DEFAULT_CHARSET))
+            )
+            url = response.get("Link")
+            if url is not None:
+                url = url[1 : url.index(">")]
+        self.assertEqual(
+            sorted(expected_result, key=itemgetter("system_id")),
+            sorted(parsed_result, key=itemgetter("system_id")),
+        )
+
+    def test_GET_with_limit_keeps_filters_in_next_link(self):
+        zone = factory.make_Zone()
+        for _ in range(3):
+            factory.make_Node(zone=zone)
+        response = self.client.get(
+            reverse("nodes_handler"), {"zone": zone.name, "limit": 1}
+        )
+        self.assertIn("zone=%s" % zone.name, response["Link"])
+
+    def test_GET_with_invalid_limit_returns_bad_request(self):
+        response = self.client.get(reverse("nodes_handler"), {"limit": 0})
+        self.assertEqual(http.client.BAD_REQUEST, response.status_code)
+
     def test_GET_with_id_returns_matching_nodes(self):
         # The "list" operation takes optional "id" parameters.  Only
         # nodes with matching ids will be returned.
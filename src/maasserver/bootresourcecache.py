@@ -0,0 +1,163 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Region-local cache of boot resource content.
+
+Boot resource content is stored in the database as large objects. Reading
+those for every rack that syncs images makes the database the bottleneck, so
+the content is also kept on local disk, in files named by its SHA256. A file
+is put in the cache the first time it is streamed from the database, and is
+evicted when its `LargeFile` is deleted.
+"""
+
+__all__ = [
+    "CachingIterator",
+    "evict",
+    "get_cached_file",
+]
+
+import fcntl
+import hashlib
+import os
+import tempfile
+
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.path import get_maas_data_path
+
+log = LegacyLogger()
+
+
+def get_cache_dir():
+    """Return the directory holding the cached content."""
+    return get_maas_data_path("boot-resources")
+
+
+def get_cached_file(sha256):
+    """Return the path to the cached content with `sha256`, or `None`."""
+    path = os.path.join(get_cache_dir(), sha256)
+    if os.path.isfile(path):
+        return path
+    else:
+        return None
+
+
+def evict(sha256):
+    """Remove the content with `sha256` from the cache."""
+    path = os.path.join(get_cache_dir(), sha256)
+    for filename in (path, path + ".lock"):
+        try:
+            os.unlink(filename)
+        except FileNotFoundError:
+            pass
+
+
+class CachingIterator:
+    """Iterate over `content`, adding it to the cache along the way.
+
+    Only one process fills the cache for a given SHA256 at a time. When
+    another is already doing so, the content is passed through untouched.
+    The cached file is only put in place once all the content has been read
+    and both its SHA256 and its size are as expected.
+    """
+
+    def __init__(self, content, sha256, size):
+        self.content = content
+        self.sha256 = sha256
+        self.size = size
+        self._iterator = None
+        self._lock = None
+        self._file = None
+        self._hash = None
+        self._written = 0
+
+    def _set_up(self):
+        """Take the lock for `sha256` and open a temporary file to fill."""
+        cache_dir = get_cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+        lock = open(os.path.join(cache_dir, self.sha256 + ".lock"), "wb")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Another request is filling the cache already.
+            lock.close()
+            return
+        self._lock = lock
+        self._file = tempfile.NamedTemporaryFile(
+            dir=cache_dir, prefix=".%s." % self.sha256, delete=False
+        )
+        self._hash = hashlib.sha256()
+
+    def _write(self, data):
+        try:
+            self._file.write(data)
+        except OSError:
+            log.err(None, "Failed to cache boot resource %s." % self.sha256)
+            self._abort()
+        else:
+            self._hash.update(data)
+            self._written += len(data)
+
+    def _finish(self):
+        """Put the filled file in place, if its content is as expected."""
+        self._file.close()
+        if self._written != self.size:
+            log.msg(
+                "Not caching boot resource %s; got %d bytes, expected %d."
+                % (self.sha256, self._written, self.size)
+            )
+            self._abort()
+        elif self._hash.hexdigest() != self.sha256:
+            log.msg(
+                "Not caching boot resource %s; SHA256 does not match."
+                % self.sha256
+            )
+            self._abort()
+        else:
+            path = os.path.join(os.path.dirname(self._file.name), self.sha256)
+            os.rename(self._file.name, path)
+            self._file = None
+            self._release()
+
+    def _abort(self):
+        """Discard the partially filled file, if any."""
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+            self._file = None
+        self._release()
+
+    def _release(self):
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._iterator is None:
+            self._iterator = iter(self.content)
+            try:
+                self._set_up()
+            except OSError:
+                log.err(
+                    None, "Failed to cache boot resource %s." % self.sha256
+                )
+                self._abort()
+        try:
+            data = next(self._iterator)
+        except StopIteration:
+            if self._file is not None:
+                self._finish()
+            raise
+        if self._file is not None:
+            self._write(data)
+        return data
+
+    def close(self):
+        """Close `content`, discarding any incomplete cache file."""
+        self._abort()
+        self.content.close()
@@ -24,7 +24,7 @@ import time
 
 from django.db import connection, connections
 from django.db.utils import load_backend
-from django.http import HttpResponse, StreamingHttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from pkg_resources import parse_version
 from simplestreams import util as sutil
 from simplestreams.mirrors import BasicMirrorWriter, UrlMirrorReader
@@ -35,7 +35,7 @@ from twisted.internet.defer import Deferred, DeferredList, inlineCallbacks
 from twisted.protocols.amp import UnhandledCommand
 from twisted.python.failure import Failure
 
-from maasserver import locks
+from maasserver import bootresourcecache, locks
 from maasserver.bootsources import (
     cache_boot_sources,
     ensure_boot_source_definition,
@@ -182,6 +182,81 @@ class ConnectionWrapper:
             self._connection = None
 
 
+def parse_byte_range(header, size):
+    """Parse the HTTP Range `header` for content of `size` bytes.
+
+    :return: Tuple (start, end) of the requested range, end included, or
+        `None` when the whole content should be returned. Multiple ranges are
+        not supported, and the whole content is returned for them.
+    :raise ValueError: When the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    byte_range = header[len("bytes=") :].strip()
+    if "," in byte_range:
+        return None
+    first, sep, last = byte_range.partition("-")
+    if sep != "-" or not (first or last):
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # A suffix range, i.e. the last bytes of the content.
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range: %s" % header)
+    return start, min(end, size - 1)
+
+
+def read_file_range(stream, start, length, block_size=1024 * 1024):
+    """Yield `length` bytes from `stream`, starting at `start`."""
+    try:
+        stream.seek(start)
+        while length > 0:
+            data = stream.read(min(block_size, length))
+            if len(data) == 0:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        stream.close()
+
+
+def get_file_response(request, path):
+    """Return a response for the file at `path`, honouring HTTP Range."""
+    stream = open(path, "rb")
+    size = os.fstat(stream.fileno()).st_size
+    try:
+        byte_range = parse_byte_range(request.META.get("HTTP_RANGE"), size)
+    except ValueError:
+        stream.close()
+        response = HttpResponse(status=416)
+        response["Content-Range"] = "bytes */%d" % size
+        return response
+    if byte_range is None:
+        response = FileResponse(
+            stream, content_type="application/octet-stream"
+        )
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            read_file_range(stream, start, length),
+            content_type="application/octet-stream",
+            status=206,
+        )
+        response["Content-Length"] = length
+        response["Content-Range"] = "bytes %d-%d/%d" % (start, end, size)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
 class SimpleStreamsHandler:
     """Simplestreams endpoint, that the racks talk to.
 
@@ -361,11 +436,21 @@ class SimpleStreamsHandler:
             rfile = resource_set.files.get(filename=filename)
         except BootResourceFile.DoesNotExist:
             raise MAASAPINotFound()
+        largefile = rfile.largefile
+        path = bootresourcecache.get_cached_file(largefile.sha256)
+        if path is not None:
+            return get_file_response(request, path)
+        # Not cached yet; stream the content from the database, caching it
+        # along the way when it is complete.
+        content = ConnectionWrapper(largefile.content)
+        if largefile.complete:
+            content = bootresourcecache.CachingIterator(
+                content, largefile.sha256, largefile.total_size
+            )
         response = StreamingHttpResponse(
-            ConnectionWrapper(rfile.largefile.content),
-            content_type="application/octet-stream",
+            content, content_type="application/octet-stream"
         )
-        response["Content-Length"] = rfile.largefile.total_size
+        response["Content-Length"] = largefile.total_size
         return response
 
 
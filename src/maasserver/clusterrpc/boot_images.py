@@ -13,11 +13,18 @@ __all__ = [
 ]
 
 from collections.abc import Sequence
+from datetime import timedelta
 from functools import partial
+import random
 from urllib.parse import ParseResult, urlparse
 
+from netaddr import IPAddress
 from twisted.internet import reactor
-from twisted.internet.defer import DeferredList, DeferredSemaphore
+from twisted.internet.defer import (
+    DeferredList,
+    DeferredSemaphore,
+    inlineCallbacks,
+)
 from twisted.protocols.amp import UnhandledCommand
 from twisted.python.failure import Failure
 
@@ -35,7 +42,8 @@ from provisioningserver.rpc.cluster import (
 )
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
 from provisioningserver.utils import flatten
-from provisioningserver.utils.twisted import asynchronous, synchronous
+from provisioningserver.utils.twisted import asynchronous, pause, synchronous
+from provisioningserver.utils.url import compose_URL
 
 log = LegacyLogger()
 
@@ -191,7 +199,22 @@ undefined = object()
 
 class RackControllersImporter:
     """Utility to help import boot resources from the region to rack
-    controllers."""
+    controllers.
+
+    Each rack controller is asked to import the boot resources, then polled
+    until it's done, so no more than `concurrency` of them download at once.
+    When peer import is enabled, the rack controllers that are done serve
+    their boot resources to the ones asked after them. The region remains
+    the source of the simplestreams metadata, and thus of the checksums.
+    """
+
+    # How often to check if a rack controller is done importing.
+    poll_interval = 5.0  # seconds
+
+    # How long to wait for a rack controller to be done importing.
+    import_timeout = timedelta(hours=6).total_seconds()
+
+    clock = reactor
 
     @staticmethod
     def _get_system_ids():
@@ -217,6 +240,43 @@ class RackControllersImporter:
         else:
             return None
 
+    @staticmethod
+    def _get_peers(system_ids):
+        """Return the URLs of the rack controllers' boot resources caches.
+
+        The URLs are keyed by system_id. None are returned unless rack
+        controllers are allowed to import boot images from each other.
+        """
+        # Avoid circular import.
+        from maasserver.models.config import Config
+
+        if not Config.objects.get_config("boot_images_peer_import"):
+            return {}
+        racks = RackController.objects.filter(system_id__in=system_ids)
+        racks = racks.prefetch_related("interface_set__ip_addresses")
+        peers = {}
+        for rack in racks:
+            ips = rack.ip_addresses()
+            if len(ips) > 0:
+                ip = min(ips, key=lambda ip: (IPAddress(ip).version, ip))
+                peers[rack.system_id] = compose_URL(
+                    "http://:5248/boot-resources-cache/", ip
+                )
+        return peers
+
+    @staticmethod
+    @transactional
+    def _get_last_image_sync(system_id):
+        racks = RackController.objects.filter(system_id=system_id)
+        return racks.values_list("last_image_sync", flat=True).first()
+
+    @staticmethod
+    def _get_concurrency():
+        # Avoid circular import.
+        from maasserver.models.config import Config
+
+        return Config.objects.get_config("boot_images_rack_import_concurrency")
+
     @classmethod
     @transactional
     def new(cls, system_ids=undefined, sources=undefined, proxy=undefined):
@@ -227,10 +287,14 @@ class RackControllersImporter:
 
         :return: :class:`RackControllersImporter`
         """
+        if system_ids is undefined:
+            system_ids = cls._get_system_ids()
         return cls(
-            cls._get_system_ids() if system_ids is undefined else system_ids,
+            system_ids,
             cls._get_sources() if sources is undefined else sources,
             cls._get_proxy() if proxy is undefined else proxy,
+            peers=cls._get_peers(list(flatten(system_ids))),
+            concurrency=cls._get_concurrency(),
         )
 
     @classmethod
@@ -239,7 +303,7 @@ class RackControllersImporter:
         system_ids=undefined,
         sources=undefined,
         proxy=undefined,
-        concurrency=1,
+        concurrency=None,
         delay=0,
         clock=reactor,
     ):
@@ -254,13 +318,20 @@ class RackControllersImporter:
 
         return clock.callLater(delay, do_import)
 
-    def __init__(self, system_ids, sources, proxy=None):
+    def __init__(
+        self, system_ids, sources, proxy=None, peers=None, concurrency=1
+    ):
         """Create a new importer.
 
         :param system_ids: A sequence of rack controller system_id's.
         :param sources: A sequence of endpoints; see `ImportBootImages`.
         :param proxy: The HTTP/HTTPS proxy to use, or `None`
         :type proxy: :class:`urlparse.ParseResult` or string
+        :param peers: A mapping of system_id's to the URLs of the rack
+            controllers' boot resources caches. The rack controllers that
+            are done importing are offered as peers to the others.
+        :param concurrency: The default number of rack controllers importing
+            at one time.
         """
         super().__init__()
         self.system_ids = tuple(flatten(system_ids))
@@ -272,67 +343,116 @@ class RackControllersImporter:
             self.proxy = proxy
         else:
             self.proxy = urlparse(proxy)
+        self.peers = {} if peers is None else peers
+        self.concurrency = concurrency
+
+    @inlineCallbacks
+    def _wait_for_import(self, client):
+        """Wait until the rack controller behind `client` is done importing.
+
+        :raise TimeoutError: If it's still importing after `import_timeout`.
+        """
+        deadline = self.clock.seconds() + self.import_timeout
+        while True:
+            try:
+                response = yield client(IsImportBootImagesRunning)
+            except UnhandledCommand:
+                # The rack controller can't tell, so don't wait for it.
+                return
+            if not response["running"]:
+                return
+            if self.clock.seconds() >= deadline:
+                raise TimeoutError(
+                    "Still importing after %d seconds." % self.import_timeout
+                )
+            yield pause(self.poll_interval, self.clock)
 
     @asynchronous
     def __call__(self, lock):
         """Ask the rack controllers to download the region's boot resources.
 
+        The result of each rack controller's import is logged as soon as it
+        is done.
+
         :param lock: A concurrency primitive to limit the number of rack
             controllers importing at one time.
         """
-
-        def sync_rack(system_id, sources, proxy):
-            d = getClientFor(system_id, timeout=1)
-            d.addCallback(
-                lambda client: client(
-                    ImportBootImages,
-                    sources=sources,
-                    http_proxy=proxy,
-                    https_proxy=proxy,
+        synced = []
+        done = []
+
+        @inlineCallbacks
+        def sync_rack(system_id):
+            client = yield getClientFor(system_id, timeout=1)
+            if system_id in self.peers:
+                last_sync = yield deferToDatabase(
+                    self._get_last_image_sync, system_id
                 )
+            kwargs = {}
+            if len(synced) > 0:
+                # Spread the load over the peers.
+                kwargs["peers"] = random.sample(synced, len(synced))
+            result = yield client(
+                ImportBootImages,
+                sources=self.sources,
+                http_proxy=self.proxy,
+                https_proxy=self.proxy,
+                **kwargs
             )
-            return d
+            yield self._wait_for_import(client)
+            if system_id in self.peers:
+                # The rack controller only records that its images were
+                # synced once its import succeeded, so only then can it be
+                # a peer to the others.
+                synced_now = yield deferToDatabase(
+                    self._get_last_image_sync, system_id
+                )
+                if synced_now is not None and synced_now != last_sync:
+                    synced.append(self.peers[system_id])
+            return result
+
+        def report(result, system_id):
+            done.append(system_id)
+            progress = "%d of %d" % (len(done), len(self.system_ids))
+            if not isinstance(result, Failure):
+                log.msg(
+                    "Rack controller (%s) has imported boot resources "
+                    "(%s)." % (system_id, progress)
+                )
+            elif result.check(NoConnectionsAvailable):
+                log.msg(
+                    "Rack controller (%s) did not import boot resources; it "
+                    "is not connected to the region at this time (%s)."
+                    % (system_id, progress)
+                )
+            else:
+                log.err(
+                    result,
+                    "Rack controller (%s) failed to import boot resources "
+                    "(%s)." % (system_id, progress),
+                )
+            return result
 
         return DeferredList(
             (
-                lock.run(sync_rack, system_id, self.sources, self.proxy)
+                lock.run(sync_rack, system_id).addBoth(report, system_id)
                 for system_id in self.system_ids
             ),
             consumeErrors=True,
         )
 
     @asynchronous
-    def run(self, concurrency=1):
+    def run(self, concurrency=None):
         """Ask the rack controllers to download the region's boot resources.
 
         Report the results via the log.
 
         :param concurrency: Limit the number of rack controllers importing at
-            one time to no more than `concurrency`.
+            one time to no more than `concurrency`. Defaults to the
+            importer's own concurrency.
         """
+        if concurrency is None:
+            concurrency = self.concurrency
         lock = DeferredSemaphore(concurrency)
-
-        def report(results):
-            message_success = (
-                "Rack controller (%s) has imported boot resources."
-            )
-            message_failure = (
-                "Rack controller (%s) failed to import boot resources."
-            )
-            message_disconn = (
-                "Rack controller (%s) did not import boot resources; it is "
-                "not connected to the region at this time."
-            )
-            for system_id, (success, result) in zip(self.system_ids, results):
-                if success:
-                    log.msg(message_success % system_id)
-                elif result.check(NoConnectionsAvailable):
-                    log.msg(message_disconn % system_id)
-                else:
-                    log.err(result, message_failure % system_id)
-
-        return (
-            self(lock)
-            .addCallback(report)
-            .addErrback(log.err, "General failure syncing boot resources.")
+        return self(lock).addErrback(
+            log.err, "General failure syncing boot resources."
         )
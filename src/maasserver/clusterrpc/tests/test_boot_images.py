@@ -4,6 +4,8 @@
 """Tests for the `boot_images` module."""
 
 
+from datetime import datetime, timedelta
+import itertools
 import os
 import random
 from unittest.mock import ANY, call, MagicMock, sentinel
@@ -33,7 +35,7 @@ from maasserver.clusterrpc.boot_images import (
     RackControllersImporter,
 )
 from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
-from maasserver.enum import BOOT_RESOURCE_TYPE
+from maasserver.enum import BOOT_RESOURCE_TYPE, IPADDRESS_TYPE
 from maasserver.models.config import Config
 from maasserver.models.signals import bootsources
 from maasserver.rpc import getAllClients
@@ -61,6 +63,7 @@ from provisioningserver.boot.tftppath import compose_image_path
 from provisioningserver.rpc import boot_images
 from provisioningserver.rpc.cluster import (
     ImportBootImages,
+    IsImportBootImagesRunning,
     ListBootImages,
     ListBootImagesV2,
 )
@@ -70,6 +73,7 @@ from provisioningserver.testing.boot_images import (
     make_image,
 )
 from provisioningserver.testing.config import ClusterConfigurationFixture
+from provisioningserver.utils.url import compose_URL
 
 
 def make_image_dir(image_params, tftp_root):
@@ -494,6 +498,14 @@ class TestRackControllersImporter(MAASServerTestCase):
             ),
         )
 
+    def test_run_uses_concurrency_of_importer_by_default(self):
+        call = self.patch(RackControllersImporter, "__call__")
+        call.return_value = succeed(None)
+        concurrency = random.randint(2, 9)
+        RackControllersImporter([], [], concurrency=concurrency).run().wait(5)
+        [lock] = call.call_args[0]
+        self.assertEqual(concurrency, lock.limit)
+
     def test_run_will_not_error_instead_it_logs(self):
         call = self.patch(RackControllersImporter, "__call__")
         call.return_value = fail(ZeroDivisionError())
@@ -512,6 +524,158 @@ class TestRackControllersImporter(MAASServerTestCase):
         )
 
 
+class TestRackControllersImporterCall(MAASServerTestCase):
+    """Tests for calling `RackControllersImporter`."""
+
+    def make_client(self, running=(False,)):
+        running = iter(running)
+
+        def call(command, **kwargs):
+            if command is IsImportBootImagesRunning:
+                return succeed({"running": next(running)})
+            else:
+                return succeed({})
+
+        return MagicMock(side_effect=call)
+
+    def patch_getClientFor(self, clients):
+        getClientFor = self.patch(boot_images_module, "getClientFor")
+        getClientFor.side_effect = lambda system_id, timeout: succeed(
+            clients[system_id]
+        )
+
+    def test_waits_for_rack_controllers_to_finish_importing(self):
+        pause = self.patch(boot_images_module, "pause")
+        pause.return_value = succeed(None)
+        client = self.make_client(running=(True, True, False))
+        self.patch_getClientFor({"abc": client})
+        importer = RackControllersImporter("abc", [sentinel.source])
+        results = importer(lock=DeferredLock()).wait(5)
+        self.assertEqual([(True, {})], results)
+        self.assertThat(
+            client,
+            MockCallsMatch(
+                call(
+                    ImportBootImages,
+                    sources=[sentinel.source],
+                    http_proxy=None,
+                    https_proxy=None,
+                ),
+                call(IsImportBootImagesRunning),
+                call(IsImportBootImagesRunning),
+                call(IsImportBootImagesRunning),
+            ),
+        )
+        self.assertThat(
+            pause,
+            MockCallsMatch(
+                call(importer.poll_interval, importer.clock),
+                call(importer.poll_interval, importer.clock),
+            ),
+        )
+
+    def test_does_not_wait_for_rack_controllers_that_cannot_tell(self):
+        client = MagicMock()
+        client.side_effect = lambda command, **kwargs: (
+            fail(UnhandledCommand())
+            if command is IsImportBootImagesRunning
+            else succeed({})
+        )
+        self.patch_getClientFor({"abc": client})
+        importer = RackControllersImporter("abc", [sentinel.source])
+        results = importer(lock=DeferredLock()).wait(5)
+        self.assertEqual([(True, {})], results)
+
+    def test_gives_up_waiting_after_import_timeout(self):
+        clock = Clock()
+        pause = self.patch(boot_images_module, "pause")
+        pause.side_effect = lambda interval, clock: succeed(
+            clock.advance(interval)
+        )
+        client = self.make_client(running=itertools.repeat(True))
+        self.patch_getClientFor({"abc": client})
+        importer = RackControllersImporter("abc", [sentinel.source])
+        importer.clock = clock
+        importer.import_timeout = importer.poll_interval * 3
+        with TwistedLoggerFixture():
+            [(success, failure)] = importer(lock=DeferredLock()).wait(5)
+        self.assertFalse(success)
+        self.assertIsNotNone(failure.check(TimeoutError))
+        self.assertEqual(3, pause.call_count)
+
+    def make_importer_with_peers(self, system_ids, peers, last_syncs):
+        importer = RackControllersImporter(
+            system_ids, [sentinel.source], peers=peers
+        )
+        last_syncs = {
+            system_id: iter(syncs) for system_id, syncs in last_syncs.items()
+        }
+        importer._get_last_image_sync = lambda system_id: next(
+            last_syncs[system_id]
+        )
+        return importer
+
+    def test_offers_rack_controllers_that_are_done_as_peers(self):
+        clients = {system_id: self.make_client() for system_id in "abc"}
+        self.patch_getClientFor(clients)
+        peers = {
+            system_id: "http://%s:5248/boot-resources-cache/" % system_id
+            for system_id in "ab"
+        }
+        synced = datetime.now()
+        importer = self.make_importer_with_peers(
+            ["a", "b", "c"],
+            peers,
+            {
+                "a": [None, synced],
+                "b": [synced - timedelta(days=1), synced],
+            },
+        )
+        importer(lock=DeferredLock()).wait(5)
+        observed = [
+            sorted(clients[system_id].call_args_list[0][1].get("peers", []))
+            for system_id in "abc"
+        ]
+        self.assertEqual(
+            [[], [peers["a"]], [peers["a"], peers["b"]]], observed
+        )
+
+    def test_does_not_offer_rack_controllers_that_failed_as_peers(self):
+        clients = {system_id: self.make_client() for system_id in "abc"}
+        self.patch_getClientFor(clients)
+        peers = {
+            system_id: "http://%s:5248/boot-resources-cache/" % system_id
+            for system_id in "ab"
+        }
+        synced = datetime.now()
+        importer = self.make_importer_with_peers(
+            ["a", "b", "c"],
+            peers,
+            # The import on "a" failed, so it never recorded a sync.
+            {"a": [synced, synced], "b": [None, synced]},
+        )
+        importer(lock=DeferredLock()).wait(5)
+        observed = [
+            sorted(clients[system_id].call_args_list[0][1].get("peers", []))
+            for system_id in "abc"
+        ]
+        self.assertEqual([[], [], [peers["b"]]], observed)
+
+    def test_logs_progress_of_each_rack_controller(self):
+        clients = {system_id: self.make_client() for system_id in "ab"}
+        self.patch_getClientFor(clients)
+        importer = RackControllersImporter(["a", "b"], [sentinel.source])
+        with TwistedLoggerFixture() as logger:
+            importer(lock=DeferredLock()).wait(5)
+        self.assertEqual(
+            [
+                "Rack controller (a) has imported boot resources (1 of 2).",
+                "Rack controller (b) has imported boot resources (2 of 2).",
+            ],
+            logger.messages,
+        )
+
+
 class TestRackControllersImporterNew(MAASServerTestCase):
     """Tests for the `RackControllersImporter.new` function."""
 
@@ -558,6 +722,41 @@ class TestRackControllersImporterNew(MAASServerTestCase):
         importer = RackControllersImporter.new(system_ids=[], sources=[])
         self.assertThat(importer, MatchesStructure(proxy=Equals(None)))
 
+    def test_new_obtains_concurrency(self):
+        Config.objects.set_config("boot_images_rack_import_concurrency", 7)
+        importer = RackControllersImporter.new(
+            system_ids=[], sources=[], proxy=None
+        )
+        self.assertEqual(7, importer.concurrency)
+
+    def test_new_obtains_no_peers_if_peer_import_disabled(self):
+        rack = factory.make_RackController()
+        factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            interface=factory.make_Interface(node=rack),
+        )
+        importer = RackControllersImporter.new(sources=[], proxy=None)
+        self.assertEqual({}, importer.peers)
+
+    def test_new_obtains_peers_if_peer_import_enabled(self):
+        Config.objects.set_config("boot_images_peer_import", True)
+        rack = factory.make_RackController()
+        ip = factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            interface=factory.make_Interface(node=rack),
+        )
+        # Rack controllers without addresses can't be peers.
+        factory.make_RackController()
+        importer = RackControllersImporter.new(sources=[], proxy=None)
+        self.assertEqual(
+            {
+                rack.system_id: compose_URL(
+                    "http://:5248/boot-resources-cache/", ip.ip
+                )
+            },
+            importer.peers,
+        )
+
 
 class TestRackControllersImporterInAction(MAASTransactionServerTestCase):
     """Live tests for `RackControllersImporter`."""
@@ -637,14 +836,14 @@ class TestRackControllersImporterInAction(MAASTransactionServerTestCase):
             """\
             ...
             ---
-            Rack controller (%s) has imported boot resources.
+            Rack controller (%s) has imported boot resources (1 of 3).
             ---
-            Rack controller (%s) failed to import boot resources.
+            Rack controller (%s) failed to import boot resources (2 of 3).
             Traceback (most recent call last):
             ...
             ---
             Rack controller (%s) did not import boot resources; it is not
-            connected to the region at this time.
+            connected to the region at this time (3 of 3).
             """
             % (rack_1.system_id, rack_2.system_id, rack_3.system_id),
             logger.output,
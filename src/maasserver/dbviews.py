@@ -105,6 +105,9 @@ maasserver_discovery = dedent(
 # IP addresses that are in subnets with the same space ID. Typically this view
 # should not be used without constraining, say, the sets of nodes, to find
 # addresses that are mutually routable between region controllers for example.
+# The pairs with a controller on the right are also kept in the
+# maasserver_routablepair table, which is cheaper to query; see
+# maasserver.triggers.system.
 maasserver_routable_pairs = dedent(
     """\
     SELECT
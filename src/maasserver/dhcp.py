@@ -47,6 +47,8 @@ from provisioningserver.rpc.cluster import (
     ConfigureDHCPv4_V2,
     ConfigureDHCPv6,
     ConfigureDHCPv6_V2,
+    UpdateDHCPv4Hosts,
+    UpdateDHCPv6Hosts,
     ValidateDHCPv4Config,
     ValidateDHCPv4Config_V2,
     ValidateDHCPv6Config,
@@ -54,7 +56,10 @@ from provisioningserver.rpc.cluster import (
 )
 from provisioningserver.rpc.clusterservice import DHCP_TIMEOUT
 from provisioningserver.rpc.dhcp import downgrade_shared_networks
-from provisioningserver.rpc.exceptions import NoConnectionsAvailable
+from provisioningserver.rpc.exceptions import (
+    CannotConfigureDHCP,
+    NoConnectionsAvailable,
+)
 from provisioningserver.utils import typed
 from provisioningserver.utils.network import get_source_address
 from provisioningserver.utils.text import split_string_list
@@ -62,6 +67,10 @@ from provisioningserver.utils.twisted import asynchronous, synchronous
 
 log = LegacyLogger()
 
+# The DHCP configuration last pushed to each rack controller by this process,
+# keyed by the rack controller's ID.
+_configured_for_rack = {}
+
 
 def get_omapi_key():
     """Return the OMAPI key for all DHCP servers that are ran by MAAS."""
@@ -841,6 +850,70 @@ DHCPConfigurationForRack = namedtuple(
 )
 
 
+def forget_dhcp_configuration(rack_id):
+    """Forget the DHCP configuration last pushed to a rack controller.
+
+    The next call to `configure_dhcp` for the rack controller will then push
+    the complete configuration.
+    """
+    _configured_for_rack.pop(rack_id, None)
+
+
+def get_unchanged_dhcp_hosts(previous, config, ip_version):
+    """Return the hosts in `previous` for `ip_version`...
+
+    ... if the hosts are the only part of the configuration for `ip_version`
+    that can differ between `previous` and `config`. Otherwise return `None`.
+
+    :param previous: The `DHCPConfigurationForRack` last pushed, or `None`.
+    :param config: The new `DHCPConfigurationForRack`.
+    """
+    if previous is None:
+        return None
+    suffix = "_v%d" % ip_version
+    if len(getattr(config, "shared_networks" + suffix)) == 0:
+        # The server is being stopped.
+        return None
+    for field in ("failover_peers", "shared_networks", "interfaces"):
+        name = field + suffix
+        if getattr(previous, name) != getattr(config, name):
+            return None
+    if (
+        previous.omapi_key != config.omapi_key
+        or previous.global_dhcp_snippets != config.global_dhcp_snippets
+    ):
+        return None
+    return getattr(previous, "hosts" + suffix)
+
+
+def get_dhcp_hosts_delta(previous_hosts, hosts):
+    """Return the `(remove, add, modify)` hosts that turn `previous_hosts`
+    into `hosts`.
+
+    Hosts carrying DHCP snippets cannot be changed over the OMAPI, so `None`
+    is returned when any of those are added, removed or changed.
+    """
+    previous_hosts = {host["mac"]: host for host in previous_hosts}
+    hosts = {host["mac"]: host for host in hosts}
+    remove, add, modify = [], [], []
+    for mac, host in hosts.items():
+        previous_host = previous_hosts.get(mac)
+        if previous_host is None:
+            if len(host["dhcp_snippets"]) > 0:
+                return None
+            add.append(host)
+        elif previous_host != host:
+            if previous_host["dhcp_snippets"] != host["dhcp_snippets"]:
+                return None
+            modify.append(host)
+    for mac, host in previous_hosts.items():
+        if mac not in hosts:
+            if len(host["dhcp_snippets"]) > 0:
+                return None
+            remove.append(host)
+    return remove, add, modify
+
+
 @asynchronous
 @inlineCallbacks
 def configure_dhcp(rack_controller):
@@ -863,6 +936,11 @@ def configure_dhcp(rack_controller):
     # Get configuration for both IPv4 and IPv6.
     config = yield deferToDatabase(get_dhcp_configuration, rack_controller)
 
+    # Compare with what was last pushed; when only host maps have changed
+    # just those are sent. The previous configuration is forgotten until this
+    # one has been pushed successfully.
+    previous = _configured_for_rack.pop(rack_controller.id, None)
+
     # Fix interfaces to go over the wire.
     interfaces_v4 = [{"name": name} for name in config.interfaces_v4]
     interfaces_v6 = [{"name": name} for name in config.interfaces_v6]
@@ -872,10 +950,12 @@ def configure_dhcp(rack_controller):
     ipv4_status, ipv6_status = SERVICE_STATUS.UNKNOWN, SERVICE_STATUS.UNKNOWN
 
     try:
-        yield _perform_dhcp_config(
+        yield _perform_dhcp_update(
             client,
+            UpdateDHCPv4Hosts,
             ConfigureDHCPv4_V2,
             ConfigureDHCPv4,
+            previous_hosts=get_unchanged_dhcp_hosts(previous, config, 4),
             failover_peers=config.failover_peers_v4,
             interfaces=interfaces_v4,
             shared_networks=config.shared_networks_v4,
@@ -902,10 +982,12 @@ def configure_dhcp(rack_controller):
         )
 
     try:
-        yield _perform_dhcp_config(
+        yield _perform_dhcp_update(
             client,
+            UpdateDHCPv6Hosts,
             ConfigureDHCPv6_V2,
             ConfigureDHCPv6,
+            previous_hosts=get_unchanged_dhcp_hosts(previous, config, 6),
             failover_peers=config.failover_peers_v6,
             interfaces=interfaces_v6,
             shared_networks=config.shared_networks_v6,
@@ -952,6 +1034,9 @@ def configure_dhcp(rack_controller):
 
     yield deferToDatabase(update_services)
 
+    if ipv4_exc is None and ipv6_exc is None:
+        _configured_for_rack[rack_controller.id] = config
+
     # Raise the exceptions to the caller, it might want to retry. This raises
     # IPv4 before IPv6 if they both fail. No specific reason for this, if
     # the function is called again both will be performed.
@@ -1082,6 +1167,65 @@ def _validate_dhcp_config_v6(client, **args):
     )
 
 
+@asynchronous
+@inlineCallbacks
+def _perform_dhcp_update(
+    client,
+    update_command,
+    v2_command,
+    v1_command,
+    *,
+    previous_hosts,
+    hosts,
+    omapi_key,
+    **args
+):
+    """Call `update_command` with the changed hosts, if possible...
+
+    ... otherwise configure the DHCP server in full with `v2_command` or
+    `v1_command`; see `_perform_dhcp_config`.
+
+    :param client: An RPC client.
+    :param update_command: The RPC command to update host maps with.
+    :param previous_hosts: The hosts last configured on the server, or `None`
+        if any other part of the configuration may have changed.
+    :param hosts: The hosts to configure.
+    :param omapi_key: The OMAPI key for the server.
+    :param args: Remaining arguments for `v2_command` and `v1_command`.
+    """
+    if previous_hosts is not None:
+        delta = get_dhcp_hosts_delta(previous_hosts, hosts)
+        if delta is not None:
+            remove, add, modify = delta
+            if len(remove) + len(add) + len(modify) == 0:
+                # Nothing has changed.
+                return
+            try:
+                yield client(
+                    update_command,
+                    _timeout=DHCP_TIMEOUT + 5,
+                    omapi_key=omapi_key,
+                    remove=remove,
+                    add=add,
+                    modify=modify,
+                )
+            except (amp.UnhandledCommand, CannotConfigureDHCP) as error:
+                log.msg(
+                    "Updating DHCP host maps on rack controller '%s' "
+                    "failed; configuring in full: %s" % (client.ident, error)
+                )
+            else:
+                return
+    yield _perform_dhcp_config(
+        client,
+        v2_command,
+        v1_command,
+        hosts=hosts,
+        omapi_key=omapi_key,
+        **args
+    )
+
+
 @asynchronous
 def _perform_dhcp_config(
     client, v2_command, v1_command, *, shared_networks, **args
@@ -5,6 +5,7 @@
 
 
 from collections import defaultdict
+import os
 
 from django.conf import settings
 from netaddr import IPAddress
@@ -24,14 +25,19 @@ from maasserver.models.subnet import Subnet
 from provisioningserver.dns.actions import (
     bind_reload,
     bind_reload_with_retries,
+    bind_reload_zones,
     bind_write_configuration,
     bind_write_options,
     bind_write_zones,
 )
+from provisioningserver.dns.config import get_dns_config_dir
 from provisioningserver.logger import get_maas_logger
 
 maaslog = get_maas_logger("dns")
 
+# The source of publications requested through `dns_force_reload`.
+FORCE_RELOAD_SOURCE = "Force reload"
+
 
 def current_zone_serial():
     return "%0.10d" % DNSPublication.objects.get_most_recent().serial
@@ -44,7 +50,75 @@ def is_dns_enabled():
 
 def dns_force_reload():
     """Force the DNS to be regenerated."""
-    DNSPublication(source="Force reload").save()
+    DNSPublication(source=FORCE_RELOAD_SOURCE).save()
+
+
+class ZonePublicationState:
+    """Record of what this process last published to BIND.
+
+    `dns_update_all_zones` compares freshly generated zones against this
+    record so that it only needs to rewrite and reload the zones that have
+    actually changed since the previous publication.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything; the next publication will be a full one."""
+        # The DNS configuration directory the zones were written into.
+        self.config_dir = None
+        # The ID of the most recent `DNSPublication` that was published.
+        self.publication_id = None
+        # The zone names and trusted networks in named.conf.maas.
+        self.configuration = None
+        # The upstream DNS servers and DNSSEC validation options.
+        self.options = None
+        # Mapping of zone names to zone fingerprints.
+        self.fingerprints = {}
+
+    def needs_full_publication(self, publication_id):
+        """Must everything be rewritten and reloaded?
+
+        This is the case when nothing has been published yet by this process,
+        when the DNS configuration directory has moved, or when a reload has
+        been forced since the previous publication.
+        """
+        if self.publication_id is None:
+            return True
+        elif self.config_dir != get_dns_config_dir():
+            return True
+        else:
+            return DNSPublication.objects.filter(
+                id__gt=self.publication_id,
+                id__lte=publication_id,
+                source=FORCE_RELOAD_SOURCE,
+            ).exists()
+
+
+# The record of what this process has published. Tests that run BIND with a
+# fresh configuration should reset this.
+zone_publication_state = ZonePublicationState()
+
+
+def get_changed_zones(zones, fingerprints, previous_fingerprints):
+    """Return the names of the zones that need to be rewritten.
+
+    :param zones: A sequence of `DomainConfigBase` instances.
+    :param fingerprints: The `{zone_name: fingerprint}` of `zones`.
+    :param previous_fingerprints: The `{zone_name: fingerprint}` of the
+        zones previously published.
+    :return: A set of zone names.
+    """
+    changed = set()
+    for zone in zones:
+        for zone_info in zone.zone_info:
+            name = zone_info.zone_name
+            if fingerprints[name] != previous_fingerprints.get(name):
+                changed.add(name)
+            elif not os.path.exists(zone_info.target_path):
+                changed.add(name)
+    return changed
 
 
 def dns_update_all_zones(reload_retry=False, reload_timeout=2):
@@ -53,17 +127,27 @@ def dns_update_all_zones(reload_retry=False, reload_timeout=2):
     Serving these zone files means updating BIND's configuration to include
     them, then asking it to load the new configuration.
 
+    The first publication in a process rewrites every zone and fully reloads
+    BIND. After that only zones whose records have changed are rewritten and
+    reloaded, one by one; a full reload only happens when zones are added or
+    removed, when BIND's options or trusted networks change, or when a reload
+    has been forced with `dns_force_reload`.
+
     :param reload_retry: Should the DNS server reload be retried in case
         of failure? Defaults to `False`.
     :type reload_retry: bool
+    :return: A tuple of the current serial, whether BIND was reloaded, and
+        the names of the domains whose zones were published.
     """
     if not is_dns_enabled():
         return
 
+    state = zone_publication_state
     domains = Domain.objects.filter(authoritative=True)
     subnets = Subnet.objects.exclude(rdns_mode=RDNS_MODE.DISABLED)
     default_ttl = Config.objects.get_config("default_dns_ttl")
     serial = current_zone_serial()
+    publication_id = DNSPublication.objects.get_most_recent().id
     zones = ZoneGenerator(
         domains,
         subnets,
@@ -71,7 +155,27 @@ def dns_update_all_zones(reload_retry=False, reload_timeout=2):
         serial,
         internal_domains=[get_internal_domain()],
     ).as_list()
-    bind_write_zones(zones)
+
+    fingerprints = {}
+    for zone in zones:
+        fingerprints.update(zone.get_zone_fingerprints())
+    upstream_dns = get_upstream_dns()
+    dnssec_validation = get_dnssec_validation()
+    trusted_networks = get_trusted_networks()
+    options = (upstream_dns, dnssec_validation)
+    configuration = (sorted(fingerprints), sorted(trusted_networks))
+
+    full = (
+        state.needs_full_publication(publication_id)
+        or options != state.options
+        or configuration != state.configuration
+    )
+    if full:
+        changed = set(fingerprints)
+        bind_write_zones(zones)
+    else:
+        changed = get_changed_zones(zones, fingerprints, state.fingerprints)
+        bind_write_zones(zones, zone_names=changed)
 
     # We should not be calling bind_write_options() here; call-sites should be
     # making a separate call. It's a historical legacy, where many sites now
@@ -79,27 +183,46 @@ def dns_update_all_zones(reload_retry=False, reload_timeout=2):
     # some that call it for this side-effect alone. At present all it does is
     # set the upstream DNS servers, nothing to do with serving zones at all!
     bind_write_options(
-        upstream_dns=get_upstream_dns(),
-        dnssec_validation=get_dnssec_validation(),
+        upstream_dns=upstream_dns, dnssec_validation=dnssec_validation
     )
 
-    # Nor should we be rewriting ACLs that are related only to allowing
-    # recursive queries to the upstream DNS servers. Again, this is legacy,
-    # where the "trusted" ACL ended up in the same configuration file as the
-    # zone stanzas, and so both need to be rewritten at the same time.
-    bind_write_configuration(zones, trusted_networks=get_trusted_networks())
-
-    # Reloading with retries may be a legacy from Celery days, or it may be
-    # necessary to recover from races during start-up. We're not sure if it is
-    # actually needed but it seems safer to maintain this behaviour until we
-    # have a better understanding.
-    if reload_retry:
-        reloaded = bind_reload_with_retries(timeout=reload_timeout)
+    if full:
+        # Nor should we be rewriting ACLs that are related only to allowing
+        # recursive queries to the upstream DNS servers. Again, this is
+        # legacy, where the "trusted" ACL ended up in the same configuration
+        # file as the zone stanzas, and so both need to be rewritten at the
+        # same time.
+        bind_write_configuration(zones, trusted_networks=trusted_networks)
+
+        # Reloading with retries may be a legacy from Celery days, or it may
+        # be necessary to recover from races during start-up. We're not sure
+        # if it is actually needed but it seems safer to maintain this
+        # behaviour until we have a better understanding.
+        if reload_retry:
+            reloaded = bind_reload_with_retries(timeout=reload_timeout)
+        else:
+            reloaded = bind_reload(timeout=reload_timeout)
+    elif len(changed) > 0:
+        reloaded = bind_reload_zones(sorted(changed))
     else:
-        reloaded = bind_reload(timeout=reload_timeout)
+        reloaded = True
 
-    # Return the current serial and list of domain names.
-    return serial, reloaded, [domain.name for domain in domains]
+    if reloaded is False:
+        # Start from scratch next time; BIND's view of the zones is unknown.
+        state.reset()
+    else:
+        state.config_dir = get_dns_config_dir()
+        state.publication_id = publication_id
+        state.configuration = configuration
+        state.options = options
+        state.fingerprints = fingerprints
+
+    # Return the current serial and list of published domain names.
+    return (
+        serial,
+        reloaded,
+        [domain.name for domain in domains if domain.name in changed],
+    )
 
 
 def get_upstream_dns():
@@ -41,7 +41,7 @@ from maasserver.models.dnspublication import DNSPublication
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from provisioningserver.dns.commands import get_named_conf, setup_dns
 from provisioningserver.dns.config import compose_config_path, DNSConfig
 from provisioningserver.dns.testing import (
@@ -94,6 +94,8 @@ class TestDNSServer(MAASServerTestCase):
         # Ensure there's an initial DNS publication. Outside of tests this is
         # guaranteed by a migration.
         DNSPublication(source="Initial").save()
+        # Start with nothing published, as a freshly started region would.
+        dns_config_module.zone_publication_state.reset()
         # Allow test-local changes to configuration.
         self.useFixture(RegionConfigurationFixture())
         # Immediately make DNS changes as they're needed.
@@ -404,6 +406,64 @@ class TestDNSConfigModifications(TestDNSServer):
             ),
         )
 
+    def test_dns_update_all_zones_skips_unchanged_zones(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        self.create_node_with_static_ip()
+        dns_update_all_zones()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones"
+        )
+        serial, reloaded, domains = dns_update_all_zones()
+        self.assertThat(reloaded, Is(True))
+        self.assertThat(domains, Equals([]))
+        self.assertThat(bind_reload, MockNotCalled())
+        self.assertThat(bind_reload_zones, MockNotCalled())
+
+    def test_dns_update_all_zones_reloads_only_changed_zones(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        domain = factory.make_Domain()
+        # Use the same subnet throughout so that no new zones are needed.
+        _, static = self.create_node_with_static_ip()
+        dns_update_all_zones()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        node, static = self.create_node_with_static_ip(
+            domain=domain, subnet=static.subnet
+        )
+        DNSPublication(source="Node added").save()
+        serial, reloaded, domains = dns_update_all_zones()
+        self.assertThat(domains, Equals([domain.name]))
+        self.assertThat(bind_reload, MockNotCalled())
+        self.assertDNSMatches(node.hostname, domain.name, static.ip)
+
+    def test_dns_update_all_zones_reloads_everything_when_forced(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        self.create_node_with_static_ip()
+        dns_update_all_zones()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload.return_value = True
+        dns_force_reload()
+        serial, reloaded, domains = dns_update_all_zones()
+        self.assertThat(bind_reload, MockCalledOnceWith(timeout=2))
+        self.assertThat(
+            domains,
+            MatchesSetwise(
+                *[
+                    Equals(domain.name)
+                    for domain in Domain.objects.filter(authoritative=True)
+                ]
+            ),
+        )
+
+    def test_dns_update_all_zones_reloads_everything_after_failure(self):
+        self.patch(settings, "DNS_CONNECT", True)
+        self.create_node_with_static_ip()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload.return_value = False
+        dns_update_all_zones()
+        dns_update_all_zones()
+        self.assertThat(bind_reload.call_count, Equals(2))
+
 
 class TestDNSDynamicIPAddresses(TestDNSServer):
     """Allocated nodes with IP addresses in the dynamic range get a DNS
@@ -165,6 +165,28 @@ def make_ReverseDNSService(postgresListener):
     return ReverseDNSService(postgresListener)
 
 
+def make_RackConnectivityService(rpc, postgresListener):
+    from maasserver.regiondservices.rack_connectivity import (
+        RackConnectivityService,
+    )
+
+    return RackConnectivityService(rpc, postgresListener)
+
+
+def make_ConfigCacheService(postgresListener):
+    from maasserver.regiondservices.config_cache import ConfigCacheService
+
+    return ConfigCacheService(postgresListener)
+
+
+def make_ExternalServicesService(postgresListener):
+    from maasserver.regiondservices.external_services import (
+        ExternalServicesService,
+    )
+
+    return ExternalServicesService(postgresListener)
+
+
 def make_NetworkTimeProtocolService():
     from maasserver.regiondservices import ntp
 
@@ -356,6 +378,21 @@ class RegionEventLoop:
             "factory": make_ReverseDNSService,
             "requires": ["postgres-listener-master"],
         },
+        "rack-connectivity": {
+            "only_on_master": False,
+            "factory": make_RackConnectivityService,
+            "requires": ["rpc", "postgres-listener-worker"],
+        },
+        "config-cache": {
+            "only_on_master": False,
+            "factory": make_ConfigCacheService,
+            "requires": ["postgres-listener-worker"],
+        },
+        "external-services": {
+            "only_on_master": False,
+            "factory": make_ExternalServicesService,
+            "requires": ["postgres-listener-worker"],
+        },
         "rack-controller": {
             "only_on_master": False,
             "factory": make_RackControllerService,
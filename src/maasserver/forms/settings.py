@@ -662,6 +662,38 @@ CONFIG_ITEMS = {
             ),
         },
     },
+    "boot_images_rack_import_concurrency": {
+        "default": 4,
+        "form": forms.IntegerField,
+        "form_kwargs": {
+            "required": False,
+            "label": (
+                "Number of rack controllers importing boot images at once"
+            ),
+            "help_text": (
+                "Rack controllers import the boot images from the region "
+                "(or from peers) after the region synced them. This limits "
+                "how many of them download at the same time."
+            ),
+            "min_value": 1,
+        },
+    },
+    "boot_images_peer_import": {
+        "default": False,
+        "form": forms.BooleanField,
+        "form_kwargs": {
+            "required": False,
+            "label": (
+                "Allow rack controllers to import boot images from each other"
+            ),
+            "help_text": (
+                "Rack controllers that are done importing the boot images "
+                "serve them to the remaining rack controllers, which fall "
+                "back to the region if they can't be reached. The region "
+                "still provides the checksums of all the files."
+            ),
+        },
+    },
     "curtin_verbose": {
         "default": False,
         "form": forms.BooleanField,
@@ -7,6 +7,7 @@
 from collections import defaultdict
 from errno import ENOENT
 import threading
+import time
 
 from django.db import connections
 from django.db.utils import load_backend
@@ -15,6 +16,7 @@ from twisted.internet import defer, error, interfaces, reactor, task
 from twisted.internet.defer import (
     CancelledError,
     Deferred,
+    DeferredSemaphore,
     ensureDeferred,
     succeed,
 )
@@ -24,6 +26,7 @@ from twisted.logger import Logger
 from twisted.python.failure import Failure
 from zope.interface import implementer
 
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.events import EventGroup
 from provisioningserver.utils.twisted import callOut, suppress, synchronous
@@ -69,19 +72,35 @@ class PostgresListenerService(Service, object):
         at all other times.
     """
 
-    # Seconds to wait to handle new notifications. When the notifications set
-    # is empty it will wait this amount of time to check again for new
-    # notifications.
+    # Seconds to wait to handle new notifications. Notifications for the
+    # same channel and payload received within this window are coalesced
+    # and handled once. When the notifications queue is empty it will wait
+    # this amount of time to check again for new notifications.
     HANDLE_NOTIFY_DELAY = 0.5
     CHANNEL_REGISTRAR_DELAY = 0.5
 
+    # Maximum number of handlers running at once for each (non-system)
+    # channel, so that a storm of notifications can't use up all the
+    # database threads. System channels are not limited.
+    HANDLE_NOTIFY_CONCURRENCY = 2
+
+    # Maximum number of handlers running at once across all the
+    # (non-system) channels, however many channels have notifications.
+    HANDLE_NOTIFY_MAX_CONCURRENCY = 4
+
     def __init__(self, alias="default"):
         self.alias = alias
         self.listeners = defaultdict(list)
         self.autoReconnect = False
         self.connection = None
         self.connectionFileno = None
-        self.notifications = set()
+        # Maps (channel, payload) to the time it was first received; dicts
+        # keep the insertion order, so the oldest is handled first.
+        self.notifications = {}
+        self.channelSemaphores = {}
+        self.notifySemaphore = DeferredSemaphore(
+            self.HANDLE_NOTIFY_MAX_CONCURRENCY
+        )
         self.notifier = task.LoopingCall(self.handleNotifies)
         self.notifierDone = None
         self.connecting = None
@@ -430,19 +449,37 @@ class PostgresListenerService(Service, object):
             return succeed(None)
 
     def handleNotifies(self, clock=reactor):
-        """Process all notify message in the notifications set."""
+        """Process all notify message in the notifications queue.
+
+        Notifications are started oldest first, and the returned `Deferred`
+        fires once they have all been handled. In the meantime new
+        notifications are queued up and coalesced.
+        """
 
         def gen_notifications(notifications):
             while len(notifications) != 0:
-                yield notifications.pop()
+                notification = next(iter(notifications))
+                yield notification, notifications.pop(notification)
 
-        return task.coiterate(
-            self.handleNotify(notification, clock=clock)
-            for notification in gen_notifications(self.notifications)
-        )
+        defers = [
+            defer.maybeDeferred(
+                self.handleNotify, notification, received=received, clock=clock
+            )
+            for notification, received in gen_notifications(self.notifications)
+        ]
+        self._updateQueueDepth()
+        return defer.DeferredList(defers)
+
+    def handleNotify(self, notification, received=None, clock=reactor):
+        """Process a notify message from the notifications queue.
+
+        At most `HANDLE_NOTIFY_CONCURRENCY` handlers are running at the same
+        time for each channel, and `HANDLE_NOTIFY_MAX_CONCURRENCY` across all
+        channels.
 
-    def handleNotify(self, notification, clock=reactor):
-        """Process a notify message in the notifications set."""
+        :param received: The time the notification was received, used to
+            track the time taken to handle it.
+        """
         channel, payload = notification
         try:
             channel, action = self.convertChannel(channel)
@@ -455,10 +492,11 @@ class PostgresListenerService(Service, object):
         else:
             defers = []
             handlers = self.listeners[channel]
-            # XXX: There could be an arbitrary number of listeners. Should we
-            # limit concurrency here? Perhaps even do one at a time.
+            semaphore = self.getChannelSemaphore(channel)
             for handler in handlers:
-                d = defer.maybeDeferred(handler, action, payload)
+                d = semaphore.run(
+                    self.notifySemaphore.run, handler, action, payload
+                )
                 d.addErrback(
                     lambda failure: self.log.failure(
                         "Failure while handling notification to {channel!r}: "
@@ -469,16 +507,47 @@ class PostgresListenerService(Service, object):
                     )
                 )
                 defers.append(d)
-            return defer.DeferredList(defers)
+            d = defer.DeferredList(defers)
+            if received is not None:
+                d.addCallback(
+                    callOut, self._recordNotifyLag, channel, received
+                )
+            return d
+
+    def getChannelSemaphore(self, channel):
+        """Return the semaphore limiting the handlers for `channel`."""
+        semaphore = self.channelSemaphores.get(channel)
+        if semaphore is None:
+            semaphore = self.channelSemaphores[channel] = DeferredSemaphore(
+                self.HANDLE_NOTIFY_CONCURRENCY
+            )
+        return semaphore
+
+    def _updateQueueDepth(self):
+        PROMETHEUS_METRICS.update(
+            "maas_region_notification_queue_depth",
+            "set",
+            value=len(self.notifications),
+        )
+
+    def _recordNotifyLag(self, channel, received):
+        PROMETHEUS_METRICS.update(
+            "maas_region_notification_lag",
+            "observe",
+            value=time.time() - received,
+            labels={"channel": channel},
+        )
 
     def _process_notifies(self):
-        """Add each notify to to the notifications set.
+        """Add each notify to to the notifications queue.
 
         This removes duplicate notifications when one entity in the database is
         updated multiple times in a short interval. Accumulating notifications
         and allowing the listener to pick them up in batches is imperfect but
         good enough, and simple.
 
+        Notifications on system channels take priority: they are passed to
+        their handler straight away, without being queued.
         """
         notifies = self.connection.connection.notifies
         for notify in notifies:
@@ -501,8 +570,11 @@ class PostgresListenerService(Service, object):
                     self.unregisterChannel(notify.channel)
             else:
                 # Place non-system messages into the queue to be
-                # processed.
-                self.notifications.add((notify.channel, notify.payload))
+                # processed, unless already there.
+                notification = (notify.channel, notify.payload)
+                if notification not in self.notifications:
+                    self.notifications[notification] = time.time()
         # Delete the contents of the connection's notifies list so
         # that we don't process them a second time.
         del notifies[:]
+        self._updateQueueDepth()
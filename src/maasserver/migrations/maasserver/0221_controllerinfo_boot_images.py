@@ -0,0 +1,27 @@
+# Generated by Django 2.2.12 on 2021-03-02 10:14
+
+from django.db import migrations, models
+
+import maasserver.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maasserver", "0220_nodedevice"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="controllerinfo",
+            name="boot_images",
+            field=maasserver.fields.JSONObjectField(
+                blank=True, default=None, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="controllerinfo",
+            name="boot_images_in_sync",
+            field=models.NullBooleanField(default=None),
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+# Routable pairs to controllers, kept up to date by the triggers registered
+# in maasserver.triggers.system, which also populate it.
+routablepair_create = """\
+CREATE TABLE maasserver_routablepair (
+    left_node_id integer NOT NULL,
+    left_ip inet NOT NULL,
+    right_node_id integer NOT NULL,
+    right_ip inet NOT NULL,
+    metric integer NOT NULL
+);
+CREATE INDEX maasserver_routablepair_left_node_id_idx
+    ON maasserver_routablepair (left_node_id);
+CREATE INDEX maasserver_routablepair_right_node_id_idx
+    ON maasserver_routablepair (right_node_id);
+"""
+
+routablepair_drop = "DROP TABLE IF EXISTS maasserver_routablepair"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("maasserver", "0221_controllerinfo_boot_images"),
+    ]
+
+    operations = [migrations.RunSQL(routablepair_create, routablepair_drop)]
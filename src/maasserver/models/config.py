@@ -8,12 +8,14 @@ from collections import defaultdict, namedtuple
 import copy
 from datetime import timedelta
 from socket import gethostname
+import threading
 
 from django.db.models import CharField, Manager, Model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
 from maasserver import DefaultMeta
 from maasserver.fields import JSONObjectField
+from maasserver.utils.orm import in_transaction, post_commit, post_commit_do
 from provisioningserver.drivers.osystem.ubuntu import UbuntuOS
 from provisioningserver.events import EVENT_TYPES
 
@@ -85,6 +87,8 @@ def get_default_config():
         # Images.
         "boot_images_auto_import": True,
         "boot_images_no_proxy": False,
+        "boot_images_rack_import_concurrency": 4,
+        "boot_images_peer_import": False,
         # Third Party
         "enable_third_party_drivers": True,
         # Disk erasing.
@@ -142,6 +146,198 @@ NetworkDiscoveryConfig = namedtuple(
 )
 
 
+# Marks a config that isn't set in the database.
+UNSET = object()
+
+# Marks a config that has to be read from the database.
+UNKNOWN = object()
+
+
+class ConfigSnapshot:
+    """The configs seen by a transaction.
+
+    :ivar values: Maps config names to their values, or to `UNSET` or
+        `UNKNOWN`.
+    :ivar complete: Whether configs not in `values` are unset, rather than
+        unknown.
+    """
+
+    def __init__(self, values, complete):
+        self.values = values
+        self.complete = complete
+
+    def get(self, name):
+        return self.values.get(name, UNSET if self.complete else UNKNOWN)
+
+
+class ConfigCache:
+    """Process-wide cache of the configs set in the database.
+
+    The cache is disabled until it has been loaded, which the region's
+    `ConfigCacheService` does once it's listening for config changes. From
+    then on, a config that changes is read from the database until it has
+    been reloaded into the cache. Configs changed by this process are put
+    in the cache as soon as the change is committed.
+
+    Within a transaction, configs are read from a snapshot of the cache
+    taken the first time one is read, so they don't change during the
+    transaction. Configs saved in the transaction are updated in the
+    snapshot straight away.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Config name -> value.
+        self._values = {}
+        # Config ID -> name.
+        self._names = {}
+        # Names of the configs that are being reloaded.
+        self._invalid = set()
+        # IDs of the configs being reloaded that aren't in the cache yet.
+        self._new = set()
+        # Config ID -> number of times it has been invalidated.
+        self._versions = defaultdict(int)
+        # Number of times any config has been invalidated.
+        self.changes = 0
+
+    def load(self, configs, changes):
+        """Replace the cache with `configs`, and enable it.
+
+        :param configs: All the `Config`s in the database.
+        :param changes: The value of `changes` before `configs` were read.
+            If a config has been invalidated since, `configs` may be stale,
+            so they are not loaded.
+        :return: Whether `configs` were loaded.
+        """
+        with self._lock:
+            if self.changes != changes:
+                return False
+            self._values = {config.name: config.value for config in configs}
+            self._names = {config.id: config.name for config in configs}
+            self._invalid.clear()
+            self._new.clear()
+            self._versions.clear()
+            self.enabled = True
+            return True
+
+    def disable(self):
+        """Disable and empty the cache."""
+        with self._lock:
+            self.enabled = False
+            self._values = {}
+            self._names = {}
+            self._invalid.clear()
+            self._new.clear()
+            self._versions.clear()
+
+    def invalidate(self, config_id):
+        """Mark the config with `config_id` as changed.
+
+        :return: The version of the config to pass to `update` once it's
+            been reloaded, or `None` if the cache is disabled.
+        """
+        with self._lock:
+            self.changes += 1
+            if not self.enabled:
+                return None
+            name = self._names.get(config_id)
+            if name is None:
+                self._new.add(config_id)
+            else:
+                self._invalid.add(name)
+            self._versions[config_id] += 1
+            return self._versions[config_id]
+
+    def update(self, config_id, version, config):
+        """Put the reloaded config with `config_id` in the cache.
+
+        :param version: The version returned by `invalidate`. If the config
+            has been invalidated again since, nothing is done.
+        :param config: The `Config`, or `None` if it's been deleted.
+        """
+        with self._lock:
+            if not self.enabled or self._versions[config_id] != version:
+                return
+            name = self._names.pop(config_id, None)
+            if name is not None:
+                self._values.pop(name, None)
+                self._invalid.discard(name)
+            self._new.discard(config_id)
+            if config is not None:
+                self._names[config_id] = config.name
+                self._values[config.name] = config.value
+
+    def _get_snapshot(self):
+        snapshot = getattr(self._local, "snapshot", None)
+        # Post-commit hooks are fired, or cancelled when the transaction is
+        # rolled back, in the reactor thread, so they can't clear this
+        # thread's snapshot. Instead, the snapshot is discarded once the
+        # hook registered with it has been called.
+        if snapshot is None or self._local.transaction_over.called:
+            with self._lock:
+                values = dict(self._values)
+                values.update(dict.fromkeys(self._invalid, UNKNOWN))
+                # Configs not in the cache are unset, unless the cache is
+                # waiting for new configs to be reloaded.
+                complete = len(self._new) == 0
+            snapshot = ConfigSnapshot(values, complete)
+            if in_transaction():
+                self._local.snapshot = snapshot
+                self._local.transaction_over = post_commit()
+        return snapshot
+
+    def get_values(self, names, load):
+        """Return the values of the configs called `names` that are set.
+
+        :param load: Called with the names of the configs not in the cache
+            to read them from the database. It must return a dict mapping
+            the names of the configs that are set to their values.
+        """
+        snapshot = self._get_snapshot()
+        missing = [name for name in names if snapshot.get(name) is UNKNOWN]
+        if len(missing) > 0:
+            values = load(missing)
+            for name in missing:
+                snapshot.values[name] = values.get(name, UNSET)
+        values = {name: snapshot.get(name) for name in names}
+        return {
+            name: copy.deepcopy(value)
+            for name, value in values.items()
+            if value is not UNSET
+        }
+
+    def set_value(self, name, value=UNSET):
+        """Record that the config called `name` has been saved or deleted.
+
+        It is only updated in the snapshot of the current transaction; the
+        cache itself is updated once the change has been committed, see
+        `update_on_commit`.
+        """
+        if self.enabled and in_transaction():
+            self._get_snapshot().values[name] = value
+
+    def update_on_commit(self, config_id, config=None):
+        """Put the saved or deleted config in the cache once committed.
+
+        This way the process that changed it sees the change straight away,
+        rather than once it's notified of it. If the config is invalidated
+        before the commit, the cache is left to the notification.
+
+        :param config: The saved `Config`, or `None` if it's been deleted.
+        """
+        if self.enabled and in_transaction():
+            with self._lock:
+                version = self._versions[config_id]
+            post_commit_do(
+                self.update, config_id, version, copy.deepcopy(config)
+            )
+
+
+config_cache = ConfigCache()
+
+
 class ConfigManager(Manager):
     """Manager for Config model class.
 
@@ -163,12 +359,8 @@ class ConfigManager(Manager):
             item exists.
         :type default: object
         :return: A config value.
-        :raises: Config.MultipleObjectsReturned
         """
-        try:
-            return self.get(name=name).value
-        except Config.DoesNotExist:
-            return copy.deepcopy(DEFAULT_CONFIG.get(name, default))
+        return self.get_configs([name], [default])[name]
 
     def get_configs(self, names, defaults=None):
         """Return the config values corresponding to the given config names.
@@ -184,16 +376,23 @@ class ConfigManager(Manager):
         """
         if defaults is None:
             defaults = [None for _ in range(len(names))]
-        configs = {
-            config.name: config for config in self.filter(name__in=names)
-        }
+        if config_cache.enabled:
+            values = config_cache.get_values(names, self._get_values)
+        else:
+            values = self._get_values(names)
         return {
-            name: configs.get(name).value
-            if configs.get(name)
+            name: values[name]
+            if name in values
             else copy.deepcopy(DEFAULT_CONFIG.get(name, default))
             for name, default in zip(names, defaults)
         }
 
+    def _get_values(self, names):
+        """Return the values of the configs called `names` that are set."""
+        return {
+            config.name: config.value for config in self.filter(name__in=names)
+        }
+
     def set_config(self, name, value, endpoint=None, request=None):
         """Set or overwrite a config value.
 
@@ -302,3 +501,19 @@ class Config(Model):
 
 # Connect config manager's _config_changed to Config's post-save signal.
 post_save.connect(Config.objects._config_changed, sender=Config)
+
+
+def _config_saved(sender, instance, **kwargs):
+    config_cache.set_value(instance.name, instance.value)
+    config_cache.update_on_commit(instance.id, instance)
+
+
+def _config_deleted(sender, instance, **kwargs):
+    config_cache.set_value(instance.name)
+    config_cache.update_on_commit(instance.id)
+
+
+# Keep the configs seen by the current transaction, and by this process once
+# it's committed, up to date.
+post_save.connect(_config_saved, sender=Config)
+post_delete.connect(_config_deleted, sender=Config)
@@ -6,7 +6,13 @@
 
 from collections import namedtuple
 
-from django.db.models import CASCADE, CharField, Manager, OneToOneField
+from django.db.models import (
+    CASCADE,
+    CharField,
+    Manager,
+    NullBooleanField,
+    OneToOneField,
+)
 
 from maasserver import DefaultMeta
 from maasserver.enum import NODE_TYPE
@@ -63,6 +69,36 @@ class ControllerInfoManager(Manager):
             node=controller,
         )
 
+    def set_boot_images(self, controller, boot_images):
+        """Cache the boot images available on `controller`.
+
+        Whether the boot images are in sync with the region's boot
+        resources is worked out now, rather than each time it's needed.
+
+        :return: The `ControllerInfo` for `controller`.
+        """
+        # Avoid circular imports.
+        from maasserver.models.bootresource import BootResource
+
+        in_sync = BootResource.objects.boot_images_are_in_sync(boot_images)
+        info, _ = self.update_or_create(
+            defaults=dict(
+                boot_images=boot_images, boot_images_in_sync=in_sync
+            ),
+            node=controller,
+        )
+        return info
+
+    def clear_boot_images_sync_status(self):
+        """Forget whether the cached boot images are in sync.
+
+        This is needed when the region's boot resources change. The sync
+        status is worked out again the next time it's needed.
+        """
+        self.filter(boot_images_in_sync__isnull=False).update(
+            boot_images_in_sync=None
+        )
+
     def get_controller_version_info(self):
         versions = list(
             self.select_related("node")
@@ -198,6 +234,10 @@ class ControllerInfo(CleanSave, TimestampedModel):
     :ivar interfaces: Interfaces JSON last sent by the controller.
     :ivar interface_udpate_hints: Topology hints last sent by the controller
         during a call to update_interfaces().
+    :ivar boot_images: Boot images last reported by the rack controller, or
+        `None` if it hasn't reported them yet.
+    :ivar boot_images_in_sync: Whether `boot_images` are in sync with the
+        region's boot resources, or `None` if that's not known.
     """
 
     class Meta(DefaultMeta):
@@ -217,5 +257,9 @@ class ControllerInfo(CleanSave, TimestampedModel):
         max_length=(2 ** 15), blank=True, default=""
     )
 
+    boot_images = JSONObjectField(null=True, blank=True, default=None)
+
+    boot_images_in_sync = NullBooleanField(default=None)
+
     def __str__(self):
         return "%s (%s)" % (self.__class__.__name__, self.node.hostname)
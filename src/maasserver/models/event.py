@@ -23,7 +23,7 @@ from maasserver.enum import ENDPOINT, ENDPOINT_CHOICES
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.eventtype import EventType
 from maasserver.models.node import Node
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import now, TimestampedModel
 from maasserver.utils.dns import validate_hostname
 from provisioningserver.events import EVENT_DETAILS
 from provisioningserver.logger import get_maas_logger
@@ -88,6 +88,42 @@ class EventManager(Manager):
             created=created,
         )
 
+    def bulk_create_node_events(self, node, events):
+        """Register events for `node` with a fixed number of queries.
+
+        :param events: A list of ``(type_name, action, description, created)``
+            tuples. If `created` is `None` the current time is used. Event
+            types that don't exist yet are registered from `EVENT_DETAILS`.
+        :return: The list of created `Event`s.
+        """
+        if len(events) == 0:
+            return []
+        type_names = {type_name for type_name, _, _, _ in events}
+        event_types = {
+            event_type.name: event_type
+            for event_type in EventType.objects.filter(name__in=type_names)
+        }
+        for type_name in type_names.difference(event_types):
+            event_types[type_name] = EventType.objects.register(
+                type_name,
+                EVENT_DETAILS[type_name].description,
+                EVENT_DETAILS[type_name].level,
+            )
+        current_time = now()
+        return self.bulk_create(
+            Event(
+                type=event_types[type_name],
+                node=node,
+                node_system_id=node.system_id,
+                node_hostname=node.hostname,
+                action=action,
+                description=description,
+                created=created or current_time,
+                updated=created or current_time,
+            )
+            for type_name, action, description, created in events
+        )
+
     def create_node_event(
         self,
         system_id,
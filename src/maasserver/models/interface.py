@@ -329,6 +329,74 @@ class InterfaceManager(Manager, InterfaceQueriesMixin):
             for interface in query
         }
 
+    def update_neighbours(self, interface_neighbours):
+        """Update the neighbours observed on interfaces, in bulk.
+
+        Neighbours observed on interfaces without neighbour discovery are
+        ignored.
+
+        :param interface_neighbours: A list of (interface, neighbour JSON)
+            pairs, in the order the neighbours were observed.
+        :return: The `Neighbour`s observed.
+        """
+        # Circular imports
+        from maasserver.models.neighbour import Neighbour
+
+        bindings = Neighbour.objects.update_neighbours(
+            [
+                (interface, neighbour)
+                for interface, neighbour in interface_neighbours
+                if interface.neighbour_discovery_state
+            ]
+        )
+        for neighbour, new in bindings:
+            # If we replaced a previous neighbour, then we have already
+            # generated a log statement about this neighbour.
+            if new:
+                maaslog.info(
+                    "%s: New MAC, IP binding observed%s: %s, %s"
+                    % (
+                        neighbour.interface.get_log_string(),
+                        Neighbour.objects.get_vid_log_snippet(neighbour.vid),
+                        neighbour.mac_address,
+                        neighbour.ip,
+                    )
+                )
+        return [neighbour for neighbour, _ in bindings]
+
+    def update_mdns_entries(self, interface_entries):
+        """Update the mDNS entries observed on interfaces, in bulk.
+
+        Entries observed on interfaces without mDNS discovery are ignored.
+
+        :param interface_entries: A list of (interface, mDNS JSON) pairs, in
+            the order the entries were observed.
+        :return: The `MDNS` bindings observed.
+        """
+        # Circular imports
+        from maasserver.models.mdns import MDNS
+
+        bindings = MDNS.objects.update_mdns_entries(
+            [
+                (interface, entry)
+                for interface, entry in interface_entries
+                if interface.mdns_discovery_state
+            ]
+        )
+        for binding, new in bindings:
+            # If we replaced a previous mDNS entry, then we have already
+            # generated a log statement about this mDNS entry.
+            if new:
+                maaslog.info(
+                    "%s: New mDNS entry resolved: '%s' on %s."
+                    % (
+                        binding.interface.get_log_string(),
+                        binding.hostname,
+                        binding.ip,
+                    )
+                )
+        return [binding for binding, _ in bindings]
+
     def filter_by_ip(self, static_ip_address):
         """Given the specified StaticIPAddress, (or string containing an IP
         address) return the Interface it is on.
@@ -1527,76 +1595,18 @@ class Interface(CleanSave, TimestampedModel):
 
         Input is expected to be the neighbour JSON from the controller.
         """
-        # Circular imports
-        from maasserver.models.neighbour import Neighbour
-
-        if self.neighbour_discovery_state is False:
-            return None
-        ip = neighbour_json["ip"]
-        mac = neighbour_json["mac"]
-        time = neighbour_json["time"]
-        vid = neighbour_json.get("vid", None)
-        deleted = Neighbour.objects.delete_and_log_obsolete_neighbours(
-            ip, mac, interface=self, vid=vid
-        )
-
-        neighbour, created = Neighbour.objects.get_or_create(
-            defaults={"time": time},
-            ip=ip,
-            mac_address=mac,
-            vid=vid,
-            interface=self,
+        neighbours = Interface.objects.update_neighbours(
+            [(self, neighbour_json)]
         )
-        if created:
-            # If we deleted a previous neighbour, then we have already
-            # generated a log statement about this neighbour.
-            if not deleted:
-                maaslog.info(
-                    "%s: New MAC, IP binding observed%s: %s, %s"
-                    % (
-                        self.get_log_string(),
-                        Neighbour.objects.get_vid_log_snippet(vid),
-                        mac,
-                        ip,
-                    )
-                )
-        else:
-            neighbour.time = time
-            neighbour.count += 1
-            neighbour.save(update_fields=["time", "count", "updated"])
-        return neighbour
+        return neighbours[0] if len(neighbours) > 0 else None
 
     def update_mdns_entry(self, avahi_json: dict):
         """Updates an mDNS entry observed on this interface.
 
         Input is expected to be the mDNS JSON from the controller.
         """
-        # Circular imports
-        from maasserver.models.mdns import MDNS
-
-        if self.mdns_discovery_state is False:
-            return None
-        ip = avahi_json["address"]
-        hostname = avahi_json["hostname"]
-        deleted = MDNS.objects.delete_and_log_obsolete_mdns_entries(
-            hostname, ip, interface=self
-        )
-        binding = MDNS.objects.get_current_entry(hostname, ip, interface=self)
-        if binding is None:
-            binding = MDNS.objects.create(
-                interface=self, ip=ip, hostname=hostname
-            )
-            # If we deleted a previous mDNS entry, then we have already
-            # generated a log statement about this mDNS entry.
-            if not deleted:
-                maaslog.info(
-                    "%s: New mDNS entry resolved: '%s' on %s."
-                    % (self.get_log_string(), hostname, ip)
-                )
-        else:
-            binding.count += 1
-            binding.save(update_fields=["count", "updated"])
-        return binding
+        bindings = Interface.objects.update_mdns_entries([(self, avahi_json)])
+        return bindings[0] if len(bindings) > 0 else None
 
     def update_discovery_state(self, discovery_mode, settings: dict):
         """Updates the state of interface monitoring. Uses
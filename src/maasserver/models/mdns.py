@@ -11,13 +11,13 @@ from django.db.models import (
     GenericIPAddressField,
     IntegerField,
     Manager,
+    Q,
 )
 from netaddr import IPAddress
 
 from maasserver import DefaultMeta
 from maasserver.models.cleansave import CleanSave
-from maasserver.models.timestampedmodel import TimestampedModel
-from maasserver.utils.orm import get_one, UniqueViolation
+from maasserver.models.timestampedmodel import now, TimestampedModel
 from provisioningserver.logger import get_maas_logger
 
 maaslog = get_maas_logger("mDNS")
@@ -26,62 +26,113 @@ maaslog = get_maas_logger("mDNS")
 class MDNSManager(Manager):
     """Manager for mDNS data."""
 
-    def delete_and_log_obsolete_mdns_entries(
-        self, hostname: str, ip: str, interface: str
-    ) -> None:
-        """Removes any existing mDNS data matching the specified values.
+    def update_mdns_entries(self, interface_entries):
+        """Update the mDNS entries observed on interfaces, in bulk.
 
-        Excludes the given IP address from removal, since it will be updated
-        rather than replaced if it exists.
+        For each (interface, hostname, ip) observed, the binding is updated,
+        or created if it doesn't exist. Bindings of the hostname to other
+        IP addresses of the same family, and of the IP address to other
+        hostnames, are deleted and logged. This takes the same number of
+        queries however many entries are observed.
 
-        Returns True if a binding was deleted.
+        :param interface_entries: A list of (interface, mDNS JSON) pairs, in
+            the order the entries were observed.
+        :return: A list of (binding, new) pairs, one for each binding
+            observed, where `new` is True if the binding was created without
+            replacing another.
         """
-        # Check if this hostname was previously assigned to another IP address.
-        deleted = False
-        incoming_ip_version = IPAddress(ip).version
-        previous_bindings = self.filter(
-            hostname=hostname, interface=interface
-        ).exclude(ip=ip)
-        # Check if this hostname was previously assigned to a different IP.
-        for binding in previous_bindings:
-            if incoming_ip_version != IPAddress(binding.ip).version:
-                # Don't move hostnames between address families.
-                continue
-            maaslog.info(
-                "%s: Hostname '%s' moved from %s to %s."
-                % (interface.get_log_string(), hostname, binding.ip, ip)
-            )
-            binding.delete()
-            deleted = True
-        # Check if this IP address had a different hostname assigned.
-        previous_bindings = self.filter(ip=ip, interface=interface).exclude(
-            hostname=hostname
+        # Later observations replace earlier ones for the same hostname or
+        # IP address, as they would replace bindings in the database.
+        observed, by_hostname, by_ip = {}, {}, {}
+        for interface, entry in interface_entries:
+            hostname, ip = entry["hostname"], IPAddress(entry["address"])
+            key = interface.id, hostname, ip
+            hostname_key = interface.id, hostname, ip.version
+            ip_key = interface.id, ip
+            seen = 1
+            for other in {by_hostname.get(hostname_key), by_ip.get(ip_key)}:
+                if other == key:
+                    seen = observed[key][2] + 1
+                elif other is not None:
+                    del observed[other]
+                    other_id, other_hostname, other_ip = other
+                    by_hostname.pop(
+                        (other_id, other_hostname, other_ip.version), None
+                    )
+                    by_ip.pop((other_id, other_ip), None)
+            observed[key] = (interface, entry, seen)
+            by_hostname[hostname_key] = key
+            by_ip[ip_key] = key
+        if len(observed) == 0:
+            return []
+
+        current, obsolete = {}, []
+        existing = self.filter(
+            Q(hostname__in={key[1] for key in observed})
+            | Q(ip__in={str(key[2]) for key in observed}),
+            interface_id__in={key[0] for key in observed},
         )
-        for binding in previous_bindings:
-            maaslog.info(
-                "%s: Hostname for %s updated from '%s' to '%s'."
-                % (interface.get_log_string(), ip, binding.hostname, hostname)
+        for binding in existing:
+            ip = IPAddress(binding.ip)
+            key = binding.interface_id, binding.hostname, ip
+            moved = by_hostname.get(
+                (binding.interface_id, binding.hostname, ip.version)
             )
-            binding.delete()
-            deleted = True
-        return deleted
-
-    def get_current_entry(self, hostname: str, ip: str, interface: str):
-        """Returns the current mDNS data for the specified values.
-
-        Returns None if an object representing the specified hostname, IP
-        address, and Interface does not exist. (This is not an error condition;
-        it happens normally when the binding is created for the first time.)
-
-        The caller must ensure that any obsolete bindings are deleted before
-        calling this method.
-        """
-        query = self.filter(interface=interface, ip=ip, hostname=hostname)
-        # If we get an exception here, it is most likely due to an unlikely
-        # race condition. (either that, or the caller neglected to remove
-        # obsolete bindings before calling this method.) Therefore, raise
-        # a UniqueViolation so this operation can be retried.
-        return get_one(query, exception_class=UniqueViolation)
+            renamed = by_ip.get((binding.interface_id, ip))
+            if key in observed:
+                current[key] = binding
+            elif moved is not None:
+                interface, entry, _ = observed[moved]
+                maaslog.info(
+                    "%s: Hostname '%s' moved from %s to %s."
+                    % (
+                        interface.get_log_string(),
+                        binding.hostname,
+                        binding.ip,
+                        entry["address"],
+                    )
+                )
+                obsolete.append((binding, moved))
+            elif renamed is not None:
+                interface, entry, _ = observed[renamed]
+                maaslog.info(
+                    "%s: Hostname for %s updated from '%s' to '%s'."
+                    % (
+                        interface.get_log_string(),
+                        binding.ip,
+                        binding.hostname,
+                        entry["hostname"],
+                    )
+                )
+                obsolete.append((binding, renamed))
+        if len(obsolete) > 0:
+            obsolete_ids = {binding.id for binding, _ in obsolete}
+            self.filter(id__in=obsolete_ids).delete()
+        replaced = {key for _, key in obsolete}
+
+        updated = now()
+        results, to_create, to_update = [], [], []
+        for key, (interface, entry, seen) in observed.items():
+            binding = current.get(key)
+            if binding is None:
+                binding = self.model(
+                    interface=interface,
+                    ip=entry["address"],
+                    hostname=entry["hostname"],
+                    count=seen,
+                    created=updated,
+                    updated=updated,
+                )
+                to_create.append(binding)
+                results.append((binding, key not in replaced))
+            else:
+                binding.count += seen
+                binding.updated = updated
+                to_update.append(binding)
+                results.append((binding, False))
+        self.bulk_create(to_create)
+        self.bulk_update(to_update, ["count", "updated"])
+        return results
 
 
 class MDNS(CleanSave, TimestampedModel):
@@ -12,12 +12,13 @@ from django.db.models import (
     Manager,
 )
 from django.db.models.query import QuerySet
+from netaddr import EUI, IPAddress
 
 from maasserver import DefaultMeta
 from maasserver.fields import MACAddressField
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.interface import Interface
-from maasserver.models.timestampedmodel import TimestampedModel
+from maasserver.models.timestampedmodel import now, TimestampedModel
 from maasserver.utils.orm import MAASQueriesMixin
 from provisioningserver.logger import get_maas_logger
 from provisioningserver.utils.network import get_mac_organization
@@ -79,37 +80,95 @@ class NeighbourManager(Manager, NeighbourQueriesMixin):
         else:
             return ""
 
-    def delete_and_log_obsolete_neighbours(
-        self, ip: str, mac: str, interface: str, vid: int
-    ) -> None:
-        """Removes any existing neighbours matching the specified values.
+    def update_neighbours(self, interface_neighbours):
+        """Update the neighbours observed on interfaces, in bulk.
 
-        Excludes the given MAC address from removal, since it will be updated
-        rather than replaced if it exists.
+        For each (interface, vid, ip) observed, the binding to the observed
+        MAC address is updated, or created if it doesn't exist. Bindings of
+        the IP address to other MAC addresses are deleted and logged. This
+        takes the same number of queries however many neighbours are
+        observed.
 
-        Returns True if a binding was (deleted and a log was generated).
+        :param interface_neighbours: A list of (interface, neighbour JSON)
+            pairs, in the order the neighbours were observed.
+        :return: A list of (neighbour, new) pairs, one for each binding
+            observed, where `new` is True if the binding was created without
+            replacing another.
         """
-        deleted = False
-        previous_bindings = self.filter(
-            interface=interface, ip=ip, vid=vid
-        ).exclude(mac_address=mac)
-        # Technically there should be just one existing mapping for this
-        # (interface, ip, vid), but the defensive thing to do is to delete
-        # them all.
-        for binding in previous_bindings:
-            maaslog.info(
-                "%s: IP address %s%s moved from %s to %s"
-                % (
-                    interface.get_log_string(),
-                    ip,
-                    self.get_vid_log_snippet(vid),
-                    binding.mac_address,
-                    mac,
+        # Only the last MAC address observed for each (interface, vid, ip)
+        # is kept. Repeated observations of it count as sightings.
+        observed = {}
+        for interface, neighbour in interface_neighbours:
+            ip, mac = IPAddress(neighbour["ip"]), EUI(neighbour["mac"])
+            key = interface.id, neighbour.get("vid"), ip
+            previous = observed.get(key)
+            if previous is not None and previous[2] == mac:
+                seen = previous[3] + 1
+            else:
+                seen = 1
+            observed[key] = (interface, neighbour, mac, seen)
+        if len(observed) == 0:
+            return []
+
+        current, obsolete = {}, []
+        existing = self.filter(
+            interface_id__in={key[0] for key in observed},
+            ip__in={str(key[2]) for key in observed},
+        )
+        for binding in existing:
+            key = binding.interface_id, binding.vid, IPAddress(binding.ip)
+            if key not in observed:
+                continue
+            interface, neighbour, mac, _ = observed[key]
+            if binding.mac_address is not None and (
+                EUI(binding.mac_address.raw) == mac
+            ):
+                current[key] = binding
+            else:
+                maaslog.info(
+                    "%s: IP address %s%s moved from %s to %s"
+                    % (
+                        interface.get_log_string(),
+                        neighbour["ip"],
+                        self.get_vid_log_snippet(binding.vid),
+                        binding.mac_address,
+                        neighbour["mac"],
+                    )
+                )
+                obsolete.append(binding)
+        if len(obsolete) > 0:
+            self.filter(id__in={binding.id for binding in obsolete}).delete()
+        replaced = {
+            (binding.interface_id, binding.vid, IPAddress(binding.ip))
+            for binding in obsolete
+        }
+
+        updated = now()
+        results, to_create, to_update = [], [], []
+        for key, (interface, neighbour, _, seen) in observed.items():
+            binding = current.get(key)
+            if binding is None:
+                binding = self.model(
+                    interface=interface,
+                    ip=neighbour["ip"],
+                    mac_address=neighbour["mac"],
+                    vid=key[1],
+                    time=neighbour["time"],
+                    count=seen,
+                    created=updated,
+                    updated=updated,
                 )
-            )
-            binding.delete()
-            deleted = True
-        return deleted
+                to_create.append(binding)
+                results.append((binding, key not in replaced))
+            else:
+                binding.time = neighbour["time"]
+                binding.count += seen
+                binding.updated = updated
+                to_update.append(binding)
+                results.append((binding, False))
+        self.bulk_create(to_create)
+        self.bulk_update(to_update, ["time", "count", "updated"])
+        return results
 
     def get_by_updated_with_related_nodes(self):
         """Returns a `QuerySet` of neighbours, while also selecting related
@@ -115,7 +115,6 @@ from maasserver.exceptions import (
 )
 from maasserver.fields import MAC
 from maasserver.models.blockdevice import BlockDevice
-from maasserver.models.bootresource import BootResource
 from maasserver.models.cacheset import CacheSet
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.config import Config
@@ -6721,13 +6720,19 @@ class Controller(Node):
         interfaces = Interface.objects.get_interface_dict_for_node(
             self, names=interface_set, fetch_fabric_vlan=True
         )
+        interface_neighbours = []
+        # Each VID seen on an interface only needs reporting once.
+        interface_vids = OrderedDict()
         for neighbour in neighbours:
             interface = interfaces.get(neighbour["interface"], None)
             if interface is not None:
-                interface.update_neighbour(neighbour)
+                interface_neighbours.append((interface, neighbour))
                 vid = neighbour.get("vid", None)
                 if vid is not None:
-                    interface.report_vid(vid)
+                    interface_vids[interface.name, vid] = interface
+        Interface.objects.update_neighbours(interface_neighbours)
+        for (_, vid), interface in interface_vids.items():
+            interface.report_vid(vid)
 
     def report_mdns_entries(self, entries):
         """Update the mDNS entries on this controller.
@@ -6741,10 +6746,13 @@ class Controller(Node):
         interfaces = Interface.objects.get_interface_dict_for_node(
             self, names=interface_set
         )
-        for entry in entries:
-            interface = interfaces.get(entry["interface"], None)
-            if interface is not None:
-                interface.update_mdns_entry(entry)
+        Interface.objects.update_mdns_entries(
+            [
+                (interfaces[entry["interface"]], entry)
+                for entry in entries
+                if entry["interface"] in interfaces
+            ]
+        )
 
     def get_discovery_state(self):
         """Returns the interface monitoring state for this Controller.
@@ -7204,19 +7212,58 @@ class RackController(Controller):
                     ),
                 )
 
-    def get_image_sync_status(self, boot_images=None):
-        """Return the status of the boot image import process."""
+    def get_boot_images(self):
+        """Return the boot images available on the rack controller.
+
+        The boot images last reported by the rack controller are used, and
+        are only requested from it if it hasn't reported them yet. Images
+        requested that way aren't cached, so that only the rack controller's
+        own reports fill the cache.
+
+        :return: A ``(boot_images, in_sync)`` tuple, where `in_sync` tells
+            whether the boot images are in sync with the boot resources.
+        :raises NoConnectionsAvailable: When no connections to the rack
+            controller are available for use.
+        :raises crochet.TimeoutError: If a response has not been received
+            within 30 seconds.
+        """
         # Avoid circular imports.
-        from maasserver import bootresources
         from maasserver.clusterrpc.boot_images import get_boot_images
+        from maasserver.models import BootResource, ControllerInfo
+
+        # The reported boot images are only current while the rack
+        # controller is connected.
+        getClientFor(self.system_id)
+        info = ControllerInfo.objects.filter(node=self).first()
+        if info is None or info.boot_images is None:
+            # Nothing was reported yet, e.g. by an older rack controller.
+            boot_images = get_boot_images(self)
+            in_sync = BootResource.objects.boot_images_are_in_sync(boot_images)
+            return boot_images, in_sync
+        elif info.boot_images_in_sync is None:
+            # The boot resources changed since the boot images were
+            # reported, so work out whether they're in sync again.
+            info = ControllerInfo.objects.set_boot_images(
+                self, info.boot_images
+            )
+        return info.boot_images, info.boot_images_in_sync
+
+    def get_image_sync_status(self, in_sync=None):
+        """Return the status of the boot image import process.
+
+        :param in_sync: Whether the boot images are in sync with the boot
+            resources, if already known.
+        """
+        # Avoid circular imports.
+        from maasserver import bootresources
 
         try:
             if bootresources.is_import_resources_running():
                 status = "region-importing"
             else:
-                if boot_images is None:
-                    boot_images = get_boot_images(self)
-                if BootResource.objects.boot_images_are_in_sync(boot_images):
+                if in_sync is None:
+                    _, in_sync = self.get_boot_images()
+                if in_sync:
                     status = "synced"
                 else:
                     if self.is_import_boot_images_running():
@@ -7229,13 +7276,10 @@ class RackController(Controller):
 
     def list_boot_images(self):
         """Return a list of boot images available on the rack controller."""
-        # Avoid circular imports.
-        from maasserver.clusterrpc.boot_images import get_boot_images
-
         try:
             # Combine all boot images one per name and arch
             downloaded_boot_images = defaultdict(set)
-            boot_images = get_boot_images(self)
+            boot_images, in_sync = self.get_boot_images()
             for image in boot_images:
                 if image["osystem"] == "custom":
                     image_name = image["release"]
@@ -7257,7 +7301,7 @@ class RackController(Controller):
                 }
                 for (name, arch), subarches in downloaded_boot_images.items()
             ]
-            status = self.get_image_sync_status(boot_images)
+            status = self.get_image_sync_status(in_sync)
             return {"images": images, "connected": True, "status": status}
         except (NoConnectionsAvailable, ConnectionClosed, TimeoutError):
             return {"images": [], "connected": False, "status": "unknown"}
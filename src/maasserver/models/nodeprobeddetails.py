@@ -12,11 +12,10 @@ __all__ = [
     "get_single_probed_details",
     "script_output_nsmap",
 ]
-import base64
-
 from django.db import connection
 
 from metadataserver.enum import SCRIPT_STATUS
+from metadataserver.fields import CompressedBinaryField
 from provisioningserver.refresh.node_info_scripts import (
     LLDP_OUTPUT_NAME,
     LSHW_OUTPUT_NAME,
@@ -44,10 +43,19 @@ def get_single_probed_details(node):
     if script_set is not None:
         # ScriptName only works here because LLDP and LSHW are builtin scripts
         # which are not stored in the Script table.
-        for script_result in script_set.scriptresult_set.filter(
-            status=SCRIPT_STATUS.PASSED, script_name__in=script_output_nsmap
-        ).only(
-            "status", "script_name", "stdout", "script_id", "script_set_id"
+        for script_result in (
+            script_set.scriptresult_set.filter(
+                status=SCRIPT_STATUS.PASSED,
+                script_name__in=script_output_nsmap,
+            )
+            .select_related("script_output")
+            .only(
+                "status",
+                "script_name",
+                "script_output__stdout",
+                "script_id",
+                "script_set_id",
+            )
         ):
             namespace = script_output_nsmap[script_result.name]
             details_template[namespace] = script_result.stdout
@@ -72,9 +80,11 @@ def get_probed_details(nodes):
         sql_query = """
             SELECT
               script_set.node_id, script_result.script_name,
-              script_result.stdout
+              script_output.stdout
             FROM
-              metadataserver_scriptresult AS script_result,
+              metadataserver_scriptresult AS script_result
+              LEFT OUTER JOIN metadataserver_scriptoutput AS script_output
+                ON script_output.script_result_id = script_result.id,
               metadataserver_scriptset AS script_set,
               maasserver_node AS node
             WHERE
@@ -95,6 +105,10 @@ def get_probed_details(nodes):
         for node_id, script_name, stdout in cursor.fetchall():
             system_id = node_ids[node_id].system_id
             namespace = script_output_nsmap[script_name]
-            stdout_decoded = base64.b64decode(stdout)
-            ret[system_id][namespace] = stdout_decoded
+            if stdout is None:
+                # The script passed without any output.
+                stdout = b""
+            ret[system_id][namespace] = CompressedBinaryField.decompress(
+                stdout
+            )
     return ret
@@ -5,11 +5,13 @@
 
 
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.models import CASCADE, CharField, ForeignKey, SET_NULL
 
 from maasserver import DefaultMeta
 from maasserver.models.blockdevice import BlockDevice, BlockDeviceManager
 from maasserver.models.podstoragepool import PodStoragePool
+from maasserver.models.timestampedmodel import now
 from maasserver.utils.converters import human_readable_bytes
 
 
@@ -24,6 +26,56 @@ class PhysicalBlockDeviceManager(BlockDeviceManager):
         """Return total size of all `PhysicalBlockDevice` for the `node`."""
         return sum(device.size for device in self.filter(node=node))
 
+    def bulk_create_devices(self, block_devices):
+        """Create the unsaved `block_devices` with a fixed number of queries.
+
+        Django can't bulk create models with multi-table inheritance, so the
+        `BlockDevice` rows are bulk created first, then all the rows for this
+        model are inserted with a single statement. Like `bulk_create`, this
+        doesn't call `save` nor send any signals.
+        """
+        if len(block_devices) == 0:
+            return
+        created = now()
+        parent_fields = [
+            field
+            for field in BlockDevice._meta.concrete_fields
+            if not field.primary_key
+        ]
+        parents = []
+        for block_device in block_devices:
+            block_device.created = block_device.updated = created
+            parents.append(
+                BlockDevice(
+                    **{
+                        field.attname: getattr(block_device, field.attname)
+                        for field in parent_fields
+                    }
+                )
+            )
+        BlockDevice.objects.bulk_create(parents)
+        for block_device, parent in zip(block_devices, parents):
+            block_device.id = block_device.blockdevice_ptr_id = parent.id
+            block_device._state.adding = False
+            block_device._state.db = parent._state.db
+
+        fields = self.model._meta.local_concrete_fields
+        row = "(%s)" % ", ".join(["%s"] * len(fields))
+        query = "INSERT INTO %s (%s) VALUES %s" % (
+            connection.ops.quote_name(self.model._meta.db_table),
+            ", ".join(connection.ops.quote_name(f.column) for f in fields),
+            ", ".join([row] * len(block_devices)),
+        )
+        params = [
+            field.get_db_prep_save(
+                getattr(block_device, field.attname), connection
+            )
+            for block_device in block_devices
+            for field in fields
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+
 
 class PhysicalBlockDevice(BlockDevice):
     """A physical block device attached to a node."""
@@ -7,6 +7,7 @@ __all__ = [
     "blockdevices",
     "bmc",
     "bootresourcefiles",
+    "bootresources",
     "bootsources",
     "config",
     "controllerinfo",
@@ -30,6 +31,7 @@ from maasserver.models.signals import (
     blockdevices,
     bmc,
     bootresourcefiles,
+    bootresources,
     bootsources,
     config,
     controllerinfo,
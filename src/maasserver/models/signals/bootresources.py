@@ -0,0 +1,51 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Respond to boot resource changes."""
+
+
+from django.db.models.signals import post_delete, post_save
+
+from maasserver.models import (
+    BootResource,
+    BootResourceFile,
+    BootResourceSet,
+    ControllerInfo,
+    LargeFile,
+)
+from maasserver.utils.signals import SignalsManager
+
+# Whether the boot images of a rack controller are in sync depends on the
+# boot resources, their sets and files, and whether the files are complete.
+BOOT_RESOURCE_CLASSES = [BootResource, BootResourceSet, BootResourceFile]
+
+signals = SignalsManager()
+
+
+def clear_boot_images_sync_status(sender, instance, **kwargs):
+    """Forget whether the rack controllers' boot images are in sync."""
+    ControllerInfo.objects.clear_boot_images_sync_status()
+
+
+for klass in BOOT_RESOURCE_CLASSES:
+    signals.watch(post_save, clear_boot_images_sync_status, sender=klass)
+    signals.watch(post_delete, clear_boot_images_sync_status, sender=klass)
+
+
+def clear_boot_images_sync_status_for_large_file(sender, instance, **kwargs):
+    """Forget whether the boot images are in sync when a file completes.
+
+    Large files are saved as their content is written, but only their
+    completion, or their content being reset, matters.
+    """
+    if instance.size in (0, instance.total_size):
+        ControllerInfo.objects.clear_boot_images_sync_status()
+
+
+signals.watch(
+    post_save, clear_boot_images_sync_status_for_large_file, sender=LargeFile
+)
+
+
+# Enable all signals by default.
+signals.enable()
@@ -6,6 +6,7 @@
 
 from django.db.models.signals import post_delete
 
+from maasserver import bootresourcecache
 from maasserver.models.largefile import (
     delete_large_object_content_later,
     LargeFile,
@@ -29,5 +30,13 @@ def delete_large_object(sender, instance, **kwargs):
 signals.watch(post_delete, delete_large_object, LargeFile)
 
 
+def evict_cached_content(sender, instance, **kwargs):
+    """Remove the content of the deleted `LargeFile` from the local cache."""
+    post_commit_do(bootresourcecache.evict, instance.sha256)
+
+
+signals.watch(post_delete, evict_cached_content, LargeFile)
+
+
 # Enable all signals by default.
 signals.enable()
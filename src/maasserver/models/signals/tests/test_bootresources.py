@@ -0,0 +1,53 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Test the behaviour of boot resource signals."""
+
+
+from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
+from maasserver.models import ControllerInfo
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+
+
+class TestBootResourceSignals(MAASServerTestCase):
+    """Tests for the boot resource models' signals."""
+
+    def make_rack_with_boot_images(self):
+        rack = factory.make_RackController()
+        ControllerInfo.objects.set_boot_images(rack, [make_rpc_boot_image()])
+        return rack
+
+    def get_sync_status(self, rack):
+        return ControllerInfo.objects.get(node=rack).boot_images_in_sync
+
+    def test_clears_sync_status_on_BootResource_create(self):
+        rack = self.make_rack_with_boot_images()
+        factory.make_BootResource()
+        self.assertIsNone(self.get_sync_status(rack))
+
+    def test_clears_sync_status_on_BootResource_delete(self):
+        resource = factory.make_BootResource()
+        rack = self.make_rack_with_boot_images()
+        resource.delete()
+        self.assertIsNone(self.get_sync_status(rack))
+
+    def test_clears_sync_status_on_BootResourceSet_create(self):
+        resource = factory.make_BootResource()
+        rack = self.make_rack_with_boot_images()
+        factory.make_BootResourceSet(resource)
+        self.assertIsNone(self.get_sync_status(rack))
+
+    def test_clears_sync_status_on_LargeFile_complete(self):
+        largefile = factory.make_LargeFile(size=100)
+        rack = self.make_rack_with_boot_images()
+        largefile.save()
+        self.assertIsNone(self.get_sync_status(rack))
+
+    def test_keeps_sync_status_while_LargeFile_in_progress(self):
+        largefile = factory.make_LargeFile(
+            content=factory.make_bytes(size=50), size=100
+        )
+        rack = self.make_rack_with_boot_images()
+        largefile.save()
+        self.assertFalse(self.get_sync_status(rack))
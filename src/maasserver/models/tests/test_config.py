@@ -4,7 +4,10 @@
 """Tests for the `Config` class and friends."""
 
 
+import random
 from socket import gethostname
+import threading
+from unittest.mock import Mock
 
 from django.db import IntegrityError
 from django.http import HttpRequest
@@ -14,9 +17,12 @@ from testtools.matchers import Is
 from maasserver.enum import ENDPOINT_CHOICES
 from maasserver.models import Config, Event, signals
 import maasserver.models.config
-from maasserver.models.config import get_default_config
+from maasserver.models.config import ConfigCache, get_default_config
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.utils.orm import post_commit_hooks
+from maastesting.djangotestcase import count_queries
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from provisioningserver.events import AUDIT
 
 
@@ -229,6 +235,251 @@ class ConfigTest(MAASServerTestCase):
         self.assertTrue(Config.objects.is_external_auth_enabled())
 
 
+class ConfigCacheTest(MAASServerTestCase):
+    """Testing of the :class:`ConfigCache`."""
+
+    def make_loaded_cache(self, **values):
+        configs = [
+            Config.objects.create(name=name, value=value)
+            for name, value in values.items()
+        ]
+        cache = ConfigCache()
+        self.assertTrue(cache.load(configs, 0))
+        return cache, configs
+
+    def get_values(self, cache, names, load=None):
+        if load is None:
+            load = Mock(return_value={})
+        values = cache.get_values(names, load)
+        # Discard the snapshot, as committing would.
+        post_commit_hooks.fire()
+        return values
+
+    def test_disabled_by_default(self):
+        self.assertFalse(ConfigCache().enabled)
+
+    def test_load_enables(self):
+        cache, _ = self.make_loaded_cache(foo="bar")
+        self.assertTrue(cache.enabled)
+
+    def test_load_refuses_configs_read_before_a_change(self):
+        cache = ConfigCache()
+        changes = cache.changes
+        cache.invalidate(random.randint(1, 100))
+        self.assertFalse(cache.load([], changes))
+        self.assertFalse(cache.enabled)
+
+    def test_get_values_returns_cached_values(self):
+        cache, _ = self.make_loaded_cache(foo="bar", baz=[1])
+        load = Mock()
+        values = self.get_values(cache, ["foo", "baz"], load)
+        self.assertEqual({"foo": "bar", "baz": [1]}, values)
+        self.assertThat(load, MockNotCalled())
+
+    def test_get_values_omits_unset_configs(self):
+        cache, _ = self.make_loaded_cache(foo="bar")
+        load = Mock()
+        values = self.get_values(cache, ["foo", "unset"], load)
+        self.assertEqual({"foo": "bar"}, values)
+        self.assertThat(load, MockNotCalled())
+
+    def test_get_values_returns_copies(self):
+        cache, _ = self.make_loaded_cache(foo={"key": "value"})
+        self.get_values(cache, ["foo"])["foo"]["key"] = "changed"
+        self.assertEqual(
+            {"foo": {"key": "value"}}, self.get_values(cache, ["foo"])
+        )
+
+    def test_get_values_loads_invalidated_configs(self):
+        cache, [foo, _] = self.make_loaded_cache(foo="bar", baz="qux")
+        cache.invalidate(foo.id)
+        load = Mock(return_value={"foo": "new"})
+        values = self.get_values(cache, ["foo", "baz"], load)
+        self.assertEqual({"foo": "new", "baz": "qux"}, values)
+        self.assertThat(load, MockCalledOnceWith(["foo"]))
+
+    def test_get_values_loads_uncached_configs_while_new_pending(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        cache.invalidate(foo.id + 1)
+        load = Mock(return_value={"new": "value"})
+        values = self.get_values(cache, ["foo", "new"], load)
+        self.assertEqual({"foo": "bar", "new": "value"}, values)
+        self.assertThat(load, MockCalledOnceWith(["new"]))
+
+    def test_update_caches_reloaded_config(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        version = cache.invalidate(foo.id)
+        foo.value = "new"
+        cache.update(foo.id, version, foo)
+        load = Mock()
+        self.assertEqual({"foo": "new"}, self.get_values(cache, ["foo"], load))
+        self.assertThat(load, MockNotCalled())
+
+    def test_update_caches_new_config(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        new = Config.objects.create(name="new", value="value")
+        version = cache.invalidate(new.id)
+        cache.update(new.id, version, new)
+        load = Mock()
+        self.assertEqual(
+            {"foo": "bar", "new": "value"},
+            self.get_values(cache, ["foo", "new"], load),
+        )
+        self.assertThat(load, MockNotCalled())
+
+    def test_update_removes_deleted_config(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        version = cache.invalidate(foo.id)
+        cache.update(foo.id, version, None)
+        load = Mock()
+        self.assertEqual({}, self.get_values(cache, ["foo"], load))
+        self.assertThat(load, MockNotCalled())
+
+    def test_update_ignores_config_invalidated_since(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        version = cache.invalidate(foo.id)
+        cache.invalidate(foo.id)
+        foo.value = "stale"
+        cache.update(foo.id, version, foo)
+        load = Mock(return_value={"foo": "new"})
+        self.assertEqual({"foo": "new"}, self.get_values(cache, ["foo"], load))
+        self.assertThat(load, MockCalledOnceWith(["foo"]))
+
+    def test_disable_empties_cache(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        cache.disable()
+        self.assertFalse(cache.enabled)
+        self.assertIsNone(cache.invalidate(foo.id))
+
+    def test_values_do_not_change_during_transaction(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        self.assertEqual({"foo": "bar"}, cache.get_values(["foo"], Mock()))
+        version = cache.invalidate(foo.id)
+        foo.value = "new"
+        cache.update(foo.id, version, foo)
+        self.assertEqual({"foo": "bar"}, cache.get_values(["foo"], Mock()))
+        post_commit_hooks.fire()
+        self.assertEqual({"foo": "new"}, self.get_values(cache, ["foo"]))
+
+    def test_snapshot_discarded_by_hooks_fired_in_another_thread(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        self.assertEqual({"foo": "bar"}, cache.get_values(["foo"], Mock()))
+        version = cache.invalidate(foo.id)
+        foo.value = "new"
+        cache.update(foo.id, version, foo)
+        # Fire the hooks in another thread, as the reactor does.
+        hooks = list(post_commit_hooks.hooks)
+        post_commit_hooks.hooks.clear()
+        thread = threading.Thread(
+            target=lambda: [hook.callback(None) for hook in hooks]
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual({"foo": "new"}, self.get_values(cache, ["foo"]))
+
+    def test_snapshot_discarded_when_transaction_rolled_back(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        cache.set_value("foo", "new")
+        post_commit_hooks.reset()
+        self.assertEqual({"foo": "bar"}, self.get_values(cache, ["foo"]))
+
+    def test_set_value_updates_values_for_transaction(self):
+        cache, _ = self.make_loaded_cache(foo="bar")
+        cache.set_value("foo", "new")
+        cache.set_value("baz", "qux")
+        self.assertEqual(
+            {"foo": "new", "baz": "qux"},
+            cache.get_values(["foo", "baz"], Mock()),
+        )
+        post_commit_hooks.fire()
+        # The cache is only updated once the change is notified.
+        self.assertEqual({"foo": "bar"}, self.get_values(cache, ["foo"]))
+
+    def test_update_on_commit_updates_cache_once_committed(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        foo.value = "new"
+        cache.update_on_commit(foo.id, foo)
+        foo.value = "changed after saving"
+        load = Mock()
+        self.assertEqual({"foo": "new"}, self.get_values(cache, ["foo"], load))
+        self.assertThat(load, MockNotCalled())
+
+    def test_update_on_commit_removes_deleted_config(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        cache.update_on_commit(foo.id)
+        load = Mock()
+        self.assertEqual({}, self.get_values(cache, ["foo"], load))
+        self.assertThat(load, MockNotCalled())
+
+    def test_update_on_commit_leaves_config_invalidated_since(self):
+        cache, [foo] = self.make_loaded_cache(foo="bar")
+        foo.value = "stale"
+        cache.update_on_commit(foo.id, foo)
+        cache.invalidate(foo.id)
+        load = Mock(return_value={"foo": "new"})
+        self.assertEqual({"foo": "new"}, self.get_values(cache, ["foo"], load))
+        self.assertThat(load, MockCalledOnceWith(["foo"]))
+
+    def test_set_value_without_value_unsets_config(self):
+        cache, _ = self.make_loaded_cache(foo="bar")
+        cache.set_value("foo")
+        self.assertEqual({}, self.get_values(cache, ["foo"]))
+
+
+class ConfigManagerCacheTest(MAASServerTestCase):
+    """Testing of :class:`ConfigManager` with the config cache enabled."""
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ConfigCache()
+        self.patch(maasserver.models.config, "config_cache", self.cache)
+
+    def load_cache(self):
+        self.assertTrue(self.cache.load(Config.objects.all(), 0))
+
+    def test_get_configs_does_not_query_database(self):
+        Config.objects.set_config("maas_name", "cached")
+        self.load_cache()
+        count, configs = count_queries(
+            Config.objects.get_configs, ["maas_name", "ntp_servers"]
+        )
+        self.assertEqual(0, count)
+        self.assertEqual(
+            {
+                "maas_name": "cached",
+                "ntp_servers": get_default_config()["ntp_servers"],
+            },
+            configs,
+        )
+        post_commit_hooks.fire()
+
+    def test_get_config_sees_configs_set_in_transaction(self):
+        self.load_cache()
+        self.assertIsNone(Config.objects.get_config("name"))
+        Config.objects.set_config("name", "value")
+        self.assertEqual("value", Config.objects.get_config("name"))
+        Config.objects.get(name="name").delete()
+        self.assertIsNone(Config.objects.get_config("name"))
+        post_commit_hooks.fire()
+
+    def test_set_config_seen_by_other_threads_once_committed(self):
+        Config.objects.set_config("maas_name", "old")
+        self.load_cache()
+        Config.objects.set_config("maas_name", "new")
+        post_commit_hooks.fire()
+        load = Mock(return_value={})
+        values = []
+        thread = threading.Thread(
+            target=lambda: values.append(
+                self.cache.get_values(["maas_name"], load)
+            )
+        )
+        thread.start()
+        thread.join()
+        self.assertEqual([{"maas_name": "new"}], values)
+        self.assertThat(load, MockNotCalled())
+
+
 class SettingConfigTest(MAASServerTestCase):
     """Testing of the :class:`Config` model and setting each option."""
 
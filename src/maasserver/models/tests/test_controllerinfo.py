@@ -7,6 +7,7 @@
 from crochet import wait_for
 from testtools.matchers import Equals, Is
 
+from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
 from maasserver.models import ControllerInfo, Notification
 from maasserver.models.controllerinfo import (
     ControllerVersionInfo,
@@ -42,6 +43,28 @@ class TestControllerInfo(MAASServerTestCase):
         self.assertThat(controller.interfaces, Equals(interfaces))
         self.assertThat(controller.interface_update_hints, Equals(hints))
 
+    def test_controllerinfo_set_boot_images(self):
+        controller = factory.make_RackController()
+        boot_images = [make_rpc_boot_image()]
+        info = ControllerInfo.objects.set_boot_images(controller, boot_images)
+        self.assertEqual(boot_images, info.boot_images)
+        self.assertFalse(info.boot_images_in_sync)
+
+    def test_controllerinfo_set_boot_images_in_sync(self):
+        controller = factory.make_RackController()
+        info = ControllerInfo.objects.set_boot_images(controller, [])
+        self.assertEqual([], info.boot_images)
+        self.assertTrue(info.boot_images_in_sync)
+
+    def test_controllerinfo_clear_boot_images_sync_status(self):
+        controller = factory.make_RackController()
+        boot_images = [make_rpc_boot_image()]
+        ControllerInfo.objects.set_boot_images(controller, boot_images)
+        ControllerInfo.objects.clear_boot_images_sync_status()
+        info = ControllerInfo.objects.get(node=controller)
+        self.assertEqual(boot_images, info.boot_images)
+        self.assertIsNone(info.boot_images_in_sync)
+
 
 class TestGetControllerVersionInfo(MAASServerTestCase):
     def test_sorts_controllerversioninfo_by_most_recent_version_first(self):
@@ -136,6 +136,43 @@ class EventTest(MAASServerTestCase):
         )
         self.assertIsNotNone(Event.objects.get(node=region))
 
+    def test_bulk_create_node_events_creates_events(self):
+        node = factory.make_Node()
+        event_type = factory.make_EventType()
+        created = factory.make_date()
+        new_type_name = EVENT_TYPES.NODE_PXE_REQUEST
+        events = Event.objects.bulk_create_node_events(
+            node,
+            [
+                (event_type.name, "action1", "description1", created),
+                (new_type_name, "action2", "description2", None),
+            ],
+        )
+        self.assertEqual(
+            [
+                (event_type, "action1", "description1", created),
+                (
+                    EventType.objects.get(name=new_type_name),
+                    "action2",
+                    "description2",
+                    events[1].created,
+                ),
+            ],
+            [
+                (event.type, event.action, event.description, event.created)
+                for event in Event.objects.filter(node=node).order_by("id")
+            ],
+        )
+        for event in Event.objects.filter(node=node):
+            self.assertEqual(node.system_id, event.node_system_id)
+            self.assertEqual(node.hostname, event.node_hostname)
+            self.assertEqual(event.created, event.updated)
+
+    def test_bulk_create_node_events_does_nothing_without_events(self):
+        node = factory.make_Node()
+        self.assertEqual([], Event.objects.bulk_create_node_events(node, []))
+        self.assertFalse(Event.objects.filter(node=node).exists())
+
     def test_register_event_and_event_type_handles_integrity_errors(self):
         # It's possible that two calls to
         # register_event_and_event_type() could arrive at more-or-less
@@ -1558,6 +1558,212 @@ class InterfaceUpdateMDNSEntryTest(MAASServerTestCase):
         )
 
 
+class InterfaceManagerUpdateNeighboursTest(MAASServerTestCase):
+    """Tests for `InterfaceManager.update_neighbours`."""
+
+    def make_interface(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.neighbour_discovery_state = True
+        return iface
+
+    def make_neighbour_json(self, ip=None, mac=None, vid=None):
+        if ip is None:
+            ip = factory.make_ip_address(ipv6=False)
+        if mac is None:
+            mac = factory.make_mac_address()
+        return {
+            "ip": ip,
+            "mac": mac,
+            "time": random.randint(0, 200000000),
+            "vid": vid,
+        }
+
+    def test_queries_are_independent_of_neighbours(self):
+        ifaces = [self.make_interface() for _ in range(2)]
+        neighbours = [
+            (iface, self.make_neighbour_json())
+            for iface in ifaces
+            for _ in range(2)
+        ]
+        Interface.objects.update_neighbours(neighbours[:2])
+        # Update the existing neighbours, replace one, and add new ones.
+        neighbours[1][1]["mac"] = factory.make_mac_address()
+        neighbours.extend(
+            (iface, self.make_neighbour_json())
+            for iface in ifaces
+            for _ in range(3)
+        )
+        counter = CountQueries()
+        with counter:
+            Interface.objects.update_neighbours(neighbours)
+        # Select, delete, insert and update.
+        self.assertEqual(4, counter.num_queries)
+        self.assertEqual(len(neighbours), Neighbour.objects.count())
+
+    def test_ignores_interfaces_without_neighbour_discovery(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        neighbours = Interface.objects.update_neighbours(
+            [(iface, self.make_neighbour_json())]
+        )
+        self.assertEqual([], neighbours)
+        self.assertEqual(0, Neighbour.objects.count())
+
+    def test_counts_repeated_neighbours(self):
+        iface = self.make_interface()
+        json = self.make_neighbour_json()
+        Interface.objects.update_neighbours([(iface, json)] * 3)
+        neighbour = get_one(Neighbour.objects.all())
+        self.assertEqual(3, neighbour.count)
+        Interface.objects.update_neighbours([(iface, json)] * 2)
+        self.assertEqual(5, reload_object(neighbour).count)
+
+    def test_keeps_last_mac_for_ip(self):
+        iface = self.make_interface()
+        first = self.make_neighbour_json()
+        last = self.make_neighbour_json(ip=first["ip"])
+        Interface.objects.update_neighbours([(iface, first), (iface, last)])
+        neighbour = get_one(Neighbour.objects.all())
+        self.assertEqual(last["mac"], neighbour.mac_address)
+        self.assertEqual(1, neighbour.count)
+
+    def test_distinguishes_vids(self):
+        iface = self.make_interface()
+        json = self.make_neighbour_json(vid=None)
+        other = self.make_neighbour_json(ip=json["ip"], vid=10)
+        Interface.objects.update_neighbours([(iface, json), (iface, other)])
+        Interface.objects.update_neighbours([(iface, json)])
+        self.assertEqual(
+            {(None, json["mac"], 2), (10, other["mac"], 1)},
+            {
+                (neighbour.vid, str(neighbour.mac_address), neighbour.count)
+                for neighbour in Neighbour.objects.all()
+            },
+        )
+
+    def test_logs_new_and_moved_bindings(self):
+        iface = self.make_interface()
+        moved = self.make_neighbour_json()
+        Interface.objects.update_neighbours([(iface, moved)])
+        moved["mac"] = factory.make_mac_address()
+        with FakeLogger("maas") as maaslog:
+            Interface.objects.update_neighbours(
+                [(iface, moved), (iface, self.make_neighbour_json())]
+            )
+        self.assertDocTestMatches(
+            """\
+            ...: IP address...moved from...to...
+            ...: New MAC, IP binding observed...
+            """,
+            maaslog.output,
+        )
+
+
+class InterfaceManagerUpdateMDNSEntriesTest(MAASServerTestCase):
+    """Tests for `InterfaceManager.update_mdns_entries`."""
+
+    def make_interface(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        iface.mdns_discovery_state = True
+        return iface
+
+    def make_mdns_entry_json(self, ip=None, hostname=None):
+        if ip is None:
+            ip = factory.make_ip_address(ipv6=False)
+        if hostname is None:
+            hostname = factory.make_hostname()
+        return {"address": ip, "hostname": hostname}
+
+    def get_bindings(self):
+        return {
+            (binding.hostname, binding.ip, binding.count)
+            for binding in MDNS.objects.all()
+        }
+
+    def test_queries_are_independent_of_entries(self):
+        ifaces = [self.make_interface() for _ in range(2)]
+        entries = [
+            (iface, self.make_mdns_entry_json())
+            for iface in ifaces
+            for _ in range(2)
+        ]
+        Interface.objects.update_mdns_entries(entries[:2])
+        # Update the existing entries, replace one, and add new ones.
+        entries[1][1]["hostname"] = factory.make_hostname()
+        entries.extend(
+            (iface, self.make_mdns_entry_json())
+            for iface in ifaces
+            for _ in range(3)
+        )
+        counter = CountQueries()
+        with counter:
+            Interface.objects.update_mdns_entries(entries)
+        # Select, delete, insert and update.
+        self.assertEqual(4, counter.num_queries)
+        self.assertEqual(len(entries), MDNS.objects.count())
+
+    def test_ignores_interfaces_without_mdns_discovery(self):
+        iface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        bindings = Interface.objects.update_mdns_entries(
+            [(iface, self.make_mdns_entry_json())]
+        )
+        self.assertEqual([], bindings)
+        self.assertEqual(0, MDNS.objects.count())
+
+    def test_counts_repeated_entries(self):
+        iface = self.make_interface()
+        json = self.make_mdns_entry_json()
+        Interface.objects.update_mdns_entries([(iface, json)] * 3)
+        self.assertEqual(
+            {(json["hostname"], json["address"], 3)}, self.get_bindings()
+        )
+
+    def test_keeps_last_ip_for_hostname(self):
+        iface = self.make_interface()
+        first = self.make_mdns_entry_json()
+        last = self.make_mdns_entry_json(hostname=first["hostname"])
+        Interface.objects.update_mdns_entries([(iface, first), (iface, last)])
+        self.assertEqual(
+            {(last["hostname"], last["address"], 1)}, self.get_bindings()
+        )
+
+    def test_keeps_hostname_for_each_address_family(self):
+        iface = self.make_interface()
+        ipv4 = self.make_mdns_entry_json()
+        ipv6 = self.make_mdns_entry_json(
+            ip=factory.make_ip_address(ipv6=True), hostname=ipv4["hostname"]
+        )
+        Interface.objects.update_mdns_entries([(iface, ipv4)])
+        Interface.objects.update_mdns_entries([(iface, ipv6)])
+        self.assertEqual(
+            {
+                (ipv4["hostname"], ipv4["address"], 1),
+                (ipv6["hostname"], ipv6["address"], 1),
+            },
+            self.get_bindings(),
+        )
+
+    def test_logs_new_moved_and_updated_entries(self):
+        iface = self.make_interface()
+        moved = self.make_mdns_entry_json()
+        renamed = self.make_mdns_entry_json()
+        Interface.objects.update_mdns_entries(
+            [(iface, moved), (iface, renamed)]
+        )
+        moved["address"] = factory.make_ip_address(ipv6=False)
+        renamed["hostname"] = factory.make_hostname()
+        with FakeLogger("maas") as maaslog:
+            Interface.objects.update_mdns_entries(
+                [
+                    (iface, moved),
+                    (iface, renamed),
+                    (iface, self.make_mdns_entry_json()),
+                ]
+            )
+        self.assertIn("moved from", maaslog.output)
+        self.assertIn("updated from", maaslog.output)
+        self.assertIn("New mDNS entry resolved", maaslog.output)
+
+
 class TestPhysicalInterface(MAASServerTestCase):
     def test_manager_returns_physical_interfaces(self):
         parent = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
@@ -152,6 +152,15 @@ class TestLargeFile(MAASServerTestCase):
             MockCallsMatch(call(ANY), call(ANY)),
         )
 
+    def test_evicts_cached_content(self):
+        self.patch(signals.largefiles, "delete_large_object_content_later")
+        evict = self.patch(signals.largefiles.bootresourcecache, "evict")
+        largefile = factory.make_LargeFile()
+        self.addCleanup(largefile.content.unlink)
+        with post_commit_hooks:
+            largefile.delete()
+        self.assertThat(evict, MockCalledOnceWith(largefile.sha256))
+
 
 class TestDeleteLargeObjectContentLater(MAASTransactionServerTestCase):
     def test_schedules_unlink(self):
@@ -84,6 +84,7 @@ from maasserver.models import (
     BridgeInterface,
     Config,
     Controller,
+    ControllerInfo,
     Device,
     Domain,
     EventType,
@@ -9897,21 +9898,22 @@ class TestControllerUpdateDiscoveryState(MAASServerTestCase):
 class TestReportNeighbours(MAASServerTestCase):
     """Tests for `Controller.report_neighbours()."""
 
-    def test_calls_update_neighbour_for_each_neighbour(self):
+    def test_updates_neighbours_in_bulk(self):
         rack = factory.make_RackController()
-        factory.make_Interface(name="eth0", node=rack)
-        factory.make_Interface(name="eth1", node=rack)
-        update_neighbour = self.patch(
-            interface_module.Interface, "update_neighbour"
+        eth0 = factory.make_Interface(name="eth0", node=rack)
+        eth1 = factory.make_Interface(name="eth1", node=rack)
+        update_neighbours = self.patch(
+            interface_module.Interface.objects, "update_neighbours"
         )
         neighbours = [
             {"interface": "eth0", "mac": factory.make_mac_address()},
             {"interface": "eth1", "mac": factory.make_mac_address()},
+            {"interface": "eth2", "mac": factory.make_mac_address()},
         ]
         rack.report_neighbours(neighbours)
         self.assertThat(
-            update_neighbour,
-            MockCallsMatch(*[call(neighbour) for neighbour in neighbours]),
+            update_neighbours,
+            MockCalledOnceWith([(eth0, neighbours[0]), (eth1, neighbours[1])]),
         )
 
     def test_calls_report_vid_for_each_vid(self):
@@ -9919,7 +9921,7 @@ class TestReportNeighbours(MAASServerTestCase):
         factory.make_Interface(name="eth0", node=rack)
         factory.make_Interface(name="eth1", node=rack)
         # Just make this a no-op for simplicity.
-        self.patch(interface_module.Interface, "update_neighbour")
+        self.patch(interface_module.Interface.objects, "update_neighbours")
         report_vid = self.patch(interface_module.Interface, "report_vid")
         neighbours = [
             {"interface": "eth0", "mac": factory.make_mac_address(), "vid": 3},
@@ -9928,25 +9930,40 @@ class TestReportNeighbours(MAASServerTestCase):
         rack.report_neighbours(neighbours)
         self.assertThat(report_vid, MockCallsMatch(call(3), call(7)))
 
+    def test_calls_report_vid_once_per_interface_and_vid(self):
+        rack = factory.make_RackController()
+        factory.make_Interface(name="eth0", node=rack)
+        factory.make_Interface(name="eth1", node=rack)
+        self.patch(interface_module.Interface.objects, "update_neighbours")
+        report_vid = self.patch(interface_module.Interface, "report_vid")
+        neighbours = [
+            {"interface": "eth0", "mac": factory.make_mac_address(), "vid": 3},
+            {"interface": "eth0", "mac": factory.make_mac_address(), "vid": 3},
+            {"interface": "eth1", "mac": factory.make_mac_address(), "vid": 3},
+        ]
+        rack.report_neighbours(neighbours)
+        self.assertThat(report_vid, MockCallsMatch(call(3), call(3)))
+
 
 class TestReportMDNSEntries(MAASServerTestCase):
     """Tests for `Controller.report_mdns_entries()."""
 
-    def test_calls_update_mdns_entry_for_each_entry(self):
+    def test_updates_mdns_entries_in_bulk(self):
         rack = factory.make_RackController()
-        factory.make_Interface(name="eth0", node=rack)
-        factory.make_Interface(name="eth1", node=rack)
-        update_mdns_entry = self.patch(
-            interface_module.Interface, "update_mdns_entry"
+        eth0 = factory.make_Interface(name="eth0", node=rack)
+        eth1 = factory.make_Interface(name="eth1", node=rack)
+        update_mdns_entries = self.patch(
+            interface_module.Interface.objects, "update_mdns_entries"
         )
         entries = [
             {"interface": "eth0", "hostname": factory.make_name("eth0")},
             {"interface": "eth1", "hostname": factory.make_name("eth1")},
+            {"interface": "eth2", "hostname": factory.make_name("eth2")},
         ]
         rack.report_mdns_entries(entries)
         self.assertThat(
-            update_mdns_entry,
-            MockCallsMatch(*[call(entry) for entry in entries]),
+            update_mdns_entries,
+            MockCalledOnceWith([(eth0, entries[0]), (eth1, entries[1])]),
         )
 
 
@@ -13895,6 +13912,7 @@ class TestRackController(MAASTransactionServerTestCase):
 
     def test_list_boot_images(self):
         rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
         self.patch(
             boot_images, "get_boot_images"
         ).return_value = self.fake_images
@@ -13917,6 +13935,7 @@ class TestRackController(MAASTransactionServerTestCase):
 
     def test_list_boot_images_when_connection_closed(self):
         rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
         self.patch(
             boot_images, "get_boot_images"
         ).side_effect = ConnectionClosed()
@@ -13928,6 +13947,7 @@ class TestRackController(MAASTransactionServerTestCase):
 
     def test_list_boot_images_region_importing(self):
         rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
         self.patch(
             boot_images, "get_boot_images"
         ).return_value = self.fake_images
@@ -13946,6 +13966,7 @@ class TestRackController(MAASTransactionServerTestCase):
 
     def test_list_boot_images_syncing(self):
         rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
         self.patch(
             boot_images, "get_boot_images"
         ).return_value = self.fake_images
@@ -13963,6 +13984,7 @@ class TestRackController(MAASTransactionServerTestCase):
 
     def test_list_boot_images_out_of_sync(self):
         rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
         self.patch(
             boot_images, "get_boot_images"
         ).return_value = self.fake_images
@@ -13982,6 +14004,7 @@ class TestRackController(MAASTransactionServerTestCase):
 
     def test_list_boot_images_when_empty(self):
         rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
         self.patch(boot_images, "get_boot_images").return_value = []
         self.patch(
             BootResource.objects, "boot_images_are_in_sync"
@@ -13994,6 +14017,71 @@ class TestRackController(MAASTransactionServerTestCase):
         self.assertItemsEqual([], images["images"])
         self.assertEqual("syncing", images["status"])
 
+    def test_list_boot_images_uses_reported_boot_images(self):
+        rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
+        self.patch(
+            BootResource.objects, "boot_images_are_in_sync"
+        ).return_value = True
+        ControllerInfo.objects.set_boot_images(
+            rack_controller, self.fake_images
+        )
+        get_boot_images = self.patch(boot_images, "get_boot_images")
+        images = rack_controller.list_boot_images()
+        self.assertThat(get_boot_images, MockNotCalled())
+        self.assertTrue(images["connected"])
+        self.assertItemsEqual(self.expected_images, images["images"])
+        self.assertEqual("synced", images["status"])
+
+    def test_list_boot_images_doesnt_cache_requested_boot_images(self):
+        rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
+        get_boot_images = self.patch(boot_images, "get_boot_images")
+        get_boot_images.return_value = self.fake_images
+        self.patch(
+            BootResource.objects, "boot_images_are_in_sync"
+        ).return_value = True
+        rack_controller.list_boot_images()
+        images = rack_controller.list_boot_images()
+        self.assertEqual(2, get_boot_images.call_count)
+        self.assertItemsEqual(self.expected_images, images["images"])
+        self.assertEqual("synced", images["status"])
+        self.assertFalse(
+            ControllerInfo.objects.filter(
+                node=rack_controller, boot_images__isnull=False
+            ).exists()
+        )
+
+    def test_list_boot_images_rechecks_sync_status_when_unknown(self):
+        rack_controller = factory.make_RackController()
+        self.patch(node_module, "getClientFor")
+        boot_images_are_in_sync = self.patch(
+            BootResource.objects, "boot_images_are_in_sync"
+        )
+        boot_images_are_in_sync.return_value = False
+        ControllerInfo.objects.set_boot_images(
+            rack_controller, self.fake_images
+        )
+        ControllerInfo.objects.clear_boot_images_sync_status()
+        boot_images_are_in_sync.return_value = True
+        images = rack_controller.list_boot_images()
+        self.assertEqual("synced", images["status"])
+        self.assertTrue(
+            ControllerInfo.objects.get(
+                node=rack_controller
+            ).boot_images_in_sync
+        )
+
+    def test_list_boot_images_when_disconnected_ignores_reported(self):
+        rack_controller = factory.make_RackController()
+        ControllerInfo.objects.set_boot_images(
+            rack_controller, self.fake_images
+        )
+        images = rack_controller.list_boot_images()
+        self.assertEqual(False, images["connected"])
+        self.assertItemsEqual([], images["images"])
+        self.assertEqual("unknown", images["status"])
+
     def test_is_import_images_running(self):
         running = factory.pick_bool()
         rackcontroller = factory.make_RackController()
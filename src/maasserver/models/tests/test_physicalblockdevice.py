@@ -12,6 +12,7 @@ from maasserver.models import PhysicalBlockDevice
 from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 
 
 class TestPhysicalBlockDeviceManager(MAASServerTestCase):
@@ -118,6 +119,62 @@ class TestPhysicalBlockDeviceManager(MAASServerTestCase):
             ),
         )
 
+    def test_bulk_create_devices(self):
+        node = factory.make_Node(with_boot_disk=False)
+        numa_node = factory.make_NUMANode(node=node)
+        block_devices = [
+            PhysicalBlockDevice(
+                numa_node=numa_node,
+                name=factory.make_name("name"),
+                id_path=factory.make_name("/dev/disk/by-id/id"),
+                size=MIN_BLOCK_DEVICE_SIZE * (index + 1),
+                block_size=4096,
+                tags=[factory.make_name("tag")],
+                model=factory.make_name("model"),
+                serial=factory.make_name("serial"),
+                firmware_version=factory.make_name("firmware"),
+            )
+            for index in range(3)
+        ]
+        PhysicalBlockDevice.objects.bulk_create_devices(block_devices)
+        created = list(PhysicalBlockDevice.objects.filter(node=node))
+        self.assertEqual(block_devices, created)
+        for block_device, created_device in zip(block_devices, created):
+            for field in PhysicalBlockDevice._meta.concrete_fields:
+                self.assertEqual(
+                    getattr(block_device, field.attname),
+                    getattr(created_device, field.attname),
+                )
+
+    def test_bulk_create_devices_uses_fixed_number_of_queries(self):
+        node = factory.make_Node(with_boot_disk=False)
+
+        def make_block_devices(count):
+            return [
+                PhysicalBlockDevice(
+                    node=node,
+                    name=factory.make_name("name"),
+                    size=MIN_BLOCK_DEVICE_SIZE,
+                    block_size=4096,
+                    model=factory.make_name("model"),
+                    serial=factory.make_name("serial"),
+                )
+                for _ in range(count)
+            ]
+
+        block_devices = make_block_devices(1)
+        num_queries_one, _ = count_queries(
+            PhysicalBlockDevice.objects.bulk_create_devices, block_devices
+        )
+        block_devices = make_block_devices(10)
+        num_queries_many, _ = count_queries(
+            PhysicalBlockDevice.objects.bulk_create_devices, block_devices
+        )
+        self.assertEqual(num_queries_one, num_queries_many)
+        self.assertEqual(
+            11, PhysicalBlockDevice.objects.filter(node=node).count()
+        )
+
     def test_default_numa_node_from_node(self):
         node = factory.make_Node()
         bdev = PhysicalBlockDevice.objects.create(
@@ -6,13 +6,17 @@ import random
 
 from django.core.exceptions import ValidationError
 
+from maasserver.models import virtualmachine as virtualmachine_module
 from maasserver.models.virtualmachine import (
     get_vm_host_resources,
+    get_vm_hosts_resources,
     MB,
     VirtualMachine,
+    VMHostResourcesCache,
 )
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 
 
 class TestVirtualMachine(MAASServerTestCase):
@@ -440,3 +444,133 @@ class TestGetVMHostResources(MAASServerTestCase):
                 },
             ],
         )
+
+
+class TestGetVMHostsResources(MAASServerTestCase):
+    def make_pod_with_vms(self, host=None):
+        if host is None:
+            host = factory.make_Node()
+            factory.make_NUMANodeHugepages(
+                numa_node=host.default_numanode, page_size=2048 * MB
+            )
+            factory.make_NUMANode(node=host)
+        pod = factory.make_Pod(pod_type="lxd", host=host)
+        vm = factory.make_VirtualMachine(
+            bmc=pod,
+            pinned_cores=host.default_numanode.cores[:1],
+            machine=factory.make_Node(),
+        )
+        factory.make_Interface(node=host)
+        return pod, vm
+
+    def test_same_as_get_vm_host_resources(self):
+        pods = [self.make_pod_with_vms()[0] for _ in range(3)]
+        pods.append(factory.make_Pod(pod_type="lxd", host=None))
+        self.assertEqual(
+            get_vm_hosts_resources(pods),
+            {pod.id: get_vm_host_resources(pod) for pod in pods},
+        )
+
+    def test_same_host(self):
+        pod1, _ = self.make_pod_with_vms()
+        pod2, _ = self.make_pod_with_vms(host=pod1.host)
+        self.assertEqual(
+            get_vm_hosts_resources([pod1, pod2]),
+            {
+                pod1.id: get_vm_host_resources(pod1),
+                pod2.id: get_vm_host_resources(pod2),
+            },
+        )
+
+    def test_host_from_ip_address(self):
+        subnet = factory.make_Subnet()
+        host = factory.make_Machine_with_Interface_on_Subnet(subnet=subnet)
+        numa_node = host.default_numanode
+        numa_node.cores = [0, 1]
+        numa_node.save()
+        ip = factory.make_StaticIPAddress(
+            subnet=subnet, interface=host.boot_interface
+        )
+        pod = factory.make_Pod(pod_type="lxd", ip_address=ip)
+        factory.make_VirtualMachine(
+            bmc=pod, memory=1024, pinned_cores=[0], hugepages_backed=False
+        )
+        [resources] = get_vm_hosts_resources([pod])[pod.id]
+        self.assertEqual(resources.node_id, numa_node.index)
+        self.assertEqual(resources.memory.general.allocated, 1024 * MB)
+
+    def test_no_pods(self):
+        self.assertEqual(get_vm_hosts_resources([]), {})
+
+    def test_query_count_doesnt_depend_on_pods(self):
+        pods = [self.make_pod_with_vms()[0] for _ in range(3)]
+        count_one, _ = count_queries(get_vm_hosts_resources, pods[:1])
+        count_all, _ = count_queries(get_vm_hosts_resources, pods)
+        self.assertEqual(count_one, count_all)
+
+
+class TestVMHostResourcesCache(MAASServerTestCase):
+    def make_pod(self):
+        host = factory.make_Node()
+        return factory.make_Pod(pod_type="lxd", host=host)
+
+    def test_disabled_by_default(self):
+        cache = VMHostResourcesCache()
+        pod = self.make_pod()
+        cache.get(pod)
+        count, _ = count_queries(cache.get, pod)
+        self.assertNotEqual(count, 0)
+
+    def test_get_many_calculates_missing(self):
+        cache = VMHostResourcesCache()
+        cache.enable()
+        pods = [self.make_pod() for _ in range(3)]
+        self.assertEqual(
+            cache.get_many(pods[:1]), get_vm_hosts_resources(pods[:1])
+        )
+        self.assertEqual(cache.get_many(pods), get_vm_hosts_resources(pods))
+        count, _ = count_queries(cache.get_many, pods)
+        self.assertEqual(count, 0)
+
+    def test_get_many_calculates_missing_in_one_go(self):
+        cache = VMHostResourcesCache()
+        cache.enable()
+        pods = [self.make_pod() for _ in range(3)]
+        cache.get(pods[0])
+        mock_get_resources = self.patch(
+            virtualmachine_module, "get_vm_hosts_resources"
+        )
+        mock_get_resources.return_value = {pod.id: [] for pod in pods[1:]}
+        cache.get_many(pods)
+        mock_get_resources.assert_called_once_with(pods[1:])
+
+    def test_invalidate(self):
+        cache = VMHostResourcesCache()
+        cache.enable()
+        pod, other_pod = self.make_pod(), self.make_pod()
+        cache.get_many([pod, other_pod])
+        cache.invalidate(pod.id)
+        count, _ = count_queries(cache.get, other_pod)
+        self.assertEqual(count, 0)
+        count, _ = count_queries(cache.get, pod)
+        self.assertNotEqual(count, 0)
+
+    def test_disable_clears(self):
+        cache = VMHostResourcesCache()
+        cache.enable()
+        pod = self.make_pod()
+        cache.get(pod)
+        cache.disable()
+        cache.enable()
+        count, _ = count_queries(cache.get, pod)
+        self.assertNotEqual(count, 0)
+
+    def test_doesnt_cache_after_change(self):
+        cache = VMHostResourcesCache()
+        cache.enable()
+        pod = self.make_pod()
+        changes = cache.changes
+        cache.invalidate(pod.id)
+        cache.get(pod, changes=changes)
+        count, _ = count_queries(cache.get, pod)
+        self.assertNotEqual(count, 0)
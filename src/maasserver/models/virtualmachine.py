@@ -4,6 +4,7 @@
 from collections import defaultdict, OrderedDict
 from dataclasses import dataclass, field
 from math import ceil
+import threading
 from typing import List
 
 from django.contrib.postgres.fields import ArrayField
@@ -16,6 +17,7 @@ from django.db.models import (
     ForeignKey,
     IntegerField,
     OneToOneField,
+    Prefetch,
     SET_NULL,
     TextField,
 )
@@ -26,7 +28,8 @@ from maasserver.models.bmc import BMC
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.interface import Interface
 from maasserver.models.node import Machine
-from maasserver.models.numa import NUMANode
+from maasserver.models.numa import NUMANode, NUMANodeHugepages
+from maasserver.models.podhints import PodHints
 from maasserver.models.timestampedmodel import TimestampedModel
 from provisioningserver.drivers.pod import (
     InterfaceAttachType,
@@ -176,23 +179,104 @@ class NUMAPinningNodeResources:
 
 def get_vm_host_resources(pod):
     """Return used resources for a VM host by its ID."""
-    if pod.host is None:
-        return []
-    vms = list(
-        VirtualMachine.objects.annotate(
-            system_id=Coalesce("machine__system_id", None)
+    return get_vm_hosts_resources([pod])[pod.id]
+
+
+def get_vm_hosts_resources(pods):
+    """Return used resources for many VM hosts.
+
+    This returns the same as `get_vm_host_resources` for each pod, but the
+    number of queries doesn't depend on the number of pods.
+
+    :return: A dict mapping the ID of each pod to its used resources.
+    """
+    pods = list(pods)
+    resources = {pod.id: [] for pod in pods}
+    host_ids = _get_vm_host_node_ids(pods)
+    if not host_ids:
+        return resources
+
+    pod_vms = defaultdict(list)
+    for vm in VirtualMachine.objects.annotate(
+        system_id=Coalesce("machine__system_id", None)
+    ).filter(bmc_id__in=host_ids.keys()):
+        pod_vms[vm.bmc_id].append(vm)
+    host_numanodes = defaultdict(OrderedDict)
+    for numa_node in (
+        NUMANode.objects.prefetch_related(
+            Prefetch(
+                "hugepages_set",
+                queryset=NUMANodeHugepages.objects.order_by("id"),
+            )
         )
-        .filter(bmc=pod)
-        .all()
-    )
-    numanodes = OrderedDict(
-        (node.index, node)
-        for node in NUMANode.objects.prefetch_related("hugepages_set")
-        .filter(node=pod.host)
-        .order_by("index")
-        .all()
-    )
+        .filter(node_id__in=host_ids.values())
+        .order_by("node_id", "index")
+    ):
+        host_numanodes[numa_node.node_id][numa_node.index] = numa_node
+    host_interfaces = defaultdict(list)
+    for interface in Interface.objects.annotate(
+        numa_index=F("numa_node__index")
+    ).filter(node_id__in=host_ids.values()):
+        host_interfaces[interface.node_id].append(interface)
+    vm_interfaces = defaultdict(list)
+    for vm_interface in VirtualMachineInterface.objects.filter(
+        vm__bmc_id__in=host_ids.keys(), host_interface__isnull=False
+    ).annotate(numa_index=F("host_interface__numa_node__index")):
+        vm_interfaces[vm_interface.vm_id].append(vm_interface)
+
+    for pod_id, host_id in host_ids.items():
+        resources[pod_id] = _get_vm_host_resources(
+            pod_vms[pod_id],
+            host_numanodes[host_id],
+            host_interfaces[host_id],
+            vm_interfaces,
+        )
+    return resources
+
+
+def _get_vm_host_node_ids(pods):
+    """Return a dict mapping the IDs of `pods` to the ID of their host.
 
+    The host is found the same way as `Pod.host`. Pods without a host are
+    left out.
+    """
+    host_ids = {}
+    hint_nodes = (
+        PodHints.nodes.through.objects.filter(
+            podhints__pod_id__in=[pod.id for pod in pods]
+        )
+        .order_by("node_id")
+        .values_list("podhints__pod_id", "node_id")
+    )
+    for pod_id, node_id in hint_nodes:
+        host_ids.setdefault(pod_id, node_id)
+    ip_pod_ids = {
+        pod.ip_address_id: pod.id
+        for pod in pods
+        if pod.id not in host_ids and pod.ip_address_id is not None
+    }
+    if ip_pod_ids:
+        ip_nodes = (
+            Interface.objects.filter(ip_addresses__id__in=ip_pod_ids.keys())
+            .order_by("created")
+            .values_list("ip_addresses__id", "node_id")
+        )
+        for ip_id, node_id in ip_nodes:
+            if node_id is not None:
+                host_ids.setdefault(ip_pod_ids[ip_id], node_id)
+    return host_ids
+
+
+def _get_vm_host_resources(vms, numanodes, interfaces, vm_interfaces):
+    """Return used resources for a VM host.
+
+    :param vms: The VMs in the VM host.
+    :param numanodes: An `OrderedDict` mapping indexes to the host's NUMA
+        nodes, with their hugepages prefetched.
+    :param interfaces: The host's interfaces, annotated with `numa_index`.
+    :param vm_interfaces: A dict mapping VM IDs to their interfaces that
+        are attached to a host interface, annotated with `numa_index`.
+    """
     # to track how many cores are not used by pinned VMs in each NUMA node
     available_numanode_cores = {}
     # to track how much general memory is allocated in each NUMA node
@@ -204,24 +288,14 @@ def get_vm_host_resources(pod):
     allocated_numanode_hugepages = defaultdict(int)
     for numa_idx, numa_node in numanodes.items():
         available_numanode_cores[numa_idx] = set(numa_node.cores)
-        numanode_hugepages[numa_idx] = numa_node.hugepages_set.first()
+        # use the prefetched hugepages, as first() would query them again
+        hugepages = numa_node.hugepages_set.all()
+        numanode_hugepages[numa_idx] = hugepages[0] if hugepages else None
 
     numanode_interfaces = defaultdict(list)
-    for interface in Interface.objects.annotate(
-        numa_index=F("numa_node__index")
-    ).filter(node=pod.host):
+    for interface in interfaces:
         interface.allocated_vfs = 0
         numanode_interfaces[interface.numa_index].append(interface)
-    all_vm_interfaces = (
-        VirtualMachineInterface.objects.filter(
-            vm__in=vms, host_interface__isnull=False
-        )
-        .annotate(numa_index=F("host_interface__numa_node__index"))
-        .all()
-    )
-    vm_interfaces = defaultdict(list)
-    for vm_interface in all_vm_interfaces:
-        vm_interfaces[vm_interface.vm_id].append(vm_interface)
 
     # map VM IDs to host NUMA nodes indexes
     for vm in vms:
@@ -382,3 +456,83 @@ def _get_numa_pinning_resources(
         for interface in numanode_interfaces[numa_node.index]
     ]
     return numa_resources
+
+
+class VMHostResourcesCache:
+    """Process-wide cache of the used resources of VM hosts, by pod ID.
+
+    The websocket pod handler invalidates a pod's resources when notified
+    that it changed, so that listing the pods and sending notifications for
+    them reuse the same results until then. Every change is counted, so
+    that resources read before a change are never cached after it.
+
+    The cache is disabled until the pod handler is being notified, since
+    nothing would invalidate it otherwise.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        # Pod ID -> list of `NUMAPinningNodeResources`.
+        self._resources = {}
+        # Number of times the cache has been invalidated.
+        self.changes = 0
+
+    def enable(self):
+        """Enable and empty the cache."""
+        with self._lock:
+            self.enabled = True
+            self._resources = {}
+            self.changes += 1
+
+    def disable(self):
+        """Disable and empty the cache."""
+        with self._lock:
+            self.enabled = False
+            self._resources = {}
+            self.changes += 1
+
+    def get(self, pod, changes=None):
+        """Return the used resources of `pod`.
+
+        See `get_many`.
+        """
+        return self.get_many([pod], changes=changes)[pod.id]
+
+    def get_many(self, pods, changes=None):
+        """Return the used resources of `pods`.
+
+        Those that aren't cached are calculated with `get_vm_hosts_resources`
+        in one go.
+
+        :param changes: The value of `changes` from before the current
+            transaction started, if known. Resources calculated in a
+            transaction that started before a change aren't cached.
+        :return: A dict mapping the ID of each pod to its used resources.
+        """
+        pods = list(pods)
+        with self._lock:
+            if changes is None:
+                changes = self.changes
+            resources = {
+                pod.id: self._resources[pod.id]
+                for pod in pods
+                if pod.id in self._resources
+            }
+        missing = [pod for pod in pods if pod.id not in resources]
+        if len(missing) > 0:
+            calculated = get_vm_hosts_resources(missing)
+            with self._lock:
+                if self.enabled and self.changes == changes:
+                    self._resources.update(calculated)
+            resources.update(calculated)
+        return resources
+
+    def invalidate(self, pod_id):
+        """Remove the used resources of the pod with `pod_id`."""
+        with self._lock:
+            self._resources.pop(pod_id, None)
+            self.changes += 1
+
+
+vm_host_resources_cache = VMHostResourcesCache()
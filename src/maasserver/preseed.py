@@ -4,6 +4,7 @@
 """Preseed generation."""
 
 from collections import namedtuple
+from copy import copy
 import json
 import os.path
 from pipes import quote
@@ -709,14 +710,13 @@ def get_preseed_template(filenames):
     assert not isinstance(filenames, (bytes, str))
     assert all(isinstance(filename, str) for filename in filenames)
     for location in settings.PRESEED_TEMPLATE_LOCATIONS:
+        location_key = preseed_template_cache.get_file_key(location)
         for filename in filenames:
             filepath = os.path.join(location, filename)
-            try:
-                with open(filepath, "r", encoding="utf-8") as stream:
-                    content = stream.read()
-            except IOError:
-                pass  # Ignore.
-            else:
+            content = preseed_template_cache.read(
+                location, location_key, filename, filepath
+            )
+            if content is not None:
                 return filepath, content
     else:
         return None, None
@@ -752,6 +752,99 @@ class TemplateNotFoundError(Exception):
         self.name = name
 
 
+class PreseedTemplateCache:
+    """Cache of preseed template files, and of the files that don't exist.
+
+    Finding a template means trying each candidate filename in each
+    template location, and most of them don't exist. Those are remembered
+    until the modification time of their location changes, which happens
+    when files are added to, or removed from, it. Files that exist are
+    remembered, along with their parsed template, until their own
+    modification time or size change.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Forget all the cached files."""
+        # Maps each location to its file key and missing filenames.
+        self._missing = {}
+        # Maps each file path to its file key, content and parsed template.
+        self._files = {}
+
+    def get_file_key(self, path):
+        """Return what identifies the current version of the file at `path`.
+
+        :return: A tuple, or `None` if the file doesn't exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def read(self, location, location_key, filename, filepath):
+        """Return the content of the template file at `filepath`.
+
+        :param location_key: The file key of `location`, read before any
+            of its files, so that files added since are noticed.
+        :return: The content, or `None` if the file can't be read.
+        """
+        missing_key, missing = self._missing.get(location, (None, None))
+        if missing is None or missing_key != location_key:
+            missing = set()
+            self._missing[location] = location_key, missing
+        if filename in missing:
+            return None
+        file_key = self.get_file_key(filepath)
+        cached = self._files.get(filepath)
+        if cached is not None and file_key is not None:
+            cached_key, content, _ = cached
+            if cached_key == file_key:
+                return content
+        try:
+            with open(filepath, "r", encoding="utf-8") as stream:
+                content = stream.read()
+        except FileNotFoundError:
+            self._files.pop(filepath, None)
+            # Files in subdirectories don't change the location's
+            # modification time when they're added.
+            if os.sep not in filename:
+                missing.add(filename)
+            return None
+        except IOError:
+            return None  # Ignore.
+        if file_key is not None:
+            self._files[filepath] = file_key, content, None
+        return content
+
+    def load(self, filepath, content, get_template):
+        """Return a `PreseedTemplate` for `content`, read from `filepath`.
+
+        The template is only parsed if `content` hasn't been parsed yet.
+
+        :param get_template: See `tempita.Template`.
+        """
+        cached = self._files.get(filepath)
+        if cached is None or cached[1] != content:
+            return PreseedTemplate(
+                content, name=filepath, get_template=get_template
+            )
+        file_key, _, template = cached
+        if template is None:
+            template = PreseedTemplate(content, name=filepath)
+            self._files[filepath] = file_key, content, template
+        # Parsed templates are shared, but what they include depends on
+        # the node they're rendered for.
+        template = copy(template)
+        template.get_template = get_template
+        return template
+
+
+preseed_template_cache = PreseedTemplateCache()
+
+
 def load_preseed_template(node, prefix, osystem="", release=""):
     """Find and load a `PreseedTemplate` for the given node.
 
@@ -775,9 +868,7 @@ def load_preseed_template(node, prefix, osystem="", release=""):
             raise TemplateNotFoundError(name)
         # This is where the closure happens: pass `get_template` when
         # instanciating PreseedTemplate.
-        return PreseedTemplate(
-            content, name=filepath, get_template=get_template
-        )
+        return preseed_template_cache.load(filepath, content, get_template)
 
     return get_template(prefix, None, default=True)
 
@@ -198,6 +198,7 @@ class RackControllerService(Service):
                 )
             self.needsDHCPUpdate.discard(rack_id)
             self.watching.discard(rack_id)
+            dhcp.forget_dhcp_configuration(rack_id)
         elif action == "watch":
             if rack_id not in self.watching:
                 self.postgresListener.register(
@@ -212,6 +213,8 @@ class RackControllerService(Service):
                 )
             self.watching.add(rack_id)
             self.needsDHCPUpdate.add(rack_id)
+            # The rack controller may have restarted; push everything.
+            dhcp.forget_dhcp_configuration(rack_id)
             self.startProcessing()
         else:
             raise ValueError("Unknown action: %s." % action)
@@ -0,0 +1,103 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Config cache service."""
+
+
+from twisted.application.service import Service
+from twisted.internet.defer import inlineCallbacks
+
+from maasserver.listener import PostgresListenerService
+from maasserver.models.config import Config, config_cache
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+
+log = LegacyLogger()
+
+
+@transactional
+def _get_all_configs():
+    """Return the number of config changes seen so far, and all configs.
+
+    The number of changes is read first, so that configs that change while
+    they're being read can be detected by `ConfigCache.load`.
+    """
+    changes = config_cache.changes
+    return changes, list(Config.objects.all())
+
+
+@transactional
+def _get_config(config_id):
+    """Return the config with `config_id`, or `None` if it doesn't exist."""
+    return Config.objects.filter(id=config_id).first()
+
+
+class ConfigCacheService(Service):
+    """Keep the configs cached in this process up to date.
+
+    The cache is loaded once the listener is connected, and each config is
+    reloaded when notified that it changed. The cache is disabled while the
+    listener is disconnected, since changes can't be seen then.
+    """
+
+    def __init__(self, postgresListener: PostgresListenerService = None):
+        super().__init__()
+        self.listener = postgresListener
+
+    def startService(self):
+        super().startService()
+        if self.listener is not None:
+            self.listener.register("config", self.configChanged)
+            self.listener.events.connected.registerHandler(
+                self.listenerConnected
+            )
+            self.listener.events.disconnected.registerHandler(
+                self.listenerDisconnected
+            )
+
+    def stopService(self):
+        if self.listener is not None:
+            self.listener.unregister("config", self.configChanged)
+            self.listener.events.connected.unregisterHandler(
+                self.listenerConnected
+            )
+            self.listener.events.disconnected.unregisterHandler(
+                self.listenerDisconnected
+            )
+        config_cache.disable()
+        return super().stopService()
+
+    @inlineCallbacks
+    def listenerConnected(self):
+        """Load all the configs into the cache.
+
+        Configs that change while being loaded are notified once the load
+        is done, so loading is retried until no config changes during it.
+        """
+        loaded = False
+        while not loaded and self.running:
+            try:
+                changes, configs = yield deferToDatabase(_get_all_configs)
+            except Exception:
+                log.err(None, "Failed to load the config cache.")
+                return
+            loaded = config_cache.load(configs, changes)
+
+    def listenerDisconnected(self, reason):
+        config_cache.disable()
+
+    @inlineCallbacks
+    def configChanged(self, action, obj_id):
+        """Reload the config with `obj_id` once notified that it changed."""
+        config_id = int(obj_id)
+        version = config_cache.invalidate(config_id)
+        if version is not None:
+            try:
+                config = yield deferToDatabase(_get_config, config_id)
+            except Exception:
+                # The config stays invalid, so it's read from the database
+                # until it next changes.
+                log.err(None, "Failed to reload config %d." % config_id)
+            else:
+                config_cache.update(config_id, version, config)
@@ -0,0 +1,111 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""External services configuration service."""
+
+
+from twisted.application.service import Service
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks
+from twisted.protocols.amp import UnhandledCommand
+
+from maasserver.listener import PostgresListenerService
+from maasserver.rpc import getClientFor
+from maasserver.rpc.externalservices import external_services_digests
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.rpc.cluster import RefreshExternalServices
+from provisioningserver.rpc.exceptions import NoConnectionsAvailable
+
+log = LegacyLogger()
+
+
+class ExternalServicesService(Service):
+    """Keep the external services configuration digests cached in this
+    process up to date, and tell rack controllers when it changes.
+
+    The configuration is made from configs, subnets and the routable pairs
+    between controllers. When any of those change, the cached digests are
+    cleared and the rack controllers that had one are told to fetch their
+    configuration again, after `NUDGE_DELAY` seconds so that a burst of
+    changes results in a single refresh. The cache is disabled while the
+    listener is disconnected, since changes can't be seen then.
+    """
+
+    NUDGE_DELAY = 1
+
+    def __init__(
+        self, postgresListener: PostgresListenerService = None, clock=reactor
+    ):
+        super().__init__()
+        self.listener = postgresListener
+        self.clock = clock
+        self._pending = set()
+        self._nudgeCall = None
+
+    def startService(self):
+        super().startService()
+        if self.listener is not None:
+            self.listener.register("config", self.dataChanged)
+            self.listener.register("subnet", self.dataChanged)
+            self.listener.register("sys_routable_pairs", self.dataChanged)
+            self.listener.events.connected.registerHandler(
+                self.listenerConnected
+            )
+            self.listener.events.disconnected.registerHandler(
+                self.listenerDisconnected
+            )
+
+    def stopService(self):
+        if self.listener is not None:
+            self.listener.unregister("config", self.dataChanged)
+            self.listener.unregister("subnet", self.dataChanged)
+            self.listener.unregister("sys_routable_pairs", self.dataChanged)
+            self.listener.events.connected.unregisterHandler(
+                self.listenerConnected
+            )
+            self.listener.events.disconnected.unregisterHandler(
+                self.listenerDisconnected
+            )
+        if self._nudgeCall is not None and self._nudgeCall.active():
+            self._nudgeCall.cancel()
+        self._nudgeCall = None
+        self._pending.clear()
+        external_services_digests.disable()
+        return super().stopService()
+
+    def listenerConnected(self):
+        external_services_digests.enable()
+
+    def listenerDisconnected(self, reason):
+        external_services_digests.disable()
+
+    def dataChanged(self, *args):
+        """Clear the cached digests, and schedule telling the rack
+        controllers that had one to fetch their configuration again."""
+        self._pending.update(external_services_digests.invalidate())
+        if len(self._pending) > 0 and self._nudgeCall is None:
+            self._nudgeCall = self.clock.callLater(
+                self.NUDGE_DELAY, self.nudgeRacks
+            )
+
+    @inlineCallbacks
+    def nudgeRacks(self):
+        """Tell the pending rack controllers to refresh their external
+        services."""
+        self._nudgeCall = None
+        system_ids, self._pending = self._pending, set()
+        for system_id in sorted(system_ids):
+            try:
+                client = yield getClientFor(system_id)
+                yield client(RefreshExternalServices)
+            except (NoConnectionsAvailable, UnhandledCommand):
+                # The rack controller isn't connected to this process, or
+                # is running an older version. Either way it'll fetch its
+                # configuration at its next interval.
+                pass
+            except Exception:
+                log.err(
+                    None,
+                    "Failed to refresh the external services of rack "
+                    "controller %s." % system_id,
+                )
@@ -0,0 +1,128 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Rack controller connectivity service."""
+
+
+from twisted.application.service import Service
+from twisted.internet.defer import inlineCallbacks
+
+from maasserver.components import (
+    discard_persistent_error,
+    register_persistent_error,
+)
+from maasserver.enum import COMPONENT
+from maasserver.listener import PostgresListenerService
+from maasserver.models.node import RackController
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from provisioningserver.logger import LegacyLogger
+
+log = LegacyLogger()
+
+
+@transactional
+def update_rack_connectivity_error(connected_ids):
+    """Register or discard the error for disconnected rack controllers.
+
+    :param connected_ids: The system IDs of the connected rack controllers.
+    """
+    disconnected = RackController.objects.exclude(
+        system_id__in=connected_ids
+    ).count()
+    if disconnected == 0:
+        discard_persistent_error(COMPONENT.RACK_CONTROLLERS)
+    else:
+        if disconnected == 1:
+            message = "One rack controller is not yet connected to the region"
+        else:
+            message = (
+                "%d rack controllers are not yet connected to the region"
+                % disconnected
+            )
+        message = (
+            '%s. Visit the <a href="/MAAS/l/controllers">'
+            "rack controllers page</a> for "
+            "more information." % message
+        )
+        register_persistent_error(COMPONENT.RACK_CONTROLLERS, message)
+
+
+class RackConnectivityService(Service):
+    """Keep the error for disconnected rack controllers up to date.
+
+    The error is updated when the service starts, whenever a rack
+    controller connects to or disconnects from this process' RPC service,
+    and whenever a rack controller is created, deleted or changes type.
+    Changes seen while an update is in progress are handled by a single
+    update once it's done.
+    """
+
+    def __init__(
+        self, rpc_service, postgresListener: PostgresListenerService = None
+    ):
+        super().__init__()
+        self.rpc_service = rpc_service
+        self.listener = postgresListener
+        self._updating = None
+        self._pending = False
+
+    def startService(self):
+        super().startService()
+        self.rpc_service.events.connected.registerHandler(
+            self.connectivityChanged
+        )
+        self.rpc_service.events.disconnected.registerHandler(
+            self.connectivityChanged
+        )
+        if self.listener is not None:
+            self.listener.register(
+                "sys_rack_controllers", self.rackControllersChanged
+            )
+        self.connectivityChanged()
+
+    def stopService(self):
+        self.rpc_service.events.connected.unregisterHandler(
+            self.connectivityChanged
+        )
+        self.rpc_service.events.disconnected.unregisterHandler(
+            self.connectivityChanged
+        )
+        if self.listener is not None:
+            self.listener.unregister(
+                "sys_rack_controllers", self.rackControllersChanged
+            )
+        super().stopService()
+        if self._updating is not None:
+            return self._updating
+
+    def connectivityChanged(self, ident=None):
+        """Update the error, unless an update is in progress already."""
+        if self._updating is None:
+            self._updating = self._update()
+            self._updating.addBoth(self._updated)
+        else:
+            self._pending = True
+
+    def rackControllersChanged(self, channel, payload):
+        """Update the error, since the rack controllers changed."""
+        self.connectivityChanged()
+
+    def _updated(self, result):
+        self._updating = None
+        return result
+
+    @inlineCallbacks
+    def _update(self):
+        self._pending = True
+        while self._pending and self.running:
+            self._pending = False
+            connected_ids = {
+                client.ident for client in self.rpc_service.getAllClients()
+            }
+            try:
+                yield deferToDatabase(
+                    update_rack_connectivity_error, connected_ids
+                )
+            except Exception:
+                log.err(None, "Failed to update rack controller connectivity.")
@@ -0,0 +1,144 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the config cache service."""
+
+
+from unittest.mock import Mock
+
+from crochet import wait_for
+from twisted.internet.defer import inlineCallbacks
+
+from maasserver.models import Config
+from maasserver.models.config import ConfigCache
+from maasserver.regiondservices import config_cache
+from maasserver.regiondservices.config_cache import ConfigCacheService
+from maasserver.testing.testcase import MAASTransactionServerTestCase
+from maasserver.utils.orm import transactional
+from maasserver.utils.threads import deferToDatabase
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from provisioningserver.utils.events import EventGroup
+
+wait_for_reactor = wait_for(30)  # 30 seconds.
+
+
+class TestConfigCacheService(MAASTransactionServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ConfigCache()
+        self.patch(config_cache, "config_cache", self.cache)
+
+    def make_listener(self):
+        listener = Mock()
+        listener.events = EventGroup("connected", "disconnected")
+        return listener
+
+    @transactional
+    def get_cached_values(self, names):
+        load = Mock(return_value={})
+        values = self.cache.get_values(names, load)
+        self.assertThat(load, MockNotCalled())
+        return values
+
+    def test_registers_and_unregisters_listener(self):
+        listener = self.make_listener()
+        service = ConfigCacheService(listener)
+        service.startService()
+        self.assertThat(
+            listener.register,
+            MockCalledOnceWith("config", service.configChanged),
+        )
+        self.assertEqual(
+            {service.listenerConnected},
+            listener.events.connected.handlers,
+        )
+        self.assertEqual(
+            {service.listenerDisconnected},
+            listener.events.disconnected.handlers,
+        )
+        service.stopService()
+        self.assertThat(
+            listener.unregister,
+            MockCalledOnceWith("config", service.configChanged),
+        )
+        self.assertEqual(set(), listener.events.connected.handlers)
+        self.assertEqual(set(), listener.events.disconnected.handlers)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_loads_cache_when_listener_connected(self):
+        yield deferToDatabase(
+            transactional(Config.objects.set_config), "name", "value"
+        )
+        service = ConfigCacheService(self.make_listener())
+        service.startService()
+        self.addCleanup(service.stopService)
+        yield service.listenerConnected()
+        self.assertTrue(self.cache.enabled)
+        values = yield deferToDatabase(self.get_cached_values, ["name"])
+        self.assertEqual({"name": "value"}, values)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_disables_cache_when_listener_disconnected(self):
+        service = ConfigCacheService(self.make_listener())
+        service.startService()
+        self.addCleanup(service.stopService)
+        yield service.listenerConnected()
+        service.listenerDisconnected(None)
+        self.assertFalse(self.cache.enabled)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_disables_cache_when_stopped(self):
+        service = ConfigCacheService(self.make_listener())
+        service.startService()
+        yield service.listenerConnected()
+        yield service.stopService()
+        self.assertFalse(self.cache.enabled)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_reloads_changed_config(self):
+        config = yield deferToDatabase(
+            transactional(Config.objects.create), name="name", value="value"
+        )
+        service = ConfigCacheService(self.make_listener())
+        service.startService()
+        self.addCleanup(service.stopService)
+        yield service.listenerConnected()
+        yield deferToDatabase(
+            transactional(Config.objects.set_config), "name", "new"
+        )
+        yield service.configChanged("update", str(config.id))
+        values = yield deferToDatabase(self.get_cached_values, ["name"])
+        self.assertEqual({"name": "new"}, values)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_reloads_created_config(self):
+        service = ConfigCacheService(self.make_listener())
+        service.startService()
+        self.addCleanup(service.stopService)
+        yield service.listenerConnected()
+        config = yield deferToDatabase(
+            transactional(Config.objects.create), name="name", value="value"
+        )
+        yield service.configChanged("create", str(config.id))
+        values = yield deferToDatabase(self.get_cached_values, ["name"])
+        self.assertEqual({"name": "value"}, values)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_reloads_deleted_config(self):
+        config = yield deferToDatabase(
+            transactional(Config.objects.create), name="name", value="value"
+        )
+        service = ConfigCacheService(self.make_listener())
+        service.startService()
+        self.addCleanup(service.stopService)
+        yield service.listenerConnected()
+        yield deferToDatabase(transactional(config.delete))
+        yield service.configChanged("delete", str(config.id))
+        values = yield deferToDatabase(self.get_cached_values, ["name"])
+        self.assertEqual({}, values)
@@ -0,0 +1,139 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the external services configuration service."""
+
+
+from unittest.mock import call, Mock
+
+from twisted.internet.defer import succeed
+from twisted.internet.task import Clock
+from twisted.protocols.amp import UnhandledCommand
+
+from maasserver.regiondservices import external_services
+from maasserver.regiondservices.external_services import (
+    ExternalServicesService,
+)
+from maasserver.rpc.externalservices import ExternalServicesDigests
+from maastesting.factory import factory
+from maastesting.matchers import MockNotCalled
+from maastesting.testcase import MAASTestCase
+from provisioningserver.rpc.cluster import RefreshExternalServices
+from provisioningserver.rpc.exceptions import NoConnectionsAvailable
+from provisioningserver.utils.events import EventGroup
+
+
+class TestExternalServicesService(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.digests = ExternalServicesDigests()
+        self.patch(
+            external_services, "external_services_digests", self.digests
+        )
+        self.getClientFor = self.patch(external_services, "getClientFor")
+        self.client = Mock(return_value=succeed({}))
+        self.getClientFor.return_value = succeed(self.client)
+
+    def make_listener(self):
+        listener = Mock()
+        listener.events = EventGroup("connected", "disconnected")
+        return listener
+
+    def make_service(self):
+        clock = Clock()
+        service = ExternalServicesService(self.make_listener(), clock)
+        service.startService()
+        self.addCleanup(service.stopService)
+        return service, clock
+
+    def set_digest(self, system_id):
+        self.digests.set(system_id, factory.make_name("digest"), 0)
+
+    def test_registers_and_unregisters_listener(self):
+        listener = self.make_listener()
+        service = ExternalServicesService(listener)
+        service.startService()
+        channels = ["config", "subnet", "sys_routable_pairs"]
+        self.assertEqual(
+            [call(channel, service.dataChanged) for channel in channels],
+            listener.register.call_args_list,
+        )
+        service.stopService()
+        self.assertEqual(
+            [call(channel, service.dataChanged) for channel in channels],
+            listener.unregister.call_args_list,
+        )
+        self.assertEqual(set(), listener.events.connected.handlers)
+        self.assertEqual(set(), listener.events.disconnected.handlers)
+
+    def test_enables_cache_while_listener_connected(self):
+        service, _ = self.make_service()
+        service.listener.events.connected.fire()
+        self.assertTrue(self.digests.enabled)
+        service.listener.events.disconnected.fire(None)
+        self.assertFalse(self.digests.enabled)
+
+    def test_disables_cache_when_stopped(self):
+        service, _ = self.make_service()
+        service.listenerConnected()
+        service.stopService()
+        self.assertFalse(self.digests.enabled)
+
+    def test_dataChanged_clears_cache(self):
+        service, _ = self.make_service()
+        service.listenerConnected()
+        system_id = factory.make_name("system_id")
+        self.set_digest(system_id)
+        service.dataChanged("update", "1")
+        self.assertIsNone(self.digests.get(system_id))
+
+    def test_dataChanged_nudges_racks_with_digests_after_delay(self):
+        service, clock = self.make_service()
+        service.listenerConnected()
+        system_ids = sorted(factory.make_name("system_id") for _ in range(3))
+        for system_id in system_ids:
+            self.set_digest(system_id)
+        service.dataChanged("sys_routable_pairs", "")
+        service.dataChanged("update", "1")
+        self.assertThat(self.getClientFor, MockNotCalled())
+        clock.advance(service.NUDGE_DELAY)
+        self.assertEqual(
+            [call(system_id) for system_id in system_ids],
+            self.getClientFor.call_args_list,
+        )
+        self.assertEqual(
+            [call(RefreshExternalServices)] * len(system_ids),
+            self.client.call_args_list,
+        )
+
+    def test_dataChanged_does_nothing_without_digests(self):
+        service, clock = self.make_service()
+        service.listenerConnected()
+        service.dataChanged("update", "1")
+        self.assertIsNone(service._nudgeCall)
+        clock.advance(service.NUDGE_DELAY)
+        self.assertThat(self.getClientFor, MockNotCalled())
+
+    def test_nudgeRacks_ignores_unavailable_racks(self):
+        service, clock = self.make_service()
+        service.listenerConnected()
+        self.set_digest("disconnected")
+        self.set_digest("old")
+        self.set_digest("updated")
+        clients = {
+            "old": Mock(side_effect=UnhandledCommand()),
+            "updated": self.client,
+        }
+
+        def getClientFor(system_id):
+            if system_id in clients:
+                return succeed(clients[system_id])
+            else:
+                raise NoConnectionsAvailable()
+
+        self.getClientFor.side_effect = getClientFor
+        service.dataChanged("update", "1")
+        clock.advance(service.NUDGE_DELAY)
+        self.assertEqual(
+            [call(RefreshExternalServices)], self.client.call_args_list
+        )
@@ -0,0 +1,195 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the rack controller connectivity service."""
+
+
+from unittest.mock import call, Mock
+
+from twisted.internet.defer import Deferred, succeed
+
+from maasserver.components import (
+    get_persistent_error,
+    register_persistent_error,
+)
+from maasserver.enum import COMPONENT
+from maasserver.regiondservices import rack_connectivity
+from maasserver.regiondservices.rack_connectivity import (
+    RackConnectivityService,
+    update_rack_connectivity_error,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.matchers import MockCalledOnceWith, MockCallsMatch
+from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
+from provisioningserver.utils.events import EventGroup
+
+
+class TestUpdateRackConnectivityError(MAASServerTestCase):
+    def test_registers_error_if_all_rack_controllers_are_disconnected(self):
+        factory.make_RackController()
+        update_rack_connectivity_error(set())
+        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
+        self.assertEqual(
+            "One rack controller is not yet connected to the region. Visit "
+            'the <a href="/MAAS/l/controllers">'
+            "rack controllers page</a> for more "
+            "information.",
+            error,
+        )
+
+    def test_registers_error_if_any_rack_controllers_are_disconnected(self):
+        rack_controllers = [
+            factory.make_RackController(),
+            factory.make_RackController(),
+            factory.make_RackController(),
+        ]
+        update_rack_connectivity_error({rack_controllers[0].system_id})
+        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
+        self.assertEqual(
+            "2 rack controllers are not yet connected to the region. Visit "
+            'the <a href="/MAAS/l/controllers">'
+            "rack controllers page</a> for more "
+            "information.",
+            error,
+        )
+
+    def test_removes_error_once_all_rack_controllers_are_connected(self):
+        rack_controllers = [
+            factory.make_RackController(),
+            factory.make_RackController(),
+        ]
+        register_persistent_error(
+            COMPONENT.RACK_CONTROLLERS, "Who flung that batter pudding?"
+        )
+        update_rack_connectivity_error(
+            {rack.system_id for rack in rack_controllers}
+        )
+        error = get_persistent_error(COMPONENT.RACK_CONTROLLERS)
+        self.assertIsNone(error)
+
+
+class TestRackConnectivityService(MAASTestCase):
+    def make_rpc_service(self, *idents):
+        rpc_service = Mock()
+        rpc_service.events = EventGroup("connected", "disconnected")
+        rpc_service.getAllClients.return_value = [
+            Mock(ident=ident) for ident in idents
+        ]
+        return rpc_service
+
+    def patch_deferToDatabase(self):
+        deferToDatabase = self.patch(rack_connectivity, "deferToDatabase")
+        deferToDatabase.return_value = succeed(None)
+        return deferToDatabase
+
+    def test_updates_error_on_start(self):
+        deferToDatabase = self.patch_deferToDatabase()
+        service = RackConnectivityService(self.make_rpc_service("abc"))
+        service.startService()
+        self.addCleanup(service.stopService)
+        self.assertThat(
+            deferToDatabase,
+            MockCalledOnceWith(update_rack_connectivity_error, {"abc"}),
+        )
+
+    def test_updates_error_when_rack_controllers_connect_or_disconnect(self):
+        deferToDatabase = self.patch_deferToDatabase()
+        rpc_service = self.make_rpc_service()
+        service = RackConnectivityService(rpc_service)
+        service.startService()
+        self.addCleanup(service.stopService)
+        rpc_service.getAllClients.return_value = [Mock(ident="abc")]
+        rpc_service.events.connected.fire("abc")
+        rpc_service.getAllClients.return_value = []
+        rpc_service.events.disconnected.fire("abc")
+        self.assertThat(
+            deferToDatabase,
+            MockCallsMatch(
+                call(update_rack_connectivity_error, set()),
+                call(update_rack_connectivity_error, {"abc"}),
+                call(update_rack_connectivity_error, set()),
+            ),
+        )
+
+    def test_coalesces_changes_during_update(self):
+        updates = []
+
+        def deferToDatabase(func, connected_ids):
+            updates.append((connected_ids, Deferred()))
+            return updates[-1][1]
+
+        self.patch(rack_connectivity, "deferToDatabase", deferToDatabase)
+        rpc_service = self.make_rpc_service()
+        service = RackConnectivityService(rpc_service)
+        service.startService()
+        self.addCleanup(service.stopService)
+        rpc_service.getAllClients.return_value = [
+            Mock(ident="abc"),
+            Mock(ident="def"),
+        ]
+        rpc_service.events.connected.fire("abc")
+        rpc_service.events.connected.fire("def")
+        # Only one update runs at a time.
+        self.assertEqual([set()], [ids for ids, _ in updates])
+        updates[0][1].callback(None)
+        # The changes seen during the update are handled by one more.
+        self.assertEqual([set(), {"abc", "def"}], [ids for ids, _ in updates])
+        updates[1][1].callback(None)
+        self.assertEqual(2, len(updates))
+        self.assertIsNone(service._updating)
+
+    def test_updates_error_when_rack_controllers_change(self):
+        deferToDatabase = self.patch_deferToDatabase()
+        rpc_service = self.make_rpc_service("abc")
+        service = RackConnectivityService(rpc_service, Mock())
+        service.startService()
+        self.addCleanup(service.stopService)
+        service.rackControllersChanged("sys_rack_controllers", "")
+        self.assertThat(
+            deferToDatabase,
+            MockCallsMatch(
+                call(update_rack_connectivity_error, {"abc"}),
+                call(update_rack_connectivity_error, {"abc"}),
+            ),
+        )
+
+    def test_unregisters_handlers_on_stop(self):
+        self.patch_deferToDatabase()
+        rpc_service = self.make_rpc_service()
+        service = RackConnectivityService(rpc_service)
+        service.startService()
+        service.stopService()
+        self.assertEqual(set(), rpc_service.events.connected.handlers)
+        self.assertEqual(set(), rpc_service.events.disconnected.handlers)
+
+    def test_registers_and_unregisters_listener(self):
+        self.patch_deferToDatabase()
+        listener = Mock()
+        service = RackConnectivityService(self.make_rpc_service(), listener)
+        service.startService()
+        self.assertThat(
+            listener.register,
+            MockCalledOnceWith(
+                "sys_rack_controllers", service.rackControllersChanged
+            ),
+        )
+        service.stopService()
+        self.assertThat(
+            listener.unregister,
+            MockCalledOnceWith(
+                "sys_rack_controllers", service.rackControllersChanged
+            ),
+        )
+
+    def test_logs_failures(self):
+        deferToDatabase = self.patch(rack_connectivity, "deferToDatabase")
+        deferToDatabase.side_effect = factory.make_exception()
+        service = RackConnectivityService(self.make_rpc_service())
+        with TwistedLoggerFixture() as logger:
+            service.startService()
+        self.addCleanup(service.stopService)
+        self.assertIn(
+            "Failed to update rack controller connectivity.", logger.output
+        )
@@ -0,0 +1,157 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""RPC helpers relating to the external services of rack controllers."""
+
+__all__ = [
+    "external_services_digests",
+    "get_external_services_configuration",
+    "get_proxy_configuration",
+    "get_syslog_configuration",
+]
+
+from hashlib import sha256
+import json
+import threading
+
+from maasserver.dns.config import get_trusted_networks
+from maasserver.models.config import Config
+from maasserver.models.subnet import Subnet
+from maasserver.rpc import nodes
+from maasserver.utils.orm import transactional
+from provisioningserver.utils.twisted import synchronous
+
+
+class ExternalServicesDigests:
+    """Process-wide cache of the external services configuration digests
+    last sent to each rack controller.
+
+    The cache is disabled until the region's `ExternalServicesService` is
+    listening for changes to the data the configuration is made from. Every
+    change clears the whole cache, since the data is shared between all the
+    rack controllers and changes rarely.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        # Rack controller system_id -> digest.
+        self._digests = {}
+        # Number of times the cache has been cleared.
+        self.changes = 0
+
+    def enable(self):
+        """Enable the cache."""
+        with self._lock:
+            self.enabled = True
+
+    def disable(self):
+        """Disable and empty the cache."""
+        with self._lock:
+            self.enabled = False
+            self._digests = {}
+            self.changes += 1
+
+    def invalidate(self):
+        """Empty the cache, as the configuration may have changed.
+
+        :return: The system_ids of the rack controllers that had a digest.
+        """
+        with self._lock:
+            system_ids, self._digests = set(self._digests), {}
+            self.changes += 1
+            return system_ids
+
+    def get(self, system_id):
+        """Return the digest last sent to `system_id`, or `None`."""
+        with self._lock:
+            return self._digests.get(system_id)
+
+    def set(self, system_id, digest, changes):
+        """Record the `digest` sent to `system_id`.
+
+        :param changes: The value of `changes` before the configuration was
+            read. If the cache has been cleared since, the configuration may
+            be stale, so `digest` isn't recorded.
+        """
+        with self._lock:
+            if self.enabled and self.changes == changes:
+                self._digests[system_id] = digest
+
+
+external_services_digests = ExternalServicesDigests()
+
+
+def calculate_digest(configuration):
+    """Return the digest of the external services `configuration`."""
+    data = json.dumps(configuration, sort_keys=True)
+    return sha256(data.encode("utf-8")).hexdigest()
+
+
+@synchronous
+@transactional
+def get_proxy_configuration():
+    """Get settings to use for configuring proxy.
+
+    :return: See `GetProxyConfiguration`.
+    """
+    allowed_subnets = Subnet.objects.filter(allow_proxy=True)
+    cidrs = [subnet.cidr for subnet in allowed_subnets]
+    configs = Config.objects.get_configs(
+        ["maas_proxy_port", "prefer_v4_proxy", "enable_http_proxy"]
+    )
+    return {
+        "enabled": configs["enable_http_proxy"],
+        "port": configs["maas_proxy_port"],
+        "allowed_cidrs": cidrs,
+        "prefer_v4_proxy": configs["prefer_v4_proxy"],
+    }
+
+
+@synchronous
+@transactional
+def get_syslog_configuration():
+    """Get settings to use for configuring syslog.
+
+    :return: See `GetSyslogConfiguration`.
+    """
+    return {"port": Config.objects.get_config("maas_syslog_port")}
+
+
+@synchronous
+@transactional
+def get_external_services_configuration(system_id, digest=None):
+    """Get settings to use for configuring the rack controller's external
+    services.
+
+    :param system_id: system_id of the rack controller.
+    :param digest: The digest returned by the previous call, if any.
+    :return: See `GetExternalServicesConfiguration`.
+    """
+    changes = external_services_digests.changes
+    time_configuration = nodes.get_time_configuration(system_id)
+    proxy_configuration = get_proxy_configuration()
+    # Sort the lists, so that the digest only changes when their contents do.
+    configuration = {
+        "controller_type": nodes.get_controller_type(system_id),
+        "time_configuration": {
+            "servers": sorted(time_configuration["servers"]),
+            "peers": sorted(time_configuration["peers"]),
+        },
+        "dns_configuration": {
+            "trusted_networks": sorted(get_trusted_networks())
+        },
+        "proxy_configuration": dict(
+            proxy_configuration,
+            allowed_cidrs=sorted(
+                str(cidr) for cidr in proxy_configuration["allowed_cidrs"]
+            ),
+        ),
+        "syslog_configuration": get_syslog_configuration(),
+    }
+    new_digest = calculate_digest(configuration)
+    external_services_digests.set(system_id, new_digest, changes)
+    if new_digest == digest:
+        return {"digest": digest}
+    else:
+        return {"digest": new_digest, "configuration": configuration}
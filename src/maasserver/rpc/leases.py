@@ -4,11 +4,12 @@
 """RPC helpers relating to DHCP leases."""
 
 
+from collections import defaultdict
 from datetime import datetime
 
-from netaddr import IPAddress
+from netaddr import EUI, IPAddress, mac_unix_expanded
 
-from maasserver.enum import IPADDRESS_FAMILY, IPADDRESS_TYPE
+from maasserver.enum import IPADDRESS_FAMILY, IPADDRESS_TYPE, IPRANGE_TYPE
 from maasserver.models import (
     DNSResource,
     Interface,
@@ -17,7 +18,7 @@ from maasserver.models import (
     Subnet,
     UnknownInterface,
 )
-from maasserver.utils.orm import transactional
+from maasserver.utils.orm import is_retryable_failure, savepoint, transactional
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.network import coerce_to_valid_hostname
 from provisioningserver.utils.twisted import synchronous
@@ -38,6 +39,88 @@ def _is_valid_hostname(hostname):
     )
 
 
+def _normalise_mac(mac):
+    """Return `mac` in the form PostgreSQL uses for `macaddr` values."""
+    return str(EUI(mac, dialect=mac_unix_expanded))
+
+
+class LeaseLookups:
+    """Database lookups needed while updating a lease.
+
+    Each lookup here is a query. See `BulkLeaseLookups` for lookups that are
+    shared between the leases in a batch.
+    """
+
+    def get_subnet(self, ip):
+        """Return the best `Subnet` for `ip`, or `None`."""
+        return Subnet.objects.get_best_subnet_for_ip(ip)
+
+    def get_dynamic_range(self, subnet, ip):
+        """Return the dynamic `IPRange` in `subnet` containing `ip`."""
+        return subnet.get_dynamic_range_for_ip(IPAddress(ip))
+
+    def get_interfaces(self, mac):
+        """Return the list of interfaces with the MAC address `mac`."""
+        return list(Interface.objects.filter(mac_address=mac))
+
+    def add_interface(self, mac, interface):
+        """Record that `interface` was created for `mac`."""
+
+
+class BulkLeaseLookups(LeaseLookups):
+    """Database lookups for a batch of leases.
+
+    Subnets with their IP ranges, and the interfaces for every MAC address
+    in the batch, are loaded up-front with a fixed number of queries.
+    """
+
+    def __init__(self, macs):
+        # Ordered like `Subnet.objects.find_best_subnet_for_ip_query`:
+        # subnets on VLANs with DHCP first, then most specific first.
+        subnets = Subnet.objects.select_related("vlan")
+        subnets = subnets.prefetch_related("iprange_set")
+        self.subnets = sorted(
+            subnets,
+            key=lambda subnet: (
+                subnet.vlan.dhcp_on,
+                subnet.get_ipnetwork().prefixlen,
+            ),
+            reverse=True,
+        )
+        self.interfaces = defaultdict(list)
+        interfaces = Interface.objects.filter(mac_address__in=set(macs))
+        for interface in interfaces.order_by("id"):
+            mac = _normalise_mac(str(interface.mac_address))
+            self.interfaces[mac].append(interface)
+
+    def get_subnet(self, ip):
+        ip = IPAddress(ip)
+        if ip.is_ipv4_mapped():
+            ip = ip.ipv4()
+        for subnet in self.subnets:
+            network = subnet.get_ipnetwork()
+            # The IP address must be strictly inside the network, as with
+            # PostgreSQL's << operator.
+            if ip in network and network.size > 1:
+                return subnet
+        return None
+
+    def get_dynamic_range(self, subnet, ip):
+        ip = IPAddress(ip)
+        for iprange in subnet.iprange_set.all():
+            if iprange.type != IPRANGE_TYPE.DYNAMIC:
+                continue
+            if ip in iprange.netaddr_iprange:
+                return iprange
+        return None
+
+    def get_interfaces(self, mac):
+        return list(self.interfaces[_normalise_mac(mac)])
+
+    def add_interface(self, mac, interface):
+        self.interfaces[_normalise_mac(mac)].append(interface)
+
+
 @synchronous
 @transactional
 def update_lease(
@@ -73,13 +156,77 @@ def update_lease(
     :raises NoSuchCluster: If the cluster identified by `cluster_uuid` does not
         exist.
     """
+    return _update_lease(
+        LeaseLookups(),
+        action,
+        mac,
+        ip_family,
+        ip,
+        timestamp,
+        lease_time=lease_time,
+        hostname=hostname,
+    )
+
+
+@synchronous
+@transactional
+def update_leases(updates):
+    """Update a batch of DHCP leases from a cluster.
+
+    The leases are updated in order, within one transaction. Subnets and
+    interfaces are looked up once for the whole batch. A lease that cannot be
+    updated is logged and skipped; it does not affect the rest of the batch.
+    Only failures that need the transaction to be retried, such as
+    serialization failures, abort the batch.
+
+    The existing addresses of each lease are still queried per lease, since
+    the leases earlier in the batch can change them.
+
+    :param updates: A list of dicts, each with the arguments for
+        `update_lease`.
+    """
+    lookups = BulkLeaseLookups(update["mac"] for update in updates)
+    for update in updates:
+        try:
+            with savepoint():
+                _update_lease(lookups, **update)
+        except LeaseUpdateError as error:
+            log.msg(
+                "Lease update for %s on %s failed: %s"
+                % (update["ip"], update["mac"], error)
+            )
+        except Exception as error:
+            if is_retryable_failure(error):
+                raise
+            log.err(
+                None,
+                "Lease update for %s on %s failed."
+                % (update["ip"], update["mac"]),
+            )
+    return {}
+
+
+def _update_lease(
+    lookups,
+    action,
+    mac,
+    ip_family,
+    ip,
+    timestamp,
+    lease_time=None,
+    hostname=None,
+):
+    """See `update_lease`.
+
+    :param lookups: The `LeaseLookups` to use.
+    """
     # Check for a valid action.
     if action not in ["commit", "expiry", "release"]:
         raise LeaseUpdateError("Unknown lease action: %s" % action)
 
     # Get the subnet for this IP address. If no subnet exists then something
     # is wrong as we should not be recieving message about unknown subnets.
-    subnet = Subnet.objects.get_best_subnet_for_ip(ip)
+    subnet = lookups.get_subnet(ip)
     if subnet is None:
         raise LeaseUpdateError("No subnet exists for: %s" % ip)
 
@@ -113,12 +260,12 @@ def update_lease(
 
     # We will recieve actions on all addresses in the subnet. We only want
     # to update the addresses in the dynamic range.
-    dynamic_range = subnet.get_dynamic_range_for_ip(IPAddress(ip))
+    dynamic_range = lookups.get_dynamic_range(subnet, ip)
     if dynamic_range is None:
         # Do nothing.
         return {}
 
-    interfaces = list(Interface.objects.filter(mac_address=mac))
+    interfaces = lookups.get_interfaces(mac)
     if len(interfaces) == 0 and action == "commit":
         # A MAC address that is unknown to MAAS was given an IP address. Create
         # an unknown interface for this lease.
@@ -126,6 +273,7 @@ def update_lease(
             name="eth0", mac_address=mac, vlan_id=subnet.vlan_id
         )
         unknown_interface.save()
+        lookups.add_interface(mac, unknown_interface)
         interfaces = [unknown_interface]
     elif len(interfaces) == 0:
         # No interfaces and not commit action so nothing needs to be done.
@@ -166,6 +166,44 @@ def update_node_power_state(system_id, power_state):
     node.update_power_state(power_state)
 
 
+# The statuses Node.update_power_state() acts on, beyond storing the power
+# state.
+POWER_STATE_STATUSES = {
+    NODE_STATUS.RELEASING,
+    NODE_STATUS.EXITING_RESCUE_MODE,
+}
+
+
+@synchronous
+@transactional
+def update_node_power_states(changed, unchanged):
+    """Update the power states of a batch of nodes.
+
+    for :py:class:`~provisioningserver.rpc.region.UpdateNodePowerStates`.
+
+    :param changed: A list of dicts with the `system_id` and new
+        `power_state` of the nodes whose power state has changed.
+    :param unchanged: The system_ids of the nodes whose power state is
+        unchanged. Unless their status reacts to their power state, only
+        their `power_state_updated` is set, in one query.
+    """
+    power_states = {
+        update["system_id"]: update["power_state"] for update in changed
+    }
+    for node in Node.objects.filter(system_id__in=power_states):
+        node.update_power_state(power_states[node.system_id])
+    if len(unchanged) > 0:
+        unchanged = Node.objects.filter(system_id__in=unchanged)
+        # A releasing node might have been powered off before the release
+        # began, and a node exiting rescue mode might already be in the
+        # power state it exits into, so let update_power_state() act on them.
+        for node in unchanged.filter(status__in=POWER_STATE_STATUSES):
+            node.update_power_state(node.power_state)
+        unchanged.exclude(status__in=POWER_STATE_STATUSES).update(
+            power_state_updated=now()
+        )
+
+
 @synchronous
 @transactional
 def create_node(
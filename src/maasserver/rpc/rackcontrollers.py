@@ -6,6 +6,7 @@
 __all__ = [
     "handle_upgrade",
     "register",
+    "report_boot_images",
     "update_interfaces",
     "update_last_image_sync",
 ]
@@ -290,3 +291,17 @@ def update_last_image_sync(system_id):
     RackController.objects.filter(system_id=system_id).update(
         last_image_sync=now()
     )
+
+
+@synchronous
+@transactional
+def report_boot_images(system_id, boot_images):
+    """Cache the boot images reported by a rack controller.
+
+    for :py:class:`~provisioningserver.rpc.region.ReportBootImages`.
+    """
+    rack_controller = RackController.objects.filter(
+        system_id=system_id
+    ).first()
+    if rack_controller is not None:
+        ControllerInfo.objects.set_boot_images(rack_controller, boot_images)
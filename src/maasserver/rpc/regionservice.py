@@ -33,13 +33,12 @@ from zope.interface import implementer
 from maasserver import eventloop
 from maasserver.bootresources import get_simplestream_endpoint
 from maasserver.dns.config import get_trusted_networks
-from maasserver.models.config import Config
 from maasserver.models.node import RackController
-from maasserver.models.subnet import Subnet
 from maasserver.rpc import (
     boot,
     configuration,
     events,
+    externalservices,
     leases,
     nodes,
     packagerepository,
@@ -52,7 +51,6 @@ from maasserver.rpc.nodes import (
 )
 from maasserver.rpc.services import update_services
 from maasserver.security import get_shared_secret
-from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.prometheus.metrics import (
@@ -105,13 +103,20 @@ class Region(RPCProtocol):
         return d.addCallback(got_secret)
 
     @region.ReportBootImages.responder
-    def report_boot_images(self, uuid, images):
-        """report_boot_images(uuid, images)
+    def report_boot_images(self, uuid, images, boot_images=None):
+        """report_boot_images(uuid, images, boot_images=None)
 
         Implementation of
         :py:class:`~provisioningserver.rpc.region.ReportBootImages`.
         """
-        return {}
+        if boot_images is None:
+            # Older rack controllers don't report anything useful.
+            return {}
+        d = deferToDatabase(
+            rackcontrollers.report_boot_images, uuid, boot_images
+        )
+        d.addCallback(lambda args: {})
+        return d
 
     @region.UpdateLease.responder
     def update_lease(
@@ -160,6 +165,31 @@ class Region(RPCProtocol):
         # region recieves the message.
         return d
 
+    @region.UpdateLeases.responder
+    def update_leases(self, cluster_uuid, updates):
+        """update_leases(cluster_uuid, updates)
+
+        Implementation of
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+        """
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        d = dbtasks.deferTask(leases.update_leases, updates)
+
+        # Catch all errors except the NoSuchCluster failure. We want that to
+        # be sent back to the cluster.
+        def err_NoSuchCluster_passThrough(failure):
+            if failure.check(NoSuchCluster):
+                return failure
+            else:
+                log.err(failure, "Unhandled failure in updating leases.")
+                return {}
+
+        d.addErrback(err_NoSuchCluster_passThrough)
+
+        # Wait for the batch to be handled, so that batches from the cluster
+        # are processed in order no matter which region recieves them.
+        return d
+
     @amp.StartTLS.responder
     def get_tls_parameters(self):
         """get_tls_parameters()
@@ -297,6 +327,17 @@ class Region(RPCProtocol):
         d.addCallback(lambda args: {})
         return d
 
+    @region.UpdateNodePowerStates.responder
+    def update_node_power_states(self, changed, unchanged):
+        """update_node_power_states()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.UpdateNodePowerStates`.
+        """
+        d = deferToDatabase(nodes.update_node_power_states, changed, unchanged)
+        d.addCallback(lambda args: {})
+        return d
+
     @region.RegisterEventType.responder
     def register_event_type(self, name, description, level):
         """register_event_type()
@@ -558,22 +599,7 @@ class Region(RPCProtocol):
         """
         # For consistency `system_id` is passed, but at the moment it is not
         # used to customise the proxy configuration.
-
-        @transactional
-        def get_from_db():
-            allowed_subnets = Subnet.objects.filter(allow_proxy=True)
-            cidrs = [subnet.cidr for subnet in allowed_subnets]
-            configs = Config.objects.get_configs(
-                ["maas_proxy_port", "prefer_v4_proxy", "enable_http_proxy"]
-            )
-            return {
-                "enabled": configs["enable_http_proxy"],
-                "port": configs["maas_proxy_port"],
-                "allowed_cidrs": cidrs,
-                "prefer_v4_proxy": configs["prefer_v4_proxy"],
-            }
-
-        return deferToDatabase(get_from_db)
+        return deferToDatabase(externalservices.get_proxy_configuration)
 
     @region.GetSyslogConfiguration.responder
     def get_syslog_configuration(self, system_id):
@@ -584,13 +610,24 @@ class Region(RPCProtocol):
         """
         # For consistency `system_id` is passed, but at the moment it is not
         # used to customise the syslog configuration.
+        return deferToDatabase(externalservices.get_syslog_configuration)
 
-        @transactional
-        def get_from_db():
-            port = Config.objects.get_config("maas_syslog_port")
-            return {"port": port}
+    @region.GetExternalServicesConfiguration.responder
+    def get_external_services_configuration(self, system_id, digest=None):
+        """Get settings to use for configuring the external services.
 
-        return deferToDatabase(get_from_db)
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.GetExternalServicesConfiguration`.
+        """
+        digests = externalservices.external_services_digests
+        if digest is not None and digests.get(system_id) == digest:
+            # Nothing has changed since the configuration was last sent.
+            return succeed({"digest": digest})
+        return deferToDatabase(
+            externalservices.get_external_services_configuration,
+            system_id,
+            digest,
+        )
 
 
 @inlineCallbacks
@@ -0,0 +1,113 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for RPC helpers relating to external services."""
+
+
+from maasserver.models import Config
+from maasserver.rpc import externalservices
+from maasserver.rpc.externalservices import (
+    calculate_digest,
+    ExternalServicesDigests,
+    get_external_services_configuration,
+)
+from maasserver.testing.factory import factory
+from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.testcase import MAASTestCase
+from provisioningserver.rpc.exceptions import NoSuchNode
+
+
+class TestExternalServicesDigests(MAASTestCase):
+    def test_disabled_by_default(self):
+        digests = ExternalServicesDigests()
+        digests.set("id", "digest", digests.changes)
+        self.assertFalse(digests.enabled)
+        self.assertIsNone(digests.get("id"))
+
+    def test_set_and_get(self):
+        digests = ExternalServicesDigests()
+        digests.enable()
+        digests.set("id", "digest", digests.changes)
+        self.assertEqual("digest", digests.get("id"))
+
+    def test_set_ignored_after_invalidate(self):
+        digests = ExternalServicesDigests()
+        digests.enable()
+        changes = digests.changes
+        digests.invalidate()
+        digests.set("id", "digest", changes)
+        self.assertIsNone(digests.get("id"))
+
+    def test_invalidate_returns_and_clears_system_ids(self):
+        digests = ExternalServicesDigests()
+        digests.enable()
+        digests.set("id1", "digest1", digests.changes)
+        digests.set("id2", "digest2", digests.changes)
+        self.assertEqual({"id1", "id2"}, digests.invalidate())
+        self.assertIsNone(digests.get("id1"))
+        self.assertEqual(set(), digests.invalidate())
+
+    def test_disable_clears(self):
+        digests = ExternalServicesDigests()
+        digests.enable()
+        digests.set("id", "digest", digests.changes)
+        digests.disable()
+        self.assertFalse(digests.enabled)
+        self.assertIsNone(digests.get("id"))
+
+
+class TestGetExternalServicesConfiguration(MAASServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.digests = ExternalServicesDigests()
+        self.digests.enable()
+        self.patch(externalservices, "external_services_digests", self.digests)
+
+    def test_returns_configuration(self):
+        rack = factory.make_RackController()
+        subnet = factory.make_Subnet(allow_proxy=True, allow_dns=True)
+        Config.objects.set_config("maas_syslog_port", 5555)
+        response = get_external_services_configuration(rack.system_id)
+        configuration = response["configuration"]
+        self.assertEqual(calculate_digest(configuration), response["digest"])
+        self.assertEqual(
+            {"is_region": False, "is_rack": True},
+            configuration["controller_type"],
+        )
+        self.assertIn(
+            subnet.cidr,
+            configuration["dns_configuration"]["trusted_networks"],
+        )
+        self.assertEqual(
+            [subnet.cidr],
+            configuration["proxy_configuration"]["allowed_cidrs"],
+        )
+        self.assertEqual({"port": 5555}, configuration["syslog_configuration"])
+
+    def test_records_digest(self):
+        rack = factory.make_RackController()
+        response = get_external_services_configuration(rack.system_id)
+        self.assertEqual(response["digest"], self.digests.get(rack.system_id))
+
+    def test_omits_configuration_when_digest_matches(self):
+        rack = factory.make_RackController()
+        digest = get_external_services_configuration(rack.system_id)["digest"]
+        self.assertEqual(
+            {"digest": digest},
+            get_external_services_configuration(rack.system_id, digest),
+        )
+
+    def test_digest_changes_with_configuration(self):
+        rack = factory.make_RackController()
+        digest = get_external_services_configuration(rack.system_id)["digest"]
+        Config.objects.set_config("maas_syslog_port", 5555)
+        response = get_external_services_configuration(rack.system_id, digest)
+        self.assertNotEqual(digest, response["digest"])
+        self.assertIn("configuration", response)
+
+    def test_raises_NoSuchNode(self):
+        self.assertRaises(
+            NoSuchNode,
+            get_external_services_configuration,
+            factory.make_name("system_id"),
+        )
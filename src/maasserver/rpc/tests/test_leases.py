@@ -13,10 +13,16 @@ from netaddr import IPAddress
 from testtools.matchers import Contains, Equals, MatchesStructure, Not
 
 from maasserver.enum import INTERFACE_TYPE, IPADDRESS_FAMILY, IPADDRESS_TYPE
-from maasserver.models import DNSResource
+from maasserver.models import DNSResource, Subnet
 from maasserver.models.interface import UnknownInterface
 from maasserver.models.staticipaddress import StaticIPAddress
-from maasserver.rpc.leases import LeaseUpdateError, update_lease
+from maasserver.rpc import leases as leases_module
+from maasserver.rpc.leases import (
+    BulkLeaseLookups,
+    LeaseUpdateError,
+    update_lease,
+    update_leases,
+)
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import get_one, reload_object
@@ -505,3 +511,148 @@ class TestUpdateLease(MAASServerTestCase):
         self.assertEqual(1, ip_address2.interface_set.count())
         self.assertEqual(1, boot_interface1.ip_addresses.count())
         self.assertEqual(1, boot_interface2.ip_addresses.count())
+
+
+class TestUpdateLeases(MAASServerTestCase):
+    def make_kwargs(self, subnet, action="commit", mac=None):
+        if mac is None:
+            mac = factory.make_mac_address()
+        dynamic_range = subnet.get_dynamic_ranges()[0]
+        return {
+            "action": action,
+            "mac": mac,
+            "ip": factory.pick_ip_in_IPRange(dynamic_range),
+            "ip_family": "ipv4",
+            "timestamp": int(time.time()),
+            "lease_time": random.randint(30, 1000),
+            "hostname": factory.make_name("host"),
+        }
+
+    def make_managed_subnet(self):
+        return factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True
+        )
+
+    def test_updates_all_leases(self):
+        subnet = self.make_managed_subnet()
+        node = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        boot_interface = node.get_boot_interface()
+        updates = [
+            self.make_kwargs(subnet, mac=str(boot_interface.mac_address)),
+            self.make_kwargs(subnet),
+        ]
+        self.assertEqual({}, update_leases(updates))
+        boot_sip = StaticIPAddress.objects.get(
+            alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=updates[0]["ip"]
+        )
+        self.assertItemsEqual(
+            [boot_interface.id],
+            boot_sip.interface_set.values_list("id", flat=True),
+        )
+        unknown_interface = UnknownInterface.objects.get(
+            mac_address=updates[1]["mac"]
+        )
+        unknown_sip = StaticIPAddress.objects.get(
+            alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=updates[1]["ip"]
+        )
+        self.assertItemsEqual(
+            [unknown_interface.id],
+            unknown_sip.interface_set.values_list("id", flat=True),
+        )
+
+    def test_applies_leases_in_order(self):
+        subnet = self.make_managed_subnet()
+        commit = self.make_kwargs(subnet, action="commit")
+        release = dict(commit, action="release")
+        update_leases([commit, release])
+        unknown_interface = UnknownInterface.objects.get(
+            mac_address=commit["mac"]
+        )
+        self.assertIsNone(
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=commit["ip"]
+            ).first()
+        )
+        self.assertEqual(
+            1,
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED,
+                ip=None,
+                interface=unknown_interface,
+            ).count(),
+        )
+
+    def test_skips_invalid_leases(self):
+        subnet = self.make_managed_subnet()
+        invalid = self.make_kwargs(subnet, action=factory.make_name("action"))
+        valid = self.make_kwargs(subnet)
+        update_leases([invalid, valid])
+        self.assertIsNotNone(
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=valid["ip"]
+            ).first()
+        )
+
+    def test_skips_leases_that_fail_unexpectedly(self):
+        subnet = self.make_managed_subnet()
+        failing = self.make_kwargs(subnet)
+        valid = self.make_kwargs(subnet)
+        orig_update_lease = leases_module._update_lease
+
+        def _update_lease(lookups, **update):
+            if update == failing:
+                raise ZeroDivisionError()
+            return orig_update_lease(lookups, **update)
+
+        self.patch(leases_module, "_update_lease", _update_lease)
+        update_leases([failing, valid])
+        self.assertIsNone(
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=failing["ip"]
+            ).first()
+        )
+        self.assertIsNotNone(
+            StaticIPAddress.objects.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED, ip=valid["ip"]
+            ).first()
+        )
+
+    def test_raises_retryable_failures(self):
+        subnet = self.make_managed_subnet()
+        update_lease = self.patch(leases_module, "_update_lease")
+        update_lease.side_effect = ZeroDivisionError()
+        self.patch(leases_module, "is_retryable_failure").return_value = True
+        self.assertRaises(
+            ZeroDivisionError, update_leases, [self.make_kwargs(subnet)]
+        )
+
+
+class TestBulkLeaseLookups(MAASServerTestCase):
+    def test_get_subnet_matches_get_best_subnet_for_ip(self):
+        vlan = factory.make_VLAN(dhcp_on=True)
+        network = factory.make_ipv4_network(slash=16)
+        subnet = factory.make_Subnet(cidr=str(network.cidr))
+        subnet_in_network = factory.make_Subnet(
+            cidr=str(next(network.subnet(24))), vlan=vlan
+        )
+        lookups = BulkLeaseLookups([])
+        for ip in [
+            str(network.network + 1),
+            str(network.network + 2 ** 8 + 1),
+            factory.make_ip_address(),
+        ]:
+            self.assertEqual(
+                Subnet.objects.get_best_subnet_for_ip(ip),
+                lookups.get_subnet(ip),
+            )
+        self.assertEqual(
+            subnet_in_network, lookups.get_subnet(str(network.network + 1))
+        )
+        self.assertEqual(
+            subnet, lookups.get_subnet(str(network.network + 2 ** 8 + 1))
+        )
+
+    def test_get_interfaces_normalises_mac(self):
+        interface = factory.make_Interface(mac_address="00:01:0a:0b:0c:0d")
+        lookups = BulkLeaseLookups(["0:1:a:b:c:d"])
+        self.assertEqual([interface], lookups.get_interfaces("0:1:a:b:c:d"))
@@ -35,6 +35,7 @@ from maasserver.rpc.nodes import (
     mark_node_failed,
     request_node_info_by_mac_address,
     update_node_power_state,
+    update_node_power_states,
 )
 from maasserver.rpc.testing.fixtures import MockLiveRegionToClusterRPCFixture
 from maasserver.testing.architecture import make_usable_architecture
@@ -48,6 +49,7 @@ from maasserver.testing.testcase import (
     MAASTransactionServerTestCase,
 )
 from maasserver.utils.orm import post_commit_hooks, reload_object
+from maastesting.djangotestcase import count_queries
 from maastesting.twisted import always_succeed_with
 from metadataserver.builtin_scripts import load_builtin_scripts
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
@@ -551,6 +553,78 @@ class TestUpdateNodePowerState(MAASServerTestCase):
         self.assertEqual(reload_object(node).power_state, POWER_STATE.ON)
 
 
+class TestUpdateNodePowerStates(MAASServerTestCase):
+    def test_updates_changed_power_states(self):
+        node1 = factory.make_Node(power_state=POWER_STATE.OFF)
+        node2 = factory.make_Node(power_state=POWER_STATE.ON)
+        update_node_power_states(
+            [
+                {"system_id": node1.system_id, "power_state": POWER_STATE.ON},
+                {
+                    "system_id": node2.system_id,
+                    "power_state": POWER_STATE.ERROR,
+                },
+            ],
+            [],
+        )
+        self.assertEqual(POWER_STATE.ON, reload_object(node1).power_state)
+        self.assertEqual(POWER_STATE.ERROR, reload_object(node2).power_state)
+
+    def test_marks_unchanged_power_states_updated(self):
+        updated = now() - timedelta(minutes=5)
+        node = factory.make_Node(
+            power_state=POWER_STATE.ON, power_state_updated=updated
+        )
+        update_node_power_states([], [node.system_id])
+        node = reload_object(node)
+        self.assertEqual(POWER_STATE.ON, node.power_state)
+        self.assertThat(node.power_state_updated, GreaterThan(updated))
+
+    def test_releases_unchanged_releasing_nodes_that_are_off(self):
+        node = factory.make_Node(
+            power_state=POWER_STATE.OFF,
+            status=NODE_STATUS.RELEASING,
+            owner=None,
+        )
+        self.patch(Node, "_clear_status_expires")
+        with post_commit_hooks:
+            update_node_power_states([], [node.system_id])
+        self.assertEqual(NODE_STATUS.READY, reload_object(node).status)
+
+    def test_exits_rescue_mode_for_unchanged_nodes(self):
+        node = factory.make_Node(
+            power_state=POWER_STATE.ON,
+            status=NODE_STATUS.EXITING_RESCUE_MODE,
+            previous_status=NODE_STATUS.DEPLOYED,
+        )
+        update_node_power_states([], [node.system_id])
+        self.assertEqual(NODE_STATUS.DEPLOYED, reload_object(node).status)
+
+    def test_ignores_unknown_nodes(self):
+        node = factory.make_Node(power_state=POWER_STATE.OFF)
+        update_node_power_states(
+            [
+                {"system_id": node.system_id, "power_state": POWER_STATE.ON},
+                {
+                    "system_id": factory.make_name("system_id"),
+                    "power_state": POWER_STATE.ON,
+                },
+            ],
+            [factory.make_name("system_id")],
+        )
+        self.assertEqual(POWER_STATE.ON, reload_object(node).power_state)
+
+    def test_unchanged_query_count_is_constant(self):
+        nodes = [factory.make_Node() for _ in range(3)]
+        count_one, _ = count_queries(
+            update_node_power_states, [], [nodes[0].system_id]
+        )
+        count_all, _ = count_queries(
+            update_node_power_states, [], [node.system_id for node in nodes]
+        )
+        self.assertEqual(count_one, count_all)
+
+
 class TestGetControllerType(MAASServerTestCase):
     """Tests for `get_controller_type`."""
 
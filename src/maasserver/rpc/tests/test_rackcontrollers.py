@@ -17,8 +17,10 @@ from testtools.matchers import (
 )
 
 from maasserver import locks, worker_user
+from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
 from maasserver.enum import INTERFACE_TYPE, IPADDRESS_TYPE, NODE_TYPE
 from maasserver.models import (
+    ControllerInfo,
     Node,
     NodeGroupToRackController,
     RackController,
@@ -30,6 +32,7 @@ from maasserver.rpc import rackcontrollers
 from maasserver.rpc.rackcontrollers import (
     handle_upgrade,
     register,
+    report_boot_images,
     report_neighbours,
     update_foreign_dhcp,
     update_interfaces,
@@ -543,3 +546,21 @@ class TestUpdateLastImageSync(MAASServerTestCase):
         update_last_image_sync(rack.system_id)
 
         self.assertNotEqual(previous_sync, reload_object(rack).last_image_sync)
+
+
+class TestReportBootImages(MAASServerTestCase):
+    def test_caches_boot_images(self):
+        rack = factory.make_RackController()
+        boot_images = [make_rpc_boot_image()]
+
+        report_boot_images(rack.system_id, boot_images)
+
+        info = ControllerInfo.objects.get(node=rack)
+        self.assertEqual(boot_images, info.boot_images)
+        self.assertFalse(info.boot_images_in_sync)
+
+    def test_ignores_unknown_rack_controller(self):
+        report_boot_images(
+            factory.make_name("system_id"), [make_rpc_boot_image()]
+        )
+        self.assertFalse(ControllerInfo.objects.exists())
@@ -25,6 +25,7 @@ from twisted.python.failure import Failure
 
 from maasserver import eventloop
 from maasserver.bootresources import get_simplestream_endpoint
+from maasserver.clusterrpc.testing.boot_images import make_rpc_boot_image
 from maasserver.dns.config import get_trusted_networks
 from maasserver.enum import INTERFACE_TYPE, NODE_STATUS, POWER_STATE
 from maasserver.models import Config, Event, EventType, Node, PackageRepository
@@ -32,6 +33,7 @@ from maasserver.models.interface import PhysicalInterface
 from maasserver.models.signals import bootsources
 from maasserver.models.signals.testing import SignalsDisabled
 from maasserver.rpc import events as events_module
+from maasserver.rpc import externalservices as externalservices_module
 from maasserver.rpc import leases as leases_module
 from maasserver.rpc import regionservice
 from maasserver.rpc.nodes import get_controller_type, get_time_configuration
@@ -49,6 +51,7 @@ from maastesting.matchers import (
     MockCalledOnce,
     MockCalledOnceWith,
     MockCalledWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
@@ -63,6 +66,7 @@ from provisioningserver.rpc.region import (
     GetBootSourcesV2,
     GetControllerType,
     GetDNSConfiguration,
+    GetExternalServicesConfiguration,
     GetProxies,
     GetProxyConfiguration,
     GetSyslogConfiguration,
@@ -80,7 +84,9 @@ from provisioningserver.rpc.region import (
     SendEventMACAddress,
     UpdateInterfaces,
     UpdateLease,
+    UpdateLeases,
     UpdateNodePowerState,
+    UpdateNodePowerStates,
     UpdateServices,
 )
 from provisioningserver.rpc.testing import (
@@ -235,6 +241,26 @@ class TestRegionProtocol_ReportBootImages(MAASTestCase):
 
         return d.addCallback(check)
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_report_boot_images_caches_boot_images(self):
+        report_boot_images = self.patch(
+            regionservice.rackcontrollers, "report_boot_images"
+        )
+        system_id = factory.make_name("system_id")
+        boot_images = [make_rpc_boot_image()]
+
+        response = yield call_responder(
+            Region(),
+            ReportBootImages,
+            {"uuid": system_id, "images": [], "boot_images": boot_images},
+        )
+
+        self.assertEqual({}, response)
+        self.assertThat(
+            report_boot_images, MockCalledOnceWith(system_id, boot_images)
+        )
+
 
 class TestRegionProtocol_UpdateLease(MAASTransactionServerTestCase):
     def setUp(self):
@@ -277,6 +303,74 @@ class TestRegionProtocol_UpdateLease(MAASTransactionServerTestCase):
         # works as expected.
 
 
+class TestRegionProtocol_UpdateLeases(MAASTransactionServerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_update_leases_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(UpdateLeases.commandName)
+        self.assertIsNotNone(responder)
+
+    def make_update(self):
+        return {
+            "action": "commit",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+            "lease_time": random.randint(30, 1000),
+            "hostname": factory.make_name("host"),
+        }
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_passes_updates_to_update_leases(self):
+        update_leases = self.patch(leases_module, "update_leases")
+        update_leases.return_value = {}
+        updates = [self.make_update(), self.make_update()]
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(),
+                UpdateLeases,
+                {
+                    "cluster_uuid": factory.make_name("uuid"),
+                    "updates": updates,
+                },
+            )
+        finally:
+            yield eventloop.reset()
+
+        self.assertThat(update_leases, MockCalledOnceWith(updates))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_doesnt_raises_other_errors(self):
+        # Cause a random exception
+        self.patch(
+            leases_module, "update_leases"
+        ).side_effect = factory.make_exception()
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(),
+                UpdateLeases,
+                {
+                    "cluster_uuid": factory.make_name("uuid"),
+                    "updates": [self.make_update()],
+                },
+            )
+        finally:
+            yield eventloop.reset()
+
+        # Test is that no exceptions are raised. If this test passes then all
+        # works as expected.
+
+
 class TestRegionProtocol_GetBootConfig(MAASTransactionServerTestCase):
     def test_get_boot_config_is_registered(self):
         protocol = Region()
@@ -655,6 +749,50 @@ class TestRegionProtocol_UpdateNodePowerState(MAASTransactionServerTestCase):
         return d.addErrback(check)
 
 
+class TestRegionProtocol_UpdateNodePowerStates(MAASTransactionServerTestCase):
+    @transactional
+    def create_node(self, power_state):
+        return factory.make_Node(power_state=power_state)
+
+    @transactional
+    def get_node_power_state(self, system_id):
+        return Node.objects.get(system_id=system_id).power_state
+
+    def test_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(UpdateNodePowerStates.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_changes_power_states(self):
+        power_state = factory.pick_enum(POWER_STATE)
+        changed = yield deferToDatabase(self.create_node, power_state)
+        unchanged = yield deferToDatabase(self.create_node, power_state)
+
+        new_state = factory.pick_enum(POWER_STATE, but_not=power_state)
+        response = yield call_responder(
+            Region(),
+            UpdateNodePowerStates,
+            {
+                "changed": [
+                    {"system_id": changed.system_id, "power_state": new_state}
+                ],
+                "unchanged": [unchanged.system_id],
+            },
+        )
+
+        self.assertEqual({}, response)
+        changed_state = yield deferToDatabase(
+            self.get_node_power_state, changed.system_id
+        )
+        self.assertEqual(new_state, changed_state)
+        unchanged_state = yield deferToDatabase(
+            self.get_node_power_state, unchanged.system_id
+        )
+        self.assertEqual(power_state, unchanged_state)
+
+
 class TestRegionProtocol_RegisterEventType(MAASTransactionServerTestCase):
     def test_register_event_type_is_registered(self):
         protocol = Region()
@@ -1496,3 +1634,83 @@ class TestRegionProtocol_GetSyslogConfiguration(MAASTransactionServerTestCase):
             Region(), GetSyslogConfiguration, {"system_id": system_id}
         )
         self.assertThat(response, Equals({"port": port}))
+
+
+class TestRegionProtocol_GetExternalServicesConfiguration(
+    MAASTransactionServerTestCase
+):
+    def test_get_external_services_configuration_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(
+            GetExternalServicesConfiguration.commandName
+        )
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_returns_configuration_and_digest(self):
+        rack = yield deferToDatabase(factory.make_RackController)
+        expected = yield deferToDatabase(
+            externalservices_module.get_external_services_configuration,
+            rack.system_id,
+        )
+        response = yield call_responder(
+            Region(),
+            GetExternalServicesConfiguration,
+            {"system_id": rack.system_id},
+        )
+        self.assertEqual(expected, response)
+        self.assertEqual(
+            {"is_region": False, "is_rack": True},
+            response["configuration"]["controller_type"],
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_omits_configuration_when_digest_matches(self):
+        rack = yield deferToDatabase(factory.make_RackController)
+        first = yield call_responder(
+            Region(),
+            GetExternalServicesConfiguration,
+            {"system_id": rack.system_id},
+        )
+        second = yield call_responder(
+            Region(),
+            GetExternalServicesConfiguration,
+            {"system_id": rack.system_id, "digest": first["digest"]},
+        )
+        self.assertEqual({"digest": first["digest"]}, second)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_answers_from_cached_digest_without_database(self):
+        digests = externalservices_module.external_services_digests
+        digests.enable()
+        self.addCleanup(digests.disable)
+        rack = yield deferToDatabase(factory.make_RackController)
+        first = yield call_responder(
+            Region(),
+            GetExternalServicesConfiguration,
+            {"system_id": rack.system_id},
+        )
+        get_configuration = self.patch(
+            externalservices_module, "get_external_services_configuration"
+        )
+        second = yield call_responder(
+            Region(),
+            GetExternalServicesConfiguration,
+            {"system_id": rack.system_id, "digest": first["digest"]},
+        )
+        self.assertEqual({"digest": first["digest"]}, second)
+        self.assertThat(get_configuration, MockNotCalled())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_raises_NoSuchNode_for_unknown_system_id(self):
+        system_id = factory.make_name("id")
+        d = call_responder(
+            Region(),
+            GetExternalServicesConfiguration,
+            {"system_id": system_id},
+        )
+        yield assert_fails_with(d, NoSuchNode)
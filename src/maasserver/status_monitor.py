@@ -72,9 +72,7 @@ def mark_nodes_failed_after_missing_script_timeout(now, node_timeout):
             ScriptSet.objects.prefetch_related(
                 Prefetch(
                     "scriptresult_set",
-                    ScriptResult.objects.defer(
-                        "output", "stdout", "stderr", "result"
-                    ).prefetch_related(
+                    ScriptResult.objects.prefetch_related(
                         Prefetch(
                             "script",
                             Script.objects.only(
@@ -90,9 +88,7 @@ def mark_nodes_failed_after_missing_script_timeout(now, node_timeout):
             ScriptSet.objects.prefetch_related(
                 Prefetch(
                     "scriptresult_set",
-                    ScriptResult.objects.defer(
-                        "output", "stdout", "stderr", "result"
-                    ).prefetch_related(
+                    ScriptResult.objects.prefetch_related(
                         Prefetch(
                             "script",
                             Script.objects.only(
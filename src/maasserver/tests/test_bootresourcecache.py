@@ -0,0 +1,115 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for `maasserver.bootresourcecache`."""
+
+
+import fcntl
+import hashlib
+import os
+from unittest.mock import MagicMock
+
+from fixtures import EnvironmentVariableFixture
+from testtools.matchers import FileContains, FileExists, Not
+
+from maasserver import bootresourcecache
+from maasserver.bootresourcecache import (
+    CachingIterator,
+    evict,
+    get_cache_dir,
+    get_cached_file,
+)
+from maastesting.factory import factory
+from maastesting.matchers import MockCalledOnceWith
+from maastesting.testcase import MAASTestCase
+
+
+class TestGetCacheDir(MAASTestCase):
+    def test_returns_path_under_maas_data(self):
+        maas_data = self.make_dir()
+        self.useFixture(EnvironmentVariableFixture("MAAS_DATA", maas_data))
+        self.assertEqual(
+            os.path.join(maas_data, "boot-resources"), get_cache_dir()
+        )
+
+
+class TestBootResourceCache(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = self.make_dir()
+        self.patch(
+            bootresourcecache, "get_cache_dir"
+        ).return_value = self.cache_dir
+
+    def make_content(self):
+        chunks = [factory.make_bytes() for _ in range(3)]
+        sha256 = hashlib.sha256(b"".join(chunks)).hexdigest()
+        return chunks, sha256
+
+    def make_iterator(self, chunks, sha256, size=None):
+        if size is None:
+            size = sum(len(chunk) for chunk in chunks)
+        content = MagicMock()
+        content.__iter__.return_value = iter(chunks)
+        return CachingIterator(content, sha256, size)
+
+    def test_get_cached_file_returns_None_when_not_cached(self):
+        self.assertIsNone(get_cached_file(factory.make_name("sha256")))
+
+    def test_get_cached_file_returns_path(self):
+        sha256 = factory.make_name("sha256")
+        path = factory.make_file(self.cache_dir, sha256)
+        self.assertEqual(path, get_cached_file(sha256))
+
+    def test_evict_removes_cached_file(self):
+        sha256 = factory.make_name("sha256")
+        path = factory.make_file(self.cache_dir, sha256)
+        evict(sha256)
+        self.assertThat(path, Not(FileExists()))
+
+    def test_evict_ignores_missing_file(self):
+        evict(factory.make_name("sha256"))
+
+    def test_iterates_content(self):
+        chunks, sha256 = self.make_content()
+        self.assertEqual(chunks, list(self.make_iterator(chunks, sha256)))
+
+    def test_caches_content(self):
+        chunks, sha256 = self.make_content()
+        list(self.make_iterator(chunks, sha256))
+        self.assertThat(
+            os.path.join(self.cache_dir, sha256),
+            FileContains(b"".join(chunks), mode="rb"),
+        )
+        self.assertItemsEqual(
+            [sha256, sha256 + ".lock"], os.listdir(self.cache_dir)
+        )
+
+    def test_does_not_cache_content_with_wrong_sha256(self):
+        chunks, _ = self.make_content()
+        sha256 = hashlib.sha256(b"other").hexdigest()
+        self.assertEqual(chunks, list(self.make_iterator(chunks, sha256)))
+        self.assertIsNone(get_cached_file(sha256))
+
+    def test_does_not_cache_content_with_wrong_size(self):
+        chunks, sha256 = self.make_content()
+        iterator = self.make_iterator(chunks, sha256, size=1)
+        self.assertEqual(chunks, list(iterator))
+        self.assertIsNone(get_cached_file(sha256))
+
+    def test_does_not_cache_when_already_being_cached(self):
+        chunks, sha256 = self.make_content()
+        lock = open(os.path.join(self.cache_dir, sha256 + ".lock"), "wb")
+        self.addCleanup(lock.close)
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self.assertEqual(chunks, list(self.make_iterator(chunks, sha256)))
+        self.assertIsNone(get_cached_file(sha256))
+
+    def test_close_discards_incomplete_file(self):
+        chunks, sha256 = self.make_content()
+        iterator = self.make_iterator(chunks, sha256)
+        next(iterator)
+        iterator.close()
+        self.assertThat(iterator.content.close, MockCalledOnceWith())
+        self.assertIsNone(get_cached_file(sha256))
+        self.assertEqual([sha256 + ".lock"], os.listdir(self.cache_dir))
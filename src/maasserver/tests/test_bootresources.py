@@ -30,13 +30,15 @@ from twisted.application.internet import TimerService
 from twisted.internet.defer import Deferred, fail, inlineCallbacks, succeed
 from twisted.protocols.amp import UnhandledCommand
 
-from maasserver import __version__, bootresources
+from maasserver import __version__, bootresourcecache, bootresources
 from maasserver.bootresources import (
     BootResourceRepoWriter,
     BootResourceStore,
     download_all_boot_resources,
     download_boot_resources,
+    get_file_response,
     get_simplestream_endpoint,
+    parse_byte_range,
     set_global_default_releases,
     SimpleStreamsHandler,
 )
@@ -486,6 +488,84 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         )
         self.assertIsInstance(response, StreamingHttpResponse)
 
+    def test_download_returns_cached_file(self):
+        product, resource = self.make_usable_product_boot_resource()
+        _, _, os, arch, subarch, series = product.split(":")
+        resource_set = resource.get_latest_complete_set()
+        resource_file = resource_set.files.order_by("?")[0]
+        content = factory.make_bytes()
+        cache_dir = bootresourcecache.get_cache_dir()
+        factory.make_file(
+            cache_dir, resource_file.largefile.sha256, contents=content
+        )
+        self.patch(bootresources, "ConnectionWrapper")
+        response = self.get_file_client(
+            os,
+            arch,
+            subarch,
+            series,
+            resource_set.version,
+            resource_file.filename,
+        )
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual(content, b"".join(response.streaming_content))
+        self.assertThat(bootresources.ConnectionWrapper, MockNotCalled())
+
+
+class TestParseByteRange(MAASTestCase):
+    """Tests for `parse_byte_range`."""
+
+    scenarios = (
+        ("no header", {"header": None, "expected": None}),
+        ("other unit", {"header": "items=0-1", "expected": None}),
+        ("multiple ranges", {"header": "bytes=0-1,5-6", "expected": None}),
+        ("malformed", {"header": "bytes=a-b", "expected": None}),
+        ("start and end", {"header": "bytes=10-19", "expected": (10, 19)}),
+        ("start only", {"header": "bytes=10-", "expected": (10, 99)}),
+        ("suffix", {"header": "bytes=-10", "expected": (90, 99)}),
+        ("long suffix", {"header": "bytes=-200", "expected": (0, 99)}),
+        ("end past size", {"header": "bytes=90-200", "expected": (90, 99)}),
+    )
+
+    def test_parses_range(self):
+        self.assertEqual(self.expected, parse_byte_range(self.header, 100))
+
+
+class TestGetFileResponse(MAASTestCase):
+    """Tests for `get_file_response`."""
+
+    def make_request(self, byte_range=None):
+        request = factory.make_fake_request("/")
+        if byte_range is not None:
+            request.META["HTTP_RANGE"] = byte_range
+        return request
+
+    def test_returns_whole_file(self):
+        content = factory.make_bytes(size=100)
+        path = self.make_file(contents=content)
+        response = get_file_response(self.make_request(), path)
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEqual("100", response["Content-Length"])
+        self.assertEqual("bytes", response["Accept-Ranges"])
+        self.assertEqual(content, b"".join(response.streaming_content))
+
+    def test_returns_range(self):
+        content = factory.make_bytes(size=100)
+        path = self.make_file(contents=content)
+        response = get_file_response(self.make_request("bytes=10-19"), path)
+        self.assertEqual(http.client.PARTIAL_CONTENT, response.status_code)
+        self.assertEqual("10", response["Content-Length"])
+        self.assertEqual("bytes 10-19/100", response["Content-Range"])
+        self.assertEqual(content[10:20], b"".join(response.streaming_content))
+
+    def test_returns_416_for_unsatisfiable_range(self):
+        path = self.make_file(contents=factory.make_bytes(size=100))
+        response = get_file_response(self.make_request("bytes=200-"), path)
+        self.assertEqual(
+            http.client.REQUESTED_RANGE_NOT_SATISFIABLE, response.status_code
+        )
+        self.assertEqual("bytes */100", response["Content-Range"])
+
 
 class TestConnectionWrapper(MAASTransactionServerTestCase):
     """Tests the use of StreamingHttpResponse(ConnectionWrapper(stream)).
@@ -559,6 +639,22 @@ class TestConnectionWrapper(MAASTransactionServerTestCase):
         self.read_response(response)
         self.assertThat(mock_get_new_connection, MockCalledOnceWith())
 
+    def test_download_fills_cache(self):
+        content, url = self.make_file_for_client()
+
+        client = MAASSensibleClient()
+        response = client.get(url)
+        self.assertEqual(content, self.read_response(response))
+        response.close()
+
+        # The second download is served from the cache.
+        mock_get_new_connection = self.patch(
+            bootresources.ConnectionWrapper, "_get_new_connection"
+        )
+        response = client.get(url)
+        self.assertEqual(content, self.read_response(response))
+        self.assertThat(mock_get_new_connection, MockNotCalled())
+
     def test_download_connection_is_not_same_as_django_connections(self):
         content, url = self.make_file_for_client()
 
@@ -59,6 +59,8 @@ from provisioningserver.rpc.cluster import (
     ConfigureDHCPv4_V2,
     ConfigureDHCPv6,
     ConfigureDHCPv6_V2,
+    UpdateDHCPv4Hosts,
+    UpdateDHCPv6Hosts,
     ValidateDHCPv4Config,
     ValidateDHCPv4Config_V2,
     ValidateDHCPv6Config,
@@ -2463,6 +2465,89 @@ class TestGetDHCPConfiguration(MAASServerTestCase):
         )
 
 
+class TestGetUnchangedDHCPHosts(MAASServerTestCase):
+    """Tests for `get_unchanged_dhcp_hosts`."""
+
+    def make_config(self, **kwargs):
+        config = dict(
+            failover_peers_v4=[],
+            shared_networks_v4=[{"name": "vlan-1", "subnets": []}],
+            hosts_v4=[],
+            interfaces_v4={"eth0"},
+            failover_peers_v6=[],
+            shared_networks_v6=[],
+            hosts_v6=[],
+            interfaces_v6=set(),
+            omapi_key=factory.make_name("omapi"),
+            global_dhcp_snippets=[],
+        )
+        config.update(kwargs)
+        return dhcp.DHCPConfigurationForRack(**config)
+
+    def test_returns_none_without_previous(self):
+        config = self.make_config()
+        self.assertIsNone(dhcp.get_unchanged_dhcp_hosts(None, config, 4))
+
+    def test_returns_previous_hosts_when_only_hosts_differ(self):
+        hosts = [{"mac": factory.make_mac_address()}]
+        previous = self.make_config(hosts_v4=hosts)
+        config = previous._replace(hosts_v4=[])
+        self.assertEqual(
+            hosts, dhcp.get_unchanged_dhcp_hosts(previous, config, 4)
+        )
+
+    def test_returns_none_when_shared_networks_differ(self):
+        previous = self.make_config()
+        config = previous._replace(
+            shared_networks_v4=[{"name": "vlan-2", "subnets": []}]
+        )
+        self.assertIsNone(dhcp.get_unchanged_dhcp_hosts(previous, config, 4))
+
+    def test_returns_none_when_omapi_key_differs(self):
+        previous = self.make_config()
+        config = previous._replace(omapi_key=factory.make_name("omapi"))
+        self.assertIsNone(dhcp.get_unchanged_dhcp_hosts(previous, config, 4))
+
+    def test_returns_none_when_stopping(self):
+        previous = self.make_config()
+        self.assertIsNone(dhcp.get_unchanged_dhcp_hosts(previous, previous, 6))
+
+
+class TestGetDHCPHostsDelta(MAASServerTestCase):
+    """Tests for `get_dhcp_hosts_delta`."""
+
+    def make_host(self, dhcp_snippets=()):
+        return {
+            "host": factory.make_name("host"),
+            "mac": factory.make_mac_address(),
+            "ip": factory.make_ipv4_address(),
+            "dhcp_snippets": list(dhcp_snippets),
+        }
+
+    def test_returns_removed_added_and_modified_hosts(self):
+        unchanged = self.make_host()
+        removed = self.make_host()
+        added = self.make_host()
+        modified = self.make_host()
+        modified_now = dict(modified, ip=factory.make_ipv4_address())
+        self.assertEqual(
+            ([removed], [added], [modified_now]),
+            dhcp.get_dhcp_hosts_delta(
+                [unchanged, removed, modified],
+                [unchanged, added, modified_now],
+            ),
+        )
+
+    def test_returns_none_when_host_with_snippets_added(self):
+        host = self.make_host(dhcp_snippets=[{"name": "snippet"}])
+        self.assertIsNone(dhcp.get_dhcp_hosts_delta([], [host]))
+
+    def test_returns_none_when_host_snippets_change(self):
+        host = self.make_host()
+        host_now = dict(host, dhcp_snippets=[{"name": "snippet"}])
+        self.assertIsNone(dhcp.get_dhcp_hosts_delta([host], [host_now]))
+
+
 class TestConfigureDHCP(MAASTransactionServerTestCase):
     """Tests for `configure_dhcp`."""
 
@@ -2487,14 +2572,19 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
         ),
     )
 
+    def setUp(self):
+        super().setUp()
+        # Start without any configuration having been pushed.
+        self.patch(dhcp, "_configured_for_rack", {})
+
     @synchronous
-    def prepare_rpc(self, rack_controller):
+    def prepare_rpc(self, rack_controller, *extra_commands):
         """"Set up test case for speaking RPC to `rack_controller`."""
         self.useFixture(RegionEventLoopFixture("rpc"))
         self.useFixture(RunningEventLoopFixture())
         fixture = self.useFixture(MockLiveRegionToClusterRPCFixture())
         cluster = fixture.makeCluster(
-            rack_controller, self.command_v4, self.command_v6
+            rack_controller, self.command_v4, self.command_v6, *extra_commands
         )
         return (
             cluster,
@@ -2569,6 +2659,27 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
         config = dhcp.get_dhcp_configuration(primary_rack)
         return primary_rack, config
 
+    @transactional
+    def add_ipv4_host(self, rack_controller):
+        """Add a host on the IPv4 subnet served by `rack_controller`."""
+        vlan = rack_controller.interface_set.first().vlan
+        [subnet_v4] = [
+            subnet
+            for subnet in vlan.subnet_set.all()
+            if IPNetwork(subnet.cidr).version == 4
+        ]
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL, vlan=vlan)
+        static_ip = factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.AUTO,
+            subnet=subnet_v4,
+            interface=interface,
+        )
+        return {
+            "host": dhcp.make_interface_hostname(interface),
+            "mac": str(interface.mac_address),
+            "ip": str(static_ip.ip),
+        }
+
     @wait_for_reactor
     @inlineCallbacks
     def test_calls_configure_for_both_ipv4_and_ipv6(self):
@@ -2616,6 +2727,95 @@ class TestConfigureDHCP(MAASTransactionServerTestCase):
             ),
         )
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_only_changed_hosts_once_configured(self):
+        if self.process_expected_shared_networks is not None:
+            self.skipTest("Older rack controllers are always configured.")
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc,
+            rack_controller,
+            UpdateDHCPv4Hosts,
+            UpdateDHCPv6Hosts,
+        )
+        ipv4_stub.side_effect = always_succeed_with({})
+        ipv6_stub.side_effect = always_succeed_with({})
+        update_v4_stub = protocol.UpdateDHCPv4Hosts
+        update_v4_stub.side_effect = always_succeed_with({})
+        update_v6_stub = protocol.UpdateDHCPv6Hosts
+        update_v6_stub.side_effect = always_succeed_with({})
+
+        yield dhcp.configure_dhcp(rack_controller)
+        host = yield deferToDatabase(self.add_ipv4_host, rack_controller)
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertThat(ipv4_stub.call_count, Equals(1))
+        self.assertThat(ipv6_stub.call_count, Equals(1))
+        self.assertThat(
+            update_v4_stub,
+            MockCalledOnceWith(
+                ANY,
+                omapi_key=config.omapi_key,
+                remove=[],
+                add=[host],
+                modify=[],
+            ),
+        )
+        self.assertThat(update_v6_stub, MockNotCalled())
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_configures_in_full_when_host_update_fails(self):
+        if self.process_expected_shared_networks is not None:
+            self.skipTest("Older rack controllers are always configured.")
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc,
+            rack_controller,
+            UpdateDHCPv4Hosts,
+            UpdateDHCPv6Hosts,
+        )
+        ipv4_stub.side_effect = always_succeed_with({})
+        ipv6_stub.side_effect = always_succeed_with({})
+        update_v4_stub = protocol.UpdateDHCPv4Hosts
+        update_v4_stub.side_effect = always_fail_with(
+            CannotConfigureDHCP("state unknown")
+        )
+
+        yield dhcp.configure_dhcp(rack_controller)
+        yield deferToDatabase(self.add_ipv4_host, rack_controller)
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertThat(update_v4_stub.call_count, Equals(1))
+        self.assertThat(ipv4_stub.call_count, Equals(2))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_configures_in_full_after_forgetting_configuration(self):
+        self.patch(dhcp.settings, "DHCP_CONNECT", True)
+        rack_controller, config = yield deferToDatabase(
+            self.create_rack_controller
+        )
+        protocol, ipv4_stub, ipv6_stub = yield deferToThread(
+            self.prepare_rpc, rack_controller
+        )
+        ipv4_stub.side_effect = always_succeed_with({})
+        ipv6_stub.side_effect = always_succeed_with({})
+
+        yield dhcp.configure_dhcp(rack_controller)
+        dhcp.forget_dhcp_configuration(rack_controller.id)
+        yield dhcp.configure_dhcp(rack_controller)
+
+        self.assertThat(ipv4_stub.call_count, Equals(2))
+        self.assertThat(ipv6_stub.call_count, Equals(2))
+
     @wait_for_reactor
     @inlineCallbacks
     def test_doesnt_call_configure_for_both_ipv4_and_ipv6(self):
@@ -28,7 +28,14 @@ from maasserver import (
 )
 from maasserver.eventloop import DEFAULT_PORT, MAASServices
 from maasserver.prometheus.stats import PrometheusService
-from maasserver.regiondservices import ntp, service_monitor_service, syslog
+from maasserver.regiondservices import (
+    config_cache,
+    external_services,
+    ntp,
+    rack_connectivity,
+    service_monitor_service,
+    syslog,
+)
 from maasserver.rpc import regionservice
 from maasserver.testing.eventloop import RegionEventLoopFixture
 from maasserver.testing.listener import FakePostgresListenerService
@@ -485,6 +492,70 @@ class TestFactories(MAASServerTestCase):
             eventloop.loop.factories["rack-controller"]["only_on_master"]
         )
 
+    def test_make_RackConnectivityService(self):
+        listener = FakePostgresListenerService()
+        service = eventloop.make_RackConnectivityService(
+            sentinel.rpc, listener
+        )
+        self.assertThat(
+            service, IsInstance(rack_connectivity.RackConnectivityService)
+        )
+        self.assertIs(sentinel.rpc, service.rpc_service)
+        self.assertIs(listener, service.listener)
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_RackConnectivityService,
+            eventloop.loop.factories["rack-connectivity"]["factory"],
+        )
+        # Has a dependency of rpc and postgres-listener.
+        self.assertEqual(
+            ["rpc", "postgres-listener-worker"],
+            eventloop.loop.factories["rack-connectivity"]["requires"],
+        )
+        self.assertFalse(
+            eventloop.loop.factories["rack-connectivity"]["only_on_master"]
+        )
+
+    def test_make_ConfigCacheService(self):
+        service = eventloop.make_ConfigCacheService(
+            FakePostgresListenerService()
+        )
+        self.assertThat(service, IsInstance(config_cache.ConfigCacheService))
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_ConfigCacheService,
+            eventloop.loop.factories["config-cache"]["factory"],
+        )
+        # Has a dependency of postgres-listener.
+        self.assertEqual(
+            ["postgres-listener-worker"],
+            eventloop.loop.factories["config-cache"]["requires"],
+        )
+        self.assertFalse(
+            eventloop.loop.factories["config-cache"]["only_on_master"]
+        )
+
+    def test_make_ExternalServicesService(self):
+        service = eventloop.make_ExternalServicesService(
+            FakePostgresListenerService()
+        )
+        self.assertThat(
+            service, IsInstance(external_services.ExternalServicesService)
+        )
+        # It is registered as a factory in RegionEventLoop.
+        self.assertIs(
+            eventloop.make_ExternalServicesService,
+            eventloop.loop.factories["external-services"]["factory"],
+        )
+        # Has a dependency of postgres-listener.
+        self.assertEqual(
+            ["postgres-listener-worker"],
+            eventloop.loop.factories["external-services"]["requires"],
+        )
+        self.assertFalse(
+            eventloop.loop.factories["external-services"]["only_on_master"]
+        )
+
     def test_make_ServiceMonitorService(self):
         service = eventloop.make_ServiceMonitorService()
         self.assertThat(
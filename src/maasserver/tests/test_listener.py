@@ -524,6 +524,83 @@ class TestPostgresListenerService(MAASServerTestCase):
         listener.doRead()
         self.assertItemsEqual(listener.notifications, set(notifications))
 
+    def test_doRead_keeps_time_of_first_notification(self):
+        listener = PostgresListenerService()
+        notification = FakeNotify(
+            channel=factory.make_name("channel_action"),
+            payload=factory.make_name("payload"),
+        )
+        connection = self.patch(listener, "connection")
+        connection.connection.poll.return_value = None
+        connection.connection.notifies = [notification]
+        self.patch(listener_module.time, "time").return_value = 10.0
+        listener.doRead()
+        connection.connection.notifies = [notification]
+        listener_module.time.time.return_value = 20.0
+        listener.doRead()
+        self.assertEqual({notification: 10.0}, listener.notifications)
+
+    def test_handleNotifies_handles_oldest_first(self):
+        listener = PostgresListenerService()
+        mock_handleNotify = self.patch(listener, "handleNotify")
+        listener.notifications[("node_update", "old")] = 10.0
+        listener.notifications[("node_update", "new")] = 20.0
+        listener.handleNotifies()
+        self.assertThat(
+            mock_handleNotify,
+            MockCallsMatch(
+                call(("node_update", "old"), received=10.0, clock=reactor),
+                call(("node_update", "new"), received=20.0, clock=reactor),
+            ),
+        )
+        self.assertEqual({}, listener.notifications)
+
+    def test_handleNotify_limits_concurrency_per_channel(self):
+        listener = PostgresListenerService()
+        listener.HANDLE_NOTIFY_CONCURRENCY = 2
+        running = []
+
+        def handler(action, payload):
+            d = Deferred()
+            running.append(d)
+            return d
+
+        for _ in range(3):
+            listener.listeners["node"].append(handler)
+        listener.listeners["other"].append(handler)
+        d = listener.handleNotify(("node_update", "payload"))
+        listener.handleNotify(("other_update", "payload"))
+        self.assertThat(running, HasLength(3))
+        running.pop(0).callback(None)
+        self.assertThat(running, HasLength(3))
+        for waiting in running:
+            waiting.callback(None)
+        self.assertTrue(d.called)
+
+    def test_handleNotify_limits_concurrency_across_channels(self):
+        self.patch(PostgresListenerService, "HANDLE_NOTIFY_MAX_CONCURRENCY", 3)
+        listener = PostgresListenerService()
+        running = []
+
+        def handler(action, payload):
+            d = Deferred()
+            running.append(d)
+            return d
+
+        channels = [factory.make_name("channel") for _ in range(5)]
+        for channel in channels:
+            listener.listeners[channel].append(handler)
+        defers = [
+            listener.handleNotify(("%s_update" % channel, "payload"))
+            for channel in channels
+        ]
+        self.assertThat(running, HasLength(3))
+        for _ in channels:
+            self.assertLessEqual(len(running), 3)
+            running.pop(0).callback(None)
+        self.assertEqual([], running)
+        self.assertTrue(all(d.called for d in defers))
+
     @wait_for_reactor
     @inlineCallbacks
     def test_listener_ignores_ENOENT_when_removing_itself_from_reactor(self):
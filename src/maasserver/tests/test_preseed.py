@@ -4,6 +4,7 @@
 """Test `maasserver.preseed` and related bits and bobs."""
 
 
+import builtins
 import http.client
 import json
 import os
@@ -67,6 +68,7 @@ from maasserver.preseed import (
     get_preseed_type_for,
     load_preseed_template,
     PreseedTemplate,
+    PreseedTemplateCache,
     render_enlistment_preseed,
     render_preseed,
     split_subarch,
@@ -290,6 +292,12 @@ class TestConfiguration(MAASServerTestCase):
 class TestGetPreseedTemplate(MAASServerTestCase):
     """Tests for `get_preseed_template`."""
 
+    def setUp(self):
+        super().setUp()
+        self.patch(
+            preseed_module, "preseed_template_cache", PreseedTemplateCache()
+        )
+
     def test_get_preseed_template_returns_None_if_no_template_locations(self):
         # get_preseed_template() returns None when no template locations are
         # defined.
@@ -328,6 +336,56 @@ class TestGetPreseedTemplate(MAASServerTestCase):
             get_preseed_template([template_filename]),
         )
 
+    def test_get_preseed_template_remembers_missing_templates(self):
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [self.make_dir()])
+        filenames = [factory.make_name("template")]
+        get_preseed_template(filenames)
+        mock_open = self.patch(builtins, "open")
+        self.assertEqual((None, None), get_preseed_template(filenames))
+        self.assertThat(mock_open, MockNotCalled())
+
+    def test_get_preseed_template_finds_templates_added_later(self):
+        location = self.make_dir()
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [location])
+        template_filename = factory.make_name("template")
+        get_preseed_template([template_filename])
+        template_content = factory.make_string()
+        template_path = os.path.join(location, template_filename)
+        with open(template_path, "w") as stream:
+            stream.write(template_content)
+        self.assertEqual(
+            (template_path, template_content),
+            get_preseed_template([template_filename]),
+        )
+
+    def test_get_preseed_template_remembers_templates(self):
+        template_content = factory.make_string()
+        template_path = self.make_file(contents=template_content)
+        template_filename = os.path.basename(template_path)
+        locations = [os.path.dirname(template_path)]
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", locations)
+        get_preseed_template([template_filename])
+        mock_open = self.patch(builtins, "open")
+        self.assertEqual(
+            (template_path, template_content),
+            get_preseed_template([template_filename]),
+        )
+        self.assertThat(mock_open, MockNotCalled())
+
+    def test_get_preseed_template_rereads_changed_templates(self):
+        template_path = self.make_file(contents=factory.make_string())
+        template_filename = os.path.basename(template_path)
+        locations = [os.path.dirname(template_path)]
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", locations)
+        get_preseed_template([template_filename])
+        template_content = factory.make_string(size=100)
+        with open(template_path, "w") as stream:
+            stream.write(template_content)
+        self.assertEqual(
+            (template_path, template_content),
+            get_preseed_template([template_filename]),
+        )
+
 
 class TestLoadPreseedTemplate(MAASServerTestCase):
     """Tests for `load_preseed_template`."""
@@ -336,6 +394,9 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         super().setUp()
         self.location = self.make_dir()
         self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [self.location])
+        self.patch(
+            preseed_module, "preseed_template_cache", PreseedTemplateCache()
+        )
 
     def create_template(self, location, name, content=None):
         # Create a tempita template in the given `self.location` with the
@@ -440,6 +501,39 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         template = load_preseed_template(node, prefix)
         self.assertRaises(TemplateNotFoundError, template.substitute)
 
+    def test_load_preseed_template_parses_templates_once(self):
+        name = factory.make_string()
+        self.create_template(self.location, name)
+        node = factory.make_Node()
+        template = load_preseed_template(node, name)
+        other_template = load_preseed_template(node, name)
+        self.assertIsNot(template, other_template)
+        self.assertIs(template._parsed, other_template._parsed)
+
+    def test_load_preseed_template_includes_for_each_node(self):
+        # Parsed templates are shared between nodes, but what they include
+        # is looked up for the node being rendered.
+        prefix = factory.make_string()
+        master_template_name = factory.make_string()
+        preseed_content = '{{inherit "%s"}}' % master_template_name
+        self.create_template(self.location, prefix, preseed_content)
+        node = factory.make_Node(hostname=factory.make_string())
+        other_node = factory.make_Node(hostname=factory.make_string())
+        master_content = self.create_template(
+            self.location, master_template_name
+        )
+        # The most specific template for the other node.
+        [other_master_template_name, *_] = get_preseed_filenames(
+            other_node, master_template_name
+        )
+        other_master_content = self.create_template(
+            self.location, other_master_template_name
+        )
+        template = load_preseed_template(node, prefix)
+        other_template = load_preseed_template(other_node, prefix)
+        self.assertEqual(master_content, template.substitute())
+        self.assertEqual(other_master_content, other_template.substitute())
+
 
 class TestPreseedContext(MAASServerTestCase):
     """Tests for `get_preseed_context`."""
@@ -4,16 +4,23 @@
 """Tests for `maasserver.routablepairs`."""
 
 
+from contextlib import closing
 from itertools import product, takewhile
 import random
 
+from django.db import connection
 from testtools import ExpectedException
 from testtools.matchers import AfterPreprocessing, Equals
 
+from maasserver.enum import NODE_TYPE
 from maasserver.models.node import Node
 from maasserver.routablepairs import find_addresses_between_nodes
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maasserver.triggers.system import (
+    ROUTABLE_PAIRS_REBUILD,
+    ROUTABLE_PAIRS_SELECT,
+)
 
 
 class TestFindAddressesBetweenNodes(MAASServerTestCase):
@@ -288,3 +295,116 @@ class TestFindAddressesBetweenNodes(MAASServerTestCase):
             find_addresses_between_nodes({origin}, {node_no_match})
         )
         self.assertEqual([], no_matches)
+
+
+class TestRoutablePairTable(MAASServerTestCase):
+    """Tests for the `maasserver_routablepair` table and its triggers."""
+
+    def make_node_with_address(self, space, network, node_type=None):
+        if node_type is None:
+            node_type = NODE_TYPE.RACK_CONTROLLER
+        node = factory.make_Node(node_type=node_type)
+        iface = factory.make_Interface(node=node)
+        subnet = factory.make_Subnet(space=space, cidr=network)
+        sip = factory.make_StaticIPAddress(interface=iface, subnet=subnet)
+        return node, iface, sip
+
+    def make_pair(self, left_type=NODE_TYPE.MACHINE):
+        space = factory.make_Space()
+        network1 = factory.make_ip4_or_6_network()
+        network2 = factory.make_ip4_or_6_network(version=network1.version)
+        left = self.make_node_with_address(space, network1, left_type)
+        right = self.make_node_with_address(space, network2)
+        return left, right
+
+    def fetch(self, sql):
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(sql)
+            return {
+                (left_id, str(left_ip), right_id, str(right_ip), metric)
+                for left_id, left_ip, right_id, right_ip, metric in cursor
+            }
+
+    def get_table_rows(self):
+        return self.fetch(
+            "SELECT left_node_id, left_ip, right_node_id, right_ip, metric "
+            "FROM maasserver_routablepair"
+        )
+
+    def get_view_rows(self):
+        return self.fetch(ROUTABLE_PAIRS_SELECT)
+
+    def clear_table(self):
+        with closing(connection.cursor()) as cursor:
+            cursor.execute("DELETE FROM maasserver_routablepair")
+
+    def test_used_when_all_right_nodes_are_controllers(self):
+        (machine, _, _), (rack, _, _) = self.make_pair()
+        self.clear_table()
+        self.assertEqual(
+            [], list(find_addresses_between_nodes([machine], [rack]))
+        )
+        # The view is still used when a right node isn't a controller.
+        self.assertNotEqual(
+            [], list(find_addresses_between_nodes([rack], [machine]))
+        )
+
+    def test_linking_address_adds_pairs(self):
+        (machine, _, machine_sip), (rack, _, rack_sip) = self.make_pair()
+        self.assertIn(
+            (
+                machine.id,
+                str(machine_sip.ip),
+                rack.id,
+                str(rack_sip.ip),
+                3,
+            ),
+            self.get_table_rows(),
+        )
+        self.assertEqual(self.get_view_rows(), self.get_table_rows())
+
+    def test_unlinking_address_removes_pairs(self):
+        (machine, iface, sip), (rack, _, _) = self.make_pair()
+        iface.ip_addresses.remove(sip)
+        self.assertEqual(
+            [], list(find_addresses_between_nodes([machine], [rack]))
+        )
+        self.assertEqual(self.get_view_rows(), self.get_table_rows())
+
+    def test_disabling_interface_removes_pairs(self):
+        (machine, _, _), (rack, iface, _) = self.make_pair()
+        iface.enabled = False
+        iface.save()
+        self.assertEqual(
+            [], list(find_addresses_between_nodes([machine], [rack]))
+        )
+        self.assertEqual(self.get_view_rows(), self.get_table_rows())
+
+    def test_moving_vlan_to_another_space_removes_pairs(self):
+        (machine, _, sip), (rack, _, _) = self.make_pair()
+        vlan = sip.subnet.vlan
+        vlan.space = factory.make_Space()
+        vlan.save()
+        self.assertEqual(
+            [], list(find_addresses_between_nodes([machine], [rack]))
+        )
+        self.assertEqual(self.get_view_rows(), self.get_table_rows())
+
+    def test_node_becoming_controller_adds_pairs(self):
+        (machine, _, _), (rack, _, _) = self.make_pair()
+        machine.node_type = NODE_TYPE.REGION_CONTROLLER
+        machine.save()
+        self.assertNotEqual(
+            [], list(find_addresses_between_nodes([rack], [machine]))
+        )
+        self.assertEqual(self.get_view_rows(), self.get_table_rows())
+
+    def test_rebuild_matches_view(self):
+        self.make_pair()
+        self.make_pair(left_type=NODE_TYPE.REGION_AND_RACK_CONTROLLER)
+        self.clear_table()
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(ROUTABLE_PAIRS_REBUILD)
+        rows = self.get_table_rows()
+        self.assertNotEqual(set(), rows)
+        self.assertEqual(self.get_view_rows(), rows)
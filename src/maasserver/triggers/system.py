@@ -10,8 +10,13 @@ for.
 """
 
 
+from contextlib import closing
 from textwrap import dedent
 
+from django.db import connection
+
+from maasserver.dbviews import maasserver_routable_pairs
+from maasserver.enum import NODE_TYPE
 from maasserver.models.dnspublication import zone_serial
 from maasserver.triggers import register_procedure, register_trigger
 from maasserver.utils.orm import transactional
@@ -1919,6 +1924,298 @@ RBAC_CONFIG_UPDATE = dedent(
 )
 
 
+# Node types of the controllers, for use in SQL.
+CONTROLLER_NODE_TYPES = ", ".join(
+    str(node_type)
+    for node_type in (
+        NODE_TYPE.RACK_CONTROLLER,
+        NODE_TYPE.REGION_CONTROLLER,
+        NODE_TYPE.REGION_AND_RACK_CONTROLLER,
+    )
+)
+
+
+# Routable pairs to controllers, for the maasserver_routablepair table. These
+# are the rows of the maasserver_routable_pairs view that are looked up, i.e.
+# with a controller on the right and a metric below 4, but the view can't be
+# used here since views are dropped while the triggers are installed.
+ROUTABLE_PAIRS_SELECT = dedent(
+    """\
+    SELECT pairs.left_node_id, pairs.left_ip,
+           pairs.right_node_id, pairs.right_ip, pairs.metric
+      FROM ({pairs_sql}) AS pairs
+      JOIN maasserver_node AS right_node
+        ON right_node.id = pairs.right_node_id
+     WHERE right_node.node_type IN ({controller_types})
+       AND pairs.metric < 4
+       AND pairs.left_node_id IS NOT NULL
+    """
+).format(
+    pairs_sql=maasserver_routable_pairs,
+    controller_types=CONTROLLER_NODE_TYPES,
+)
+
+
+# Rebuilds the maasserver_routablepair table from scratch.
+ROUTABLE_PAIRS_REBUILD = dedent(
+    """\
+    DELETE FROM maasserver_routablepair;
+    INSERT INTO maasserver_routablepair
+      (left_node_id, left_ip, right_node_id, right_ip, metric)
+    {select};
+    """
+).format(select=ROUTABLE_PAIRS_SELECT)
+
+
+# Helper that refreshes the routable pairs from or to the given nodes. The
+# pairs between controllers are used to configure the controllers' external
+# services, so `sys_routable_pairs` is notified when a controller is refreshed.
+ROUTABLE_PAIRS_REFRESH = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_refresh(node_ids integer[])
+    RETURNS void as $$
+    BEGIN
+      node_ids := array_remove(node_ids, NULL);
+      IF cardinality(node_ids) = 0 THEN
+        RETURN;
+      END IF;
+      IF EXISTS (
+          SELECT 1 FROM maasserver_node
+          WHERE id = ANY(node_ids)
+          AND node_type IN ({controller_types})) THEN
+        PERFORM pg_notify('sys_routable_pairs', '');
+      END IF;
+      DELETE FROM maasserver_routablepair
+      WHERE left_node_id = ANY(node_ids) OR right_node_id = ANY(node_ids);
+      INSERT INTO maasserver_routablepair
+        (left_node_id, left_ip, right_node_id, right_ip, metric)
+      {select}
+         AND pairs.left_node_id = ANY(node_ids);
+      INSERT INTO maasserver_routablepair
+        (left_node_id, left_ip, right_node_id, right_ip, metric)
+      {select}
+         AND pairs.right_node_id = ANY(node_ids)
+         AND pairs.left_node_id != ALL(node_ids);
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+).format(select=ROUTABLE_PAIRS_SELECT, controller_types=CONTROLLER_NODE_TYPES)
+
+
+# Triggered when an interface is linked to an IP address. Refreshes the
+# routable pairs of the interface's node.
+ROUTABLE_PAIRS_NIC_IP_LINK = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_nic_ip_link()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY(
+        SELECT maasserver_interface.node_id
+        FROM maasserver_interface
+        WHERE maasserver_interface.id = NEW.interface_id));
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when an interface is unlinked from an IP address. Refreshes the
+# routable pairs of the interface's node.
+ROUTABLE_PAIRS_NIC_IP_UNLINK = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_nic_ip_unlink()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY(
+        SELECT maasserver_interface.node_id
+        FROM maasserver_interface
+        WHERE maasserver_interface.id = OLD.interface_id));
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when an interface is enabled, disabled or moved to another node.
+# Refreshes the routable pairs of the old and new nodes.
+ROUTABLE_PAIRS_INTERFACE_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_interface_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY[OLD.node_id, NEW.node_id]);
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when an interface is deleted. Refreshes the routable pairs of its
+# node.
+ROUTABLE_PAIRS_INTERFACE_DELETE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_interface_delete()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY[OLD.node_id]);
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when the IP or subnet of an IP address changes. Refreshes the
+# routable pairs of the nodes with the IP address.
+ROUTABLE_PAIRS_STATICIPADDRESS_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_staticipaddress_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY(
+        SELECT DISTINCT maasserver_interface.node_id
+        FROM
+          maasserver_interface,
+          maasserver_interface_ip_addresses AS ip_link
+        WHERE ip_link.interface_id = maasserver_interface.id
+        AND ip_link.staticipaddress_id = NEW.id));
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when a subnet moves to another VLAN. Refreshes the routable pairs
+# of the nodes with IP addresses in the subnet.
+ROUTABLE_PAIRS_SUBNET_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_subnet_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY(
+        SELECT DISTINCT maasserver_interface.node_id
+        FROM
+          maasserver_interface,
+          maasserver_interface_ip_addresses AS ip_link,
+          maasserver_staticipaddress
+        WHERE ip_link.interface_id = maasserver_interface.id
+        AND ip_link.staticipaddress_id = maasserver_staticipaddress.id
+        AND maasserver_staticipaddress.subnet_id = NEW.id));
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when a VLAN moves to another space. Refreshes the routable pairs
+# of the nodes with IP addresses in the VLAN.
+ROUTABLE_PAIRS_VLAN_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_vlan_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY(
+        SELECT DISTINCT maasserver_interface.node_id
+        FROM
+          maasserver_interface,
+          maasserver_interface_ip_addresses AS ip_link,
+          maasserver_staticipaddress,
+          maasserver_subnet
+        WHERE ip_link.interface_id = maasserver_interface.id
+        AND ip_link.staticipaddress_id = maasserver_staticipaddress.id
+        AND maasserver_staticipaddress.subnet_id = maasserver_subnet.id
+        AND maasserver_subnet.vlan_id = NEW.id));
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Triggered when the type of a node changes, as it may have become or stopped
+# being a controller. Refreshes the routable pairs of the node, and notifies
+# `sys_routable_pairs` even if it's no longer a controller.
+ROUTABLE_PAIRS_NODE_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_routable_pairs_node_update()
+    RETURNS trigger as $$
+    BEGIN
+      PERFORM sys_routable_pairs_refresh(ARRAY[NEW.id]);
+      PERFORM pg_notify('sys_routable_pairs', '');
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+
+# Node types of the rack controllers, for use in SQL.
+RACK_CONTROLLER_NODE_TYPES = ", ".join(
+    str(node_type)
+    for node_type in (
+        NODE_TYPE.RACK_CONTROLLER,
+        NODE_TYPE.REGION_AND_RACK_CONTROLLER,
+    )
+)
+
+
+# Notify that the set of rack controllers changed when a rack controller is
+# created.
+RACK_CONTROLLERS_NODE_INSERT = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_rack_controllers_node_insert()
+    RETURNS trigger as $$
+    BEGIN
+      IF NEW.node_type IN ({rack_types}) THEN
+        PERFORM pg_notify('sys_rack_controllers', '');
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+).format(rack_types=RACK_CONTROLLER_NODE_TYPES)
+
+
+# Notify that the set of rack controllers changed when a node becomes or stops
+# being a rack controller.
+RACK_CONTROLLERS_NODE_UPDATE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_rack_controllers_node_update()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.node_type IN ({rack_types})
+          OR NEW.node_type IN ({rack_types}) THEN
+        PERFORM pg_notify('sys_rack_controllers', '');
+      END IF;
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+).format(rack_types=RACK_CONTROLLER_NODE_TYPES)
+
+
+# Notify that the set of rack controllers changed when a rack controller is
+# deleted.
+RACK_CONTROLLERS_NODE_DELETE = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION sys_rack_controllers_node_delete()
+    RETURNS trigger as $$
+    BEGIN
+      IF OLD.node_type IN ({rack_types}) THEN
+        PERFORM pg_notify('sys_rack_controllers', '');
+      END IF;
+      RETURN OLD;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+).format(rack_types=RACK_CONTROLLER_NODE_TYPES)
+
+
 def render_sys_proxy_procedure(proc_name, on_delete=False):
     """Render a database procedure with name `proc_name` that notifies that a
     proxy update is needed.
@@ -2187,3 +2484,91 @@ def register_system_triggers():
     register_trigger("maasserver_config", "sys_rbac_config_insert", "insert")
     register_procedure(RBAC_CONFIG_UPDATE)
     register_trigger("maasserver_config", "sys_rbac_config_update", "update")
+
+    # Routable pairs
+    register_procedure(ROUTABLE_PAIRS_REFRESH)
+
+    # - Interface IP addresses
+    register_procedure(ROUTABLE_PAIRS_NIC_IP_LINK)
+    register_trigger(
+        "maasserver_interface_ip_addresses",
+        "sys_routable_pairs_nic_ip_link",
+        "insert",
+    )
+    register_procedure(ROUTABLE_PAIRS_NIC_IP_UNLINK)
+    register_trigger(
+        "maasserver_interface_ip_addresses",
+        "sys_routable_pairs_nic_ip_unlink",
+        "delete",
+    )
+
+    # - Interface
+    register_procedure(ROUTABLE_PAIRS_INTERFACE_UPDATE)
+    register_trigger(
+        "maasserver_interface",
+        "sys_routable_pairs_interface_update",
+        "update",
+        fields=["node_id", "enabled"],
+    )
+    register_procedure(ROUTABLE_PAIRS_INTERFACE_DELETE)
+    register_trigger(
+        "maasserver_interface", "sys_routable_pairs_interface_delete", "delete"
+    )
+
+    # - StaticIPAddress
+    register_procedure(ROUTABLE_PAIRS_STATICIPADDRESS_UPDATE)
+    register_trigger(
+        "maasserver_staticipaddress",
+        "sys_routable_pairs_staticipaddress_update",
+        "update",
+        fields=["ip", "subnet_id"],
+    )
+
+    # - Subnet
+    register_procedure(ROUTABLE_PAIRS_SUBNET_UPDATE)
+    register_trigger(
+        "maasserver_subnet",
+        "sys_routable_pairs_subnet_update",
+        "update",
+        fields=["vlan_id"],
+    )
+
+    # - VLAN
+    register_procedure(ROUTABLE_PAIRS_VLAN_UPDATE)
+    register_trigger(
+        "maasserver_vlan",
+        "sys_routable_pairs_vlan_update",
+        "update",
+        fields=["space_id"],
+    )
+
+    # - Node
+    register_procedure(ROUTABLE_PAIRS_NODE_UPDATE)
+    register_trigger(
+        "maasserver_node",
+        "sys_routable_pairs_node_update",
+        "update",
+        fields=["node_type"],
+    )
+
+    # Rack controllers
+    register_procedure(RACK_CONTROLLERS_NODE_INSERT)
+    register_trigger(
+        "maasserver_node", "sys_rack_controllers_node_insert", "insert"
+    )
+    register_procedure(RACK_CONTROLLERS_NODE_UPDATE)
+    register_trigger(
+        "maasserver_node",
+        "sys_rack_controllers_node_update",
+        "update",
+        fields=["node_type"],
+    )
+    register_procedure(RACK_CONTROLLERS_NODE_DELETE)
+    register_trigger(
+        "maasserver_node", "sys_rack_controllers_node_delete", "delete"
+    )
+
+    # The triggers are dropped during upgrades, so the routable pairs can be
+    # out of date. Rebuild them now that the triggers maintain them again.
+    with closing(connection.cursor()) as cursor:
+        cursor.execute(ROUTABLE_PAIRS_REBUILD)
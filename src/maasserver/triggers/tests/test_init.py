@@ -160,6 +160,9 @@ class TestTriggersUsed(MAASServerTestCase):
         "filesystemgroup_nd_filesystemgroup_unlink_notify",
         "filesystemgroup_nd_filesystemgroup_update_notify",
         "interface_interface_pod_notify",
+        "interface_interface_pod_resources_delete_notify",
+        "interface_interface_pod_resources_insert_notify",
+        "interface_interface_pod_resources_update_notify",
         "interface_ip_addresses_nd_sipaddress_dns_link_notify",
         "interface_ip_addresses_nd_sipaddress_dns_unlink_notify",
         "interface_ip_addresses_nd_sipaddress_link_notify",
@@ -218,6 +221,12 @@ class TestTriggersUsed(MAASServerTestCase):
         "notification_notification_delete_notify",
         "notification_notification_update_notify",
         "notificationdismissal_notificationdismissal_create_notify",
+        "numanode_numanode_pod_delete_notify",
+        "numanode_numanode_pod_insert_notify",
+        "numanode_numanode_pod_update_notify",
+        "numanodehugepages_numanodehugepages_pod_delete_notify",
+        "numanodehugepages_numanodehugepages_pod_insert_notify",
+        "numanodehugepages_numanodehugepages_pod_update_notify",
         "packagerepository_packagerepository_create_notify",
         "packagerepository_packagerepository_delete_notify",
         "packagerepository_packagerepository_update_notify",
@@ -228,6 +237,9 @@ class TestTriggersUsed(MAASServerTestCase):
         "partitiontable_nd_partitiontable_unlink_notify",
         "partitiontable_nd_partitiontable_update_notify",
         "physicalblockdevice_nd_physblockdevice_update_notify",
+        "podhints_nodes_podhints_nodes_pod_delete_notify",
+        "podhints_nodes_podhints_nodes_pod_insert_notify",
+        "podhints_nodes_podhints_nodes_pod_update_notify",
         "resourcepool_resourcepool_create_notify",
         "resourcepool_resourcepool_delete_notify",
         "resourcepool_resourcepool_update_notify",
@@ -275,6 +287,12 @@ class TestTriggersUsed(MAASServerTestCase):
         "tag_tag_update_machine_device_notify",
         "tag_tag_update_notify",
         "virtualblockdevice_nd_virtblockdevice_update_notify",
+        "virtualmachine_virtualmachine_pod_delete_notify",
+        "virtualmachine_virtualmachine_pod_insert_notify",
+        "virtualmachine_virtualmachine_pod_update_notify",
+        "virtualmachineinterface_virtualmachineinterface_pod_delete_notify",
+        "virtualmachineinterface_virtualmachineinterface_pod_insert_notify",
+        "virtualmachineinterface_virtualmachineinterface_pod_update_notify",
         "vlan_vlan_create_notify",
         "vlan_vlan_delete_notify",
         "vlan_vlan_machine_update_notify",
@@ -65,6 +65,17 @@ class TestTriggers(MAASServerTestCase):
             "resourcepool_sys_rbac_rpool_delete",
             "config_sys_rbac_config_insert",
             "config_sys_rbac_config_update",
+            "interface_ip_addresses_sys_routable_pairs_nic_ip_link",
+            "interface_ip_addresses_sys_routable_pairs_nic_ip_unlink",
+            "interface_sys_routable_pairs_interface_update",
+            "interface_sys_routable_pairs_interface_delete",
+            "staticipaddress_sys_routable_pairs_staticipaddress_update",
+            "subnet_sys_routable_pairs_subnet_update",
+            "vlan_sys_routable_pairs_vlan_update",
+            "node_sys_routable_pairs_node_update",
+            "node_sys_rack_controllers_node_insert",
+            "node_sys_rack_controllers_node_update",
+            "node_sys_rack_controllers_node_delete",
         ]
         sql, args = psql_array(triggers, sql_type="text")
         with closing(connection.cursor()) as cursor:
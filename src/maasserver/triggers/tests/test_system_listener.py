@@ -24,6 +24,7 @@ from maasserver.enum import (
     INTERFACE_TYPE,
     IPADDRESS_TYPE,
     IPRANGE_TYPE,
+    NODE_TYPE,
     RDNS_MODE,
 )
 from maasserver.models.config import Config
@@ -5309,6 +5310,160 @@ class TestProxyListener(
             yield listener.stopService()
 
 
+class TestRoutablePairsListener(
+    MAASTransactionServerTestCase, TransactionalHelpersMixin
+):
+    """End-to-end test for the routable pairs triggers code."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_node_type_update(self):
+        yield deferToDatabase(register_system_triggers)
+        node = yield deferToDatabase(self.create_node)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_routable_pairs", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.update_node,
+                node.system_id,
+                {"node_type": NODE_TYPE.RACK_CONTROLLER},
+            )
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_controller_interface_update(self):
+        yield deferToDatabase(register_system_triggers)
+        rack = yield deferToDatabase(self.create_rack_controller)
+        interface = yield deferToDatabase(
+            self.create_interface, {"node": rack}
+        )
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_routable_pairs", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.update_interface, interface.id, {"enabled": False}
+            )
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_doesnt_send_message_for_machine_interface_update(self):
+        yield deferToDatabase(register_system_triggers)
+        node = yield deferToDatabase(self.create_node)
+        interface = yield deferToDatabase(
+            self.create_interface, {"node": node}
+        )
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_routable_pairs", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.update_interface, interface.id, {"enabled": False}
+            )
+            with ExpectedException(CancelledError):
+                yield dv.get(timeout=1)
+        finally:
+            yield listener.stopService()
+
+
+class TestRackControllersListener(
+    MAASTransactionServerTestCase, TransactionalHelpersMixin
+):
+    """End-to-end test for the rack controllers triggers code."""
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_rack_controller_insert(self):
+        yield deferToDatabase(register_system_triggers)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_rack_controllers", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(self.create_rack_controller)
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_rack_controller_delete(self):
+        yield deferToDatabase(register_system_triggers)
+        rack = yield deferToDatabase(self.create_rack_controller)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_rack_controllers", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(self.delete_rack_controller, rack.id)
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_node_type_update_to_rack(self):
+        yield deferToDatabase(register_system_triggers)
+        node = yield deferToDatabase(self.create_node)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_rack_controllers", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.update_node,
+                node.system_id,
+                {"node_type": NODE_TYPE.RACK_CONTROLLER},
+            )
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_sends_message_for_node_type_update_from_rack(self):
+        yield deferToDatabase(register_system_triggers)
+        rack = yield deferToDatabase(self.create_rack_controller)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_rack_controllers", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(
+                self.update_node,
+                rack.system_id,
+                {"node_type": NODE_TYPE.MACHINE},
+            )
+            yield dv.get(timeout=2)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_doesnt_send_message_for_machine_insert(self):
+        yield deferToDatabase(register_system_triggers)
+        dv = DeferredValue()
+        listener = self.make_listener_without_delay()
+        listener.register("sys_rack_controllers", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(self.create_node)
+            with ExpectedException(CancelledError):
+                yield dv.get(timeout=1)
+        finally:
+            yield listener.stopService()
+
+
 class TestRBACResourcePoolListener(
     MAASTransactionServerTestCase, TransactionalHelpersMixin, RBACHelpersMixin
 ):
@@ -29,12 +29,17 @@ from maasserver.enum import (
     NODE_TYPE_CHOICES,
 )
 from maasserver.listener import PostgresListenerService
-from maasserver.models import ControllerInfo
+from maasserver.models import ControllerInfo, Interface
 from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
 from maasserver.models.config import Config
 from maasserver.models.node import Node
+from maasserver.models.numa import NUMANode
 from maasserver.models.partition import MIN_PARTITION_SIZE
 from maasserver.models.switch import Switch
+from maasserver.models.virtualmachine import (
+    VirtualMachine,
+    VirtualMachineInterface,
+)
 from maasserver.testing import get_data
 from maasserver.testing.factory import factory
 from maasserver.testing.fixtures import UserSkipCreateAuthorisationTokenFixture
@@ -48,6 +53,7 @@ from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from metadataserver.builtin_scripts import load_builtin_scripts
 from metadataserver.enum import SCRIPT_STATUS
+from provisioningserver.drivers.pod import InterfaceAttachType
 from provisioningserver.utils.twisted import (
     asynchronous,
     DeferredValue,
@@ -4733,6 +4739,192 @@ class TestNodePodListener(
             yield listener.stopService()
 
 
+class TestPodResourcesListener(
+    MAASTransactionServerTestCase, TransactionalHelpersMixin
+):
+    """End-to-end test of both the listeners code and the triggers on the
+    tables used to calculate the resources of VM hosts."""
+
+    @transactional
+    def create_pod_with_numa_node(self):
+        host = factory.make_Node()
+        pod = factory.make_Pod(pod_type="lxd", host=host)
+        return pod, factory.make_NUMANode(node=host)
+
+    @transactional
+    def create_vm(self, pod):
+        return factory.make_VirtualMachine(bmc=pod, memory=1024)
+
+    @transactional
+    def update_vm(self, vm_id, params):
+        VirtualMachine.objects.filter(id=vm_id).update(**params)
+
+    @transactional
+    def create_vm_interface(self, vm):
+        return VirtualMachineInterface.objects.create(
+            vm=vm, attachment_type=InterfaceAttachType.BRIDGE
+        )
+
+    @transactional
+    def update_numa_node(self, numa_node_id, params):
+        NUMANode.objects.filter(id=numa_node_id).update(**params)
+
+    @transactional
+    def create_numa_node(self, node_id):
+        return factory.make_NUMANode(node=Node.objects.get(id=node_id))
+
+    @transactional
+    def create_hugepages(self, numa_node):
+        return factory.make_NUMANodeHugepages(numa_node=numa_node)
+
+    @transactional
+    def create_host_interface(self, numa_node):
+        return factory.make_Interface(node=numa_node.node, numa_node=numa_node)
+
+    @transactional
+    def update_host_interface(self, interface_id, params):
+        Interface.objects.filter(id=interface_id).update(**params)
+
+    @transactional
+    def create_pod_without_host(self):
+        return factory.make_Pod(pod_type="lxd")
+
+    @transactional
+    def add_pod_hint_node(self, pod):
+        pod.hints.nodes.add(factory.make_Node())
+
+    @transactional
+    def clear_pod_hint_nodes(self, pod):
+        pod.hints.nodes.clear()
+
+    @inlineCallbacks
+    def assertNotifiesPodUpdate(self, pod, func, *args):
+        listener = self.make_listener_without_delay()
+        dv = DeferredValue()
+        listener.register("pod", lambda *args: dv.set(args))
+        yield listener.startService()
+        try:
+            yield deferToDatabase(func, *args)
+            yield dv.get(timeout=2)
+            self.assertEqual(("update", "%s" % pod.id), dv.value)
+        finally:
+            yield listener.stopService()
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_vm_create_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, _ = yield deferToDatabase(self.create_pod_with_numa_node)
+        yield self.assertNotifiesPodUpdate(pod, self.create_vm, pod)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_vm_update_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, _ = yield deferToDatabase(self.create_pod_with_numa_node)
+        vm = yield deferToDatabase(self.create_vm, pod)
+        yield self.assertNotifiesPodUpdate(
+            pod, self.update_vm, vm.id, {"memory": 2048}
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_vm_interface_create_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, _ = yield deferToDatabase(self.create_pod_with_numa_node)
+        vm = yield deferToDatabase(self.create_vm, pod)
+        yield self.assertNotifiesPodUpdate(pod, self.create_vm_interface, vm)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_numa_node_update_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, numa_node = yield deferToDatabase(self.create_pod_with_numa_node)
+        yield self.assertNotifiesPodUpdate(
+            pod, self.update_numa_node, numa_node.id, {"memory": 4096}
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_hugepages_create_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, numa_node = yield deferToDatabase(self.create_pod_with_numa_node)
+        yield self.assertNotifiesPodUpdate(
+            pod, self.create_hugepages, numa_node
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_numa_node_create_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, numa_node = yield deferToDatabase(self.create_pod_with_numa_node)
+        yield self.assertNotifiesPodUpdate(
+            pod, self.create_numa_node, numa_node.node_id
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_host_interface_name_update_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, numa_node = yield deferToDatabase(self.create_pod_with_numa_node)
+        interface = yield deferToDatabase(
+            self.create_host_interface, numa_node
+        )
+        yield self.assertNotifiesPodUpdate(
+            pod,
+            self.update_host_interface,
+            interface.id,
+            {"name": factory.make_name("eth")},
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_host_interface_sriov_update_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, numa_node = yield deferToDatabase(self.create_pod_with_numa_node)
+        interface = yield deferToDatabase(
+            self.create_host_interface, numa_node
+        )
+        yield self.assertNotifiesPodUpdate(
+            pod,
+            self.update_host_interface,
+            interface.id,
+            {"sriov_max_vf": interface.sriov_max_vf + 8},
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_host_interface_numa_update_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, numa_node = yield deferToDatabase(self.create_pod_with_numa_node)
+        interface = yield deferToDatabase(
+            self.create_host_interface, numa_node
+        )
+        other_numa_node = yield deferToDatabase(
+            self.create_numa_node, numa_node.node_id
+        )
+        yield self.assertNotifiesPodUpdate(
+            pod,
+            self.update_host_interface,
+            interface.id,
+            {"numa_node_id": other_numa_node.id},
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_pod_hints_nodes_add_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod = yield deferToDatabase(self.create_pod_without_host)
+        yield self.assertNotifiesPodUpdate(pod, self.add_pod_hint_node, pod)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_calls_handler_on_pod_hints_nodes_remove_notification(self):
+        yield deferToDatabase(register_websocket_triggers)
+        pod, _ = yield deferToDatabase(self.create_pod_with_numa_node)
+        yield self.assertNotifiesPodUpdate(pod, self.clear_pod_hint_nodes, pod)
+
+
 class TestNodeTypeChange(
     MAASTransactionServerTestCase, TransactionalHelpersMixin
 ):
@@ -271,6 +271,49 @@ INTERFACE_POD_NOTIFY = dedent(
     """
 )
 
+# Procedure that is called when a row used to calculate the resources of VM
+# hosts is inserted, updated or deleted. Sends a notify message for
+# pod_update for each pod returned by the given query.
+POD_RESOURCES_NOTIFY = dedent(
+    """\
+    CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
+    DECLARE
+      _pod_id integer;
+    BEGIN
+      FOR _pod_id IN %s LOOP
+        PERFORM pg_notify('pod_update',CAST(_pod_id AS text));
+      END LOOP;
+      RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """
+)
+
+# Queries for POD_RESOURCES_NOTIFY, returning the pods with the given IDs,
+# the pods of the VMs with the given IDs, the pods hosted on the nodes with
+# the given IDs, the pods hosted on the nodes of the NUMA nodes with the
+# given IDs, and the pods of the hints with the given IDs.
+POD_RESOURCES_PODS = (
+    "SELECT id FROM maasserver_bmc WHERE id IN (%%(ids)s) AND bmc_type = %d"
+    % BMC_TYPE.POD
+)
+POD_RESOURCES_VM_PODS = (
+    "SELECT bmc_id FROM maasserver_virtualmachine WHERE id IN (%(ids)s)"
+)
+POD_RESOURCES_HOST_PODS = (
+    "SELECT pod_id FROM maasserver_podhost WHERE node_id IN (%(ids)s) "
+    "UNION SELECT hints.pod_id FROM maasserver_podhints hints "
+    "JOIN maasserver_podhints_nodes hint_nodes "
+    "ON hint_nodes.podhints_id = hints.id "
+    "WHERE hint_nodes.node_id IN (%(ids)s)"
+)
+POD_RESOURCES_NUMANODE_PODS = POD_RESOURCES_HOST_PODS % {
+    "ids": "SELECT node_id FROM maasserver_numanode WHERE id IN (%(ids)s)"
+}
+POD_RESOURCES_PODHINTS_PODS = (
+    "SELECT pod_id FROM maasserver_podhints WHERE id IN (%(ids)s)"
+)
+
 # Procedure that is called when a static ip address is linked or unlinked to
 # an Interface. Sends a notify message for domain_update
 INTERFACE_IP_ADDRESS_DOMAIN_NOTIFY = dedent(
@@ -1905,6 +1948,69 @@ def register_websocket_triggers():
         "INSERT OR UPDATE OR DELETE",
     )
 
+    # VM host resources pod notifications
+    pod_resources = [
+        (
+            "maasserver_virtualmachine",
+            "virtualmachine_pod",
+            POD_RESOURCES_PODS,
+            "bmc_id",
+            [
+                "bmc_id",
+                "machine_id",
+                "memory",
+                "pinned_cores",
+                "hugepages_backed",
+            ],
+        ),
+        (
+            "maasserver_virtualmachineinterface",
+            "virtualmachineinterface_pod",
+            POD_RESOURCES_VM_PODS,
+            "vm_id",
+            ["vm_id", "host_interface_id", "attachment_type"],
+        ),
+        (
+            "maasserver_numanode",
+            "numanode_pod",
+            POD_RESOURCES_HOST_PODS,
+            "node_id",
+            ["node_id", "index", "memory", "cores"],
+        ),
+        (
+            "maasserver_numanodehugepages",
+            "numanodehugepages_pod",
+            POD_RESOURCES_NUMANODE_PODS,
+            "numanode_id",
+            ["numanode_id", "page_size", "total"],
+        ),
+        (
+            "maasserver_interface",
+            "interface_pod_resources",
+            POD_RESOURCES_HOST_PODS,
+            "node_id",
+            ["node_id", "name", "sriov_max_vf", "numa_node_id"],
+        ),
+        (
+            "maasserver_podhints_nodes",
+            "podhints_nodes_pod",
+            POD_RESOURCES_PODHINTS_PODS,
+            "podhints_id",
+            ["podhints_id", "node_id"],
+        ),
+    ]
+    for table, event_prefix, query, column, fields in pod_resources:
+        for _, event, row in EVENTS_IUD:
+            rows = ["NEW", "OLD"] if event == "update" else [row]
+            ids = ", ".join("%s.%s" % (row, column) for row in rows)
+            procedure = "%s_%s_notify" % (event_prefix, event)
+            register_procedure(
+                POD_RESOURCES_NOTIFY % (procedure, query % {"ids": ids})
+            )
+        register_triggers(
+            table, event_prefix, events=EVENTS_IUD, fields=fields
+        )
+
     # DNSData table
     register_procedure(
         DNSDATA_DOMAIN_NOTIFY
@@ -4,6 +4,7 @@
 """The base class that all handlers must extend."""
 
 __all__ = [
+    "DehydrationCache",
     "HandlerError",
     "HandlerPKError",
     "HandlerValidationError",
@@ -11,6 +12,7 @@ __all__ = [
 ]
 
 from functools import wraps
+import json
 from operator import attrgetter
 
 from django.contrib.postgres.fields import ArrayField
@@ -96,6 +98,7 @@ class HandlerOptions:
     form = None
     form_requires_request = True
     listen_channels = []
+    share_dehydration = False
     batch_key = "id"
     create_permission = None
     view_permission = None
@@ -146,6 +149,88 @@ class HandlerMetaclass(type):
         return new_class
 
 
+class DehydrationCache:
+    """Share the work for a notification between all the connections.
+
+    When a notification is processed for every connected client, each
+    object is loaded and dehydrated once per handler class, primary key and
+    `for_list`. Only the visibility check and the data that depends on the
+    user (see `Handler.dehydrate_user`) are done for each connection.
+    Messages that end up identical are only encoded once.
+
+    Only handlers with `Meta.share_dehydration` set should use this.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._objects = {}
+        self._dehydrated = {}
+        self._user_data = {}
+        self._frames = {}
+
+    def get_object(self, handler, pk):
+        """Return the object with `pk` from the queryset of `handler`.
+
+        The object is only loaded once, but it is checked to be in the
+        queryset for each user.
+
+        :raise DoesNotExist: when the user of `handler` can't view it.
+        """
+        queryset = handler.get_queryset(for_list=False)
+        lookup = {handler._meta.pk: pk}
+        key = (type(handler), pk)
+        if key not in self._objects:
+            self._objects[key] = queryset.get(**lookup)
+        elif not queryset.filter(**lookup).exists():
+            raise handler._meta.object_class.DoesNotExist()
+        return self._objects[key]
+
+    def dehydrate(self, handler, obj, for_list=False):
+        """Return the same as `handler.full_dehydrate`.
+
+        `Handler.dehydrate_object` is only called for the first handler of
+        a class, others receive a copy of its result.
+        """
+        key = (type(handler), getattr(obj, handler._meta.pk), for_list)
+        shared = self._dehydrated.get(key)
+        if shared is None:
+            self.misses += 1
+            shared = handler.dehydrate_object(obj, for_list=for_list)
+            self._dehydrated[key] = shared
+        else:
+            self.hits += 1
+        data = handler.dehydrate_user(obj, dict(shared), for_list=for_list)
+        user_data = {
+            name: value
+            for name, value in data.items()
+            if name not in shared or value is not shared[name]
+        }
+        # Keep a reference to `data` so its id can't be reused.
+        self._user_data[id(data)] = (
+            data,
+            key,
+            json.dumps(user_data, sort_keys=True, default=str),
+        )
+        return data
+
+    def encode(self, name, action, data, encoder):
+        """Return `encoder(name, action, data)`.
+
+        The result is reused for any other data returned from `dehydrate`
+        for the same object with the same user-specific data.
+        """
+        entry = self._user_data.get(id(data))
+        if entry is None or entry[0] is not data:
+            return encoder(name, action, data)
+        _, key, user_data = entry
+        frame_key = (name, action, key, user_data)
+        frame = self._frames.get(frame_key)
+        if frame is None:
+            frame = self._frames[frame_key] = encoder(name, action, data)
+        return frame
+
+
 class Handler(metaclass=HandlerMetaclass):
     """Base handler for all handlers in the WebSocket protocol.
 
@@ -163,6 +248,10 @@ class Handler(metaclass=HandlerMetaclass):
 
     """
 
+    # Set by the protocol when the same notification is being processed for
+    # many connections at once. See `DehydrationCache`.
+    dehydration_cache = None
+
     def __init__(self, user, cache, request):
         self.user = user
         self.cache = cache
@@ -176,6 +265,19 @@ class Handler(metaclass=HandlerMetaclass):
     def full_dehydrate(self, obj, for_list=False):
         """Convert the given object into a dictionary.
 
+        :param for_list: True when the object is being converted to belong
+            in a list.
+        """
+        data = self.dehydrate_object(obj, for_list=for_list)
+        return self.dehydrate_user(obj, data, for_list=for_list)
+
+    def dehydrate_object(self, obj, for_list=False):
+        """Convert the given object into a dictionary, without the fields
+        that depend on the user.
+
+        When `Meta.share_dehydration` is set the result can be shared
+        between every connection that is notified about `obj`.
+
         :param for_list: True when the object is being converted to belong
             in a list.
         """
@@ -212,9 +314,6 @@ class Handler(metaclass=HandlerMetaclass):
                 else:
                     data[field_name] = field.value_to_string(obj)
 
-        # Add permissions that can be performed on this object.
-        data = self._add_permissions(obj, data)
-
         # Return the data after the final dehydrate.
         return self.dehydrate(obj, data, for_list=for_list)
 
@@ -228,6 +327,20 @@ class Handler(metaclass=HandlerMetaclass):
         """
         return data
 
+    def dehydrate_user(self, obj, data, for_list=False):
+        """Add the info to `data` that depends on the current user.
+
+        This is always called for each user, even when the rest of `data`
+        has been shared with other connections.
+
+        :param obj: object being dehydrated.
+        :param data: dictionary to place extra info.
+        :param for_list: True when the object is being converted to belong
+            in a list.
+        """
+        # Add permissions that can be performed on this object.
+        return self._add_permissions(obj, data)
+
     def _is_foreign_key_for(self, field_name, obj, value):
         """Given the specified field name for the specified object, returns
         True if the specified value is a foreign key; otherwise returns False.
@@ -316,7 +429,12 @@ class Handler(metaclass=HandlerMetaclass):
             )
         pk = params[self._meta.pk]
         try:
-            obj = self.get_queryset(for_list=False).get(**{self._meta.pk: pk})
+            if self.dehydration_cache is None:
+                obj = self.get_queryset(for_list=False).get(
+                    **{self._meta.pk: pk}
+                )
+            else:
+                obj = self.dehydration_cache.get_object(self, pk)
         except self._meta.object_class.DoesNotExist:
             raise HandlerDoesNotExistError(pk)
         if permission is not None or self._meta.view_permission is not None:
@@ -638,19 +756,18 @@ class Handler(metaclass=HandlerMetaclass):
         active primary key."""
         if "active_pk" in self.cache and pk == self.cache["active_pk"]:
             # Active so send all the data for the object.
-            return (
-                self._meta.handler_name,
-                action,
-                self.full_dehydrate(obj, for_list=False),
-            )
+            for_list = False
         else:
             # Not active so only send the data like it was comming from
             # the list call.
-            return (
-                self._meta.handler_name,
-                action,
-                self.full_dehydrate(obj, for_list=True),
+            for_list = True
+        if self.dehydration_cache is None:
+            data = self.full_dehydrate(obj, for_list=for_list)
+        else:
+            data = self.dehydration_cache.dehydrate(
+                self, obj, for_list=for_list
             )
+        return (self._meta.handler_name, action, data)
 
     def listen(self, channel, action, pk):
         """Called when the handler listens for events on channels with
@@ -662,6 +779,30 @@ class Handler(metaclass=HandlerMetaclass):
         """
         return self.get_object({self._meta.pk: pk})
 
+    @classmethod
+    def notified(cls, channel, action, pk):
+        """Called once for every event on channels with
+        `Meta.listen_channels`, before `on_listen` is called for each
+        connection.
+
+        Override to drop anything cached for the object. This is called in
+        the reactor, so it mustn't block.
+
+        :param channel: Channel event occured on.
+        :param action: Action that caused this event.
+        :param pk: Id of the object.
+        """
+
+    @classmethod
+    def listener_connected(cls, connected):
+        """Called when the listener for `Meta.listen_channels` connects or
+        disconnects.
+
+        Events are missed while it's disconnected, so nothing cached that
+        relies on `notified` can be trusted until it connects again. This is
+        called in the reactor, so it mustn't block.
+        """
+
 
 class AdminOnlyMixin(Handler):
     class Meta:
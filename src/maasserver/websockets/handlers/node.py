@@ -43,7 +43,10 @@ from maasserver.websockets.base import (
     HandlerPermissionError,
 )
 from maasserver.websockets.handlers.event import dehydrate_event_type_level
-from maasserver.websockets.handlers.node_result import NodeResultHandler
+from maasserver.websockets.handlers.node_result import (
+    NodeResultHandler,
+    SCRIPT_OUTPUT_DEFERRED,
+)
 from maasserver.websockets.handlers.timestampedmodel import (
     TimestampedModelHandler,
 )
@@ -106,6 +109,7 @@ class NodeHandler(TimestampedModelHandler):
         abstract = True
         pk = "system_id"
         pk_type = str
+        share_dehydration = True
 
     def __init__(self, user, cache, request):
         super().__init__(user, cache, request)
@@ -197,7 +201,6 @@ class NodeHandler(TimestampedModelHandler):
     def dehydrate(self, obj, data, for_list=False):
         """Add extra fields to `data`."""
         data["fqdn"] = obj.fqdn
-        data["actions"] = list(compile_node_actions(obj, self.user).keys())
         data["node_type_display"] = obj.get_node_type_display()
         data["link_type"] = NODE_TYPE_TO_LINK_TYPE[obj.node_type]
         data["tags"] = [tag.name for tag in obj.tags.all()]
@@ -408,14 +411,8 @@ class NodeHandler(TimestampedModelHandler):
                     for script_result in commissioning_script_results:
                         if script_result.name == LIST_MODALIASES_OUTPUT_NAME:
                             if script_result.status == SCRIPT_STATUS.PASSED:
-                                # STDOUT is deferred in the cache so load it.
-                                script_result = (
-                                    ScriptResult.objects.filter(
-                                        id=script_result.id
-                                    )
-                                    .only("id", "status", "stdout")
-                                    .first()
-                                )
+                                # The output isn't in the cache, so this
+                                # loads it.
                                 modaliases = script_result.stdout.decode(
                                     "utf-8"
                                 ).splitlines()
@@ -437,9 +434,7 @@ class NodeHandler(TimestampedModelHandler):
         script_results = ScriptResult.objects.filter(
             script_set__node__in=nodes
         )
-        script_results = script_results.defer(
-            "parameters", "output", "stdout", "stderr", "result"
-        )
+        script_results = script_results.defer("parameters")
         script_results = script_results.select_related("script_set", "script")
         script_results = script_results.defer(
             "script_set__requested_scripts",
@@ -502,9 +497,23 @@ class NodeHandler(TimestampedModelHandler):
         self._cache_script_results(nodes)
 
     def on_listen_for_active_pk(self, action, pk, obj):
-        self._cache_script_results([obj])
+        if self.dehydration_cache is None:
+            self._cache_script_results([obj])
         return super().on_listen_for_active_pk(action, pk, obj)
 
+    def dehydrate_object(self, obj, for_list=False):
+        if self.dehydration_cache is not None:
+            # Only load the script results when the node is dehydrated, not
+            # for each connection the notification is sent to.
+            self._cache_script_results([obj])
+        return super().dehydrate_object(obj, for_list=for_list)
+
+    def dehydrate_user(self, obj, data, for_list=False):
+        """Add the actions the user can perform to `data`."""
+        data = super().dehydrate_user(obj, data, for_list=for_list)
+        data["actions"] = list(compile_node_actions(obj, self.user).keys())
+        return data
+
     def dehydrate_blockdevice(self, blockdevice, obj):
         """Return `BlockDevice` formatted for JSON encoding."""
         # model and serial are currently only avalible on physical block
@@ -973,11 +982,12 @@ class NodeHandler(TimestampedModelHandler):
                 status=SCRIPT_STATUS.PASSED,
                 script_set__node=node,
             )
+            .select_related("script_output")
             .only(
                 "status",
                 "script_name",
                 "updated",
-                "stdout",
+                "script_output__stdout",
                 "script__id",
                 "script_set__node",
                 "script__name",
@@ -1010,11 +1020,12 @@ class NodeHandler(TimestampedModelHandler):
                 status=SCRIPT_STATUS.PASSED,
                 script_set__node=node,
             )
+            .select_related("script_output")
             .only(
                 "status",
                 "script_name",
                 "updated",
-                "stdout",
+                "script_output__stdout",
                 "script__id",
                 "script_set__node",
             )
@@ -1067,7 +1078,8 @@ class NodeHandler(TimestampedModelHandler):
                 script_set__node__system_id__in=system_ids,
                 suppressed=False,
             )
-            .defer("output", "stdout", "stderr")
+            .select_related("script_output")
+            .defer(*SCRIPT_OUTPUT_DEFERRED)
             .prefetch_related("script", "script_set", "script_set__node")
             .defer("script__parameters", "script__packages")
             .defer("script_set__requested_scripts")
@@ -1102,7 +1114,8 @@ class NodeHandler(TimestampedModelHandler):
                 script_set__node__system_id__in=system_ids,
                 script_set__result_type=RESULT_TYPE.TESTING,
             )
-            .defer("output", "stdout", "stderr")
+            .select_related("script_output")
+            .defer(*SCRIPT_OUTPUT_DEFERRED)
             .prefetch_related("script", "script_set", "script_set__node")
             .defer("script__parameters", "script__packages")
             .defer("script_set__requested_scripts")
@@ -20,12 +20,20 @@ from maasserver.websockets.handlers.timestampedmodel import (
 from metadataserver.enum import HARDWARE_TYPE
 from metadataserver.models import ScriptResult
 
+# Only the result YAML of a script's output is needed to dehydrate a result.
+SCRIPT_OUTPUT_DEFERRED = (
+    "script_output__output",
+    "script_output__stdout",
+    "script_output__stderr",
+)
+
 
 class NodeResultHandler(TimestampedModelHandler):
     class Meta:
         queryset = (
             ScriptResult.objects.all()
-            .defer("output", "stdout", "stderr")
+            .select_related("script_output")
+            .defer(*SCRIPT_OUTPUT_DEFERRED)
             .prefetch_related("script", "script_set")
             .defer("script__parameters", "script__packages")
             .defer("script_set__requested_scripts")
@@ -39,7 +47,7 @@ class NodeResultHandler(TimestampedModelHandler):
             "list",
         ]
         listen_channels = ["scriptresult"]
-        exclude = ["script_set", "script_name", "output", "stdout", "stderr"]
+        exclude = ["script_set", "script_name"]
         list_fields = [
             "id",
             "updated",
@@ -168,7 +176,8 @@ class NodeResultHandler(TimestampedModelHandler):
         """
         node = self.get_node(params)
         queryset = node.get_latest_script_results
-        queryset = queryset.defer("output", "stdout", "stderr")
+        queryset = queryset.select_related("script_output")
+        queryset = queryset.defer(*SCRIPT_OUTPUT_DEFERRED)
         queryset = queryset.defer("script__parameters", "script__packages")
         queryset = queryset.defer("script_set__requested_scripts")
 
@@ -188,7 +197,9 @@ class NodeResultHandler(TimestampedModelHandler):
             queryset = queryset.filter(interface_id=params["interface_id"])
         if "has_surfaced" in params:
             if params["has_surfaced"]:
-                queryset = queryset.exclude(result="")
+                queryset = queryset.filter(
+                    script_output__isnull=False
+                ).exclude(script_output__result=b"")
         if "start" in params:
             queryset = queryset[params["start"] :]
         if "limit" in params:
@@ -207,14 +218,17 @@ class NodeResultHandler(TimestampedModelHandler):
             return "Unknown data_type %s" % data_type
         if data_type == "combined":
             data_type = "output"
-        script_result = (
+        row = (
             ScriptResult.objects.filter(id=id)
-            .only("status", data_type)
+            .values_list("script_output__%s" % data_type)
             .first()
         )
-        if script_result is None:
+        if row is None:
             return "Unknown ScriptResult id %s" % id
-        data = getattr(script_result, data_type)
+        data = row[0]
+        if data is None:
+            # The script hasn't output anything yet.
+            return ""
         return data.decode().strip()
 
     def get_history(self, params):
@@ -14,7 +14,7 @@ from maasserver.exceptions import PodProblem
 from maasserver.forms.pods import ComposeMachineForm, PodForm
 from maasserver.models.bmc import Pod
 from maasserver.models.resourcepool import ResourcePool
-from maasserver.models.virtualmachine import get_vm_host_resources
+from maasserver.models.virtualmachine import vm_host_resources_cache
 from maasserver.models.zone import Zone
 from maasserver.permissions import PodPermission
 from maasserver.rbac import rbac
@@ -67,6 +67,26 @@ class PodHandler(TimestampedModelHandler):
         edit_permission = PodPermission.edit
         delete_permission = PodPermission.edit
 
+    def __init__(self, user, cache, request):
+        super().__init__(user, cache, request)
+        # Handlers are made before their transaction starts, so this tells
+        # the cache whether a pod changed since. See `VMHostResourcesCache`.
+        self._vm_host_resources_changes = vm_host_resources_cache.changes
+        self._vm_host_resources = {}
+
+    @classmethod
+    def notified(cls, channel, action, pk):
+        """Drop the cached resources of the pod."""
+        vm_host_resources_cache.invalidate(cls._meta.pk_type(pk))
+
+    @classmethod
+    def listener_connected(cls, connected):
+        """Only cache the resources of pods while notified of changes."""
+        if connected:
+            vm_host_resources_cache.enable()
+        else:
+            vm_host_resources_cache.disable()
+
     def get_queryset(self, for_list=False):
         """Return `QuerySet` for devices only viewable by `user`."""
         return Pod.objects.get_pods(
@@ -142,10 +162,13 @@ class PodHandler(TimestampedModelHandler):
                 data["boot_vlans"] = []
 
         data["numa_pinning"] = self.dehydrate_numa_pinning(obj)
+        return data
 
+    def dehydrate_user(self, obj, data, for_list=False):
+        """Add the compose permission to `data`."""
+        data = super().dehydrate_user(obj, data, for_list=for_list)
         if self.user.has_perm(PodPermission.compose, obj):
             data["permissions"].append("compose")
-
         return data
 
     def dehydrate_total(self, obj):
@@ -240,14 +263,21 @@ class PodHandler(TimestampedModelHandler):
 
     def dehydrate_numa_pinning(self, obj):
         """Dehydrate NUMA pinning info."""
-        if obj.host is None:
-            return []
-
-        resources = [
-            dataclasses.asdict(entry) for entry in get_vm_host_resources(obj)
-        ]
-
-        return resources
+        resources = self._vm_host_resources.pop(obj.id, None)
+        if resources is None:
+            resources = vm_host_resources_cache.get(
+                obj, changes=self._vm_host_resources_changes
+            )
+        return [dataclasses.asdict(entry) for entry in resources]
+
+    def _cache_pks(self, objs):
+        """Get the resources of all the loaded pods in one go."""
+        super()._cache_pks(objs)
+        self._vm_host_resources.update(
+            vm_host_resources_cache.get_many(
+                objs, changes=self._vm_host_resources_changes
+            )
+        )
 
     @asynchronous
     def create(self, params):
@@ -4,6 +4,7 @@
 """Tests for `maasserver.websockets.handlers.pod`"""
 
 
+from dataclasses import asdict
 import random
 from unittest.mock import MagicMock
 
@@ -14,7 +15,14 @@ from twisted.internet.defer import inlineCallbacks, succeed
 from maasserver.enum import INTERFACE_TYPE
 from maasserver.forms import pods
 from maasserver.forms.pods import PodForm
-from maasserver.models.virtualmachine import MB, VirtualMachineInterface
+from maasserver.models import virtualmachine as virtualmachine_module
+from maasserver.models.virtualmachine import (
+    get_vm_host_resources,
+    get_vm_hosts_resources,
+    MB,
+    VirtualMachineInterface,
+    vm_host_resources_cache,
+)
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASTransactionServerTestCase
 from maasserver.utils.orm import reload_object
@@ -475,6 +483,44 @@ class TestPodHandler(MAASTransactionServerTestCase):
         result = handler.list({"id": pod.id})
         self.assertThat(result, Equals(expected_data))
 
+    def test_list_gets_vm_host_resources_in_one_go(self):
+        admin = factory.make_admin()
+        handler = PodHandler(admin, {}, None)
+        pods = [
+            self.make_pod_with_hints(host=factory.make_Node())
+            for _ in range(3)
+        ]
+        mock_get_resources = self.patch(
+            virtualmachine_module,
+            "get_vm_hosts_resources",
+            MagicMock(side_effect=get_vm_hosts_resources),
+        )
+        result = handler.list({})
+        self.assertThat(mock_get_resources, MockCalledOnceWith(pods))
+        self.assertEqual(
+            [
+                [asdict(entry) for entry in get_vm_host_resources(pod)]
+                for pod in pods
+            ],
+            [data["numa_pinning"] for data in result],
+        )
+
+    def test_notified_invalidates_vm_host_resources(self):
+        mock_invalidate = self.patch(vm_host_resources_cache, "invalidate")
+        PodHandler.notified("pod", "update", "5")
+        self.assertThat(mock_invalidate, MockCalledOnceWith(5))
+
+    def test_listener_connected_enables_vm_host_resources_cache(self):
+        self.addCleanup(vm_host_resources_cache.disable)
+        PodHandler.listener_connected(True)
+        self.assertTrue(vm_host_resources_cache.enabled)
+
+    def test_listener_disconnected_disables_vm_host_resources_cache(self):
+        vm_host_resources_cache.enable()
+        self.addCleanup(vm_host_resources_cache.disable)
+        PodHandler.listener_connected(False)
+        self.assertFalse(vm_host_resources_cache.enabled)
+
     @wait_for_reactor
     @inlineCallbacks
     def test_refresh(self):
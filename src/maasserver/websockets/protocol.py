@@ -8,6 +8,7 @@ from collections import deque
 from functools import partial
 from http.cookies import SimpleCookie
 import json
+import time
 from typing import Optional
 from urllib.parse import parse_qs, urlparse
 
@@ -26,8 +27,10 @@ from maasserver.eventloop import services
 from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from maasserver.websockets import handlers
+from maasserver.websockets.base import DehydrationCache
 from maasserver.websockets.websockets import STATUSES
 from provisioningserver.logger import LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils import typed
 from provisioningserver.utils.twisted import deferred, synchronous
 from provisioningserver.utils.url import splithost
@@ -382,16 +385,24 @@ class WebSocketProtocol(Protocol):
 
     def sendNotify(self, name, action, data):
         """Send the notify message with data."""
+        self.sendFrame(self.encodeNotify(name, action, data))
+
+    def encodeNotify(self, name, action, data):
+        """Return the encoded notify message with data."""
         notify_msg = {
             "type": MSG_TYPE.NOTIFY,
             "name": name,
             "action": action,
             "data": data,
         }
-        self.transport.write(
-            json.dumps(notify_msg, default=self._json_encode).encode("ascii")
+        return json.dumps(notify_msg, default=self._json_encode).encode(
+            "ascii"
         )
 
+    def sendFrame(self, frame):
+        """Send an already encoded message to the client."""
+        self.transport.write(frame)
+
     def buildHandler(self, handler_class):
         """Return an initialised instance of `handler_class`."""
         handler_name = handler_class._meta.handler_name
@@ -412,12 +423,25 @@ class WebSocketFactory(Factory):
         self.registerNotifiers()
 
     def startFactory(self):
-        """Register for RPC events."""
+        """Register for RPC and listener events."""
         self.registerRPCEvents()
+        self.listener.events.connected.registerHandler(self.listenerConnected)
+        self.listener.events.disconnected.registerHandler(
+            self.listenerDisconnected
+        )
+        if self.listener.connected():
+            self.listenerConnected()
 
     def stopFactory(self):
-        """Unregister RPC events."""
+        """Unregister RPC and listener events."""
         self.unregisterRPCEvents()
+        self.listener.events.connected.unregisterHandler(
+            self.listenerConnected
+        )
+        self.listener.events.disconnected.unregisterHandler(
+            self.listenerDisconnected
+        )
+        self.listenerDisconnected(None)
 
     def getSessionEngine(self):
         """Returns the session engine being used by Django.
@@ -460,20 +484,82 @@ class WebSocketFactory(Factory):
                     channel, partial(self.onNotify, handler, channel)
                 )
 
+    def listenerConnected(self):
+        """Tell the handlers that the listener is connected."""
+        for handler in self.handlers.values():
+            handler.listener_connected(True)
+
+    def listenerDisconnected(self, reason):
+        """Tell the handlers that the listener is disconnected."""
+        for handler in self.handlers.values():
+            handler.listener_connected(False)
+
     @inlineCallbacks
     def onNotify(self, handler_class, channel, action, obj_id):
-        for client in self.clients:
-            handler = client.buildHandler(handler_class)
-            data = yield deferToDatabase(
-                self.processNotify, handler, channel, action, obj_id
-            )
-            if data is not None:
-                (name, client_action, data) = data
-                client.sendNotify(name, client_action, data)
+        handler_class.notified(channel, action, obj_id)
+        clients = list(self.clients)
+        if len(clients) == 0:
+            return
+        handlers = [
+            (client, client.buildHandler(handler_class)) for client in clients
+        ]
+        before = time.time()
+        frames = yield deferToDatabase(
+            self.processNotify,
+            handler_class,
+            handlers,
+            channel,
+            action,
+            obj_id,
+        )
+        for client, frame in zip(clients, frames):
+            # The client may have gone away while processing.
+            if frame is not None and client in self.clients:
+                client.sendFrame(frame)
+        PROMETHEUS_METRICS.update(
+            "maas_websocket_notify_fanout_latency",
+            "observe",
+            value=time.time() - before,
+            labels={"handler": handler_class._meta.handler_name},
+        )
 
     @transactional
-    def processNotify(self, handler, channel, action, obj_id):
-        return handler.on_listen(channel, action, obj_id)
+    def processNotify(self, handler_class, handlers, channel, action, obj_id):
+        """Process the notification for every handler in one transaction.
+
+        :param handlers: A list of ``(client, handler)`` tuples.
+        :return: The encoded message to send for each handler, or `None`
+            when nothing is to be sent to its client.
+        """
+        cache = DehydrationCache()
+        frames = []
+        for client, handler in handlers:
+            if handler_class._meta.share_dehydration:
+                handler.dehydration_cache = cache
+            data = handler.on_listen(channel, action, obj_id)
+            if data is None:
+                frames.append(None)
+            else:
+                (name, client_action, data) = data
+                frames.append(
+                    cache.encode(
+                        name, client_action, data, client.encodeNotify
+                    )
+                )
+        labels = {"handler": handler_class._meta.handler_name}
+        PROMETHEUS_METRICS.update(
+            "maas_websocket_notify_dehydrate_cache",
+            "inc",
+            value=cache.hits,
+            labels=dict(labels, result="hit"),
+        )
+        PROMETHEUS_METRICS.update(
+            "maas_websocket_notify_dehydrate_cache",
+            "inc",
+            value=cache.misses,
+            labels=dict(labels, result="miss"),
+        )
+        return frames
 
     def registerRPCEvents(self):
         """Register for connected and disconnected events from the RPC
@@ -26,6 +26,7 @@ from maasserver.testing.testcase import (
 from maasserver.utils.orm import reload_object
 from maasserver.websockets import base
 from maasserver.websockets.base import (
+    DehydrationCache,
     Handler,
     HandlerDoesNotExistError,
     HandlerNoSuchMethodError,
@@ -867,6 +868,122 @@ class TestHandler(MAASServerTestCase, FakeNodesHandlerMixin):
         )
 
 
+class TestDehydrationCache(MAASServerTestCase, FakeNodesHandlerMixin):
+    def make_handlers(self, **kwargs):
+        handler = self.make_nodes_handler(**kwargs)
+        other = type(handler)(factory.make_User(), {}, None)
+        return handler, other
+
+    def test_get_object_loads_object_once(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers()
+        cache = DehydrationCache()
+        obj = cache.get_object(handler, node.system_id)
+        self.assertEqual(node, obj)
+        self.assertIs(obj, cache.get_object(other, node.system_id))
+
+    def test_get_object_checks_queryset_for_each_handler(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers()
+        self.patch(other, "get_queryset").return_value = Node.objects.none()
+        cache = DehydrationCache()
+        cache.get_object(handler, node.system_id)
+        self.assertRaises(
+            Node.DoesNotExist, cache.get_object, other, node.system_id
+        )
+
+    def test_dehydrate_calls_dehydrate_object_once(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers(fields=["hostname"])
+        mock_dehydrate = self.patch(type(handler), "dehydrate_object")
+        mock_dehydrate.return_value = {"hostname": node.hostname}
+        cache = DehydrationCache()
+        self.assertEqual(
+            {"hostname": node.hostname},
+            cache.dehydrate(handler, node, for_list=True),
+        )
+        self.assertEqual(
+            {"hostname": node.hostname},
+            cache.dehydrate(other, node, for_list=True),
+        )
+        self.assertThat(
+            mock_dehydrate, MockCalledOnceWith(node, for_list=True)
+        )
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_dehydrate_caches_for_list_separately(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers(fields=["hostname"])
+        cache = DehydrationCache()
+        cache.dehydrate(handler, node, for_list=True)
+        cache.dehydrate(other, node, for_list=False)
+        self.assertEqual((0, 2), (cache.hits, cache.misses))
+
+    def test_dehydrate_adds_user_data_for_each_handler(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers(
+            fields=["hostname"],
+            edit_permission=NodePermission.admin,
+            delete_permission=NodePermission.admin,
+        )
+        handler.user = factory.make_admin()
+        cache = DehydrationCache()
+        self.assertEqual(
+            {"hostname": node.hostname, "permissions": ["edit", "delete"]},
+            cache.dehydrate(handler, node),
+        )
+        self.assertEqual(
+            {"hostname": node.hostname, "permissions": []},
+            cache.dehydrate(other, node),
+        )
+
+    def test_encode_reuses_frame_for_same_user_data(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers(fields=["hostname"])
+        cache = DehydrationCache()
+        encoder = MagicMock()
+        encoder.return_value = sentinel.frame
+        frames = [
+            cache.encode("name", "update", data, encoder)
+            for data in (
+                cache.dehydrate(handler, node),
+                cache.dehydrate(other, node),
+            )
+        ]
+        self.assertEqual([sentinel.frame, sentinel.frame], frames)
+        self.assertThat(
+            encoder,
+            MockCalledOnceWith("name", "update", {"hostname": node.hostname}),
+        )
+
+    def test_encode_encodes_different_user_data(self):
+        node = factory.make_Node()
+        handler, other = self.make_handlers(
+            fields=["hostname"], edit_permission=NodePermission.admin
+        )
+        handler.user = factory.make_admin()
+        cache = DehydrationCache()
+        encoder = MagicMock()
+        for data in (
+            cache.dehydrate(handler, node),
+            cache.dehydrate(other, node),
+        ):
+            cache.encode("name", "update", data, encoder)
+        self.assertEqual(2, encoder.call_count)
+
+    def test_encode_encodes_unknown_data(self):
+        cache = DehydrationCache()
+        encoder = MagicMock()
+        encoder.return_value = sentinel.frame
+        self.assertIs(
+            sentinel.frame,
+            cache.encode("name", "delete", sentinel.pk, encoder),
+        )
+        self.assertThat(
+            encoder, MockCalledOnceWith("name", "delete", sentinel.pk)
+        )
+
+
 class TestHandlerTransaction(
     MAASTransactionServerTestCase, FakeNodesHandlerMixin
 ):
@@ -7,7 +7,7 @@
 from collections import deque
 import json
 import random
-from unittest.mock import MagicMock, sentinel
+from unittest.mock import ANY, MagicMock, sentinel
 
 from crochet import wait_for
 from django.core.exceptions import ValidationError
@@ -39,6 +39,7 @@ from maastesting.matchers import (
     IsFiredDeferred,
     MockCalledOnceWith,
     MockCalledWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
@@ -764,6 +765,16 @@ class MakeProtocolFactoryMixin:
         self.addCleanup(lambda: protocol.connectionLost(""))
         return protocol, factory
 
+    def add_protocol(self, factory, user):
+        protocol = factory.buildProtocol(None)
+        protocol.transport = MagicMock()
+        protocol.transport.cookies = b""
+        mock_authenticate = self.patch(protocol, "authenticate")
+        mock_authenticate.return_value = defer.succeed(user)
+        protocol.connectionMade()
+        self.addCleanup(lambda: protocol.connectionLost(""))
+        return protocol
+
 
 ALL_NOTIFIERS = (
     "config",
@@ -895,6 +906,75 @@ class TestWebSocketFactory(MAASTestCase, MakeProtocolFactoryMixin):
             MockCalledOnceWith(factory.updateRackController),
         )
 
+    def test_startFactory_registers_listener_handlers(self):
+        factory = self.make_factory()
+        factory.startFactory()
+        try:
+            self.assertIn(
+                factory.listenerConnected,
+                factory.listener.events.connected.handlers,
+            )
+            self.assertIn(
+                factory.listenerDisconnected,
+                factory.listener.events.disconnected.handlers,
+            )
+        finally:
+            factory.stopFactory()
+
+    def test_startFactory_calls_listenerConnected_when_connected(self):
+        factory = self.make_factory()
+        self.patch(factory.listener, "connected").return_value = True
+        mock_listenerConnected = self.patch(factory, "listenerConnected")
+        factory.startFactory()
+        self.addCleanup(factory.stopFactory)
+        self.assertThat(mock_listenerConnected, MockCalledOnceWith())
+
+    def test_stopFactory_unregisters_listener_handlers(self):
+        factory = self.make_factory()
+        mock_listenerDisconnected = self.patch(factory, "listenerDisconnected")
+        factory.startFactory()
+        factory.stopFactory()
+        self.assertNotIn(
+            factory.listenerConnected,
+            factory.listener.events.connected.handlers,
+        )
+        self.assertNotIn(
+            mock_listenerDisconnected,
+            factory.listener.events.disconnected.handlers,
+        )
+        self.assertThat(mock_listenerDisconnected, MockCalledOnceWith(None))
+
+    def test_listenerConnected_calls_handlers_listener_connected(self):
+        factory = self.make_factory()
+        handler_class = MagicMock()
+        factory.handlers = {"handler": handler_class}
+        factory.listenerConnected()
+        self.assertThat(
+            handler_class.listener_connected, MockCalledOnceWith(True)
+        )
+
+    def test_listenerDisconnected_calls_handlers_listener_connected(self):
+        factory = self.make_factory()
+        handler_class = MagicMock()
+        factory.handlers = {"handler": handler_class}
+        factory.listenerDisconnected(None)
+        self.assertThat(
+            handler_class.listener_connected, MockCalledOnceWith(False)
+        )
+
+    def test_onNotify_calls_handler_class_notified(self):
+        factory = self.make_factory()
+        handler_class = MagicMock()
+        factory.onNotify(
+            handler_class, sentinel.channel, sentinel.action, sentinel.obj_id
+        )
+        self.assertThat(
+            handler_class.notified,
+            MockCalledOnceWith(
+                sentinel.channel, sentinel.action, sentinel.obj_id
+            ),
+        )
+
     def test_registerNotifiers_registers_all_notifiers(self):
         factory = self.make_factory()
         self.assertItemsEqual(ALL_NOTIFIERS, factory.listener.listeners.keys())
@@ -963,7 +1043,7 @@ class TestWebSocketFactoryTransactional(
 
     @wait_for_reactor
     @inlineCallbacks
-    def test_onNotify_calls_sendNotify_on_protocol(self):
+    def test_onNotify_calls_sendFrame_on_protocol(self):
         user = yield deferToDatabase(self.make_user)
         protocol, factory = self.make_protocol_with_factory(user=user)
         name = maas_factory.make_name("name")
@@ -971,11 +1051,60 @@ class TestWebSocketFactoryTransactional(
         data = maas_factory.make_name("data")
         mock_class = MagicMock()
         mock_class.return_value.on_listen.return_value = (name, action, data)
-        mock_sendNotify = self.patch(protocol, "sendNotify")
+        mock_sendFrame = self.patch(protocol, "sendFrame")
         yield factory.onNotify(
             mock_class, sentinel.channel, action, sentinel.obj_id
         )
-        self.assertThat(mock_sendNotify, MockCalledWith(name, action, data))
+        self.assertThat(
+            mock_sendFrame,
+            MockCalledWith(protocol.encodeNotify(name, action, data)),
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_dehydrates_once_for_all_protocols(self):
+        admin = yield deferToDatabase(transactional(maas_factory.make_admin))
+        other_admin = yield deferToDatabase(
+            transactional(maas_factory.make_admin)
+        )
+        node = yield deferToDatabase(transactional(maas_factory.make_Node))
+        protocol, factory = self.make_protocol_with_factory(user=admin)
+        other_protocol = self.add_protocol(factory, other_admin)
+        calls = []
+        dehydrate_object = MachineHandler.dehydrate_object
+
+        def count_dehydrate_object(handler, obj, for_list=False):
+            calls.append(obj.system_id)
+            return dehydrate_object(handler, obj, for_list=for_list)
+
+        self.patch(MachineHandler, "dehydrate_object", count_dehydrate_object)
+        yield factory.onNotify(
+            MachineHandler, "machine", "update", node.system_id
+        )
+        self.assertEqual([node.system_id], calls)
+        [frame] = protocol.transport.write.call_args[0]
+        self.assertThat(
+            other_protocol.transport.write, MockCalledOnceWith(frame)
+        )
+        self.assertEqual(
+            node.system_id, json.loads(frame)["data"]["system_id"]
+        )
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_checks_permission_for_each_protocol(self):
+        owner = yield deferToDatabase(self.make_user)
+        other_user = yield deferToDatabase(self.make_user)
+        node = yield deferToDatabase(
+            transactional(maas_factory.make_Node), owner=owner
+        )
+        protocol, factory = self.make_protocol_with_factory(user=owner)
+        other_protocol = self.add_protocol(factory, other_user)
+        yield factory.onNotify(
+            MachineHandler, "machine", "update", node.system_id
+        )
+        self.assertThat(protocol.transport.write, MockCalledOnceWith(ANY))
+        self.assertThat(other_protocol.transport.write, MockNotCalled())
 
     @wait_for_reactor
     @inlineCallbacks
@@ -193,10 +193,15 @@ def check_version(version):
         raise UnknownMetadataVersion("Unknown metadata version: %s" % version)
 
 
-def add_event_to_node_event_log(
-    node, origin, action, description, event_type, result=None, created=None
+def get_node_event_log_events(
+    node, origin, action, description, event_type, result=None
 ):
-    """Add an entry to the node's event log."""
+    """Return the entries to add to the node's event log.
+
+    The type of the entries depends on the node's current status.
+
+    :return: A list of ``(type_name, action, description)`` tuples.
+    """
     if node.status == NODE_STATUS.COMMISSIONING:
         if result in ["SUCCESS", None]:
             type_name = EVENT_TYPES.NODE_COMMISSIONING_EVENT
@@ -222,28 +227,32 @@ def add_event_to_node_event_log(
     else:
         type_name = EVENT_TYPES.NODE_STATUS_EVENT
 
+    events = []
     # Create an extra event for the machine status messages.
     if action in EVENT_STATUS_MESSAGES and event_type == "start":
-        Event.objects.register_event_and_event_type(
-            EVENT_STATUS_MESSAGES[action],
-            type_level=EVENT_DETAILS[EVENT_STATUS_MESSAGES[action]].level,
-            type_description=EVENT_DETAILS[
-                EVENT_STATUS_MESSAGES[action]
-            ].description,
-            event_action=action,
+        events.append((EVENT_STATUS_MESSAGES[action], action, ""))
+    events.append((type_name, action, "'%s' %s" % (origin, description)))
+    return events
+
+
+def add_event_to_node_event_log(
+    node, origin, action, description, event_type, result=None, created=None
+):
+    """Add an entry to the node's event log."""
+    events = get_node_event_log_events(
+        node, origin, action, description, event_type, result
+    )
+    for type_name, event_action, event_description in events:
+        event = Event.objects.register_event_and_event_type(
+            type_name,
+            type_level=EVENT_DETAILS[type_name].level,
+            type_description=EVENT_DETAILS[type_name].description,
+            event_action=event_action,
+            event_description=event_description,
             system_id=node.system_id,
             created=created,
         )
-
-    return Event.objects.register_event_and_event_type(
-        type_name,
-        type_level=EVENT_DETAILS[type_name].level,
-        type_description=EVENT_DETAILS[type_name].description,
-        event_action=action,
-        event_description="'%s' %s" % (origin, description),
-        system_id=node.system_id,
-        created=created,
-    )
+    return event
 
 
 def process_file(
@@ -278,7 +287,7 @@ def process_file(
 
     script_result = (
         script_set.scriptresult_set.filter(id=script_result_id)
-        .defer("parameters", "output", "stdout", "stderr", "result")
+        .defer("parameters")
         .first()
     )
     if script_result is None:
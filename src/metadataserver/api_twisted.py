@@ -18,21 +18,28 @@ from twisted.web.server import NOT_DONE_YET
 from maasserver.api.utils import extract_oauth_key_from_auth_header
 from maasserver.enum import NODE_STATUS, NODE_TYPE
 from maasserver.forms.pods import PodForm
-from maasserver.models import Node, NodeMetadata
+from maasserver.models import Event, Node, NodeMetadata
 from maasserver.preseed import CURTIN_INSTALL_LOG
 from maasserver.utils.orm import (
     in_transaction,
+    is_retryable_failure,
+    savepoint,
     transactional,
     TransactionManagementError,
 )
 from maasserver.utils.threads import deferToDatabase
 from metadataserver import logger
-from metadataserver.api import add_event_to_node_event_log, process_file
+from metadataserver.api import (
+    add_event_to_node_event_log,
+    get_node_event_log_events,
+    process_file,
+)
 from metadataserver.enum import SCRIPT_STATUS
 from metadataserver.models import NodeKey
 from provisioningserver.events import EVENT_STATUS_MESSAGES
 from provisioningserver.logger import LegacyLogger
-from provisioningserver.utils.twisted import deferred
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
+from provisioningserver.utils.twisted import callOut, deferred
 
 log = LegacyLogger()
 
@@ -238,10 +245,22 @@ class StatusWorkerService(TimerService, object):
         self.dbtasks = dbtasks
         self.clock = clock
         self.queue = defaultdict(list)
+        # The number of queued messages handed to the database tasks service
+        # that haven't been processed yet.
+        self.processing = 0
+
+    def _updateBacklog(self):
+        queued = sum(len(messages) for messages in self.queue.values())
+        PROMETHEUS_METRICS.update(
+            "maas_region_status_message_backlog",
+            "set",
+            value=queued + self.processing,
+        )
 
     def _tryUpdateNodes(self):
         if len(self.queue) != 0:
             queue, self.queue = self.queue, defaultdict(list)
+            self._updateBacklog()
             d = deferToDatabase(self._preProcessQueue, queue)
             d.addCallback(self._processMessagesLater)
             d.addErrback(log.err, "Failed to process node status messages.")
@@ -265,7 +284,19 @@ class StatusWorkerService(TimerService, object):
         # don't apply back-pressure to those systems that are producing these
         # messages anyway.
         for node, messages in tasks:
-            self.dbtasks.addTask(self._processMessages, node, messages)
+            self.processing += len(messages)
+            d = self.dbtasks.deferTask(self._processMessages, node, messages)
+            d.addErrback(
+                log.err,
+                "Failed to process status messages for node: %s"
+                % node.hostname,
+            )
+            d.addBoth(callOut, self._messagesProcessed, len(messages))
+        self._updateBacklog()
+
+    def _messagesProcessed(self, count):
+        self.processing -= count
+        self._updateBacklog()
 
     def _processMessages(self, node, messages):
         # Push the messages into the database, recording them for this node.
@@ -278,19 +309,48 @@ class StatusWorkerService(TimerService, object):
             )
         else:
             # Here we're in a database thread, with a database connection.
-            for idx, message in enumerate(messages):
-                try:
-                    exists = self._processMessage(node, message)
-                    if not exists:
-                        # Node has been deleted no reason to continue saving
-                        # the events for this node.
-                        break
-                except Exception:
-                    log.err(
-                        None,
-                        "Failed to process message "
-                        "for node: %s" % node.hostname,
-                    )
+            self._processNodeMessages(node, messages)
+
+    @transactional
+    def _processNodeMessages(self, node, messages):
+        """Process `messages` for `node` in a single transaction.
+
+        Each message is processed in a savepoint, so that a message that
+        fails doesn't prevent the others from being processed. The events
+        for the node's event log are saved in bulk once all the messages
+        have been processed.
+        """
+        # Validate that the node still exists since this is a new transaction.
+        try:
+            node = Node.objects.get(id=node.id)
+        except Node.DoesNotExist:
+            # Node has been deleted no reason to continue saving the events
+            # for this node.
+            return
+        events = []
+        for message in messages:
+            message_events = []
+            try:
+                with savepoint():
+                    self._processNodeMessage(node, message, message_events)
+            except Exception as error:
+                if is_retryable_failure(error):
+                    # Retry the whole transaction.
+                    raise
+                log.err(
+                    None,
+                    "Failed to process message for node: %s" % node.hostname,
+                )
+                # The node may have been changed before the failure.
+                node = Node.objects.get(id=node.id)
+            else:
+                events.extend(message_events)
+        Event.objects.bulk_create_node_events(node, events)
+        PROMETHEUS_METRICS.update(
+            "maas_region_status_message_batch_size",
+            "observe",
+            value=len(messages),
+        )
 
     @transactional
     def _processMessage(self, node, message):
@@ -299,7 +359,16 @@ class StatusWorkerService(TimerService, object):
             node = Node.objects.get(id=node.id)
         except Node.DoesNotExist:
             return False
+        self._processNodeMessage(node, message)
+        return True
+
+    def _processNodeMessage(self, node, message, events=None):
+        """Process `message` for `node` in the current transaction.
 
+        If `events` is a list, the events for the node's event log are
+        appended to it, as ``(type_name, action, description, created)``
+        tuples, instead of being saved.
+        """
         event_type = message["event_type"]
         origin = message["origin"]
         activity_name = message["name"]
@@ -313,15 +382,28 @@ class StatusWorkerService(TimerService, object):
 
         # Add this event to the node event log if 'start' or a 'failure'.
         if event_type == "start" or failed:
-            add_event_to_node_event_log(
-                node,
-                origin,
-                activity_name,
-                description,
-                event_type,
-                result,
-                message["timestamp"],
-            )
+            if events is None:
+                add_event_to_node_event_log(
+                    node,
+                    origin,
+                    activity_name,
+                    description,
+                    event_type,
+                    result,
+                    message["timestamp"],
+                )
+            else:
+                node_events = get_node_event_log_events(
+                    node,
+                    origin,
+                    activity_name,
+                    description,
+                    event_type,
+                    result,
+                )
+                events.extend(
+                    event + (message["timestamp"],) for event in node_events
+                )
 
         # Group files together with the ScriptResult they belong.
         results = {}
@@ -470,7 +552,6 @@ class StatusWorkerService(TimerService, object):
 
         if save_node:
             node.save()
-        return True
 
     def _retrieve_content(self, compression, encoding, content):
         """Extract the content of the sent file."""
@@ -570,3 +651,4 @@ class StatusWorkerService(TimerService, object):
             return d
         else:
             self.queue[authorization].append(message)
+            self._updateBacklog()
@@ -12,8 +12,9 @@ import re
 from django.core.exceptions import ValidationError
 
 from maasserver.enum import NODE_METADATA, NODE_STATUS
-from maasserver.models.blockdevice import MIN_BLOCK_DEVICE_SIZE
+from maasserver.models.blockdevice import BlockDevice, MIN_BLOCK_DEVICE_SIZE
 from maasserver.models.fabric import Fabric
+from maasserver.models.filesystemgroup import FilesystemGroup
 from maasserver.models.interface import Interface, PhysicalInterface
 from maasserver.models.node import Node
 from maasserver.models.nodemetadata import NodeMetadata
@@ -22,6 +23,7 @@ from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.subnet import Subnet
 from maasserver.models.switch import Switch
 from maasserver.models.tag import Tag
+from maasserver.models.timestampedmodel import now
 from maasserver.utils.orm import get_one
 from maasserver.utils.osystems import get_release
 from metadataserver.enum import SCRIPT_STATUS
@@ -274,69 +276,77 @@ def update_node_network_information(node, data, numa_nodes):
             raise
     current_interfaces = set()
 
-    for mac, iface in interfaces_info.items():
-        ifname = iface.get("name")
-        link_connected = iface.get("link_connected")
-        interface_speed = iface.get("interface_speed")
-        link_speed = iface.get("link_speed")
-        numa_index = iface.get("numa_node")
-        vendor = iface.get("vendor")
-        product = iface.get("product")
-        firmware_version = iface.get("firmware_version")
-        sriov_max_vf = iface.get("sriov_max_vf")
+    # Load the physical interfaces with the reported MAC addresses at once,
+    # instead of looking each one up.
+    existing_interfaces = {
+        str(interface.mac_address): interface
+        for interface in PhysicalInterface.objects.filter(
+            mac_address__in=list(interfaces_info)
+        ).select_related("node")
+    }
+    kept_interfaces = {
+        mac: interface
+        for mac, interface in existing_interfaces.items()
+        if interface.node_id == node.id
+    }
+    # Since MAC addresses didn't match, delete any interface that has the
+    # name of an interface that's going to be created.
+    new_names = [
+        iface.get("name")
+        for mac, iface in interfaces_info.items()
+        if mac not in kept_interfaces
+    ]
+    if len(new_names) > 0:
+        PhysicalInterface.objects.filter(
+            node=node, name__in=new_names
+        ).exclude(
+            id__in=[interface.id for interface in kept_interfaces.values()]
+        ).delete()
 
-        try:
-            interface = PhysicalInterface.objects.get(mac_address=mac)
-            if interface.node == node:
-                # Interface already exists on this node, so just update the NIC
-                # info
-                update_interface_details(interface, interfaces_info)
-            else:
-                logger.warning(
-                    "Interface with MAC %s moved from node %s to %s. "
-                    "(The existing interface will be deleted.)"
-                    % (interface.mac_address, interface.node.fqdn, node.fqdn)
-                )
-                interface.delete()
-                interface = _create_default_physical_interface(
-                    node,
-                    ifname,
-                    mac,
-                    link_connected,
-                    interface_speed=interface_speed,
-                    link_speed=link_speed,
-                    numa_node=numa_nodes[numa_index],
-                    vendor=vendor,
-                    product=product,
-                    firmware_version=firmware_version,
-                    sriov_max_vf=sriov_max_vf,
-                )
-        except PhysicalInterface.DoesNotExist:
-            # Since MAC addresses didn't match, delete any interface that
-            # has a matching (name, node) pair and create a new interface
-            # with the supplied information.
-            PhysicalInterface.objects.filter(name=ifname, node=node).delete()
-            interface = _create_default_physical_interface(
-                node,
-                ifname,
-                mac,
-                link_connected,
-                interface_speed=interface_speed,
-                link_speed=link_speed,
-                numa_node=numa_nodes[numa_index],
-                vendor=vendor,
-                product=product,
-                firmware_version=firmware_version,
-                sriov_max_vf=sriov_max_vf,
+    # Interfaces that already exist on this node are updated first, so that
+    # they release their names if they're renamed.
+    interfaces = []
+    for mac, iface in interfaces_info.items():
+        interface = kept_interfaces.get(mac)
+        if interface is not None:
+            # Interface already exists on this node, so just update the NIC
+            # info
+            update_interface_details(interface, interfaces_info)
+            interfaces.append((interface, iface))
+    for mac, iface in interfaces_info.items():
+        if mac in kept_interfaces:
+            continue
+        interface = existing_interfaces.get(mac)
+        if interface is not None:
+            logger.warning(
+                "Interface with MAC %s moved from node %s to %s. "
+                "(The existing interface will be deleted.)"
+                % (interface.mac_address, interface.node.fqdn, node.fqdn)
             )
+            interface.delete()
+        interface = _create_default_physical_interface(
+            node,
+            iface.get("name"),
+            mac,
+            iface.get("link_connected"),
+            interface_speed=iface.get("interface_speed"),
+            link_speed=iface.get("link_speed"),
+            numa_node=numa_nodes[iface.get("numa_node")],
+            vendor=iface.get("vendor"),
+            product=iface.get("product"),
+            firmware_version=iface.get("firmware_version"),
+            sriov_max_vf=iface.get("sriov_max_vf"),
+        )
+        interfaces.append((interface, iface))
 
+    for interface, iface in interfaces:
         current_interfaces.add(interface)
         interface.update_ip_addresses(iface.get("ips"))
-        if sriov_max_vf > 0:
+        if iface.get("sriov_max_vf") > 0:
             interface.add_tag("sriov")
             interface.save(update_fields=["tags"])
 
-        if not link_connected:
+        if not iface.get("link_connected"):
             # This interface is now disconnected.
             if interface.vlan is not None:
                 interface.vlan = None
@@ -564,6 +574,13 @@ def update_node_physical_block_devices(node, data, numa_nodes):
     previous_block_devices = list(
         PhysicalBlockDevice.objects.filter(node=node).all()
     )
+    previous_names = {
+        block_device.id: block_device.name
+        for block_device in previous_block_devices
+    }
+    updated_block_devices = []
+    resized_block_devices = []
+    new_block_devices = []
     for block_info in blockdevs:
         # Skip the read-only devices or cdroms. We keep them in the output
         # for the user to view but they do not get an entry in the database.
@@ -590,28 +607,16 @@ def update_node_physical_block_devices(node, data, numa_nodes):
         numa_index = block_info.get("numa_node")
         tags = get_tags_from_block_info(block_info)
 
-        # First check if there is an existing device with the same name.
-        # If so, we need to rename it. Its name will be changed back later,
-        # when we loop around to it.
-        existing = PhysicalBlockDevice.objects.filter(
-            node=node, name=name
-        ).all()
-        for device in existing:
-            # Use the device ID to ensure a unique temporary name.
-            device.name = "%s.%d" % (device.name, device.id)
-            device.save(update_fields=["name"])
-
         block_device = get_matching_block_device(
             previous_block_devices, serial, id_path
         )
         if block_device is not None:
-            # Refresh, since it might have been temporarily renamed
-            # above.
-            block_device.refresh_from_db()
             # Already exists for the node. Keep the original object so the
             # ID doesn't change and if its set to the boot_disk that FK will
             # not need to be updated.
             previous_block_devices.remove(block_device)
+            if block_device.size != size:
+                resized_block_devices.append(block_device)
             block_device.name = name
             block_device.model = model
             block_device.serial = serial
@@ -620,7 +625,7 @@ def update_node_physical_block_devices(node, data, numa_nodes):
             block_device.block_size = block_size
             block_device.firmware_version = firmware_version
             block_device.tags = tags
-            block_device.save()
+            updated_block_devices.append(block_device)
         else:
             # MAAS doesn't allow disks smaller than 4MiB so skip them
             if size <= MIN_BLOCK_DEVICE_SIZE:
@@ -630,18 +635,64 @@ def update_node_physical_block_devices(node, data, numa_nodes):
                 continue
 
             # New block device. Create it on the node.
-            PhysicalBlockDevice.objects.create(
-                numa_node=numa_nodes[numa_index],
-                name=name,
-                id_path=id_path,
-                size=size,
-                block_size=block_size,
-                tags=tags,
-                model=model,
-                serial=serial,
-                firmware_version=firmware_version,
+            new_block_devices.append(
+                PhysicalBlockDevice(
+                    numa_node=numa_nodes[numa_index],
+                    name=name,
+                    id_path=id_path,
+                    size=size,
+                    block_size=block_size,
+                    tags=tags,
+                    model=model,
+                    serial=serial,
+                    firmware_version=firmware_version,
+                )
             )
 
+    # Names are unique per node, so existing devices holding a name that
+    # another device takes are temporarily renamed first. The device ID
+    # ensures a unique temporary name.
+    names = {block_device.name for block_device in updated_block_devices}
+    names.update(block_device.name for block_device in new_block_devices)
+    renamed_block_devices = []
+    for block_device in updated_block_devices + previous_block_devices:
+        previous_name = previous_names[block_device.id]
+        if previous_name in names and previous_name != block_device.name:
+            renamed_block_devices.append(
+                BlockDevice(
+                    id=block_device.id,
+                    name="%s.%d" % (previous_name, block_device.id),
+                )
+            )
+    if len(renamed_block_devices) > 0:
+        BlockDevice.objects.bulk_update(renamed_block_devices, ["name"])
+    if len(updated_block_devices) > 0:
+        updated = now()
+        for block_device in updated_block_devices:
+            block_device.updated = updated
+        PhysicalBlockDevice.objects.bulk_update(
+            updated_block_devices,
+            [
+                "name",
+                "model",
+                "serial",
+                "id_path",
+                "size",
+                "block_size",
+                "firmware_version",
+                "tags",
+                "updated",
+            ],
+        )
+    PhysicalBlockDevice.objects.bulk_create_devices(new_block_devices)
+    # Saving a block device updates the filesystem groups it belongs to,
+    # so that their sizes stay right. Do the same for resized devices.
+    for block_device in resized_block_devices:
+        for group in FilesystemGroup.objects.filter_by_block_device(
+            block_device
+        ):
+            group.save()
+
     # Clear boot_disk if it is being removed.
     boot_disk = node.boot_disk
     if boot_disk is not None and boot_disk in previous_block_devices:
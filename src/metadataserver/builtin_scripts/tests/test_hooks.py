@@ -21,6 +21,8 @@ from testtools.matchers import (
 )
 
 from maasserver.enum import (
+    FILESYSTEM_GROUP_TYPE,
+    FILESYSTEM_TYPE,
     INTERFACE_TYPE,
     IPADDRESS_TYPE,
     NODE_METADATA,
@@ -41,6 +43,7 @@ from maasserver.storage_layouts import get_applied_storage_layout_for_node
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockNotCalled
 from maastesting.testcase import MAASTestCase
 import metadataserver.builtin_scripts.hooks as hooks_module
@@ -2044,6 +2047,101 @@ class TestUpdateNodePhysicalBlockDevices(MAASServerTestCase):
         _, layout = get_applied_storage_layout_for_node(node)
         self.assertEqual("blank", layout)
 
+    def make_disks(self, count):
+        return {
+            "storage": {
+                "disks": [
+                    {
+                        "id": "disk%d" % index,
+                        "model": "ST4000NM0035",
+                        "type": "sata",
+                        "read_only": False,
+                        "size": 4000787030016,
+                        "removable": False,
+                        "numa_node": 0,
+                        "device_id": "wwn-0x5000c500%08x" % index,
+                        "block_size": 4096,
+                        "rpm": 7200,
+                        "firmware_version": "TN02",
+                        "serial": "ZC1%05d" % index,
+                    }
+                    for index in range(count)
+                ]
+            }
+        }
+
+    def count_queries_for_disks(self, count):
+        # The storage layout isn't part of the reconciliation.
+        self.patch(node_module.Node, "set_default_storage_layout")
+        node = factory.make_Node(with_empty_script_sets=True)
+        numa_nodes = create_numa_nodes(node)
+        data = self.make_disks(count)
+        num_queries_created, _ = count_queries(
+            update_node_physical_block_devices, node, data, numa_nodes
+        )
+        # Recommission with the names reversed, so that the disks have to
+        # swap names, and with one disk replaced.
+        disks = data["storage"]["disks"]
+        names = [disk["id"] for disk in reversed(disks)]
+        for disk, name in zip(disks, names):
+            disk["id"] = name
+        disks[0]["serial"] = factory.make_name("serial")
+        num_queries_updated, _ = count_queries(
+            update_node_physical_block_devices, node, data, numa_nodes
+        )
+        self.assertItemsEqual(
+            [(disk["id"], disk["serial"]) for disk in disks],
+            [
+                (device.name, device.serial)
+                for device in PhysicalBlockDevice.objects.filter(node=node)
+            ],
+        )
+        return num_queries_created, num_queries_updated
+
+    def test_number_of_queries_does_not_grow_with_number_of_disks(self):
+        self.assertEqual(
+            self.count_queries_for_disks(2), self.count_queries_for_disks(20)
+        )
+
+    def test_keeps_ids_when_disks_swap_names(self):
+        node = factory.make_Node()
+        numa_nodes = create_numa_nodes(node)
+        data = self.make_disks(2)
+        update_node_physical_block_devices(node, data, numa_nodes)
+        ids = {
+            device.serial: device.id
+            for device in PhysicalBlockDevice.objects.filter(node=node)
+        }
+        disks = data["storage"]["disks"]
+        disks[0]["id"], disks[1]["id"] = disks[1]["id"], disks[0]["id"]
+        update_node_physical_block_devices(node, data, numa_nodes)
+        self.assertItemsEqual(
+            [(disk["id"], ids[disk["serial"]]) for disk in disks],
+            [
+                (device.name, device.id)
+                for device in PhysicalBlockDevice.objects.filter(node=node)
+            ],
+        )
+
+    def test_resaves_filesystem_groups_of_resized_disks(self):
+        node = factory.make_Node()
+        numa_nodes = create_numa_nodes(node)
+        data = self.make_disks(2)
+        update_node_physical_block_devices(node, data, numa_nodes)
+        filesystem_group = factory.make_FilesystemGroup(
+            group_type=FILESYSTEM_GROUP_TYPE.RAID_0,
+            filesystems=[
+                factory.make_Filesystem(
+                    fstype=FILESYSTEM_TYPE.RAID, block_device=device
+                )
+                for device in PhysicalBlockDevice.objects.filter(node=node)
+            ],
+        )
+        data["storage"]["disks"][0]["size"] *= 2
+        update_node_physical_block_devices(node, data, numa_nodes)
+        virtual_device = reload_object(filesystem_group).virtual_device
+        self.assertEqual(filesystem_group.get_size(), virtual_device.size)
+
 
 class TestUpdateNodeNetworkInformation(MAASServerTestCase):
     """Tests the update_node_network_information function using data from LXD.
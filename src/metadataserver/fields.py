@@ -5,8 +5,10 @@
 
 
 from base64 import b64decode, b64encode
+import zlib
 
 from django.db import connection
+from django.db.models import BinaryField as DjangoBinaryField
 
 from maasserver.fields import Field
 
@@ -142,3 +144,39 @@ class BinaryField(Field):
         """Override Django's crack-smoking ``Field.get_default``."""
         default = self._get_default()
         return None if default is None else Bin(default)
+
+
+class CompressedBinaryField(DjangoBinaryField):
+    """A field that stores binary data compressed.
+
+    The data is stored zlib-compressed in a postgres BYTEA, so unlike
+    `BinaryField` it's fine for large blobs. Values are always `Bin` on the
+    Python side. Empty data is stored as-is, so it can still be looked up.
+    """
+
+    def get_prep_value(self, value):
+        """Django overridable: compress python-side value."""
+        value = super().get_prep_value(value)
+        if value:
+            value = zlib.compress(value)
+        return value
+
+    def from_db_value(self, value, expression, connection):
+        return self.decompress(value)
+
+    @staticmethod
+    def decompress(value):
+        """Return the `Bin` for `value` as read from the database.
+
+        Use this when the value was read with raw SQL.
+        """
+        if value is None:
+            return None
+        elif value:
+            return Bin(zlib.decompress(value))
+        else:
+            return Bin(b"")
+
+    def get_default(self):
+        default = super().get_default()
+        return None if default is None else Bin(default)
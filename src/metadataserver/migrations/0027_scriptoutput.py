@@ -0,0 +1,86 @@
+# Generated by Django 2.2.12 on 2021-03-09 11:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import maasserver.models.cleansave
+import metadataserver.fields
+
+BATCH_SIZE = 100
+
+
+def move_script_output(apps, schema_editor):
+    ScriptResult = apps.get_model("metadataserver", "ScriptResult")
+    ScriptOutput = apps.get_model("metadataserver", "ScriptOutput")
+    fields = ("output", "stdout", "stderr", "result")
+    # Results without any output don't get a ScriptOutput.
+    script_results = (
+        ScriptResult.objects.exclude(**{field: "" for field in fields})
+        .only(*fields)
+        .order_by("id")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    script_outputs = []
+    for script_result in script_results:
+        script_outputs.append(
+            ScriptOutput(
+                script_result_id=script_result.id,
+                **{field: getattr(script_result, field) for field in fields}
+            )
+        )
+        if len(script_outputs) == BATCH_SIZE:
+            ScriptOutput.objects.bulk_create(script_outputs)
+            script_outputs = []
+    ScriptOutput.objects.bulk_create(script_outputs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metadataserver", "0026_drop_ipaddr_script"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScriptOutput",
+            fields=[
+                (
+                    "script_result",
+                    models.OneToOneField(
+                        editable=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="script_output",
+                        serialize=False,
+                        to="metadataserver.ScriptResult",
+                    ),
+                ),
+                (
+                    "output",
+                    metadataserver.fields.CompressedBinaryField(
+                        blank=True, default=b""
+                    ),
+                ),
+                (
+                    "stdout",
+                    metadataserver.fields.CompressedBinaryField(
+                        blank=True, default=b""
+                    ),
+                ),
+                (
+                    "stderr",
+                    metadataserver.fields.CompressedBinaryField(
+                        blank=True, default=b""
+                    ),
+                ),
+                (
+                    "result",
+                    metadataserver.fields.CompressedBinaryField(
+                        blank=True, default=b""
+                    ),
+                ),
+            ],
+            bases=(maasserver.models.cleansave.CleanSave, models.Model),
+        ),
+        migrations.RunPython(move_script_output),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.12 on 2021-03-09 11:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # The output has been moved to ScriptOutput. This is separate from that
+    # migration, since PostgreSQL won't alter the table while the foreign
+    # keys of the moved rows are still to be checked.
+    dependencies = [
+        ("metadataserver", "0027_scriptoutput"),
+    ]
+
+    operations = [
+        migrations.RemoveField(model_name="scriptresult", name="output"),
+        migrations.RemoveField(model_name="scriptresult", name="result"),
+        migrations.RemoveField(model_name="scriptresult", name="stderr"),
+        migrations.RemoveField(model_name="scriptresult", name="stdout"),
+    ]
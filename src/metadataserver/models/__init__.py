@@ -4,10 +4,18 @@
 """Model export and helpers for metadataserver.
 """
 
-__all__ = ["NodeKey", "NodeUserData", "Script", "ScriptResult", "ScriptSet"]
+__all__ = [
+    "NodeKey",
+    "NodeUserData",
+    "Script",
+    "ScriptOutput",
+    "ScriptResult",
+    "ScriptSet",
+]
 
 from metadataserver.models.nodekey import NodeKey
 from metadataserver.models.nodeuserdata import NodeUserData
 from metadataserver.models.script import Script
+from metadataserver.models.scriptoutput import ScriptOutput
 from metadataserver.models.scriptresult import ScriptResult
 from metadataserver.models.scriptset import ScriptSet
@@ -0,0 +1,51 @@
+# Copyright 2021 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Output of a script run."""
+
+
+from django.db.models import CASCADE, Model, OneToOneField
+
+from maasserver.models.cleansave import CleanSave
+from metadataserver import DefaultMeta
+from metadataserver.fields import CompressedBinaryField
+
+# Names of the fields holding the output of a script run. Each is also a
+# property of `ScriptResult`.
+SCRIPT_OUTPUT_FIELDS = ("output", "stdout", "stderr", "result")
+
+
+class ScriptOutput(CleanSave, Model):
+    """The output of a `ScriptResult`.
+
+    This is kept out of the `ScriptResult` table so that loading results,
+    e.g. to list them or to calculate a node's test status, never reads the
+    output. It's accessed through the `ScriptResult` properties of the same
+    names, which load it only when first used. A `ScriptResult` without any
+    output has no `ScriptOutput`.
+
+    :ivar script_result: The `ScriptResult` this is the output of.
+    :ivar output: The combined stdout and stderr.
+    :ivar stdout: The stdout.
+    :ivar stderr: The stderr.
+    :ivar result: The result YAML.
+    """
+
+    class Meta(DefaultMeta):
+        """Needed for South to recognize this model."""
+
+    script_result = OneToOneField(
+        "ScriptResult",
+        primary_key=True,
+        editable=False,
+        related_name="script_output",
+        on_delete=CASCADE,
+    )
+
+    output = CompressedBinaryField(blank=True, default=b"")
+
+    stdout = CompressedBinaryField(blank=True, default=b"")
+
+    stderr = CompressedBinaryField(blank=True, default=b"")
+
+    result = CompressedBinaryField(blank=True, default=b"")
@@ -33,12 +33,28 @@ from metadataserver.enum import (
     SCRIPT_STATUS_RUNNING_OR_PENDING,
     SCRIPT_TYPE,
 )
-from metadataserver.fields import Bin, BinaryField
+from metadataserver.fields import Bin
 from metadataserver.models.script import Script
+from metadataserver.models.scriptoutput import (
+    SCRIPT_OUTPUT_FIELDS,
+    ScriptOutput,
+)
 from metadataserver.models.scriptset import ScriptSet
 from provisioningserver.events import EVENT_TYPES
 
 
+def script_output_property(name):
+    """Return a property for the `ScriptOutput` field `name`."""
+
+    def fget(self):
+        return getattr(self._get_script_output(), name)
+
+    def fset(self, value):
+        setattr(self._get_script_output(), name, value)
+
+    return property(fget, fset)
+
+
 class ScriptResult(CleanSave, TimestampedModel):
 
     # Force model into the metadataserver namespace.
@@ -91,13 +107,14 @@ class ScriptResult(CleanSave, TimestampedModel):
         max_length=255, unique=False, editable=False, null=True
     )
 
-    output = BinaryField(max_length=1024 * 1024, blank=True, default=b"")
+    # The output is stored in ScriptOutput and only loaded when used.
+    output = script_output_property("output")
 
-    stdout = BinaryField(max_length=1024 * 1024, blank=True, default=b"")
+    stdout = script_output_property("stdout")
 
-    stderr = BinaryField(max_length=1024 * 1024, blank=True, default=b"")
+    stderr = script_output_property("stderr")
 
-    result = BinaryField(max_length=1024 * 1024, blank=True, default=b"")
+    result = script_output_property("result")
 
     # When the script started to run
     started = DateTimeField(editable=False, null=True, blank=True)
@@ -192,6 +209,53 @@ class ScriptResult(CleanSave, TimestampedModel):
     def __str__(self):
         return "%s/%s" % (self.script_set.node.system_id, self.name)
 
+    def _get_script_output(self):
+        """Return the `ScriptOutput`, loading it if needed.
+
+        A new one is returned if this doesn't have any output yet. It's
+        saved along with this, once any output is set.
+        """
+        try:
+            return self.script_output
+        except ScriptOutput.DoesNotExist:
+            return ScriptOutput(script_result=self)
+
+    def _save_script_output(self, update_fields=None):
+        """Save the `ScriptOutput`, if it was loaded and has changed.
+
+        :param update_fields: The fields this was saved with, if only some
+            were. The output is then only saved if any of its changed
+            fields are among them.
+        """
+        field = self._meta.get_field("script_output")
+        script_output = field.get_cached_value(self, default=None)
+        if script_output is None:
+            return
+        if script_output._state.adding:
+            # Every field of a new `ScriptOutput` counts as changed, so only
+            # those with some output are.
+            changed = [
+                name
+                for name in SCRIPT_OUTPUT_FIELDS
+                if getattr(script_output, name)
+            ]
+        else:
+            changed = [
+                name
+                for name in SCRIPT_OUTPUT_FIELDS
+                if script_output._state.has_changed(name)
+            ]
+        if update_fields is not None:
+            changed = [name for name in changed if name in update_fields]
+        if len(changed) == 0:
+            return
+        elif script_output._state.adding:
+            # Now that this has been saved it has an id to link to.
+            script_output.script_result = self
+            script_output.save(force_insert=True)
+        else:
+            script_output.save(update_fields=changed)
+
     def read_results(self):
         """Read the results YAML file and validate it."""
         try:
@@ -490,4 +554,20 @@ class ScriptResult(CleanSave, TimestampedModel):
                     qs = qs.filter(interface=None)
                 qs.delete()
 
-        return super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            ret = super().save(*args, **kwargs)
+        else:
+            # The output fields belong to the `ScriptOutput`, which is saved
+            # separately.
+            kwargs["update_fields"] = [
+                name
+                for name in update_fields
+                if name not in SCRIPT_OUTPUT_FIELDS
+            ]
+            if len(kwargs["update_fields"]) == 0:
+                ret = None
+            else:
+                ret = super().save(*args, **kwargs)
+        self._save_script_output(update_fields)
+        return ret
@@ -545,11 +545,9 @@ class ScriptSet(CleanSave, Model):
         from metadataserver.models import ScriptResult
 
         regenerate_scripts = {}
-        for script_result in (
-            self.scriptresult_set.filter(status=SCRIPT_STATUS.PENDING)
-            .exclude(parameters={})
-            .defer("stdout", "stderr", "output", "result")
-        ):
+        for script_result in self.scriptresult_set.filter(
+            status=SCRIPT_STATUS.PENDING
+        ).exclude(parameters={}):
             # If there are multiple storage devices or interface on the system
             # for every script which contains a storage or interface type
             # parameter there will be one ScriptResult per device. If we
@@ -24,7 +24,8 @@ from metadataserver.enum import (
     SCRIPT_STATUS_RUNNING_OR_PENDING,
     SCRIPT_TYPE,
 )
-from metadataserver.models import ScriptResult
+from metadataserver.fields import Bin
+from metadataserver.models import ScriptOutput, ScriptResult
 from metadataserver.models import scriptresult as scriptresult_module
 from provisioningserver.events import EVENT_TYPES
 
@@ -952,3 +953,129 @@ class TestScriptResult(MAASServerTestCase):
     def test_suppressed(self):
         script_result = factory.make_ScriptResult(suppressed=True)
         self.assertTrue(script_result.suppressed)
+
+
+class TestScriptResultOutput(MAASServerTestCase):
+    """Test the ScriptResult output stored in ScriptOutput."""
+
+    def test_stores_output_in_script_output(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        script_output = ScriptOutput.objects.get(script_result=script_result)
+        self.assertEqual(script_result.output, script_output.output)
+        self.assertEqual(script_result.stdout, script_output.stdout)
+        self.assertEqual(script_result.stderr, script_output.stderr)
+        self.assertEqual(script_result.result, script_output.result)
+
+    def test_no_script_output_without_output(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.PENDING)
+        self.assertFalse(
+            ScriptOutput.objects.filter(script_result=script_result).exists()
+        )
+        script_result = reload_object(script_result)
+        self.assertEqual(b"", script_result.output)
+        self.assertEqual(b"", script_result.stdout)
+        self.assertEqual(b"", script_result.stderr)
+        self.assertEqual(b"", script_result.result)
+
+    def test_loads_output_only_when_used(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        queries = CountQueries()
+        with queries:
+            loaded_script_result = ScriptResult.objects.get(
+                id=script_result.id
+            )
+        self.assertEqual(1, queries.num_queries)
+        with queries:
+            stdout = loaded_script_result.stdout
+            stderr = loaded_script_result.stderr
+        self.assertEqual(2, queries.num_queries)
+        self.assertEqual(script_result.stdout, stdout)
+        self.assertEqual(script_result.stderr, stderr)
+
+    def test_saves_changed_output(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        stdout = factory.make_bytes()
+        script_result.stdout = Bin(stdout)
+        script_result.save()
+        self.assertEqual(stdout, reload_object(script_result).stdout)
+
+    def test_saves_output_of_result_without_output(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PENDING)
+        )
+        stdout = factory.make_bytes()
+        script_result.stdout = Bin(stdout)
+        script_result.save()
+        self.assertEqual(stdout, reload_object(script_result).stdout)
+
+    def test_save_doesnt_save_unchanged_output(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        script_result.stdout
+        queries = CountQueries()
+        with queries:
+            script_result.save()
+        self.assertEqual(0, queries.num_queries)
+
+    def test_saves_only_changed_output_fields(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        script_result.stdout = Bin(factory.make_bytes())
+        save = self.patch(ScriptOutput, "save")
+        script_result.save()
+        self.assertThat(save, MockCalledOnceWith(update_fields=["stdout"]))
+
+    def test_save_with_update_fields_doesnt_save_other_output(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        stdout = script_result.stdout
+        script_result.stdout = Bin(factory.make_bytes())
+        script_result.suppressed = True
+        script_result.save(update_fields=["suppressed"])
+        script_result = reload_object(script_result)
+        self.assertTrue(script_result.suppressed)
+        self.assertEqual(stdout, script_result.stdout)
+
+    def test_save_with_update_fields_saves_output_among_them(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        stdout = factory.make_bytes()
+        script_result.stdout = Bin(stdout)
+        script_result.save(update_fields=["stdout"])
+        self.assertEqual(stdout, reload_object(script_result).stdout)
+
+    def test_save_with_only_output_update_fields_doesnt_save_result(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        script_result.stdout = Bin(factory.make_bytes())
+        queries = CountQueries()
+        with queries:
+            script_result.save(update_fields=["stdout"])
+        # Only the output is updated.
+        self.assertEqual(1, queries.num_queries)
+
+    def test_save_with_update_fields_saves_result_and_output(self):
+        script_result = reload_object(
+            factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        )
+        stdout = factory.make_bytes()
+        script_result.stdout = Bin(stdout)
+        script_result.suppressed = True
+        script_result.save(update_fields=["stdout", "suppressed"])
+        script_result = reload_object(script_result)
+        self.assertTrue(script_result.suppressed)
+        self.assertEqual(stdout, script_result.stdout)
+
+    def test_delete_deletes_output(self):
+        script_result = factory.make_ScriptResult(status=SCRIPT_STATUS.PASSED)
+        script_result.delete()
+        self.assertFalse(
+            ScriptOutput.objects.filter(script_result_id=script_result.id)
+        )
@@ -1,15 +1,21 @@
 # Copyright 2012-2015 Canonical Ltd.  This software is licensed under the
 # GNU Affero General Public License version 3 (see the file LICENSE).
 
-"""Test model for testing BinaryField."""
+"""Test models for testing BinaryField and CompressedBinaryField."""
 
 
 from django.db.models import Model
 
-from metadataserver.fields import BinaryField
+from metadataserver.fields import BinaryField, CompressedBinaryField
 
 
 class BinaryFieldModel(Model):
     """Test model for BinaryField.  Contains nothing but a BinaryField."""
 
     data = BinaryField(null=True)
+
+
+class CompressedBinaryFieldModel(Model):
+    """Test model for CompressedBinaryField.  Contains nothing but one."""
+
+    data = CompressedBinaryField(null=True)
@@ -73,6 +73,7 @@ from metadataserver import api
 from metadataserver.api import (
     add_event_to_node_event_log,
     check_version,
+    get_node_event_log_events,
     get_node_for_mac,
     get_node_for_request,
     get_queried_node,
@@ -245,6 +246,23 @@ class TestHelpers(MAASServerTestCase):
             )
             self.assertEqual("", event.description)
 
+    def test_get_node_event_log_events(self):
+        node = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        action = random.choice(list(EVENT_STATUS_MESSAGES))
+        self.assertEqual(
+            [
+                (EVENT_STATUS_MESSAGES[action], action, ""),
+                (
+                    EVENT_TYPES.NODE_INSTALL_EVENT_FAILED,
+                    action,
+                    "'curtin' Failed",
+                ),
+            ],
+            get_node_event_log_events(
+                node, "curtin", action, "Failed", "start", "FAILURE"
+            ),
+        )
+
     def test_add_event_to_node_event_log_logs_rack_refresh(self):
         rack = factory.make_RackController()
         origin = factory.make_name("origin")
@@ -16,7 +16,7 @@ from crochet import wait_for
 from django.db.utils import DatabaseError
 from testtools import ExpectedException
 from testtools.matchers import Equals, Is, MatchesListwise, MatchesSetwise
-from twisted.internet.defer import inlineCallbacks, succeed
+from twisted.internet.defer import Deferred, inlineCallbacks, succeed
 from twisted.web.server import NOT_DONE_YET
 from twisted.web.test.requesthelper import DummyRequest
 
@@ -37,6 +37,7 @@ from maasserver.utils.orm import (
     TransactionManagementError,
 )
 from maasserver.utils.threads import deferToDatabase
+from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
     DocTestMatches,
     MockCalledOnceWith,
@@ -44,6 +45,7 @@ from maastesting.matchers import (
     MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
 from metadataserver import api
 from metadataserver import api_twisted as api_twisted_module
 from metadataserver.api_twisted import (
@@ -199,7 +201,7 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
             for node, _ in nodes_with_tokens
         }
         dbtasks = Mock()
-        dbtasks.addTask = Mock()
+        dbtasks.deferTask.return_value = succeed(None)
         worker = StatusWorkerService(dbtasks)
         for node, token in nodes_with_tokens:
             for message in node_messages[node]:
@@ -207,7 +209,7 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
         yield worker._tryUpdateNodes()
         call_args = [
             (call_arg[0][1], call_arg[0][2])
-            for call_arg in dbtasks.addTask.call_args_list
+            for call_arg in dbtasks.deferTask.call_args_list
         ]
         self.assertThat(
             call_args,
@@ -241,40 +243,93 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
                 sentinel.message,
             )
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_tryUpdateNodes_tracks_backlog(self):
+        prometheus_metrics = self.patch(
+            api_twisted_module, "PROMETHEUS_METRICS"
+        )
+        nodes_with_tokens = yield deferToDatabase(self.make_nodes_with_tokens)
+        processed = Deferred()
+        dbtasks = Mock()
+        dbtasks.deferTask.return_value = processed
+        worker = StatusWorkerService(dbtasks)
+        node, token = nodes_with_tokens[0]
+        worker.queueMessage(token.key, self.make_message())
+        worker.queueMessage(token.key, self.make_message())
+        yield worker._tryUpdateNodes()
+        self.assertEqual(2, worker.processing)
+        processed.callback(None)
+        self.assertEqual(0, worker.processing)
+        self.assertThat(
+            prometheus_metrics.update,
+            MockCallsMatch(
+                *[
+                    call(
+                        "maas_region_status_message_backlog",
+                        "set",
+                        value=value,
+                    )
+                    for value in [1, 2, 0, 2, 0]
+                ]
+            ),
+        )
+
     @wait_for_reactor
     @inlineCallbacks
     def test_processMessages_doesnt_call_when_node_deleted(self):
         worker = StatusWorkerService(sentinel.dbtasks)
-        mock_processMessage = self.patch(worker, "_processMessage")
-        mock_processMessage.return_value = False
+        mock_processNodeMessage = self.patch(worker, "_processNodeMessage")
+        nodes_with_tokens = yield deferToDatabase(self.make_nodes_with_tokens)
+        node, _ = nodes_with_tokens[0]
+        yield deferToDatabase(transactional(node.delete))
         yield deferToDatabase(
             worker._processMessages,
-            sentinel.node,
+            node,
             [sentinel.message1, sentinel.message2],
         )
-        self.assertThat(
-            mock_processMessage,
-            MockCalledOnceWith(sentinel.node, sentinel.message1),
-        )
+        self.assertThat(mock_processNodeMessage, MockNotCalled())
 
     @wait_for_reactor
     @inlineCallbacks
-    def test_processMessages_calls_processMessage(self):
+    def test_processMessages_calls_processNodeMessage(self):
         worker = StatusWorkerService(sentinel.dbtasks)
-        mock_processMessage = self.patch(worker, "_processMessage")
+        mock_processNodeMessage = self.patch(worker, "_processNodeMessage")
+        nodes_with_tokens = yield deferToDatabase(self.make_nodes_with_tokens)
+        node, _ = nodes_with_tokens[0]
         yield deferToDatabase(
             worker._processMessages,
-            sentinel.node,
+            node,
             [sentinel.message1, sentinel.message2],
         )
         self.assertThat(
-            mock_processMessage,
+            mock_processNodeMessage,
             MockCallsMatch(
-                call(sentinel.node, sentinel.message1),
-                call(sentinel.node, sentinel.message2),
+                call(node, sentinel.message1, []),
+                call(node, sentinel.message2, []),
             ),
         )
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_processMessages_continues_after_failure(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        mock_processNodeMessage = self.patch(worker, "_processNodeMessage")
+        mock_processNodeMessage.side_effect = [factory.make_exception(), None]
+        nodes_with_tokens = yield deferToDatabase(self.make_nodes_with_tokens)
+        node, _ = nodes_with_tokens[0]
+        with TwistedLoggerFixture() as logger:
+            yield deferToDatabase(
+                worker._processMessages,
+                node,
+                [sentinel.message1, sentinel.message2],
+            )
+        self.assertEqual(2, mock_processNodeMessage.call_count)
+        self.assertIn(
+            "Failed to process message for node: %s" % node.hostname,
+            logger.output,
+        )
+
     @wait_for_reactor
     @inlineCallbacks
     def test_queueMessages_processes_top_level_message_instantly(self):
@@ -380,6 +435,79 @@ class TestStatusWorkerService(MAASServerTestCase):
             CURTIN_INSTALL_LOG + " changed status from 'Pending' to 'Running'",
         )
 
+    def make_progress_message(self, name="start"):
+        return {
+            "event_type": "start",
+            "origin": "curtin",
+            "name": "cmd-install/stage-%s" % name,
+            "description": factory.make_name("description"),
+            "timestamp": now() - timedelta(seconds=random.randint(1, 60)),
+        }
+
+    def test_process_node_messages_saves_events(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.DEPLOYING, with_empty_script_sets=True
+        )
+        messages = [self.make_progress_message() for _ in range(3)]
+        worker = StatusWorkerService(sentinel.dbtasks)
+        worker._processNodeMessages(node, messages)
+        self.assertEqual(
+            [
+                (
+                    "cmd-install/stage-start",
+                    "'curtin' %s" % message["description"],
+                    message["timestamp"],
+                )
+                for message in messages
+            ],
+            [
+                (event.action, event.description, event.created)
+                for event in Event.objects.filter(node=node).order_by("id")
+            ],
+        )
+
+    def test_process_node_messages_skips_events_of_failed_messages(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.DEPLOYING, with_empty_script_sets=True
+        )
+        messages = [self.make_progress_message() for _ in range(3)]
+        messages[1]["files"] = [
+            {
+                "path": "sample.txt",
+                "encoding": "base64",
+                "compression": "unknown",
+                "content": encode_as_base64(b"content"),
+            }
+        ]
+        worker = StatusWorkerService(sentinel.dbtasks)
+        with TwistedLoggerFixture():
+            worker._processNodeMessages(node, messages)
+        self.assertItemsEqual(
+            [messages[0]["description"], messages[2]["description"]],
+            [
+                event.description.split(" ", 1)[1]
+                for event in Event.objects.filter(node=node)
+            ],
+        )
+
+    def test_process_node_messages_uses_fixed_number_of_queries(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.DEPLOYING, with_empty_script_sets=True
+        )
+        worker = StatusWorkerService(sentinel.dbtasks)
+        # Register the event types first.
+        worker._processNodeMessages(node, [self.make_progress_message()])
+        num_queries_one, _ = count_queries(
+            worker._processNodeMessages, node, [self.make_progress_message()]
+        )
+        num_queries_many, _ = count_queries(
+            worker._processNodeMessages,
+            node,
+            [self.make_progress_message() for _ in range(10)],
+        )
+        # Each message only adds a savepoint and its release.
+        self.assertEqual(num_queries_one + 9 * 2, num_queries_many)
+
     def test_process_message_returns_false_when_node_deleted(self):
         node1 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
         node1.delete()
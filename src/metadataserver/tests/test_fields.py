@@ -5,14 +5,20 @@
 
 
 from base64 import b64encode
+import zlib
+
+from django.db import connection
 
 from maasserver.testing.testcase import (
     MAASLegacyTransactionServerTestCase,
     MAASServerTestCase,
 )
 from maastesting.factory import factory
-from metadataserver.fields import Bin, BinaryField
-from metadataserver.tests.models import BinaryFieldModel
+from metadataserver.fields import Bin, BinaryField, CompressedBinaryField
+from metadataserver.tests.models import (
+    BinaryFieldModel,
+    CompressedBinaryFieldModel,
+)
 
 
 class TestBin(MAASServerTestCase):
@@ -104,3 +110,65 @@ class TestBinaryField(MAASLegacyTransactionServerTestCase):
         field = BinaryField(null=True)
         self.patch(field, "default", b"wotcha")
         self.assertEqual(Bin(b"wotcha"), field.get_default())
+
+
+class TestCompressedBinaryField(MAASLegacyTransactionServerTestCase):
+    """Test CompressedBinaryField.  Uses CompressedBinaryFieldModel."""
+
+    apps = ["metadataserver.tests"]
+
+    def get_stored_data(self, binary_item):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT data FROM %s WHERE id = %%s"
+                % CompressedBinaryFieldModel._meta.db_table,
+                [binary_item.id],
+            )
+            return bytes(cursor.fetchone()[0])
+
+    def test_stores_and_retrieves_None(self):
+        binary_item = CompressedBinaryFieldModel()
+        self.assertIsNone(binary_item.data)
+        binary_item.save()
+        self.assertIsNone(
+            CompressedBinaryFieldModel.objects.get(id=binary_item.id).data
+        )
+
+    def test_stores_and_retrieves_binary_data(self):
+        data = b"\x01\x02\xff\xff\xfe\xff\xff\xfe\x00" * 100
+        binary_item = CompressedBinaryFieldModel(data=Bin(data))
+        binary_item.save()
+        retrieved_data = CompressedBinaryFieldModel.objects.get(
+            id=binary_item.id
+        ).data
+        self.assertEqual(data, retrieved_data)
+        self.assertIsInstance(retrieved_data, Bin)
+
+    def test_stores_compressed_data(self):
+        data = factory.make_string(size=1000).encode("ascii") * 100
+        binary_item = CompressedBinaryFieldModel(data=Bin(data))
+        binary_item.save()
+        stored_data = self.get_stored_data(binary_item)
+        self.assertLess(len(stored_data), len(data))
+        self.assertEqual(data, zlib.decompress(stored_data))
+
+    def test_stores_empty_data_uncompressed(self):
+        binary_item = CompressedBinaryFieldModel(data=Bin(b""))
+        binary_item.save()
+        self.assertEqual(b"", self.get_stored_data(binary_item))
+        self.assertEqual(
+            binary_item, CompressedBinaryFieldModel.objects.get(data=b"")
+        )
+
+    def test_decompress(self):
+        data = factory.make_bytes()
+        self.assertEqual(
+            data, CompressedBinaryField.decompress(zlib.compress(data))
+        )
+        self.assertEqual(b"", CompressedBinaryField.decompress(b""))
+        self.assertIsNone(CompressedBinaryField.decompress(None))
+
+    def test_get_default_returns_Bin(self):
+        field = CompressedBinaryField(default=b"wotcha")
+        self.assertEqual(Bin(b"wotcha"), field.get_default())
+        self.assertIsInstance(field.get_default(), Bin)
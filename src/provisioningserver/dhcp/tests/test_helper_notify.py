@@ -39,10 +39,12 @@ class TestDHCPNotify(MAASTestCase):
         service = LeaseSocketService(sentinel.service, reactor)
         dv = DeferredValue()
 
-        def mock_processNotification(*args, **kwargs):
+        def mock_processNotificationBatch(*args, **kwargs):
             dv.set(args)
 
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(
+            service, "processNotificationBatch", mock_processNotificationBatch
+        )
 
         return socket_path, service, dv
 
@@ -81,8 +83,9 @@ class TestDHCPNotify(MAASTestCase):
         )
         yield done.get(timeout=10)
 
+        [notification] = done.value[0]
         self.assertThat(
-            done.value[0],
+            notification,
             MatchesDict(
                 {
                     "action": Equals(action),
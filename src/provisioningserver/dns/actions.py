@@ -127,11 +127,13 @@ def bind_write_options(upstream_dns, dnssec_validation):
     )
 
 
-def bind_write_zones(zones):
+def bind_write_zones(zones, zone_names=None):
     """Write out DNS zones.
 
     :param zones: Those zones to write.
     :type zones: Sequence of :py:class:`DomainData`.
+    :param zone_names: Optional collection of zone names. When given, only
+        the zone files for those zones are written.
     """
     for zone in zones:
-        zone.write_config()
+        zone.write_config(zone_names=zone_names)
@@ -22,6 +22,7 @@ from twisted.python.filepath import FilePath
 from maastesting.factory import factory
 from maastesting.matchers import MockNotCalled
 from maastesting.testcase import MAASTestCase
+from provisioningserver.dns import zoneconfig as zoneconfig_module
 from provisioningserver.dns.config import get_dns_config_dir
 from provisioningserver.dns.testing import patch_dns_config_path
 from provisioningserver.dns.zoneconfig import (
@@ -667,6 +668,95 @@ class TestDNSReverseZoneConfig(MAASTestCase):
             self.assertTrue(filepath.getPermissions().other.read)
 
 
+class TestDomainConfigFingerprints(MAASTestCase):
+    """Tests for `DomainConfigBase.get_zone_fingerprints`."""
+
+    def make_forward_zone(self, domain, serial, ip, ttl=30):
+        return DNSForwardZoneConfig(
+            domain,
+            serial=serial,
+            mapping={"host": HostnameIPMapping(None, ttl, {ip})},
+        )
+
+    def test_fingerprints_every_reverse_zone(self):
+        dns_zone_config = DNSReverseZoneConfig(
+            factory.make_string(),
+            serial=random.randint(1, 100),
+            network=IPNetwork("192.168.0.1/22"),
+        )
+        self.assertItemsEqual(
+            [zi.zone_name for zi in dns_zone_config.zone_info],
+            dns_zone_config.get_zone_fingerprints().keys(),
+        )
+
+    def test_fingerprint_ignores_serial(self):
+        domain = factory.make_string()
+        ip = factory.make_ipv4_address()
+        zone1 = self.make_forward_zone(domain, 1, ip)
+        zone2 = self.make_forward_zone(domain, 2, ip)
+        self.assertEqual(
+            zone1.get_zone_fingerprints(), zone2.get_zone_fingerprints()
+        )
+
+    def test_fingerprint_changes_with_records(self):
+        domain = factory.make_string()
+        network = factory.make_ipv4_network()
+        ip1 = factory.pick_ip_in_network(network)
+        ip2 = factory.pick_ip_in_network(network, but_not={ip1})
+        zone1 = self.make_forward_zone(domain, 1, ip1)
+        zone2 = self.make_forward_zone(domain, 1, ip2)
+        self.assertNotEqual(
+            zone1.get_zone_fingerprints(), zone2.get_zone_fingerprints()
+        )
+
+    def test_fingerprint_changes_with_ttl(self):
+        domain = factory.make_string()
+        ip = factory.make_ipv4_address()
+        zone1 = self.make_forward_zone(domain, 1, ip, ttl=30)
+        zone2 = self.make_forward_zone(domain, 1, ip, ttl=60)
+        self.assertNotEqual(
+            zone1.get_zone_fingerprints(), zone2.get_zone_fingerprints()
+        )
+
+    def test_fingerprint_ignores_order_of_records(self):
+        domain = factory.make_string()
+        mapping = {
+            factory.make_name("host"): HostnameIPMapping(
+                None, 30, {factory.make_ipv4_address()}
+            )
+            for _ in range(3)
+        }
+        zone1 = DNSForwardZoneConfig(domain, serial=1, mapping=mapping)
+        zone2 = DNSForwardZoneConfig(
+            domain, serial=1, mapping=dict(reversed(list(mapping.items())))
+        )
+        self.assertEqual(
+            zone1.get_zone_fingerprints(), zone2.get_zone_fingerprints()
+        )
+
+    def test_fingerprint_doesnt_render_zones(self):
+        render_dns_template = self.patch(
+            zoneconfig_module, "render_dns_template"
+        )
+        zone = self.make_forward_zone(
+            factory.make_string(), 1, factory.make_ipv4_address()
+        )
+        zone.get_zone_fingerprints()
+        self.assertThat(render_dns_template, MockNotCalled())
+
+    def test_write_config_writes_only_named_zones(self):
+        patch_dns_config_path(self)
+        dns_zone_config = DNSReverseZoneConfig(
+            factory.make_string(),
+            serial=random.randint(1, 100),
+            network=IPNetwork("192.168.0.1/22"),
+        )
+        written, skipped = dns_zone_config.zone_info[:2]
+        dns_zone_config.write_config(zone_names={written.zone_name})
+        self.assertTrue(os.path.exists(written.target_path))
+        self.assertFalse(os.path.exists(skipped.target_path))
+
+
 class TestDNSReverseZoneConfig_GetGenerateDirectives(MAASTestCase):
     """Tests for `DNSReverseZoneConfig.get_GENERATE_directives()`."""
 
@@ -4,7 +4,9 @@
 """Classes for generating BIND zone config files."""
 
 
+from collections.abc import Iterator
 from datetime import datetime
+from hashlib import sha256
 from itertools import chain
 
 from netaddr import IPAddress, IPNetwork, spanning_cidr
@@ -31,6 +33,33 @@ def get_fqdn_or_ip_address(target):
         return target.rstrip(".") + "."
 
 
+def fingerprint_data(value):
+    """Return `value`, as found in template parameters, as a string.
+
+    Dicts, lists, sets and generators are sorted, so that the string only
+    changes when the contents do, not the order they were gathered in.
+    Generators are consumed.
+    """
+    if isinstance(value, dict):
+        return "{%s}" % ", ".join(
+            sorted(
+                "%s: %s" % (fingerprint_data(key), fingerprint_data(item))
+                for key, item in value.items()
+            )
+        )
+    elif isinstance(value, tuple):
+        return "(%s)" % ", ".join(fingerprint_data(item) for item in value)
+    elif isinstance(value, (list, set, frozenset, Iterator)):
+        return "[%s]" % ", ".join(
+            sorted(fingerprint_data(item) for item in value)
+        )
+    elif value is None or isinstance(value, (str, bytes, int, float)):
+        return repr(value)
+    else:
+        # E.g. IPAddress or IPNetwork.
+        return repr(str(value))
+
+
 def enumerate_ip_mapping(mapping):
     """Generate `(hostname, ttl, value)` tuples from `mapping`.
 
@@ -155,6 +184,50 @@ class DomainConfigBase:
             "ns_host_name": self.ns_host_name,
         }
 
+    def get_zone_parameters(self, zone_info):
+        """Return the template parameters specific to the zone `zone_info`.
+
+        :param zone_info: One of this config's `DomainInfo` entries.
+        """
+        raise NotImplementedError()
+
+    def get_zone_fingerprints(self):
+        """Return a `{zone_name: fingerprint}` dict for this config's zones.
+
+        The fingerprint is computed over the template parameters of the zone
+        without its serial and modification time, so it changes only when the
+        records in the zone change. The zone isn't rendered, so that only the
+        zones that changed are rendered when they're written.
+        """
+        parameters = dict(self.make_parameters(), serial=0, modified="")
+        fingerprints = {}
+        for zi in self.zone_info:
+            data = fingerprint_data(
+                (
+                    self.template_file_name,
+                    parameters,
+                    self.get_zone_parameters(zi),
+                )
+            )
+            fingerprints[zi.zone_name] = sha256(
+                data.encode("utf-8")
+            ).hexdigest()
+        return fingerprints
+
+    def write_config(self, zone_names=None):
+        """Write the zone files.
+
+        :param zone_names: Optional collection of zone names. When given,
+            only the zone files for those zones are written.
+        """
+        for zi in self.zone_info:
+            if zone_names is None or zi.zone_name in zone_names:
+                self.write_zone_file(
+                    zi.target_path,
+                    self.make_parameters(),
+                    self.get_zone_parameters(zi),
+                )
+
     @classmethod
     def write_zone_file(cls, output_file, *parameters):
         """Write a zone file based on the zone file template.
@@ -281,33 +354,24 @@ class DNSForwardZoneConfig(DomainConfigBase):
 
         return sorted(generate_directives, key=lambda directive: directive[2])
 
-    def write_config(self):
-        """Write the zone file."""
+    def get_zone_parameters(self, zone_info):
+        """See `DomainConfigBase.get_zone_parameters`."""
         # Create GENERATE directives for IPv4 ranges.
-        for zi in self.zone_info:
-            generate_directives = list(
-                chain.from_iterable(
-                    self.get_GENERATE_directives(dynamic_range)
-                    for dynamic_range in self._dynamic_ranges
-                    if dynamic_range.version == 4
-                )
-            )
-            self.write_zone_file(
-                zi.target_path,
-                self.make_parameters(),
-                {
-                    "mappings": {
-                        "A": self.get_A_mapping(self._mapping, self._ipv4_ttl),
-                        "AAAA": self.get_AAAA_mapping(
-                            self._mapping, self._ipv6_ttl
-                        ),
-                    },
-                    "other_mapping": enumerate_rrset_mapping(
-                        self._other_mapping
-                    ),
-                    "generate_directives": {"A": generate_directives},
-                },
+        generate_directives = list(
+            chain.from_iterable(
+                self.get_GENERATE_directives(dynamic_range)
+                for dynamic_range in self._dynamic_ranges
+                if dynamic_range.version == 4
             )
+        )
+        return {
+            "mappings": {
+                "A": self.get_A_mapping(self._mapping, self._ipv4_ttl),
+                "AAAA": self.get_AAAA_mapping(self._mapping, self._ipv6_ttl),
+            },
+            "other_mapping": enumerate_rrset_mapping(self._other_mapping),
+            "generate_directives": {"A": generate_directives},
+        }
 
 
 class DNSReverseZoneConfig(DomainConfigBase):
@@ -533,34 +597,29 @@ class DNSReverseZoneConfig(DomainConfigBase):
                 generate_directives.add((iterator, "${0,1,x}", hostname))
         return sorted(generate_directives)
 
-    def write_config(self):
-        """Write the zone file."""
+    def get_zone_parameters(self, zone_info):
+        """See `DomainConfigBase.get_zone_parameters`."""
         # Create GENERATE directives for IPv4 ranges.
-        for zi in self.zone_info:
-            generate_directives = list(
-                chain.from_iterable(
-                    self.get_GENERATE_directives(
-                        dynamic_range, self.domain, zi
-                    )
-                    for dynamic_range in self._dynamic_ranges
-                    if dynamic_range.version == 4
+        generate_directives = list(
+            chain.from_iterable(
+                self.get_GENERATE_directives(
+                    dynamic_range, self.domain, zone_info
                 )
+                for dynamic_range in self._dynamic_ranges
+                if dynamic_range.version == 4
             )
-            self.write_zone_file(
-                zi.target_path,
-                self.make_parameters(),
-                {
-                    "mappings": {
-                        "PTR": self.get_PTR_mapping(
-                            self._mapping, zi.subnetwork
-                        )
-                    },
-                    "other_mapping": [],
-                    "generate_directives": {
-                        "PTR": generate_directives,
-                        "CNAME": self.get_rfc2317_GENERATE_directives(
-                            zi.subnetwork, self._rfc2317_ranges, self.domain
-                        ),
-                    },
-                },
-            )
+        )
+        return {
+            "mappings": {
+                "PTR": self.get_PTR_mapping(
+                    self._mapping, zone_info.subnetwork
+                )
+            },
+            "other_mapping": [],
+            "generate_directives": {
+                "PTR": generate_directives,
+                "CNAME": self.get_rfc2317_GENERATE_directives(
+                    zone_info.subnetwork, self._rfc2317_ranges, self.domain
+                ),
+            },
+        }
@@ -4,13 +4,19 @@
 """LXD Pod Driver."""
 
 
+from collections import defaultdict
 from contextlib import suppress
 import re
+import time
 from urllib.parse import urlparse
 
 from pylxd import Client
 from pylxd.exceptions import ClientConnectionFailed, NotFound
-from twisted.internet.defer import ensureDeferred, inlineCallbacks
+from twisted.internet.defer import (
+    DeferredLock,
+    ensureDeferred,
+    inlineCallbacks,
+)
 from twisted.internet.threads import deferToThread
 
 from provisioningserver.drivers import (
@@ -50,6 +56,14 @@ maaslog = get_maas_logger("drivers.pod.lxd")
 # LXD status codes
 LXD_VM_POWER_STATE = {101: "on", 102: "off", 103: "on", 110: "off"}
 
+# How long a connected client is reused before checking that it still
+# works, in seconds.
+LXD_CLIENT_CHECK_INTERVAL = 60
+
+# How long the status codes of the instances on a LXD host are shared by
+# the power queries of its VMs, in seconds.
+LXD_POWER_STATES_TTL = 5
+
 
 # LXD byte suffixes.
 # https://lxd.readthedocs.io/en/latest/instances/#units-for-storage-and-network-limits
@@ -141,6 +155,63 @@ class LXDPodError(Exception):
     """Failure communicating to LXD. """
 
 
+# Connected clients, keyed by (endpoint, password, certificate); see
+# `_get_client_key`. Values are tuples of (client, time of the next check).
+_clients = {}
+
+# Status codes of the instances on each LXD host, keyed by endpoint. Values
+# are tuples of ({instance name: status code}, expiry time).
+_power_states = {}
+
+# Locks so that concurrent requests for the same client share it, and
+# concurrent requests for the same endpoint a single fetch of the power
+# states.
+_client_locks = defaultdict(DeferredLock)
+_power_states_locks = defaultdict(DeferredLock)
+
+
+def _is_client_healthy(client):
+    """Whether `client` can still reach LXD, and is trusted by it."""
+    try:
+        response = client.api.get()
+        return response.json()["metadata"]["auth"] == "trusted"
+    except Exception:
+        # Whatever went wrong, the client can't be used anymore.
+        return False
+
+
+def _get_instances_status_codes(client):
+    """Return the status codes of all instances, by name.
+
+    A single recursive request fetches all the instances, rather than one
+    request per instance.
+    """
+    response = client.api.instances.get(params={"recursion": 1})
+    return {
+        instance["name"]: instance["status_code"]
+        for instance in response.json()["metadata"]
+    }
+
+
+def _get_client_key(endpoint, context):
+    """Return the key of the cached client for `endpoint`.
+
+    A client is only reused with the password and certificate it connected
+    with, so that changing either connects a new client.
+    """
+    return endpoint, context.get("password"), get_maas_cert_tuple()
+
+
+def _forget_client(endpoint):
+    """Drop the cached clients and power states for `endpoint`.
+
+    This is done when a request fails, so that the next one reconnects.
+    """
+    for key in [key for key in _clients if key[0] == endpoint]:
+        del _clients[key]
+    _power_states.pop(endpoint, None)
+
+
 class LXDPodDriver(PodDriver):
 
     name = "lxd"
@@ -192,15 +263,40 @@ class LXDPodDriver(PodDriver):
     @typed
     @inlineCallbacks
     def get_client(self, pod_id: str, context: dict):
-        """Connect pylxd client."""
+        """Return a connected pylxd client.
+
+        Clients are cached per endpoint, password and certificate, and
+        reused, checking that they still work every
+        `LXD_CLIENT_CHECK_INTERVAL` seconds.
+        """
         endpoint = self.get_url(context)
-        password = context.get("password")
+        key = _get_client_key(endpoint, context)
+        lock = _client_locks[key]
+        yield lock.acquire()
+        try:
+            client, next_check = _clients.get(key, (None, 0))
+            if client is not None and next_check <= time.monotonic():
+                healthy = yield deferToThread(_is_client_healthy, client)
+                if not healthy:
+                    _forget_client(endpoint)
+                    client = None
+            if client is None:
+                client = yield self._connect_client(pod_id, *key)
+            if next_check <= time.monotonic():
+                _clients[key] = (
+                    client,
+                    time.monotonic() + LXD_CLIENT_CHECK_INTERVAL,
+                )
+        finally:
+            lock.release()
+        return client
+
+    @inlineCallbacks
+    def _connect_client(self, pod_id, endpoint, password, cert):
+        """Connect a new pylxd client to `endpoint`."""
         try:
             client = yield deferToThread(
-                Client,
-                endpoint=endpoint,
-                cert=get_maas_cert_tuple(),
-                verify=False,
+                Client, endpoint=endpoint, cert=cert, verify=False
             )
             if not client.trusted:
                 if password:
@@ -229,8 +325,44 @@ class LXDPodDriver(PodDriver):
             raise LXDPodError(
                 f"Pod {pod_id}: LXD VM {instance_name} not found."
             )
+        except Exception:
+            _forget_client(self.get_url(context))
+            raise
         return machine
 
+    @typed
+    @inlineCallbacks
+    def get_power_states(self, pod_id: str, context: dict, refresh=False):
+        """Return the status codes of the instances on the LXD host.
+
+        They're fetched with a single request, and shared by the power
+        queries of all the VMs on the host for `LXD_POWER_STATES_TTL`
+        seconds, unless `refresh` is set.
+
+        :return: A dict of instance name to status code.
+        """
+        endpoint = self.get_url(context)
+        lock = _power_states_locks[endpoint]
+        yield lock.acquire()
+        try:
+            states, expires = _power_states.get(endpoint, (None, 0))
+            if refresh or expires <= time.monotonic():
+                client = yield self.get_client(pod_id, context)
+                try:
+                    states = yield deferToThread(
+                        _get_instances_status_codes, client
+                    )
+                except Exception:
+                    _forget_client(endpoint)
+                    raise
+                _power_states[endpoint] = (
+                    states,
+                    time.monotonic() + LXD_POWER_STATES_TTL,
+                )
+        finally:
+            lock.release()
+        return states
+
     async def get_discovered_machine(
         self, client, machine, storage_pools, request=None
     ):
@@ -392,6 +524,9 @@ class LXDPodDriver(PodDriver):
     def power_on(self, pod_id: str, context: dict):
         """Power on LXD VM."""
         machine = yield self.get_machine(pod_id, context)
+        # The state is about to change, so don't answer the queries that
+        # follow from the cached states.
+        _power_states.pop(self.get_url(context), None)
         if LXD_VM_POWER_STATE[machine.status_code] == "off":
             yield deferToThread(machine.start)
 
@@ -401,6 +536,7 @@ class LXDPodDriver(PodDriver):
     def power_off(self, pod_id: str, context: dict):
         """Power off LXD VM."""
         machine = yield self.get_machine(pod_id, context)
+        _power_states.pop(self.get_url(context), None)
         if LXD_VM_POWER_STATE[machine.status_code] == "on":
             yield deferToThread(machine.stop)
 
@@ -408,9 +544,21 @@ class LXDPodDriver(PodDriver):
     @asynchronous
     @inlineCallbacks
     def power_query(self, pod_id: str, context: dict):
-        """Power query LXD VM."""
-        machine = yield self.get_machine(pod_id, context)
-        state = machine.status_code
+        """Power query LXD VM.
+
+        The state is looked up in the states of all the instances on the
+        host, so that querying every VM on a host takes a single request.
+        """
+        instance_name = context.get("instance_name")
+        states = yield self.get_power_states(pod_id, context)
+        if instance_name not in states:
+            # The VM may have been created since the states were fetched.
+            states = yield self.get_power_states(pod_id, context, refresh=True)
+        if instance_name not in states:
+            raise LXDPodError(
+                f"Pod {pod_id}: LXD VM {instance_name} not found."
+            )
+        state = states[instance_name]
         try:
             return LXD_VM_POWER_STATE[state]
         except KeyError:
@@ -5,14 +5,14 @@
 
 from os.path import join
 import random
-from unittest.mock import Mock, PropertyMock, sentinel
+from unittest.mock import ANY, call, Mock, PropertyMock, sentinel
 
 from testtools.matchers import Equals, IsInstance, MatchesAll, MatchesStructure
 from testtools.testcase import ExpectedException
-from twisted.internet.defer import ensureDeferred, inlineCallbacks
+from twisted.internet.defer import ensureDeferred, inlineCallbacks, succeed
 
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockCallsMatch
 from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
 from provisioningserver import maas_certificates
 from provisioningserver.drivers.pod import (
@@ -93,6 +93,11 @@ class TestLXDPodDriver(MAASTestCase):
         # Generating the cert tuple can be slow and aren't necessary
         # for the tests.
         self.patch(maas_certificates, "generate_certificate_if_needed")
+        self.patch(lxd_module, "_clients", {})
+        self.patch(lxd_module, "_power_states", {})
+
+    def get_client_key(self, driver, context):
+        return lxd_module._get_client_key(driver.get_url(context), context)
 
     def test_missing_packages(self):
         driver = lxd_module.LXDPodDriver()
@@ -193,6 +198,102 @@ class TestLXDPodDriver(MAASTestCase):
         with ExpectedException(lxd_module.LXDPodError, error_msg):
             yield driver.get_client(pod_id, context)
 
+    @inlineCallbacks
+    def test_get_client_reuses_client(self):
+        context = self.make_parameters_context()
+        Client = self.patch(lxd_module, "Client")
+        driver = lxd_module.LXDPodDriver()
+        client1 = yield driver.get_client(None, context)
+        client2 = yield driver.get_client(None, context)
+        self.assertIs(client1, client2)
+        self.assertEqual(1, Client.call_count)
+        client1.api.get.assert_not_called()
+
+    @inlineCallbacks
+    def test_get_client_reconnects_when_password_changes(self):
+        context = self.make_parameters_context()
+        Client = self.patch(lxd_module, "Client")
+        Client.side_effect = [Mock(), Mock()]
+        driver = lxd_module.LXDPodDriver()
+        old_client = yield driver.get_client(None, context)
+        context["password"] = factory.make_name("password")
+        new_client = yield driver.get_client(None, context)
+        self.assertIsNot(old_client, new_client)
+        self.assertEqual(2, Client.call_count)
+
+    @inlineCallbacks
+    def test_get_client_reconnects_when_certificate_changes(self):
+        context = self.make_parameters_context()
+        Client = self.patch(lxd_module, "Client")
+        Client.side_effect = [Mock(), Mock()]
+        get_maas_cert_tuple = self.patch(lxd_module, "get_maas_cert_tuple")
+        get_maas_cert_tuple.return_value = (sentinel.cert, sentinel.key)
+        driver = lxd_module.LXDPodDriver()
+        old_client = yield driver.get_client(None, context)
+        get_maas_cert_tuple.return_value = (sentinel.new_cert, sentinel.key)
+        new_client = yield driver.get_client(None, context)
+        self.assertIsNot(old_client, new_client)
+        self.assertThat(
+            Client,
+            MockCallsMatch(
+                call(
+                    endpoint=ANY,
+                    cert=(sentinel.cert, sentinel.key),
+                    verify=False,
+                ),
+                call(
+                    endpoint=ANY,
+                    cert=(sentinel.new_cert, sentinel.key),
+                    verify=False,
+                ),
+            ),
+        )
+
+    @inlineCallbacks
+    def test_get_client_checks_cached_client(self):
+        context = self.make_parameters_context()
+        Client = self.patch(lxd_module, "Client")
+        client = Client.return_value
+        client.api.get.return_value.json.return_value = {
+            "metadata": {"auth": "trusted"}
+        }
+        driver = lxd_module.LXDPodDriver()
+        key = self.get_client_key(driver, context)
+        yield driver.get_client(None, context)
+        lxd_module._clients[key] = (client, 0)
+        returned_client = yield driver.get_client(None, context)
+        self.assertIs(client, returned_client)
+        self.assertThat(client.api.get, MockCalledOnceWith())
+        self.assertEqual(1, Client.call_count)
+        _, next_check = lxd_module._clients[key]
+        self.assertGreater(next_check, 0)
+
+    @inlineCallbacks
+    def test_get_client_reconnects_when_cached_client_unhealthy(self):
+        context = self.make_parameters_context()
+        Client = self.patch(lxd_module, "Client")
+        Client.side_effect = [Mock(), Mock()]
+        driver = lxd_module.LXDPodDriver()
+        key = self.get_client_key(driver, context)
+        old_client = yield driver.get_client(None, context)
+        old_client.api.get.side_effect = lxd_module.ClientConnectionFailed()
+        lxd_module._clients[key] = (old_client, 0)
+        new_client = yield driver.get_client(None, context)
+        self.assertIsNot(old_client, new_client)
+        self.assertEqual(2, Client.call_count)
+        self.assertIs(new_client, lxd_module._clients[key][0])
+
+    @inlineCallbacks
+    def test_get_client_doesnt_cache_failed_client(self):
+        context = self.make_parameters_context()
+        context["password"] = None
+        Client = self.patch(lxd_module, "Client")
+        Client.return_value.trusted = False
+        driver = lxd_module.LXDPodDriver()
+        with ExpectedException(lxd_module.LXDPodError):
+            yield driver.get_client(None, context)
+        self.assertEqual({}, lxd_module._clients)
+
     @inlineCallbacks
     def test_get_machine(self):
         context = self.make_parameters_context()
@@ -218,6 +319,92 @@ class TestLXDPodDriver(MAASTestCase):
         with ExpectedException(lxd_module.LXDPodError, error_msg):
             yield driver.get_machine(pod_id, context)
 
+    @inlineCallbacks
+    def test_get_machine_forgets_client_on_error(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        key = self.get_client_key(driver, context)
+        client = Mock()
+        client.virtual_machines.get.side_effect = (
+            lxd_module.ClientConnectionFailed()
+        )
+        lxd_module._clients[key] = (client, float("inf"))
+        with ExpectedException(lxd_module.ClientConnectionFailed):
+            yield driver.get_machine(None, context)
+        self.assertEqual({}, lxd_module._clients)
+
+    def patch_instances(self, client, status_codes):
+        client.api.instances.get.return_value.json.return_value = {
+            "metadata": [
+                {"name": name, "status_code": status_code}
+                for name, status_code in status_codes.items()
+            ]
+        }
+
+    @inlineCallbacks
+    def test_get_power_states(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        client = self.patch(driver, "get_client").return_value
+        status_codes = {
+            factory.make_name("instance"): 103,
+            factory.make_name("instance"): 102,
+        }
+        self.patch_instances(client, status_codes)
+        states = yield driver.get_power_states(None, context)
+        self.assertEqual(status_codes, states)
+        self.assertThat(
+            client.api.instances.get,
+            MockCalledOnceWith(params={"recursion": 1}),
+        )
+
+    @inlineCallbacks
+    def test_get_power_states_reuses_recent_states(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        client = self.patch(driver, "get_client").return_value
+        self.patch_instances(client, {context["instance_name"]: 103})
+        states1 = yield driver.get_power_states(None, context)
+        states2 = yield driver.get_power_states(None, context)
+        self.assertIs(states1, states2)
+        self.assertThat(client.api.instances.get, MockCalledOnceWith(ANY))
+
+    @inlineCallbacks
+    def test_get_power_states_refreshes_expired_states(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        endpoint = driver.get_url(context)
+        client = self.patch(driver, "get_client").return_value
+        self.patch_instances(client, {context["instance_name"]: 103})
+        lxd_module._power_states[endpoint] = ({}, 0)
+        states = yield driver.get_power_states(None, context)
+        self.assertEqual({context["instance_name"]: 103}, states)
+
+    @inlineCallbacks
+    def test_get_power_states_refreshes_when_asked(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        client = self.patch(driver, "get_client").return_value
+        self.patch_instances(client, {context["instance_name"]: 103})
+        yield driver.get_power_states(None, context)
+        yield driver.get_power_states(None, context, refresh=True)
+        self.assertEqual(2, client.api.instances.get.call_count)
+
+    @inlineCallbacks
+    def test_get_power_states_forgets_client_on_error(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        key = self.get_client_key(driver, context)
+        client = Mock()
+        client.api.instances.get.side_effect = (
+            lxd_module.ClientConnectionFailed()
+        )
+        lxd_module._clients[key] = (client, float("inf"))
+        with ExpectedException(lxd_module.ClientConnectionFailed):
+            yield driver.get_power_states(None, context)
+        self.assertEqual({}, lxd_module._clients)
+        self.assertEqual({}, lxd_module._power_states)
+
     @inlineCallbacks
     def test_power_on(self):
         context = self.make_parameters_context()
@@ -227,6 +414,19 @@ class TestLXDPodDriver(MAASTestCase):
         yield driver.power_on(None, context)
         self.assertThat(mock_machine.start, MockCalledOnceWith())
 
+    @inlineCallbacks
+    def test_power_on_forgets_power_states(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        lxd_module._power_states[driver.get_url(context)] = (
+            {},
+            float("inf"),
+        )
+        mock_machine = self.patch(driver, "get_machine").return_value
+        mock_machine.status_code = 110
+        yield driver.power_on(None, context)
+        self.assertEqual({}, lxd_module._power_states)
+
     @inlineCallbacks
     def test_power_off(self):
         context = self.make_parameters_context()
@@ -237,22 +437,83 @@ class TestLXDPodDriver(MAASTestCase):
         self.assertThat(mock_machine.stop, MockCalledOnceWith())
 
     @inlineCallbacks
-    def test_power_query(self):
+    def test_power_off_forgets_power_states(self):
         context = self.make_parameters_context()
         driver = lxd_module.LXDPodDriver()
+        lxd_module._power_states[driver.get_url(context)] = (
+            {},
+            float("inf"),
+        )
         mock_machine = self.patch(driver, "get_machine").return_value
         mock_machine.status_code = 103
+        yield driver.power_off(None, context)
+        self.assertEqual({}, lxd_module._power_states)
+
+    @inlineCallbacks
+    def test_power_query(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        get_power_states = self.patch(driver, "get_power_states")
+        get_power_states.return_value = succeed(
+            {context["instance_name"]: 103}
+        )
         state = yield driver.power_query(None, context)
         self.assertThat(state, Equals("on"))
+        self.assertThat(get_power_states, MockCalledOnceWith(None, context))
+
+    @inlineCallbacks
+    def test_power_query_shares_states_of_host(self):
+        context = self.make_parameters_context()
+        other_context = dict(
+            context, instance_name=factory.make_name("instance_name")
+        )
+        driver = lxd_module.LXDPodDriver()
+        client = self.patch(driver, "get_client").return_value
+        self.patch_instances(
+            client,
+            {
+                context["instance_name"]: 103,
+                other_context["instance_name"]: 102,
+            },
+        )
+        state = yield driver.power_query(None, context)
+        other_state = yield driver.power_query(None, other_context)
+        self.assertEqual(("on", "off"), (state, other_state))
+        self.assertThat(client.api.instances.get, MockCalledOnceWith(ANY))
+
+    @inlineCallbacks
+    def test_power_query_refreshes_states_for_unknown_instance(self):
+        context = self.make_parameters_context()
+        driver = lxd_module.LXDPodDriver()
+        get_power_states = self.patch(driver, "get_power_states")
+        get_power_states.side_effect = [
+            succeed({}),
+            succeed({context["instance_name"]: 102}),
+        ]
+        state = yield driver.power_query(None, context)
+        self.assertEqual("off", state)
+        get_power_states.assert_called_with(None, context, refresh=True)
+
+    @inlineCallbacks
+    def test_power_query_raises_error_when_machine_not_found(self):
+        context = self.make_parameters_context()
+        pod_id = factory.make_name("pod_id")
+        instance_name = context.get("instance_name")
+        driver = lxd_module.LXDPodDriver()
+        self.patch(driver, "get_power_states").return_value = succeed({})
+        error_msg = f"Pod {pod_id}: LXD VM {instance_name} not found."
+        with ExpectedException(lxd_module.LXDPodError, error_msg):
+            yield driver.power_query(pod_id, context)
 
     @inlineCallbacks
     def test_power_query_raises_error_on_unknown_state(self):
         context = self.make_parameters_context()
         pod_id = factory.make_name("pod_id")
         driver = lxd_module.LXDPodDriver()
-        mock_machine = self.patch(driver, "get_machine").return_value
-        mock_machine.status_code = 106
-        error_msg = f"Pod {pod_id}: Unknown power status code: {mock_machine.status_code}"
+        self.patch(driver, "get_power_states").return_value = succeed(
+            {context["instance_name"]: 106}
+        )
+        error_msg = f"Pod {pod_id}: Unknown power status code: 106"
         with ExpectedException(lxd_module.LXDPodError, error_msg):
             yield driver.power_query(pod_id, context)
 
@@ -4,9 +4,11 @@
 """Tests for `provisioningserver.drivers.pod.virsh`."""
 
 
+import json
 from math import floor
 import os
 import random
+import sys
 from textwrap import dedent
 from unittest.mock import ANY, call, MagicMock, sentinel
 from uuid import uuid4
@@ -15,7 +17,8 @@ from lxml import etree
 import pexpect
 from testtools.matchers import Contains, Equals
 from testtools.testcase import ExpectedException
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, succeed
+from twisted.internet.task import Clock
 from twisted.internet.threads import deferToThread
 
 from maastesting.factory import factory
@@ -112,6 +115,16 @@ SAMPLE_POOLLIST = dedent(
     """
 )
 
+SAMPLE_LIST_ALL = dedent(
+    """
+     Id   Name             State
+    ---------------------------------
+     1    example1         running
+     -    example2         shut off
+     -    example3         in shutdown
+    """
+)
+
 SAMPLE_POOLINFO = dedent(
     """
     <pool type='dir'>
@@ -392,6 +405,57 @@ SAMPLE_CAPABILITY_QEMU = dedent(
 )
 
 
+# Stands in for `virsh --connect ...`, for the domains in the JSON file
+# given as the first argument. Each command is appended to the file given
+# as the second argument, after a "connect" line when it starts.
+FAKE_VIRSH = dedent(
+    """\
+    import json
+    import sys
+
+    domains_path, log_path = sys.argv[1:3]
+
+
+    def log(line):
+        with open(log_path, "a") as fd:
+            fd.write(line + "\\n")
+
+
+    log("connect")
+    while True:
+        sys.stdout.write("virsh # ")
+        sys.stdout.flush()
+        line = sys.stdin.readline()
+        if not line:
+            break
+        args = line.split()
+        if not args:
+            continue
+        log(" ".join(args))
+        if args[0] == "quit":
+            break
+        with open(domains_path) as fd:
+            domains = json.load(fd)
+        if args == ["list", "--all"]:
+            print(" Id   Name                 State")
+            print("--------------------------------------")
+            for name, state in domains.items():
+                print(" -    %-20s %s" % (name, state))
+        elif args[0] == "domstate" and args[1] in domains:
+            print(domains[args[1]])
+        elif args[0] in ("start", "destroy") and args[1] in domains:
+            state = "running" if args[0] == "start" else "shut off"
+            domains[args[1]] = state
+            with open(domains_path, "w") as fd:
+                json.dump(domains, fd)
+            print("Domain %s %s" % (args[1], state))
+        else:
+            print("error: failed to get domain '%s'" % args[-1])
+        print()
+    """
+)
+
+
 POOLINFO_TEMPLATE = dedent(
     """
     <pool type='dir'>
@@ -730,6 +794,22 @@ class TestVirshSSH(MAASTestCase):
         )
         self.assertItemsEqual(block_devices, expected)
 
+    def test_get_machine_states(self):
+        conn = self.configure_virshssh(SAMPLE_LIST_ALL)
+        self.assertEqual(
+            {
+                "example1": virsh.VirshVMState.ON,
+                "example2": virsh.VirshVMState.OFF,
+                "example3": virsh.VirshVMState.IN_SHUTDOWN,
+            },
+            conn.get_machine_states(),
+        )
+        self.assertThat(conn.run, MockCalledOnceWith(["list", "--all"]))
+
+    def test_get_machine_states_error(self):
+        conn = self.configure_virshssh("error:")
+        self.assertIsNone(conn.get_machine_states())
+
     def test_get_machine_state(self):
         state = factory.make_name("state")
         conn = self.configure_virshssh(state)
@@ -2626,10 +2706,121 @@ class TestVirsh(MAASTestCase):
             )
 
 
+class TestVirshSessionPool(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+        self.pool = virsh.VirshSessionPool(clock=self.clock)
+        self.power_address = factory.make_name("power_address")
+        self.power_pass = factory.make_name("power_pass")
+        self.key = self.power_address, self.power_pass
+        self.login = self.patch(virsh.VirshSSH, "login")
+        self.login.return_value = True
+        self.patch(virsh.VirshSSH, "isalive").return_value = True
+        self.close_session = self.patch(virsh, "_close_session")
+
+    @inlineCallbacks
+    def test_run_logs_in_and_calls_func(self):
+        func = MagicMock(return_value=sentinel.result)
+        result = yield self.pool.run(
+            self.power_address, self.power_pass, func, sentinel.arg
+        )
+        self.assertIs(sentinel.result, result)
+        self.assertThat(
+            self.login, MockCalledOnceWith(self.power_address, self.power_pass)
+        )
+        conn = self.pool._sessions[self.key]
+        self.assertThat(func, MockCalledOnceWith(conn, sentinel.arg))
+
+    @inlineCallbacks
+    def test_run_reuses_session(self):
+        func = MagicMock()
+        yield self.pool.run(self.power_address, self.power_pass, func)
+        yield self.pool.run(self.power_address, self.power_pass, func)
+        self.assertThat(self.login, MockCalledOnceWith(ANY, ANY))
+        [(conn1,), (conn2,)] = [args for args, _ in func.call_args_list]
+        self.assertIs(conn1, conn2)
+
+    @inlineCallbacks
+    def test_run_uses_session_per_host(self):
+        func = MagicMock()
+        yield self.pool.run(self.power_address, self.power_pass, func)
+        yield self.pool.run(
+            factory.make_name("power_address"), self.power_pass, func
+        )
+        self.assertEqual(2, self.login.call_count)
+
+    @inlineCallbacks
+    def test_run_logs_in_again_when_session_died(self):
+        func = MagicMock()
+        yield self.pool.run(self.power_address, self.power_pass, func)
+        virsh.VirshSSH.isalive.return_value = False
+        yield self.pool.run(self.power_address, self.power_pass, func)
+        self.assertEqual(2, self.login.call_count)
+
+    @inlineCallbacks
+    def test_run_raises_error_on_failed_login(self):
+        self.login.return_value = False
+        func = MagicMock()
+        with ExpectedException(virsh.VirshError):
+            yield self.pool.run(self.power_address, self.power_pass, func)
+        func.assert_not_called()
+        self.assertEqual({}, self.pool._sessions)
+
+    @inlineCallbacks
+    def test_run_keeps_session_on_virsh_error(self):
+        func = MagicMock(side_effect=virsh.VirshError())
+        with ExpectedException(virsh.VirshError):
+            yield self.pool.run(self.power_address, self.power_pass, func)
+        self.assertIn(self.key, self.pool._sessions)
+        self.close_session.assert_not_called()
+
+    @inlineCallbacks
+    def test_run_closes_session_on_other_error(self):
+        func = MagicMock(side_effect=pexpect.EOF("EOF"))
+        with ExpectedException(pexpect.EOF):
+            yield self.pool.run(self.power_address, self.power_pass, func)
+        self.assertEqual({}, self.pool._sessions)
+        self.assertThat(self.close_session, MockCalledOnceWith(ANY))
+
+    @inlineCallbacks
+    def test_run_expires_idle_session(self):
+        yield self.pool.run(self.power_address, self.power_pass, MagicMock())
+        self.clock.advance(self.pool.idle_timeout - 1)
+        self.assertIn(self.key, self.pool._sessions)
+        self.clock.advance(1)
+        self.assertEqual({}, self.pool._sessions)
+        self.assertEqual([], self.clock.getDelayedCalls())
+
+    @inlineCallbacks
+    def test_run_postpones_expiry_when_reused(self):
+        yield self.pool.run(self.power_address, self.power_pass, MagicMock())
+        self.clock.advance(self.pool.idle_timeout - 1)
+        yield self.pool.run(self.power_address, self.power_pass, MagicMock())
+        self.clock.advance(1)
+        self.assertIn(self.key, self.pool._sessions)
+        self.assertEqual(1, len(self.clock.getDelayedCalls()))
+
+    @inlineCallbacks
+    def test_expire_closes_session(self):
+        yield self.pool.run(self.power_address, self.power_pass, MagicMock())
+        conn = self.pool._sessions[self.key]
+        yield self.pool._expire(self.key)
+        self.assertThat(self.close_session, MockCalledOnceWith(conn))
+
+
 class TestVirshPodDriver(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
 
+    def setUp(self):
+        super().setUp()
+        self.patch(virsh, "_session_pool", virsh.VirshSessionPool(Clock()))
+        self.patch(virsh, "_domain_states", {})
+
     def test_missing_packages(self):
         mock = self.patch(has_command_available)
         mock.return_value = False
@@ -2762,6 +2953,20 @@ class TestVirshPodDriver(MAASTestCase):
         with ExpectedException(virsh.VirshError):
             yield driver.power_control_virsh(power_address, power_id, "off")
 
+    @inlineCallbacks
+    def test_power_control_forgets_domain_states(self):
+        driver = VirshPodDriver()
+        self.patch(virsh.VirshSSH, "login").return_value = True
+        mock_state = self.patch(virsh.VirshSSH, "get_machine_state")
+        mock_state.return_value = virsh.VirshVMState.OFF
+        self.patch(virsh.VirshSSH, "poweron")
+
+        power_address = factory.make_name("power_address")
+        power_id = factory.make_name("power_id")
+        virsh._domain_states[(power_address, None)] = ({}, float("inf"))
+        yield driver.power_control_virsh(power_address, power_id, "on")
+        self.assertEqual({}, virsh._domain_states)
+
     @inlineCallbacks
     def test_power_state_login_failure(self):
         driver = VirshPodDriver()
@@ -2779,11 +2984,11 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, "login")
         mock_login.return_value = True
-        mock_state = self.patch(virsh.VirshSSH, "get_machine_state")
-        mock_state.return_value = virsh.VirshVMState.ON
-
         power_address = factory.make_name("power_address")
         power_id = factory.make_name("power_id")
+        mock_states = self.patch(virsh.VirshSSH, "get_machine_states")
+        mock_states.return_value = {power_id: virsh.VirshVMState.ON}
+
         state = yield driver.power_state_virsh(power_address, power_id)
         self.assertEqual("on", state)
 
@@ -2792,19 +2997,79 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, "login")
         mock_login.return_value = True
-        mock_state = self.patch(virsh.VirshSSH, "get_machine_state")
-        mock_state.return_value = virsh.VirshVMState.OFF
+        power_address = factory.make_name("power_address")
+        power_id = factory.make_name("power_id")
+        mock_states = self.patch(virsh.VirshSSH, "get_machine_states")
+        mock_states.return_value = {power_id: virsh.VirshVMState.OFF}
+
+        state = yield driver.power_state_virsh(power_address, power_id)
+        self.assertEqual("off", state)
+
+    @inlineCallbacks
+    def test_power_state_shares_domain_states(self):
+        driver = VirshPodDriver()
+        self.patch(virsh.VirshSSH, "login").return_value = True
+        self.patch(virsh.VirshSSH, "isalive").return_value = True
+        power_address = factory.make_name("power_address")
+        power_ids = [factory.make_name("power_id") for _ in range(3)]
+        mock_states = self.patch(virsh.VirshSSH, "get_machine_states")
+        mock_states.return_value = {
+            power_id: virsh.VirshVMState.ON for power_id in power_ids
+        }
 
+        for power_id in power_ids:
+            state = yield driver.power_state_virsh(power_address, power_id)
+            self.assertEqual("on", state)
+        self.assertThat(mock_states, MockCalledOnceWith(ANY))
+
+    @inlineCallbacks
+    def test_power_state_refreshes_states_for_unknown_domain(self):
+        driver = VirshPodDriver()
         power_address = factory.make_name("power_address")
         power_id = factory.make_name("power_id")
+        get_domain_states = self.patch(driver, "get_domain_states")
+        get_domain_states.side_effect = [
+            succeed({}),
+            succeed({power_id: virsh.VirshVMState.OFF}),
+        ]
+
         state = yield driver.power_state_virsh(power_address, power_id)
         self.assertEqual("off", state)
+        get_domain_states.assert_called_with(power_address, None, refresh=True)
+
+    @inlineCallbacks
+    def test_power_state_falls_back_to_domstate(self):
+        driver = VirshPodDriver()
+        self.patch(virsh.VirshSSH, "login").return_value = True
+        self.patch(virsh.VirshSSH, "get_machine_states").return_value = {}
+        mock_state = self.patch(virsh.VirshSSH, "get_machine_state")
+        mock_state.return_value = virsh.VirshVMState.ON
+        self.patch(virsh.VirshSSH, "isalive").return_value = True
+
+        power_address = factory.make_name("power_address")
+        power_id = str(uuid4())
+        state = yield driver.power_state_virsh(power_address, power_id)
+        self.assertEqual("on", state)
+        self.assertThat(mock_state, MockCalledOnceWith(ANY, power_id))
+
+    @inlineCallbacks
+    def test_power_state_errors_when_states_cant_be_listed(self):
+        driver = VirshPodDriver()
+        self.patch(virsh.VirshSSH, "login").return_value = True
+        self.patch(virsh.VirshSSH, "get_machine_states").return_value = None
+
+        power_address = factory.make_name("power_address")
+        power_id = factory.make_name("power_id")
+        with ExpectedException(virsh.VirshError):
+            yield driver.power_state_virsh(power_address, power_id)
 
     @inlineCallbacks
     def test_power_state_bad_domain(self):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, "login")
         mock_login.return_value = True
+        self.patch(virsh.VirshSSH, "isalive").return_value = True
+        self.patch(virsh.VirshSSH, "get_machine_states").return_value = {}
         mock_state = self.patch(virsh.VirshSSH, "get_machine_state")
         mock_state.return_value = None
 
@@ -2818,11 +3083,11 @@ class TestVirshPodDriver(MAASTestCase):
         driver = VirshPodDriver()
         mock_login = self.patch(virsh.VirshSSH, "login")
         mock_login.return_value = True
-        mock_state = self.patch(virsh.VirshSSH, "get_machine_state")
-        mock_state.return_value = "unknown"
-
         power_address = factory.make_name("power_address")
         power_id = factory.make_name("power_id")
+        mock_states = self.patch(virsh.VirshSSH, "get_machine_states")
+        mock_states.return_value = {power_id: "unknown"}
+
         with ExpectedException(virsh.VirshError):
             yield driver.power_state_virsh(power_address, power_id)
 
@@ -2921,3 +3186,77 @@ class TestVirshPodDriver(MAASTestCase):
 
         hints = yield driver.decompose(pod_id, context)
         self.assertEqual(sentinel.hints, hints)
+
+
+class TestVirshPodDriverFakeVirsh(MAASTestCase):
+    """Tests for `VirshPodDriver` power methods against a fake `virsh`."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def setUp(self):
+        super().setUp()
+        self.pool = virsh.VirshSessionPool(Clock())
+        self.addCleanup(self.close_sessions)
+        self.patch(virsh, "_session_pool", self.pool)
+        self.patch(virsh, "_domain_states", {})
+
+    def close_sessions(self):
+        for conn in self.pool._sessions.values():
+            conn.close()
+
+    def patch_virsh(self, domains):
+        """Spawn `FAKE_VIRSH` for `domains` instead of `virsh`.
+
+        :return: The path of the file the commands run are logged to.
+        """
+        script = self.make_file("virsh.py", FAKE_VIRSH)
+        domains_path = self.make_file("domains.json", json.dumps(domains))
+        log_path = self.make_file("virsh.log", "")
+
+        def _execute(conn, poweraddr):
+            conn._spawn(sys.executable, [script, domains_path, log_path])
+
+        self.patch(virsh.VirshSSH, "_execute", _execute)
+        return log_path
+
+    def read_log(self, log_path):
+        with open(log_path) as fd:
+            return fd.read().splitlines()
+
+    @inlineCallbacks
+    def test_power_queries_share_session_and_listing(self):
+        domains = {
+            factory.make_name("domain"): random.choice(
+                [virsh.VirshVMState.ON, virsh.VirshVMState.OFF]
+            )
+            for _ in range(5)
+        }
+        log_path = self.patch_virsh(domains)
+        driver = VirshPodDriver()
+        power_address = factory.make_name("qemu+ssh://host/system")
+        for domain, state in domains.items():
+            power_state = yield driver.power_state_virsh(power_address, domain)
+            self.assertEqual(virsh.VM_STATE_TO_POWER_STATE[state], power_state)
+        self.assertEqual(["connect", "list --all"], self.read_log(log_path))
+
+    @inlineCallbacks
+    def test_power_on_then_query_uses_one_session(self):
+        domain = factory.make_name("domain")
+        log_path = self.patch_virsh({domain: virsh.VirshVMState.OFF})
+        driver = VirshPodDriver()
+        power_address = factory.make_name("qemu+ssh://host/system")
+        state = yield driver.power_state_virsh(power_address, domain)
+        self.assertEqual("off", state)
+        yield driver.power_control_virsh(power_address, domain, "on")
+        state = yield driver.power_state_virsh(power_address, domain)
+        self.assertEqual("on", state)
+        self.assertEqual(
+            [
+                "connect",
+                "list --all",
+                "domstate %s" % domain,
+                "start %s" % domain,
+                "list --all",
+            ],
+            self.read_log(log_path),
+        )
@@ -4,18 +4,20 @@
 """Virsh pod driver."""
 
 
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from math import floor
 import os
 import string
 from tempfile import NamedTemporaryFile
 from textwrap import dedent
+import time
 from urllib.parse import urlparse
 from uuid import uuid4
 
 from lxml import etree
 import pexpect
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredLock, inlineCallbacks
 from twisted.internet.threads import deferToThread
 
 from provisioningserver.drivers import (
@@ -270,6 +272,14 @@ VM_STATE_TO_POWER_STATE = {
 }
 
 
+# How long an idle virsh session is kept open for reuse, in seconds.
+VIRSH_SESSION_IDLE_TIMEOUT = 60
+
+# How long the states of the domains on a host are shared by the power
+# queries of its VMs, in seconds.
+VIRSH_STATES_TTL = 5
+
+
 class VirshError(Exception):
     """Failure communicating to virsh. """
 
@@ -473,6 +483,24 @@ class VirshSSH(pexpect.spawn):
         devices = self.get_column_values(output, keys)
         return [(d[1], d[2]) for d in devices if d[0] == "disk"]
 
+    def get_machine_states(self):
+        """Gets the states of all VMs, by name.
+
+        Returns `None` if the VMs can't be listed.
+        """
+        output = self.run(["list", "--all"]).strip()
+        if output.startswith("error:"):
+            return None
+        states = {}
+        # Skip the two header lines. States can contain spaces, e.g.
+        # "shut off", so only split off the ID and name.
+        for line in output.splitlines()[2:]:
+            values = line.split(None, 2)
+            if len(values) == 3:
+                _, name, state = values
+                states[name] = state.strip()
+        return states
+
     def get_machine_state(self, machine):
         """Gets the VM state."""
         state = self.run(["domstate", machine]).strip()
@@ -1287,6 +1315,101 @@ class VirshSSH(pexpect.spawn):
         )
 
 
+def _close_session(conn):
+    """Log out of the virsh session `conn`.
+
+    Errors are ignored, since the session may already have been closed by
+    the other end.
+    """
+    try:
+        conn.logout()
+    except Exception:
+        pass
+
+
+class VirshSessionPool:
+    """Pool of logged in virsh sessions, one per host.
+
+    A session is used for one operation at a time, and operations for the
+    same host wait for each other. After an operation the session is kept
+    for reuse, and logged out once it has been idle for `idle_timeout`
+    seconds, or if an operation on it fails.
+    """
+
+    def __init__(self, clock=reactor, idle_timeout=VIRSH_SESSION_IDLE_TIMEOUT):
+        self.clock = clock
+        self.idle_timeout = idle_timeout
+        # (power_address, power_pass) -> VirshSSH.
+        self._sessions = {}
+        # (power_address, power_pass) -> DelayedCall logging out the session.
+        self._expiries = {}
+        self._locks = defaultdict(DeferredLock)
+
+    @inlineCallbacks
+    def run(self, power_address, power_pass, func, *args):
+        """Call `func(conn, *args)` in a thread with a logged in session.
+
+        `VirshError` raised by `func` leaves the session in the pool, as
+        it's about the request rather than the session; any other error
+        logs it out.
+        """
+        key = power_address, power_pass
+        lock = self._locks[key]
+        yield lock.acquire()
+        try:
+            expiry = self._expiries.pop(key, None)
+            if expiry is not None and expiry.active():
+                expiry.cancel()
+            conn = self._sessions.pop(key, None)
+            if conn is not None and not conn.isalive():
+                conn = None
+            if conn is None:
+                conn = VirshSSH()
+                logged_in = yield deferToThread(
+                    conn.login, power_address, power_pass
+                )
+                if not logged_in:
+                    raise VirshError("Failed to login to virsh console.")
+            try:
+                result = yield deferToThread(func, conn, *args)
+            except VirshError:
+                self._keep(key, conn)
+                raise
+            except Exception:
+                yield deferToThread(_close_session, conn)
+                raise
+            self._keep(key, conn)
+            return result
+        finally:
+            lock.release()
+
+    def _keep(self, key, conn):
+        """Keep `conn` for reuse until it's been idle for too long."""
+        self._sessions[key] = conn
+        self._expiries[key] = self.clock.callLater(
+            self.idle_timeout, self._expire, key
+        )
+
+    def _expire(self, key):
+        """Log out of the idle session for `key`."""
+        self._expiries.pop(key, None)
+        conn = self._sessions.pop(key, None)
+        if conn is not None:
+            return deferToThread(_close_session, conn)
+
+
+# Sessions used for power operations.
+_session_pool = VirshSessionPool()
+
+# States of the domains on each host, keyed by (power_address, power_pass).
+# Values are tuples of ({domain name: state}, expiry time).
+_domain_states = {}
+
+# Locks so that concurrent power queries for domains on the same host
+# share a single listing of the states.
+_domain_states_locks = defaultdict(DeferredLock)
+
+
 class VirshPodDriver(PodDriver):
 
     name = "virsh"
@@ -1326,43 +1449,87 @@ class VirshPodDriver(PodDriver):
         if power_pass == "":
             power_pass = None
 
-        conn = VirshSSH()
-        logged_in = yield deferToThread(conn.login, power_address, power_pass)
-        if not logged_in:
-            raise VirshError("Failed to login to virsh console.")
+        def power_control(conn):
+            state = conn.get_machine_state(power_id)
+            if state is None:
+                raise VirshError("%s: Failed to get power state" % power_id)
+
+            if state == VirshVMState.OFF:
+                if power_change == "on":
+                    if conn.poweron(power_id) is False:
+                        raise VirshError(
+                            "%s: Failed to power on VM" % power_id
+                        )
+            elif state == VirshVMState.ON:
+                if power_change == "off":
+                    if conn.poweroff(power_id) is False:
+                        raise VirshError(
+                            "%s: Failed to power off VM" % power_id
+                        )
+
+        # The state is about to change, so don't answer the queries that
+        # follow from the listed states.
+        _domain_states.pop((power_address, power_pass), None)
+        yield _session_pool.run(power_address, power_pass, power_control)
 
-        state = yield deferToThread(conn.get_machine_state, power_id)
-        if state is None:
-            raise VirshError("%s: Failed to get power state" % power_id)
-
-        if state == VirshVMState.OFF:
-            if power_change == "on":
-                powered_on = yield deferToThread(conn.poweron, power_id)
-                if powered_on is False:
-                    raise VirshError("%s: Failed to power on VM" % power_id)
-        elif state == VirshVMState.ON:
-            if power_change == "off":
-                powered_off = yield deferToThread(conn.poweroff, power_id)
-                if powered_off is False:
-                    raise VirshError("%s: Failed to power off VM" % power_id)
+    @inlineCallbacks
+    def get_domain_states(self, power_address, power_pass, refresh=False):
+        """Return the states of the domains on the host, by name.
+
+        They're listed with a single command, and shared by the power
+        queries of all the VMs on the host for `VIRSH_STATES_TTL` seconds,
+        unless `refresh` is set.
+        """
+        key = power_address, power_pass
+        lock = _domain_states_locks[key]
+        yield lock.acquire()
+        try:
+            states, expires = _domain_states.get(key, (None, 0))
+            if refresh or expires <= time.monotonic():
+                states = yield _session_pool.run(
+                    power_address, power_pass, VirshSSH.get_machine_states
+                )
+                if states is None:
+                    raise VirshError("Failed to list domains.")
+                _domain_states[key] = (
+                    states,
+                    time.monotonic() + VIRSH_STATES_TTL,
+                )
+        finally:
+            lock.release()
+        return states
 
     @inlineCallbacks
     def power_state_virsh(
         self, power_address, power_id, power_pass=None, **kwargs
     ):
-        """Return the power state for the VM using virsh."""
+        """Return the power state for the VM using virsh.
+
+        The state is looked up in the states of all the domains on the
+        host, so that querying every VM on a host takes a single command.
+        """
 
         # Force password to None if blank, as the power control
         # script will send a blank password if one is not set.
         if power_pass == "":
             power_pass = None
 
-        conn = VirshSSH()
-        logged_in = yield deferToThread(conn.login, power_address, power_pass)
-        if not logged_in:
-            raise VirshError("Failed to login to virsh console.")
-
-        state = yield deferToThread(conn.get_machine_state, power_id)
+        states = yield self.get_domain_states(power_address, power_pass)
+        if power_id not in states:
+            # The domain may have been defined since the states were
+            # listed.
+            states = yield self.get_domain_states(
+                power_address, power_pass, refresh=True
+            )
+        state = states.get(power_id)
+        if state is None:
+            # The domain may be given by ID or UUID instead of name.
+            state = yield _session_pool.run(
+                power_address,
+                power_pass,
+                VirshSSH.get_machine_state,
+                power_id,
+            )
         if state is None:
             raise VirshError("Failed to get domain: %s" % power_id)
 
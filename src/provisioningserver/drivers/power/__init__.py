@@ -253,6 +253,12 @@ class PowerDriver(PowerDriverBase):
 
     wait_time = DEFAULT_WAITING_POLICY
     queryable = True
+    # How many nodes using this driver the rack queries at once. The rack
+    # starts at query_concurrency, and raises it up to query_concurrency_max
+    # while queries complete within query_latency_target seconds.
+    query_concurrency = 5
+    query_concurrency_max = 5
+    query_latency_target = 10
 
     def __init__(self, clock=reactor):
         self.clock = reactor
@@ -282,6 +282,9 @@ class IPMIPowerDriver(PowerDriver):
         ),
     ]
     ip_extractor = make_ip_extractor("power_address")
+    # Queries run ipmipower in the reactor threadpool, so leave some threads
+    # for everything else.
+    query_concurrency_max = 15
     wait_time = (4, 8, 16, 32)
 
     def detect_missing_packages(self):
@@ -53,6 +53,8 @@ class OpenBMCPowerDriver(PowerDriver):
         ),
     ]
     ip_extractor = make_ip_extractor("power_address")
+    query_concurrency = 20
+    query_concurrency_max = 50
 
     cookie_jar = compat.cookielib.CookieJar()
     agent = CookieAgent(
@@ -9,12 +9,14 @@ from http import HTTPStatus
 from io import BytesIO
 import json
 from os.path import basename, join
+import time
 
 from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
 from twisted.web.client import (
     Agent,
     FileBodyProducer,
+    HTTPConnectionPool,
     PartialDownloadError,
     readBody,
     RedirectAgent,
@@ -28,6 +30,7 @@ from provisioningserver.drivers import (
 )
 from provisioningserver.drivers.power import PowerActionError, PowerDriver
 from provisioningserver.drivers.power.utils import WebClientContextFactory
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.twisted import asynchronous
 
 # no trailing slashes
@@ -37,8 +40,72 @@ REDFISH_POWER_CONTROL_ENDPOINT = (
 
 REDFISH_SYSTEMS_ENDPOINT = b"redfish/v1/Systems"
 
+REDFISH_SESSIONS_ENDPOINT = b"redfish/v1/SessionService/Sessions"
+
+
+class REDFISH_AUTH:
+    BASIC = "basic"
+    SESSION = "session"
+
+
+REDFISH_AUTH_CHOICES = [
+    [REDFISH_AUTH.BASIC, "Basic"],
+    [REDFISH_AUTH.SESSION, "Session token"],
+]
+
+# How long the Systems member ID of a BMC is remembered for, in seconds.
+REDFISH_NODE_ID_TTL = 60 * 60
+
+
+class RedfishConnectionPool(HTTPConnectionPool):
+    """Pool of persistent connections to Redfish BMCs.
+
+    Connections are kept per BMC, and counted as new or reused in the
+    `maas_rack_redfish_connections` metric.
+    """
+
+    maxPersistentPerHost = 2
+    cachedConnectionTimeout = 120
+
+    def getConnection(self, key, endpoint):
+        if self._connections.get(key):
+            connection = "reused"
+        else:
+            connection = "new"
+        PROMETHEUS_METRICS.update(
+            "maas_rack_redfish_connections",
+            "inc",
+            labels={"connection": connection},
+        )
+        return super().getConnection(key, endpoint)
+
+
+_connection_pool = None
+
+
+def get_connection_pool():
+    """Return the `RedfishConnectionPool` shared by Redfish requests."""
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = RedfishConnectionPool(reactor)
+    return _connection_pool
+
+
+# Systems member IDs found by `get_node_id`, keyed by BMC URL. Values are
+# tuples of (node_id, expiry time).
+_node_ids = {}
+
+# Session authentication headers, keyed by (BMC URL, user).
+_session_headers = {}
+
 
 class RedfishPowerDriverBase(PowerDriver):
+
+    # Queries are asynchronous HTTP requests over pooled connections, so
+    # they don't tie up the reactor threadpool.
+    query_concurrency = 20
+    query_concurrency_max = 50
+
     def get_url(self, context):
         """Return url for the pod."""
         url = context.get("power_address")
@@ -64,7 +131,11 @@ class RedfishPowerDriverBase(PowerDriver):
     def redfish_request(self, method, uri, headers=None, bodyProducer=None):
         """Send the redfish request and return the response."""
         agent = RedirectAgent(
-            Agent(reactor, contextFactory=WebClientContextFactory())
+            Agent(
+                reactor,
+                contextFactory=WebClientContextFactory(),
+                pool=get_connection_pool(),
+            )
         )
         d = agent.request(
             method, uri, headers=headers, bodyProducer=bodyProducer
@@ -146,6 +217,13 @@ class RedfishPowerDriver(RedfishPowerDriverBase):
             field_type="password",
             required=True,
         ),
+        make_setting_field(
+            "power_auth",
+            "Redfish authentication",
+            field_type="choice",
+            choices=REDFISH_AUTH_CHOICES,
+            default=REDFISH_AUTH.BASIC,
+        ),
         make_setting_field("node_id", "Node ID", scope=SETTING_SCOPE.NODE),
     ]
     ip_extractor = make_ip_extractor("power_address")
@@ -167,14 +245,76 @@ class RedfishPowerDriver(RedfishPowerDriverBase):
           }
         """
         url = self.get_url(context)
-        headers = self.make_auth_headers(**context)
+        if context.get("power_auth") == REDFISH_AUTH.SESSION:
+            headers = yield self.get_session_headers(url, **context)
+        else:
+            headers = self.make_auth_headers(**context)
         node_id = context.get("node_id")
         if node_id:
             node_id = node_id.encode("utf-8")
         else:
-            node_id = yield self.get_node_id(url, headers)
+            node_id, expires = _node_ids.get(url, (None, 0))
+            if expires <= time.monotonic():
+                node_id = yield self.get_node_id(url, headers)
+                _node_ids[url] = (
+                    node_id,
+                    time.monotonic() + REDFISH_NODE_ID_TTL,
+                )
         return url, node_id, headers
 
+    def forget_redfish_context(self, context):
+        """Forget the node ID and session cached for `context`.
+
+        They are looked up again the next time they are needed.
+        """
+        url = self.get_url(context)
+        _node_ids.pop(url, None)
+        _session_headers.pop((url, context.get("power_user")), None)
+
+    @inlineCallbacks
+    def get_session_headers(self, url, power_user, power_pass, **kwargs):
+        """Return headers authenticating with a Redfish session token.
+
+        A session is created on the BMC the first time, and its token is
+        reused for later requests.
+        """
+        headers = _session_headers.get((url, power_user))
+        if headers is None:
+            payload = FileBodyProducer(
+                BytesIO(
+                    json.dumps(
+                        {"UserName": power_user, "Password": power_pass}
+                    ).encode("utf-8")
+                )
+            )
+            _, response_headers = yield self.redfish_request(
+                b"POST",
+                join(url, REDFISH_SESSIONS_ENDPOINT),
+                Headers(
+                    {
+                        b"User-Agent": [b"MAAS"],
+                        b"Accept": [b"application/json"],
+                        b"Content-Type": [b"application/json; charset=utf-8"],
+                    }
+                ),
+                payload,
+            )
+            tokens = response_headers.getRawHeaders(b"X-Auth-Token")
+            if not tokens:
+                raise PowerActionError(
+                    "Redfish session creation did not return a token."
+                )
+            headers = Headers(
+                {
+                    b"User-Agent": [b"MAAS"],
+                    b"Accept": [b"application/json"],
+                    b"X-Auth-Token": [tokens[0]],
+                    b"Content-Type": [b"application/json; charset=utf-8"],
+                }
+            )
+            _session_headers[(url, power_user)] = headers
+        return headers
+
     @inlineCallbacks
     def get_node_id(self, url, headers):
         uri = join(url, REDFISH_SYSTEMS_ENDPOINT)
@@ -219,33 +359,48 @@ class RedfishPowerDriver(RedfishPowerDriverBase):
     @inlineCallbacks
     def power_on(self, node_id, context):
         """Power on machine."""
-        url, node_id, headers = yield self.process_redfish_context(context)
-        power_state = yield self.power_query(node_id, context)
-        # Power off the machine if currently on.
-        if power_state == "on":
-            yield self.power("ForceOff", url, node_id, headers)
-        # Set to PXE boot.
-        yield self.set_pxe_boot(url, node_id, headers)
-        # Power on the machine.
-        yield self.power("On", url, node_id, headers)
+        try:
+            url, node_id, headers = yield self.process_redfish_context(context)
+            power_state = yield self.power_query(node_id, context)
+            # Power off the machine if currently on.
+            if power_state == "on":
+                yield self.power("ForceOff", url, node_id, headers)
+            # Set to PXE boot.
+            yield self.set_pxe_boot(url, node_id, headers)
+            # Power on the machine.
+            yield self.power("On", url, node_id, headers)
+        except Exception:
+            # The cached node ID or session may no longer be valid.
+            self.forget_redfish_context(context)
+            raise
 
     @asynchronous
     @inlineCallbacks
     def power_off(self, node_id, context):
         """Power off machine."""
-        url, node_id, headers = yield self.process_redfish_context(context)
-        # Power off the machine if it is not already off
-        power_state = yield self.power_query(node_id, context)
-        if power_state != "off":
-            yield self.power("ForceOff", url, node_id, headers)
-        # Set to PXE boot.
-        yield self.set_pxe_boot(url, node_id, headers)
+        try:
+            url, node_id, headers = yield self.process_redfish_context(context)
+            # Power off the machine if it is not already off
+            power_state = yield self.power_query(node_id, context)
+            if power_state != "off":
+                yield self.power("ForceOff", url, node_id, headers)
+            # Set to PXE boot.
+            yield self.set_pxe_boot(url, node_id, headers)
+        except Exception:
+            # The cached node ID or session may no longer be valid.
+            self.forget_redfish_context(context)
+            raise
 
     @asynchronous
     @inlineCallbacks
     def power_query(self, node_id, context):
         """Power query machine."""
-        url, node_id, headers = yield self.process_redfish_context(context)
-        uri = join(url, REDFISH_SYSTEMS_ENDPOINT, b"%s" % node_id)
-        node_data, _ = yield self.redfish_request(b"GET", uri, headers)
+        try:
+            url, node_id, headers = yield self.process_redfish_context(context)
+            uri = join(url, REDFISH_SYSTEMS_ENDPOINT, b"%s" % node_id)
+            node_data, _ = yield self.redfish_request(b"GET", uri, headers)
+        except Exception:
+            # The cached node ID or session may no longer be valid.
+            self.forget_redfish_context(context)
+            raise
         return node_data.get("PowerState").lower()
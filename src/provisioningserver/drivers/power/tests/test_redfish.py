@@ -11,7 +11,7 @@ from io import BytesIO
 import json
 from os.path import join
 import random
-from unittest.mock import call, Mock
+from unittest.mock import ANY, call, Mock, sentinel
 
 from testtools import ExpectedException
 from twisted.internet._sslverify import ClientTLSOptions
@@ -21,6 +21,7 @@ from twisted.web.http_headers import Headers
 
 from maastesting.factory import factory
 from maastesting.matchers import (
+    MockCalledOnce,
     MockCalledOnceWith,
     MockCallsMatch,
     MockNotCalled,
@@ -29,7 +30,12 @@ from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
 from provisioningserver.drivers.power import PowerActionError
 import provisioningserver.drivers.power.redfish as redfish_module
 from provisioningserver.drivers.power.redfish import (
+    get_connection_pool,
+    REDFISH_AUTH,
+    REDFISH_NODE_ID_TTL,
     REDFISH_POWER_CONTROL_ENDPOINT,
+    REDFISH_SESSIONS_ENDPOINT,
+    RedfishConnectionPool,
     RedfishPowerDriver,
     WebClientContextFactory,
 )
@@ -143,10 +149,56 @@ class TestWebClientContextFactory(MAASTestCase):
         self.assertIsInstance(opts, ClientTLSOptions)
 
 
+class TestRedfishConnectionPool(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.metrics = self.patch(redfish_module, "PROMETHEUS_METRICS")
+
+    def test_get_connection_pool_returns_shared_pool(self):
+        self.patch(redfish_module, "_connection_pool", None)
+        pool = get_connection_pool()
+        self.assertIsInstance(pool, RedfishConnectionPool)
+        self.assertTrue(pool.persistent)
+        self.assertIs(pool, get_connection_pool())
+
+    def test_getConnection_counts_new_connection(self):
+        pool = RedfishConnectionPool(Mock())
+        self.patch(pool, "_newConnection")
+        pool.getConnection(sentinel.key, sentinel.endpoint)
+        self.assertThat(
+            self.metrics.update,
+            MockCalledOnceWith(
+                "maas_rack_redfish_connections",
+                "inc",
+                labels={"connection": "new"},
+            ),
+        )
+
+    def test_getConnection_counts_reused_connection(self):
+        pool = RedfishConnectionPool(Mock())
+        connection = Mock(state="QUIESCENT")
+        pool._connections[sentinel.key] = [connection]
+        pool._timeouts[connection] = Mock()
+        pool.getConnection(sentinel.key, sentinel.endpoint)
+        self.assertThat(
+            self.metrics.update,
+            MockCalledOnceWith(
+                "maas_rack_redfish_connections",
+                "inc",
+                labels={"connection": "reused"},
+            ),
+        )
+
+
 class TestRedfishPowerDriver(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
 
+    def setUp(self):
+        super().setUp()
+        self.patch(redfish_module, "_node_ids", {})
+        self.patch(redfish_module, "_session_headers", {})
+
     def test_missing_packages(self):
         # there's nothing to check for, just confirm it returns []
         driver = RedfishPowerDriver()
@@ -236,6 +288,102 @@ class TestRedfishPowerDriver(MAASTestCase):
         node_id = yield driver.get_node_id(url, {})
         self.assertEqual(b"1", node_id)
 
+    @inlineCallbacks
+    def test_process_redfish_context_caches_node_id(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        mock_get_node_id = self.patch(driver, "get_node_id")
+        mock_get_node_id.return_value = succeed(b"1")
+        first = yield driver.process_redfish_context(context)
+        second = yield driver.process_redfish_context(context)
+        self.assertEqual(first, second)
+        self.assertThat(mock_get_node_id, MockCalledOnceWith(ANY, ANY))
+
+    @inlineCallbacks
+    def test_process_redfish_context_looks_up_expired_node_id(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        mock_get_node_id = self.patch(driver, "get_node_id")
+        mock_get_node_id.side_effect = [succeed(b"1"), succeed(b"2")]
+        mock_monotonic = self.patch(redfish_module.time, "monotonic")
+        mock_monotonic.return_value = 1000
+        _, node_id, _ = yield driver.process_redfish_context(context)
+        self.assertEqual(b"1", node_id)
+        mock_monotonic.return_value = 1000 + REDFISH_NODE_ID_TTL
+        _, node_id, _ = yield driver.process_redfish_context(context)
+        self.assertEqual(b"2", node_id)
+
+    @inlineCallbacks
+    def test_process_redfish_context_uses_session_headers(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        context["power_auth"] = REDFISH_AUTH.SESSION
+        context["node_id"] = "1"
+        mock_get_session_headers = self.patch(driver, "get_session_headers")
+        mock_get_session_headers.return_value = succeed(sentinel.headers)
+        _, _, headers = yield driver.process_redfish_context(context)
+        self.assertIs(sentinel.headers, headers)
+        self.assertThat(
+            mock_get_session_headers,
+            MockCalledOnceWith(driver.get_url(context), **context),
+        )
+
+    @inlineCallbacks
+    def test_get_session_headers_creates_session_once(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        url = driver.get_url(context)
+        token = factory.make_name("token").encode("utf-8")
+        mock_redfish_request = self.patch(driver, "redfish_request")
+        mock_redfish_request.return_value = succeed(
+            (None, Headers({b"X-Auth-Token": [token]}))
+        )
+        headers = yield driver.get_session_headers(url, **context)
+        self.assertEqual([token], headers.getRawHeaders(b"X-Auth-Token"))
+        self.assertFalse(headers.hasHeader(b"Authorization"))
+        self.assertThat(
+            mock_redfish_request,
+            MockCalledOnceWith(
+                b"POST", join(url, REDFISH_SESSIONS_ENDPOINT), ANY, ANY
+            ),
+        )
+        again = yield driver.get_session_headers(url, **context)
+        self.assertIs(headers, again)
+        self.assertThat(mock_redfish_request, MockCalledOnce())
+
+    @inlineCallbacks
+    def test_get_session_headers_raises_without_token(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        mock_redfish_request = self.patch(driver, "redfish_request")
+        mock_redfish_request.return_value = succeed((None, Headers()))
+        with ExpectedException(PowerActionError):
+            yield driver.get_session_headers(
+                driver.get_url(context), **context
+            )
+
+    @inlineCallbacks
+    def test_redfish_request_uses_connection_pool(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        uri = join(driver.get_url(context), b"redfish/v1/Systems")
+        mock_agent = self.patch(redfish_module, "Agent")
+        mock_agent.return_value.request = Mock()
+        expected_headers = Mock()
+        expected_headers.code = HTTPStatus.OK
+        mock_agent.return_value.request.return_value = succeed(
+            expected_headers
+        )
+        mock_readBody = self.patch(redfish_module, "readBody")
+        mock_readBody.return_value = succeed(b"")
+        yield driver.redfish_request(b"GET", uri)
+        self.assertThat(
+            mock_agent,
+            MockCalledOnceWith(
+                ANY, contextFactory=ANY, pool=get_connection_pool()
+            ),
+        )
+
     @inlineCallbacks
     def test_redfish_request_renders_response(self):
         driver = RedfishPowerDriver()
@@ -505,6 +653,38 @@ class TestRedfishPowerDriver(MAASTestCase):
             mock_power, MockCalledOnceWith("ForceOff", url, node_id, headers)
         )
 
+    @inlineCallbacks
+    def test_power_on_forgets_cached_context_on_failure(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        url = driver.get_url(context)
+        redfish_module._node_ids[url] = (b"1", float("inf"))
+        session_key = url, context["power_user"]
+        redfish_module._session_headers[session_key] = sentinel.headers
+        self.patch(driver, "power_query").return_value = "off"
+        self.patch(driver, "set_pxe_boot")
+        self.patch(driver, "power").side_effect = PowerActionError()
+        with ExpectedException(PowerActionError):
+            yield driver.power_on(factory.make_name("system_id"), context)
+        self.assertNotIn(url, redfish_module._node_ids)
+        self.assertEqual({}, redfish_module._session_headers)
+
+    @inlineCallbacks
+    def test_power_off_forgets_cached_context_on_failure(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        url = driver.get_url(context)
+        redfish_module._node_ids[url] = (b"1", float("inf"))
+        session_key = url, context["power_user"]
+        redfish_module._session_headers[session_key] = sentinel.headers
+        self.patch(driver, "power_query").return_value = "on"
+        self.patch(driver, "set_pxe_boot").side_effect = PowerActionError()
+        self.patch(driver, "power")
+        with ExpectedException(PowerActionError):
+            yield driver.power_off(factory.make_name("system_id"), context)
+        self.assertNotIn(url, redfish_module._node_ids)
+        self.assertEqual({}, redfish_module._session_headers)
+
     @inlineCallbacks
     def test_power_off_already_off(self):
         driver = RedfishPowerDriver()
@@ -541,6 +721,18 @@ class TestRedfishPowerDriver(MAASTestCase):
         power_state = yield driver.power_query(system_id, context)
         self.assertEqual(power_state, power_change.lower())
 
+    @inlineCallbacks
+    def test_power_query_forgets_cached_node_id_on_failure(self):
+        driver = RedfishPowerDriver()
+        context = make_context()
+        url = driver.get_url(context)
+        redfish_module._node_ids[url] = (b"1", float("inf"))
+        mock_redfish_request = self.patch(driver, "redfish_request")
+        mock_redfish_request.side_effect = PowerActionError()
+        with ExpectedException(PowerActionError):
+            yield driver.power_query(factory.make_name("system_id"), context)
+        self.assertNotIn(url, redfish_module._node_ids)
+
     @inlineCallbacks
     def test_power_query_queries_off(self):
         driver = RedfishPowerDriver()
@@ -126,11 +126,14 @@ def parse_sources(sources_yaml):
     return BootSources.parse(StringIO(sources_yaml))
 
 
-def import_images(sources):
+def import_images(sources, peers=None):
     """Import images.  Callable from the command line.
 
     :param config: An iterable of dicts representing the sources from
         which boot images will be downloaded.
+    :param peers: Optional base URLs of rack controllers that have already
+        imported the same boot images. Their copies are tried before the
+        sources, but the sources' checksums are still verified.
     """
     if len(sources) == 0:
         msg = "Can't import: region did not provide a source."
@@ -189,7 +192,7 @@ def import_images(sources):
 
         try:
             snapshot_path = download_all_boot_resources(
-                sources, storage, product_mapping
+                sources, storage, product_mapping, peers=peers
             )
         except Exception as e:
             try_send_rack_event(
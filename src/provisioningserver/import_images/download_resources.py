@@ -8,6 +8,7 @@ from datetime import datetime
 import os.path
 import tarfile
 
+from simplestreams.contentsource import UrlContentSource
 from simplestreams.mirrors import BasicMirrorWriter, UrlMirrorReader
 from simplestreams.objectstores import FileStore
 from simplestreams.util import (
@@ -60,6 +61,34 @@ def insert_file(store, name, tag, checksums, size, content_source):
     return [(store._fullpath(tag), name)]
 
 
+def insert_file_from_peers(store, name, tag, checksums, size, peers):
+    """Insert a file into `store`, fetching it from a peer rack controller.
+
+    Peers serve their cache directory, where files are named by their tag,
+    so each peer is asked for `tag` in turn until one of them provides the
+    file. The file is checked against `checksums`, which come from the
+    source, so a peer can't provide a different file.
+
+    :param peers: A list of base URLs of the peers' cache directories.
+    :return: A list of inserted files, as returned by `insert_file`, or
+        `None` if none of the peers could provide the file.
+    """
+    for peer in peers:
+        url = "%s/%s" % (peer.rstrip("/"), tag)
+        try:
+            return insert_file(
+                store, name, tag, checksums, size, UrlContentSource(url)
+            )
+        except Exception as error:
+            log.debug(
+                "Unable to fetch {name} from {url}: {error}",
+                name=name,
+                url=url,
+                error=error,
+            )
+    return None
+
+
 def extract_archive_tar(store, name, tag, checksums, size, content_source):
     """Extract an archive.tar.xz into `store`.
 
@@ -196,12 +225,15 @@ class RepoWriter(BasicMirrorWriter):
         should be stored.
     :ivar product_mapping: A `ProductMapping` describing the desired boot
         resources.
+    :ivar peers: A list of base URLs of peer rack controllers' caches, from
+        which files are fetched before falling back to the repo.
     """
 
-    def __init__(self, root_path, store, product_mapping):
+    def __init__(self, root_path, store, product_mapping, peers=None):
         self.root_path = root_path
         self.store = store
         self.product_mapping = product_mapping
+        self.peers = [] if peers is None else peers
         super().__init__(
             config={
                 # Only download the latest version. Without this all versions
@@ -234,9 +266,17 @@ class RepoWriter(BasicMirrorWriter):
                 self.store, filename, tag, checksums, size, contentsource
             )
         else:
-            links = insert_file(
-                self.store, filename, tag, checksums, size, contentsource
-            )
+            # Archives are removed from the cache once they're extracted,
+            # so only plain files can be fetched from peers.
+            links = None
+            if len(self.peers) > 0:
+                links = insert_file_from_peers(
+                    self.store, filename, tag, checksums, size, self.peers
+                )
+            if links is None:
+                links = insert_file(
+                    self.store, filename, tag, checksums, size, contentsource
+                )
 
         osystem = get_os_from_product(item)
 
@@ -284,7 +324,7 @@ class RepoWriter(BasicMirrorWriter):
 
 
 def download_boot_resources(
-    path, store, snapshot_path, product_mapping, keyring_file=None
+    path, store, snapshot_path, product_mapping, keyring_file=None, peers=None
 ):
     """Download boot resources for one simplestreams source.
 
@@ -297,9 +337,11 @@ def download_boot_resources(
         downloaded.
     :param keyring_file: Optional path to a keyring file for verifying
         signatures.
+    :param peers: Optional base URLs of peer rack controllers' caches to
+        fetch the files from; the source still provides the checksums.
     """
     maaslog.info("Downloading boot resources from %s", path)
-    writer = RepoWriter(snapshot_path, store, product_mapping)
+    writer = RepoWriter(snapshot_path, store, product_mapping, peers=peers)
     (mirror, rpath) = path_from_mirror_url(path, None)
     policy = get_signing_policy(rpath, keyring_file)
     reader = UrlMirrorReader(mirror, policy=policy)
@@ -322,7 +364,7 @@ def compose_snapshot_path(storage_path):
 
 
 def download_all_boot_resources(
-    sources, storage_path, product_mapping, store=None
+    sources, storage_path, product_mapping, store=None, peers=None
 ):
     """Download the actual boot resources.
 
@@ -343,6 +385,8 @@ def download_all_boot_resources(
     :param product_mapping: A `ProductMapping` describing the resources to be
         downloaded.
     :param store: A `FileStore` instance. Used only for testing.
+    :param peers: Optional base URLs of peer rack controllers' caches to
+        fetch the files from, instead of the sources.
     :return: Path to the snapshot directory.
     """
     storage_path = os.path.abspath(storage_path)
@@ -362,6 +406,7 @@ def download_all_boot_resources(
             snapshot_path,
             product_mapping,
             keyring_file=source.get("keyring"),
+            peers=peers,
         ),
 
     return snapshot_path
@@ -10,8 +10,12 @@ import os
 import random
 import tarfile
 from unittest import mock
+from unittest.mock import sentinel
 
-from simplestreams.contentsource import ChecksummingContentSource
+from simplestreams.contentsource import (
+    ChecksummingContentSource,
+    MemoryContentSource,
+)
 from simplestreams.objectstores import FileStore
 
 from maastesting.factory import factory
@@ -80,6 +84,7 @@ class TestDownloadAllBootResources(MAASTestCase):
                 snapshot_path,
                 product_mapping,
                 keyring_file=source["keyring"],
+                peers=None,
             ),
         )
 
@@ -209,6 +214,71 @@ class TestExtractArchiveTar(MAASTestCase):
                     self.assertIn(expected_cached_file, cached_files)
 
 
+class TestInsertFileFromPeers(MAASTestCase):
+    """Tests for `insert_file_from_peers`()."""
+
+    def make_content(self):
+        content = factory.make_bytes()
+        checksums = {"sha256": hashlib.sha256(content).hexdigest()}
+        return content, checksums
+
+    def patch_UrlContentSource(self, contents):
+        def make_content_source(url):
+            content = contents[url]
+            if isinstance(content, Exception):
+                raise content
+            return MemoryContentSource(url=url, content=content)
+
+        return self.patch(
+            download_resources, "UrlContentSource", make_content_source
+        )
+
+    def test_inserts_file_from_peer_by_tag(self):
+        cache_dir = self.make_dir()
+        store = FileStore(cache_dir)
+        content, checksums = self.make_content()
+        tag = checksums["sha256"]
+        peer = "http://%s:5248/boot-resources-cache/" % factory.make_name()
+        self.patch_UrlContentSource({peer + tag: content})
+        links = download_resources.insert_file_from_peers(
+            store, "boot-kernel", tag, checksums, len(content), [peer]
+        )
+        path = os.path.join(cache_dir, tag)
+        self.assertEqual([(path, "boot-kernel")], links)
+        with open(path, "rb") as f:
+            self.assertEqual(content, f.read())
+
+    def test_tries_next_peer_if_checksum_does_not_match(self):
+        cache_dir = self.make_dir()
+        store = FileStore(cache_dir)
+        content, checksums = self.make_content()
+        tag = checksums["sha256"]
+        peers = [
+            "http://%s:5248/boot-resources-cache/" % factory.make_name()
+            for _ in range(2)
+        ]
+        self.patch_UrlContentSource(
+            {peers[0] + tag: factory.make_bytes(), peers[1] + tag: content}
+        )
+        download_resources.insert_file_from_peers(
+            store, "boot-kernel", tag, checksums, len(content), peers
+        )
+        with open(os.path.join(cache_dir, tag), "rb") as f:
+            self.assertEqual(content, f.read())
+
+    def test_returns_None_if_no_peer_provides_file(self):
+        store = FileStore(self.make_dir())
+        content, checksums = self.make_content()
+        tag = checksums["sha256"]
+        peer = "http://%s:5248/boot-resources-cache/" % factory.make_name()
+        self.patch_UrlContentSource({peer + tag: IOError("Not Found")})
+        self.assertIsNone(
+            download_resources.insert_file_from_peers(
+                store, "boot-kernel", tag, checksums, len(content), [peer]
+            )
+        )
+
+
 class TestRepoWriter(MAASTestCase):
     """Tests for `RepoWriter`."""
 
@@ -320,6 +390,68 @@ class TestRepoWriter(MAASTestCase):
             ),
         )
 
+    def test_inserts_file_from_peers(self):
+        product_mapping = ProductMapping()
+        subarch = factory.make_name("subarch")
+        product = self.make_product(subarch=subarch)
+        product_mapping.add(product, subarch)
+        peers = [factory.make_simple_http_url()]
+        repo_writer = download_resources.RepoWriter(
+            None, None, product_mapping, peers=peers
+        )
+        self.patch(
+            download_resources, "products_exdata"
+        ).return_value = product
+        mock_insert_file_from_peers = self.patch(
+            download_resources, "insert_file_from_peers"
+        )
+        mock_insert_file_from_peers.return_value = []
+        mock_insert_file = self.patch(download_resources, "insert_file")
+        self.patch(download_resources, "link_resources")
+        repo_writer.insert_item(product, None, None, None, None)
+        self.assertThat(
+            mock_insert_file_from_peers,
+            MockCalledOnceWith(
+                None,
+                os.path.basename(product["path"]),
+                product["sha256"],
+                {"sha256": product["sha256"]},
+                product["size"],
+                peers,
+            ),
+        )
+        self.assertThat(mock_insert_file, MockNotCalled())
+
+    def test_inserts_file_from_source_if_peers_do_not_provide_it(self):
+        product_mapping = ProductMapping()
+        subarch = factory.make_name("subarch")
+        product = self.make_product(subarch=subarch)
+        product_mapping.add(product, subarch)
+        repo_writer = download_resources.RepoWriter(
+            None, None, product_mapping, peers=[factory.make_simple_http_url()]
+        )
+        self.patch(
+            download_resources, "products_exdata"
+        ).return_value = product
+        mock_insert_file_from_peers = self.patch(
+            download_resources, "insert_file_from_peers"
+        )
+        mock_insert_file_from_peers.return_value = None
+        mock_insert_file = self.patch(download_resources, "insert_file")
+        self.patch(download_resources, "link_resources")
+        repo_writer.insert_item(product, None, None, None, sentinel.source)
+        self.assertThat(
+            mock_insert_file,
+            MockCalledOnceWith(
+                None,
+                os.path.basename(product["path"]),
+                product["sha256"],
+                {"sha256": product["sha256"]},
+                product["size"],
+                sentinel.source,
+            ),
+        )
+
     def test_inserts_rolling_links(self):
         product_mapping = ProductMapping()
         product = self.make_product(subarch="hwe-16.04", rolling=True)
@@ -31,6 +31,25 @@ METRICS_DEFINITIONS = [
         "Latency of TFTP file downloads",
         ["filename"],
     ),
+    MetricDefinition(
+        "Counter",
+        "maas_rack_redfish_connections",
+        "Connections to Redfish BMCs, new and reused",
+        ["connection"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_rack_power_query_queue_lag",
+        "Time power queries wait for a free slot before being sent",
+        ["power_type"],
+        buckets=[0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_rack_power_query_latency",
+        "Latency of power queries",
+        ["power_type"],
+    ),
     # regiond metrics
     MetricDefinition(
         "Histogram",
@@ -83,6 +102,40 @@ METRICS_DEFINITIONS = [
         "HTTP request query latency",
         _WEBSOCKET_CALL_LABELS,
     ),
+    MetricDefinition(
+        "Gauge",
+        "maas_region_notification_queue_depth",
+        "Number of database notifications waiting to be handled",
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_region_notification_lag",
+        "Time from receiving a database notification to having handled it",
+        ["channel"],
+    ),
+    MetricDefinition(
+        "Gauge",
+        "maas_region_status_message_backlog",
+        "Number of queued node status messages waiting to be processed",
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_region_status_message_batch_size",
+        "Number of node status messages processed in one transaction",
+        buckets=[1, 5, 10, 25, 50, 100, 250, 500, 1000],
+    ),
+    MetricDefinition(
+        "Counter",
+        "maas_websocket_notify_dehydrate_cache",
+        "Websocket notification dehydration cache hits and misses",
+        ["handler", "result"],
+    ),
+    MetricDefinition(
+        "Histogram",
+        "maas_websocket_notify_fanout_latency",
+        "Latency of sending a notification to all websocket clients",
+        ["handler"],
+    ),
     # Common metrics
     *node_metrics_definitions(),
 ]
@@ -14,8 +14,14 @@ from datetime import timedelta
 import attr
 from netaddr import IPAddress
 from twisted.application.internet import TimerService
-from twisted.internet.defer import DeferredList, inlineCallbacks, maybeDeferred
+from twisted.internet.defer import (
+    DeferredList,
+    DeferredLock,
+    inlineCallbacks,
+    maybeDeferred,
+)
 from twisted.internet.threads import deferToThread
+from twisted.protocols.amp import UnhandledCommand
 
 from provisioningserver.dns.actions import (
     bind_reload_with_retries,
@@ -29,6 +35,7 @@ from provisioningserver.rpc import exceptions
 from provisioningserver.rpc.region import (
     GetControllerType,
     GetDNSConfiguration,
+    GetExternalServicesConfiguration,
     GetProxyConfiguration,
     GetSyslogConfiguration,
     GetTimeConfiguration,
@@ -404,11 +411,16 @@ class RackExternalService(TimerService):
     _rpc_service = None
     _services = None
 
+    # The configuration last fetched from the region, and its digest.
+    _configuration = None
+    _digest = None
+
     def __init__(self, rpc_service, reactor, services=None):
         super().__init__(self.INTERVAL_LOW, self._tryUpdate)
         self._rpc_service = rpc_service
         self.clock = reactor
         self._services = services
+        self._lock = DeferredLock()
         if self._services is None:
             self._services = [
                 ("NTP", RackNTP()),
@@ -427,6 +439,26 @@ class RackExternalService(TimerService):
     @inlineCallbacks
     def _getConfiguration(self):
         client = yield self._rpc_service.getClientNow()
+        try:
+            response = yield client(
+                GetExternalServicesConfiguration,
+                system_id=client.localIdent,
+                digest=self._digest,
+            )
+        except UnhandledCommand:
+            # The region is running an older version; fall back to fetching
+            # each part of the configuration separately.
+            config = yield self._getConfigurationSeparately(client)
+            return config
+        if "configuration" in response:
+            self._configuration = response["configuration"]
+            self._digest = response["digest"]
+        return _Configuration(
+            connections=self._rpc_service.connections, **self._configuration
+        )
+
+    @inlineCallbacks
+    def _getConfigurationSeparately(self, client):
         controller_type = yield client(
             GetControllerType, system_id=client.localIdent
         )
@@ -451,9 +483,20 @@ class RackExternalService(TimerService):
             connections=self._rpc_service.connections,
         )
 
-    @inlineCallbacks
+    def refresh(self):
+        """Update the external services now, rather than at the next interval.
+
+        Called when the region says that the configuration has changed.
+        """
+        return self._tryUpdate()
+
     def _tryUpdate(self):
-        """Update the NTP server running on this host."""
+        """Update the external services, one update at a time."""
+        return self._lock.run(self._update)
+
+    @inlineCallbacks
+    def _update(self):
+        """Update the external services running on this host."""
         try:
             config = yield self._getConfiguration()
         except exceptions.NoSuchNode:
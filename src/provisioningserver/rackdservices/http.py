@@ -175,6 +175,12 @@ class RackHTTPService(TimerService):
                 {
                     "upstream_http": list(sorted(upstream_http)),
                     "resource_root": self._resource_root,
+                    # Peer rack controllers fetch boot resources from the
+                    # cache, which is next to the current snapshot.
+                    "resource_cache": os.path.join(
+                        os.path.dirname(self._resource_root.rstrip("/")),
+                        "cache/",
+                    ),
                     "machine_resources": os.path.join(
                         snappy.get_snap_path(), "usr/share/maas"
                     )
@@ -7,6 +7,7 @@
 from datetime import timedelta
 
 from twisted.application.internet import TimerService
+from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
 from twisted.internet.error import ConnectionDone
 
@@ -16,7 +17,7 @@ from provisioningserver.rpc.exceptions import (
     NoConnectionsAvailable,
     NoSuchCluster,
 )
-from provisioningserver.rpc.power import query_all_nodes
+from provisioningserver.rpc.power import PowerQueryScheduler
 from provisioningserver.rpc.region import ListNodePowerParameters
 
 maaslog = get_maas_logger("power_monitor_service")
@@ -27,12 +28,15 @@ class NodePowerMonitorService(TimerService, object):
     """Service to monitor the power status of all nodes in this cluster."""
 
     check_interval = timedelta(seconds=15).total_seconds()
-    max_nodes_at_once = 5
 
     def __init__(self, clock=None):
         # Call self.query_nodes() every self.check_interval.
         super().__init__(self.check_interval, self.try_query_nodes)
         self.clock = clock
+        # Kept across rounds, for BMC backoff and prioritisation.
+        self.scheduler = PowerQueryScheduler(
+            reactor if clock is None else clock
+        )
 
     def try_query_nodes(self):
         """Attempt to query nodes' power states.
@@ -54,20 +58,19 @@ class NodePowerMonitorService(TimerService, object):
     @inlineCallbacks
     def query_nodes(self, client):
         # Get the nodes' power parameters from the region. Keep getting more
-        # power parameters until the region returns an empty list.
+        # power parameters until the region returns an empty list, then
+        # query them all in one go so that the scheduler can order them.
+        power_parameters = []
         while True:
             response = yield client(
                 ListNodePowerParameters, uuid=client.localIdent
             )
-            power_parameters = response["nodes"]
-            if len(power_parameters) > 0:
-                yield query_all_nodes(
-                    power_parameters,
-                    max_concurrency=self.max_nodes_at_once,
-                    clock=self.clock,
-                )
+            if len(response["nodes"]) > 0:
+                power_parameters.extend(response["nodes"])
             else:
                 break
+        if len(power_parameters) > 0:
+            yield self.scheduler.query_nodes(power_parameters)
 
     def query_nodes_failed(self, failure, localIdent):
         if failure.check(NoSuchCluster):
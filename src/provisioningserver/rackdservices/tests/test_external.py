@@ -10,7 +10,7 @@ from unittest.mock import Mock
 import attr
 from testtools.matchers import Equals, Is, IsInstance, MatchesStructure
 from twisted.internet import reactor
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, succeed
 
 from maastesting.factory import factory
 from maastesting.fixtures import MAASRootFixture
@@ -191,6 +191,82 @@ class TestRackExternalService(MAASTestCase):
         self.assertThat(logger.output, Equals(""))
         self.assertThat(ntp._tryUpdate, MockNotCalled())
 
+    def prepareRegionWithExternalServicesConfiguration(self, configuration):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(
+            region.GetControllerType,
+            region.GetExternalServicesConfiguration,
+        )
+        protocol.RegisterRackController.side_effect = always_succeed_with(
+            {"system_id": factory.make_name("maas-id")}
+        )
+        protocol.GetExternalServicesConfiguration.side_effect = [
+            succeed({"digest": "digest", "configuration": configuration}),
+            succeed({"digest": "digest"}),
+        ]
+
+        def connected(teardown):
+            self.addCleanup(teardown)
+            return services.getServiceNamed("rpc"), protocol
+
+        return connecting.addCallback(connected)
+
+    @inlineCallbacks
+    def test_getConfiguration_fetches_only_changed_configuration(self):
+        configuration = {
+            "controller_type": {"is_region": False, "is_rack": True},
+            "time_configuration": {"servers": ["10.0.0.1"], "peers": []},
+            "dns_configuration": {"trusted_networks": ["10.0.0.0/24"]},
+            "proxy_configuration": {
+                "enabled": True,
+                "port": 8000,
+                "allowed_cidrs": ["10.0.0.0/24"],
+                "prefer_v4_proxy": False,
+            },
+            "syslog_configuration": {"port": 5247},
+        }
+        prepared = yield self.prepareRegionWithExternalServicesConfiguration(
+            configuration
+        )
+        rpc_service, protocol = prepared
+        service = external.RackExternalService(rpc_service, reactor, [])
+
+        first = yield service._getConfiguration()
+        second = yield service._getConfiguration()
+
+        self.assertEqual(first, second)
+        self.assertThat(
+            first,
+            MatchesStructure.byEquality(
+                connections=rpc_service.connections, **configuration
+            ),
+        )
+        calls = protocol.GetExternalServicesConfiguration.call_args_list
+        self.assertEqual(
+            [None, "digest"], [kwargs.get("digest") for _, kwargs in calls]
+        )
+        self.assertThat(protocol.GetControllerType, MockNotCalled())
+
+    @inlineCallbacks
+    def test_getConfiguration_falls_back_to_separate_calls(self):
+        rpc_service, protocol = yield prepareRegion(self, is_region=True)
+        service = external.RackExternalService(rpc_service, reactor, [])
+
+        config = yield service._getConfiguration()
+
+        self.assertEqual(
+            {"is_region": True, "is_rack": True}, config.controller_type
+        )
+        self.assertIsNone(service._digest)
+
+    def test_refresh_updates_now(self):
+        service = external.RackExternalService(
+            StubClusterClientService(), reactor, []
+        )
+        self.patch(service, "_update").return_value = succeed(None)
+        service.refresh()
+        self.assertThat(service._update, MockCalledOnceWith())
+
 
 class TestRackNTP(MAASTestCase):
     """Tests for `RackNTP` in `RackExternalService`."""
@@ -4,6 +4,7 @@
 """Tests for `provisioningserver.rackdservices.http`."""
 
 
+import os
 import random
 from unittest.mock import ANY, Mock
 
@@ -136,6 +137,13 @@ class TestRackHTTPService(MAASTestCase):
             target_path,
             FileContains(matcher=Contains("alias %s;" % resource_root)),
         )
+        resource_cache = os.path.join(
+            os.path.dirname(resource_root.rstrip("/")), "cache/"
+        )
+        self.assertThat(
+            target_path,
+            FileContains(matcher=Contains("alias %s;" % resource_cache)),
+        )
         for region_ip in region_ips:
             self.assertThat(
                 target_path,
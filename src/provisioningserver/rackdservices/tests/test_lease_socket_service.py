@@ -8,7 +8,7 @@ import json
 import os
 import socket
 import time
-from unittest.mock import MagicMock, sentinel
+from unittest.mock import call, MagicMock, sentinel
 
 from testtools.matchers import Not, PathExists
 from twisted.application.service import Service
@@ -24,7 +24,7 @@ from provisioningserver.rackdservices.lease_socket_service import (
     LeaseSocketService,
 )
 from provisioningserver.rpc import getRegionClient
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import UpdateLease, UpdateLeases
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.utils.twisted import DeferredValue, pause, retries
 
@@ -107,16 +107,18 @@ class TestLeaseSocketService(MAASTestCase):
         self.assertEqual([packet], list(service.notifications))
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_with_notification(self):
+    def test_processNotificationBatch_gets_called_with_notification(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(sentinel.service, reactor)
         dv = DeferredValue()
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
+        # Mock processNotificationBatch to catch the call.
+        def mock_processNotificationBatch(*args, **kwargs):
             dv.set(args)
 
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(
+            service, "processNotificationBatch", mock_processNotificationBatch
+        )
 
         # Start the service and stop it at the end of the test.
         service.startService()
@@ -129,23 +131,25 @@ class TestLeaseSocketService(MAASTestCase):
         yield deferToThread(self.send_notification, socket_path, packet)
         yield dv.get(timeout=10)
 
-        # Packet should be the argument passed to processNotifcation
-        self.assertEqual((packet,), dv.value)
+        # Packet should be in the batch passed to processNotificationBatch.
+        self.assertEqual(([packet],), dv.value)
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_multiple_times(self):
+    def test_processNotificationBatch_gets_all_notifications_in_order(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(sentinel.service, reactor)
-        dvs = [DeferredValue(), DeferredValue()]
+        dv = DeferredValue()
+        received = []
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
-            for dv in dvs:
-                if not dv.isSet:
-                    dv.set(args)
-                    break
+        # Mock processNotificationBatch to catch the calls.
+        def mock_processNotificationBatch(notifications, **kwargs):
+            received.extend(notifications)
+            if len(received) == 2:
+                dv.set(received)
 
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(
+            service, "processNotificationBatch", mock_processNotificationBatch
+        )
 
         # Start the service and stop it at the end of the test.
         service.startService()
@@ -158,26 +162,35 @@ class TestLeaseSocketService(MAASTestCase):
         # Send notifications to the socket and wait for notifications.
         yield deferToThread(self.send_notification, socket_path, packet1)
         yield deferToThread(self.send_notification, socket_path, packet2)
-        yield dvs[0].get(timeout=10)
-        yield dvs[1].get(timeout=10)
+        yield dv.get(timeout=10)
 
-        # Packet should be the argument passed to processNotification in
-        # order.
-        self.assertEqual((packet1,), dvs[0].value)
-        self.assertEqual((packet2,), dvs[1].value)
+        # Packets should be passed to processNotificationBatch in order.
+        self.assertEqual([packet1, packet2], dv.value)
 
     @defer.inlineCallbacks
-    def test_processNotification_send_to_region(self):
-        protocol, connecting = self.patch_rpc_UpdateLease()
-        self.addCleanup((yield connecting))
-
-        client = getRegionClient()
-        rpc_service = MagicMock()
-        rpc_service.getClientNow.return_value = defer.succeed(client)
-        service = LeaseSocketService(rpc_service, reactor)
+    def test_processNotifications_splits_into_batches(self):
+        service = LeaseSocketService(sentinel.service, reactor)
+        service.batch_size = 2
+        processNotificationBatch = self.patch(
+            service, "processNotificationBatch"
+        )
+        processNotificationBatch.return_value = None
+        packets = [{"test": factory.make_name("test")} for _ in range(3)]
+        service.notifications.extend(packets)
+
+        yield service.processNotifications(clock=reactor)
+
+        self.assertEqual(
+            [
+                call(packets[:2], clock=reactor),
+                call(packets[2:], clock=reactor),
+            ],
+            processNotificationBatch.call_args_list,
+        )
+        self.assertEqual(0, len(service.notifications))
 
-        # Notification to region.
-        packet = {
+    def make_notification(self):
+        return {
             "action": "commit",
             "mac": factory.make_mac_address(),
             "ip_family": "ipv4",
@@ -186,18 +199,46 @@ class TestLeaseSocketService(MAASTestCase):
             "lease_time": 30,
             "hostname": factory.make_name("host"),
         }
-        yield service.processNotification(packet, clock=reactor)
+
+    @defer.inlineCallbacks
+    def test_processNotificationBatch_send_to_region(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(UpdateLeases)
+        self.addCleanup((yield connecting))
+
+        client = getRegionClient()
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+
+        packets = [self.make_notification(), self.make_notification()]
+        yield service.processNotificationBatch(packets, clock=reactor)
         self.assertThat(
-            protocol.UpdateLease,
+            protocol.UpdateLeases,
             MockCalledOnceWith(
-                protocol,
-                cluster_uuid=client.localIdent,
-                action=packet["action"],
-                mac=packet["mac"],
-                ip_family=packet["ip_family"],
-                ip=packet["ip"],
-                timestamp=packet["timestamp"],
-                lease_time=packet["lease_time"],
-                hostname=packet["hostname"],
+                protocol, cluster_uuid=client.localIdent, updates=packets
             ),
         )
+
+    @defer.inlineCallbacks
+    def test_processNotificationBatch_falls_back_to_UpdateLease(self):
+        # The region does not know about UpdateLeases.
+        protocol, connecting = self.patch_rpc_UpdateLease()
+        self.addCleanup((yield connecting))
+
+        client = getRegionClient()
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+
+        packets = [self.make_notification(), self.make_notification()]
+        yield service.processNotificationBatch(
+            [dict(packet) for packet in packets], clock=reactor
+        )
+        self.assertEqual(
+            [
+                call(protocol, cluster_uuid=client.localIdent, **packet)
+                for packet in packets
+            ],
+            protocol.UpdateLease.call_args_list,
+        )
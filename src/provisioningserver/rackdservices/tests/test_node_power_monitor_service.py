@@ -14,11 +14,12 @@ from twisted.internet.error import ConnectionDone
 from twisted.internet.task import Clock
 
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import MockCalledOnceWith, MockNotCalled
 from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
 from maastesting.twisted import extract_result, TwistedLoggerFixture
 from provisioningserver.rackdservices import node_power_monitor_service as npms
 from provisioningserver.rpc import exceptions, getRegionClient, region
+from provisioningserver.rpc.power import PowerQueryScheduler
 from provisioningserver.rpc.testing import MockClusterToRegionRPCFixture
 
 
@@ -62,11 +63,8 @@ class TestNodePowerMonitorService(MAASTestCase):
             MockCalledOnceWith(ANY, uuid=client.localIdent),
         )
 
-    def test_query_nodes_calls_query_all_nodes(self):
-        service = self.make_monitor_service()
-        service.max_nodes_at_once = sentinel.max_nodes_at_once
-
-        example_power_parameters = {
+    def make_power_parameters(self):
+        return {
             "system_id": factory.make_UUID(),
             "hostname": factory.make_hostname(),
             "power_state": factory.make_name("power_state"),
@@ -74,6 +72,15 @@ class TestNodePowerMonitorService(MAASTestCase):
             "context": {},
         }
 
+    def test_init_creates_scheduler(self):
+        service = self.make_monitor_service()
+        self.assertIsInstance(service.scheduler, PowerQueryScheduler)
+        self.assertIs(service.clock, service.scheduler.clock)
+
+    def test_query_nodes_calls_scheduler(self):
+        service = self.make_monitor_service()
+        example_power_parameters = self.make_power_parameters()
+
         rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
         proto_region, io = rpc_fixture.makeEventLoop(
             region.ListNodePowerParameters
@@ -83,20 +90,59 @@ class TestNodePowerMonitorService(MAASTestCase):
             succeed({"nodes": []}),
         ]
 
-        query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_nodes = self.patch(service.scheduler, "query_nodes")
 
         d = service.query_nodes(getRegionClient())
         io.flush()
 
         self.assertEqual(None, extract_result(d))
         self.assertThat(
-            query_all_nodes,
-            MockCalledOnceWith(
-                [example_power_parameters],
-                max_concurrency=sentinel.max_nodes_at_once,
-                clock=service.clock,
-            ),
+            query_nodes, MockCalledOnceWith([example_power_parameters])
+        )
+
+    def test_query_nodes_queries_all_pages_at_once(self):
+        service = self.make_monitor_service()
+        pages = [
+            [self.make_power_parameters() for _ in range(2)],
+            [self.make_power_parameters()],
+        ]
+
+        rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        proto_region, io = rpc_fixture.makeEventLoop(
+            region.ListNodePowerParameters
+        )
+        proto_region.ListNodePowerParameters.side_effect = [
+            succeed({"nodes": pages[0]}),
+            succeed({"nodes": pages[1]}),
+            succeed({"nodes": []}),
+        ]
+
+        query_nodes = self.patch(service.scheduler, "query_nodes")
+
+        d = service.query_nodes(getRegionClient())
+        io.flush()
+
+        self.assertEqual(None, extract_result(d))
+        self.assertThat(query_nodes, MockCalledOnceWith(pages[0] + pages[1]))
+
+    def test_query_nodes_does_not_call_scheduler_without_nodes(self):
+        service = self.make_monitor_service()
+
+        rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        proto_region, io = rpc_fixture.makeEventLoop(
+            region.ListNodePowerParameters
         )
+        proto_region.ListNodePowerParameters.return_value = succeed(
+            {"nodes": []}
+        )
+
+        query_nodes = self.patch(service.scheduler, "query_nodes")
+
+        d = service.query_nodes(getRegionClient())
+        io.flush()
+
+        self.assertEqual(None, extract_result(d))
+        self.assertThat(query_nodes, MockNotCalled())
 
     def test_query_nodes_copes_with_NoSuchCluster(self):
         service = self.make_monitor_service()
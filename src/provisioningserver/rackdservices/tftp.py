@@ -33,7 +33,10 @@ from provisioningserver.events import EVENT_TYPES, send_node_event_ip_address
 from provisioningserver.kernel_opts import KernelParameters
 from provisioningserver.logger import get_maas_logger, LegacyLogger
 from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
-from provisioningserver.rpc.boot_images import list_boot_images
+from provisioningserver.rpc.boot_images import (
+    get_boot_image_index,
+    list_boot_images,
+)
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import GetBootConfig, MarkNodeFailed
 from provisioningserver.utils import network, tftp, typed
@@ -52,34 +55,16 @@ def get_boot_image(params):
     if purpose == "enlist":
         purpose = "commissioning"
 
-    # Get the matching boot images, minus subarchitecture.
-    boot_images = list_boot_images()
-    boot_images = [
-        image
-        for image in boot_images
-        if (
-            image["osystem"] == params["osystem"]
-            and image["release"] == params["release"]
-            and image["architecture"] == params["arch"]
-            and image["purpose"] == purpose
-        )
-    ]
-
-    # See if exact subarchitecture match.
-    for image in boot_images:
-        if image["subarchitecture"] == params["subarch"]:
-            return image
-
-    # Not exact match check if subarchitecture is in the supported
-    # subarchitectures list.
-    for image in boot_images:
-        subarches = image.get("supported_subarches", "")
-        subarches = subarches.split(",")
-        if params["subarch"] in subarches:
-            return image
-
-    # No matching boot image was found.
-    return None
+    # Look the image up in the index, preferring an exact subarchitecture
+    # match over a supported subarchitecture.
+    index = get_boot_image_index(list_boot_images())
+    return index.get_image(
+        params["osystem"],
+        params["release"],
+        params["arch"],
+        params["subarch"],
+        purpose,
+    )
 
 
 def log_request(file_name, clock=reactor):
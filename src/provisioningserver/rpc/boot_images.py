@@ -15,7 +15,7 @@ from provisioningserver.config import ClusterConfiguration
 from provisioningserver.import_images import boot_resources
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.rpc import getRegionClient
-from provisioningserver.rpc.region import UpdateLastImageSync
+from provisioningserver.rpc.region import ReportBootImages, UpdateLastImageSync
 from provisioningserver.utils.env import environment_variables, get_maas_id
 from provisioningserver.utils.twisted import synchronous
 
@@ -23,6 +23,62 @@ log = LegacyLogger()
 
 
 CACHED_BOOT_IMAGES = None
+CACHED_BOOT_IMAGE_INDEX = None
+
+
+class BootImageIndex:
+    """An index for finding the boot image to use for a boot request.
+
+    The index is built once from a list of boot images, as returned by
+    `list_boot_images`, and is not modified afterwards. Use
+    `get_boot_image_index` to obtain one.
+    """
+
+    def __init__(self, images):
+        self.images = images
+        # Map (osystem, release, arch, purpose, subarch) to an image, first
+        # by exact subarchitecture and then by supported subarchitecture.
+        # The first image listed wins in each case.
+        self._by_subarch = {}
+        self._by_supported_subarch = {}
+        for image in images:
+            key = (
+                image["osystem"],
+                image["release"],
+                image["architecture"],
+                image["purpose"],
+            )
+            self._by_subarch.setdefault(
+                key + (image["subarchitecture"],), image
+            )
+            subarches = image.get("supported_subarches", "")
+            for subarch in subarches.split(","):
+                self._by_supported_subarch.setdefault(key + (subarch,), image)
+
+    def get_image(self, osystem, release, arch, subarch, purpose):
+        """Return the boot image matching the given parameters, or `None`.
+
+        An image with the exact subarchitecture is preferred over one that
+        lists `subarch` in its supported subarchitectures.
+        """
+        key = (osystem, release, arch, purpose, subarch)
+        image = self._by_subarch.get(key)
+        if image is None:
+            image = self._by_supported_subarch.get(key)
+        return image
+
+
+def get_boot_image_index(images):
+    """Return a `BootImageIndex` for `images`.
+
+    The index is rebuilt only when `images` is not the list the cached index
+    was built from, i.e. after `reload_boot_images` found a change.
+    """
+    global CACHED_BOOT_IMAGE_INDEX
+    index = CACHED_BOOT_IMAGE_INDEX
+    if index is None or index.images is not images:
+        index = CACHED_BOOT_IMAGE_INDEX = BootImageIndex(images)
+    return index
 
 
 def list_boot_images():
@@ -43,11 +99,17 @@ def list_boot_images():
 
 def reload_boot_images():
     """Update the cached boot images so `list_boot_images` returns the
-    most up-to-date boot images list."""
+    most up-to-date boot images list.
+
+    The cached list is only replaced when the boot images have changed, so
+    that the `BootImageIndex` built from it can be reused.
+    """
     global CACHED_BOOT_IMAGES
     with ClusterConfiguration.open() as config:
         tftp_root = config.tftp_root
-    CACHED_BOOT_IMAGES = tftppath.list_boot_images(tftp_root)
+    boot_images = tftppath.list_boot_images(tftp_root)
+    if boot_images != CACHED_BOOT_IMAGES:
+        CACHED_BOOT_IMAGES = boot_images
 
 
 def get_hosts_from_sources(sources):
@@ -89,10 +151,15 @@ def fix_sources_for_cluster(sources, maas_url):
 
 
 @synchronous
-def _run_import(sources, maas_url, http_proxy=None, https_proxy=None):
+def _run_import(
+    sources, maas_url, http_proxy=None, https_proxy=None, peers=None
+):
     """Run the import.
 
     This is function is synchronous so it must be called with deferToThread.
+
+    :param peers: Optional base URLs of rack controllers from which the boot
+        resources can be fetched instead of the sources.
     """
     # Fix the sources to download from the IP address defined in the cluster
     # configuration, instead of the URL that the region asked it to use.
@@ -112,9 +179,14 @@ def _run_import(sources, maas_url, http_proxy=None, https_proxy=None):
         "[::1]",
     ]
     no_proxy_hosts += list(get_hosts_from_sources(sources))
+    # The peers are other rack controllers, so also reached directly.
+    if peers:
+        no_proxy_hosts += sorted(
+            get_hosts_from_sources([{"url": peer} for peer in peers])
+        )
     variables["no_proxy"] = ",".join(no_proxy_hosts)
     with environment_variables(variables):
-        imported = boot_resources.import_images(sources)
+        imported = boot_resources.import_images(sources, peers=peers)
 
     # Update the boot images cache so `list_boot_images` returns the
     # correct information.
@@ -124,7 +196,9 @@ def _run_import(sources, maas_url, http_proxy=None, https_proxy=None):
     return imported
 
 
-def import_boot_images(sources, maas_url, http_proxy=None, https_proxy=None):
+def import_boot_images(
+    sources, maas_url, http_proxy=None, https_proxy=None, peers=None
+):
     """Imports the boot images from the given sources."""
     lock = concurrency.boot_images
     # This checks if any other defer is already waiting. If nothing is waiting
@@ -140,20 +214,26 @@ def import_boot_images(sources, maas_url, http_proxy=None, https_proxy=None):
             maas_url,
             http_proxy=http_proxy,
             https_proxy=https_proxy,
+            peers=peers,
         )
 
 
 @inlineCallbacks
-def _import_boot_images(sources, maas_url, http_proxy=None, https_proxy=None):
+def _import_boot_images(
+    sources, maas_url, http_proxy=None, https_proxy=None, peers=None
+):
     """Import boot images then inform the region.
 
     Helper for `import_boot_images`.
     """
     proxies = dict(http_proxy=http_proxy, https_proxy=https_proxy)
-    yield deferToThread(_run_import, sources, maas_url, **proxies)
+    yield deferToThread(_run_import, sources, maas_url, peers=peers, **proxies)
     yield touch_last_image_sync_timestamp().addErrback(
         log.err, "Failure touching last image sync timestamp."
     )
+    yield report_boot_images().addErrback(
+        log.err, "Failure reporting boot images."
+    )
 
 
 def is_import_boot_images_running():
@@ -173,3 +253,25 @@ def touch_last_image_sync_timestamp():
         return fail()
     else:
         return client(UpdateLastImageSync, system_id=get_maas_id())
+
+
+def report_boot_images():
+    """Report the boot images on this rack controller to the region.
+
+    The region caches them, so that it doesn't need to ask for them.
+
+    :return: :class:`Deferred` that can fail with `NoConnectionsAvailable` or
+        any exception arising from a `ReportBootImages` RPC.
+    """
+    try:
+        client = getRegionClient()
+    except Exception:
+        return fail()
+    else:
+        system_id = get_maas_id()
+        return client(
+            ReportBootImages,
+            uuid=system_id,
+            images=[],
+            boot_images=list_boot_images(),
+        )
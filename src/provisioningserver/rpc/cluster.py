@@ -27,6 +27,8 @@ __all__ = [
     "PowerOn",
     "PowerQuery",
     "ScanNetworks",
+    "UpdateDHCPv4Hosts",
+    "UpdateDHCPv6Hosts",
     "ValidateDHCPv4Config",
     "ValidateDHCPv4Config_V2",
     "ValidateDHCPv6Config",
@@ -640,11 +642,76 @@ class ValidateDHCPv6Config_V2(_ValidateDHCPConfig_V2):
     """
 
 
+class _UpdateDHCPHosts(amp.Command):
+    """Update the host maps of a running DHCP server.
+
+    Only the host maps that changed since the server was last configured are
+    sent; they are applied over the OMAPI without rewriting the configuration
+    or restarting the server. `CannotConfigureDHCP` is raised when the server
+    cannot be updated this way, in which case a full configuration is needed.
+
+    :since: 2.10
+    """
+
+    arguments = [
+        (b"omapi_key", amp.Unicode()),
+        (
+            b"remove",
+            CompressedAmpList(
+                [
+                    (b"host", amp.Unicode()),
+                    (b"mac", amp.Unicode()),
+                    (b"ip", amp.Unicode()),
+                ]
+            ),
+        ),
+        (
+            b"add",
+            CompressedAmpList(
+                [
+                    (b"host", amp.Unicode()),
+                    (b"mac", amp.Unicode()),
+                    (b"ip", amp.Unicode()),
+                ]
+            ),
+        ),
+        (
+            b"modify",
+            CompressedAmpList(
+                [
+                    (b"host", amp.Unicode()),
+                    (b"mac", amp.Unicode()),
+                    (b"ip", amp.Unicode()),
+                ]
+            ),
+        ),
+    ]
+    response = []
+    errors = {exceptions.CannotConfigureDHCP: b"CannotConfigureDHCP"}
+
+
+class UpdateDHCPv4Hosts(_UpdateDHCPHosts):
+    """Update the host maps of the DHCPv4 server.
+
+    :since: 2.10
+    """
+
+
+class UpdateDHCPv6Hosts(_UpdateDHCPHosts):
+    """Update the host maps of the DHCPv6 server.
+
+    :since: 2.10
+    """
+
+
 class ImportBootImages(amp.Command):
     """Import boot images and report the final
     boot images that exist on the cluster.
 
     :since: 1.7
+    :since: 2.10 for `peers`, base URLs of rack controllers that have already
+        imported the same boot images, from which the content can be fetched
+        instead of the region.
     """
 
     arguments = [
@@ -671,6 +738,7 @@ class ImportBootImages(amp.Command):
         ),
         (b"http_proxy", ParsedURL(optional=True)),
         (b"https_proxy", ParsedURL(optional=True)),
+        (b"peers", amp.ListOf(amp.Unicode(), optional=True)),
     ]
     response = []
     errors = []
@@ -727,6 +795,19 @@ class RefreshRackControllerInfo(amp.Command):
     errors = {exceptions.RefreshAlreadyInProgress: b"RefreshAlreadyInProgress"}
 
 
+class RefreshExternalServices(amp.Command):
+    """Tell the rack controller that the configuration of its external
+    services has changed, so that it's fetched now rather than at the next
+    interval.
+
+    :since: 2.10
+    """
+
+    arguments = []
+    response = []
+    errors = {}
+
+
 class AddChassis(amp.Command):
     """Probe and enlist the chassis which a rack controller can connect to.
 
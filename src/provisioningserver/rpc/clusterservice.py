@@ -37,7 +37,7 @@ from zope.interface import implementer
 
 from apiclient.creds import convert_string_to_tuple
 from apiclient.utils import ascii_url
-from provisioningserver import concurrency
+from provisioningserver import concurrency, services
 from provisioningserver.config import ClusterConfiguration, is_dev_environment
 from provisioningserver.drivers import ArchitectureRegistry
 from provisioningserver.drivers.hardware.seamicro import (
@@ -305,7 +305,9 @@ class Cluster(RPCProtocol):
         return {"images": list_boot_images()}
 
     @cluster.ImportBootImages.responder
-    def import_boot_images(self, sources, http_proxy=None, https_proxy=None):
+    def import_boot_images(
+        self, sources, http_proxy=None, https_proxy=None, peers=None
+    ):
         """import_boot_images()
 
         Implementation of
@@ -320,6 +322,7 @@ class Cluster(RPCProtocol):
             self.service.maas_url,
             http_proxy=get_proxy_url(http_proxy),
             https_proxy=get_proxy_url(https_proxy),
+            peers=peers,
         )
         return {}
 
@@ -650,6 +653,46 @@ class Cluster(RPCProtocol):
 
         return d
 
+    def _update_dhcp_hosts(self, server, lock, remove, add, modify):
+        """Update the host maps of `server` while holding `lock`."""
+        d = lock.run(
+            deferWithTimeout,
+            DHCP_TIMEOUT,
+            dhcp.update_hosts,
+            server,
+            remove,
+            add,
+            modify,
+        )
+        d.addCallback(lambda _: {})
+
+        # Catch the cancelled error, which means the work timed out.
+        def _timeoutEb(failure):
+            failure.trap(CancelledError)
+            log.err(
+                failure,
+                "%s host maps update timed out" % server.descriptive_name,
+            )
+            raise CannotConfigureDHCP("timed out") from failure.value
+
+        d.addErrback(_timeoutEb)
+
+        return d
+
+    @cluster.UpdateDHCPv4Hosts.responder
+    def update_dhcpv4_hosts(self, omapi_key, remove, add, modify):
+        server = dhcp.DHCPv4Server(omapi_key)
+        return self._update_dhcp_hosts(
+            server, concurrency.dhcpv4, remove, add, modify
+        )
+
+    @cluster.UpdateDHCPv6Hosts.responder
+    def update_dhcpv6_hosts(self, omapi_key, remove, add, modify):
+        server = dhcp.DHCPv6Server(omapi_key)
+        return self._update_dhcp_hosts(
+            server, concurrency.dhcpv6, remove, add, modify
+        )
+
     @cluster.ValidateDHCPv6Config.responder
     def validate_dhcpv6_config(
         self,
@@ -773,6 +816,24 @@ class Cluster(RPCProtocol):
             lambda: {"maas_version": str(get_running_version())}
         )
 
+    @cluster.RefreshExternalServices.responder
+    def refresh_external_services(self):
+        """RefreshExternalServices()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.cluster.RefreshExternalServices`.
+        """
+        try:
+            service = services.getServiceNamed("external")
+        except KeyError:
+            # The external services aren't managed by this process.
+            pass
+        else:
+            if service.running:
+                # Update the external services but don't wait.
+                service.refresh()
+        return {}
+
     @cluster.AddChassis.responder
     def add_chassis(
         self,
@@ -8,10 +8,12 @@ __all__ = [
     "DHCPv4Server",
     "DHCPv6Server",
     "downgrade_shared_networks",
+    "update_hosts",
     "upgrade_shared_networks",
 ]
 
 from collections import namedtuple
+from itertools import chain
 from operator import itemgetter
 import os
 import re
@@ -434,6 +436,81 @@ def configure(
         _current_server_state[server.dhcp_service] = new_state
 
 
+@asynchronous
+@inlineCallbacks
+def update_hosts(server, remove, add, modify):
+    """Update the host maps of the running DHCPv6/DHCPv4 server.
+
+    The host maps are changed over the OMAPI and the known state of the
+    server is updated to match. The configuration file is not rewritten and
+    the server is not restarted; the next call to `configure` takes care of
+    both when needed.
+
+    This method is not safe to call concurrently with itself or `configure`.
+    The clusterserver ensures that this method is not called concurrently.
+
+    :param server: A `DHCPServer` instance.
+    :param remove: List of dicts for the hosts to remove.
+    :param add: List of dicts for the hosts to add.
+    :param modify: List of dicts for the hosts whose IP address changed.
+    :raise CannotConfigureDHCP: When the state of the server is not known,
+        is not compatible with the update, or the OMAPI update fails. The
+        server needs to be configured in full with `configure` instead.
+    """
+    current_state = _current_server_state.get(server.dhcp_service, None)
+    if current_state is None:
+        raise CannotConfigureDHCP(
+            "%s server state is unknown; it must be configured first."
+            % server.descriptive_name
+        )
+    if current_state.omapi_key != server.omapi_key:
+        raise CannotConfigureDHCP(
+            "%s server OMAPI key has changed; it must be reconfigured."
+            % server.descriptive_name
+        )
+    service_state = yield service_monitor.getServiceState(
+        server.dhcp_service, now=True
+    )
+    if service_state.active_state != SERVICE_STATE.ON:
+        raise CannotConfigureDHCP(
+            "%s server is not running; it must be reconfigured."
+            % server.descriptive_name
+        )
+
+    hosts = dict(current_state.hosts)
+    for host in remove:
+        hosts.pop(host["mac"], None)
+    for host in chain(add, modify):
+        previous = hosts.get(host["mac"], {})
+        hosts[host["mac"]] = dict(
+            host, dhcp_snippets=previous.get("dhcp_snippets", [])
+        )
+
+    log.debug(
+        "Writing to OMAPI for {name} service:\n"
+        "\tremove: {remove()}\n"
+        "\tadd: {add()}\n"
+        "\tmodify: {modify()}\n",
+        name=server.descriptive_name,
+        remove=_debug_hostmap_msg_remove(remove),
+        add=_debug_hostmap_msg(add),
+        modify=_debug_hostmap_msg(modify),
+    )
+    try:
+        yield deferToThread(_update_hosts, server, remove, add, modify)
+    except Exception as error:
+        # The host maps are now in an unknown state; force the next
+        # configure to restart the server.
+        _current_server_state[server.dhcp_service] = None
+        raise CannotConfigureDHCP(
+            "%s server failed to update host maps: %s"
+            % (server.descriptive_name, error)
+        ) from error
+    _current_server_state[server.dhcp_service] = current_state._replace(
+        hosts=hosts
+    )
+
+
 def _parse_dhcpd_errors(error_str):
     """Parse the output of dhcpd -t -cf <file> into a list of dictionaries
 
@@ -3,6 +3,7 @@
 
 """Power control."""
 
+from collections import deque
 from datetime import timedelta
 from functools import partial
 import sys
@@ -10,25 +11,34 @@ import sys
 from twisted.internet import reactor
 from twisted.internet.defer import (
     CancelledError,
+    Deferred,
     DeferredList,
     DeferredSemaphore,
     inlineCallbacks,
+    maybeDeferred,
     returnValue,
     succeed,
 )
 from twisted.internet.task import deferLater
+from twisted.protocols.amp import UnhandledCommand
+from twisted.python.failure import Failure
 
 from provisioningserver.drivers.power import get_error_message, PowerError
 from provisioningserver.drivers.power.registry import PowerDriverRegistry
 from provisioningserver.events import EVENT_TYPES, send_node_event
 from provisioningserver.logger import get_maas_logger, LegacyLogger
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc import getRegionClient
 from provisioningserver.rpc.exceptions import (
     NoSuchNode,
     PowerActionAlreadyInProgress,
     PowerActionFail,
 )
-from provisioningserver.rpc.region import MarkNodeFailed, UpdateNodePowerState
+from provisioningserver.rpc.region import (
+    MarkNodeFailed,
+    UpdateNodePowerState,
+    UpdateNodePowerStates,
+)
 from provisioningserver.utils.twisted import (
     asynchronous,
     callOut,
@@ -44,6 +54,18 @@ log = LegacyLogger()
 # meant to cope with broken BMCs.
 CHANGE_POWER_STATE_TIMEOUT = timedelta(minutes=5).total_seconds()
 
+# How long after a node's power state changes its power is queried ahead of
+# other nodes.
+RECENT_TRANSITION_PERIOD = timedelta(minutes=10).total_seconds()
+
+# Backoff for BMCs that keep failing to be queried: the first retry is after
+# BMC_BACKOFF_MIN, doubling after every further failure up to BMC_BACKOFF_MAX.
+BMC_BACKOFF_MIN = timedelta(minutes=1).total_seconds()
+BMC_BACKOFF_MAX = timedelta(hours=1).total_seconds()
+
+# The maximum number of power states reported to the region in one call.
+POWER_STATE_BATCH_SIZE = 100
+
 # We could use a Registry here, but it seems kind of like overkill.
 power_action_registry = {}
 
@@ -59,6 +81,33 @@ def power_state_update(system_id, state):
     return client(UpdateNodePowerState, system_id=system_id, power_state=state)
 
 
+@asynchronous
+@inlineCallbacks
+def power_states_update(changed, unchanged):
+    """Report to the region about the power states of several nodes.
+
+    Regions that don't know `UpdateNodePowerStates` are sent every power
+    state with `UpdateNodePowerState` instead.
+
+    :param changed: A list of dicts with the `system_id` and `power_state` of
+        the nodes whose power state has changed.
+    :param unchanged: The same, for the nodes whose power state is unchanged.
+    """
+    client = getRegionClient()
+    try:
+        yield client(
+            UpdateNodePowerStates,
+            changed=changed,
+            unchanged=[update["system_id"] for update in unchanged],
+        )
+    except UnhandledCommand:
+        for update in changed + unchanged:
+            try:
+                yield client(UpdateNodePowerState, **update)
+            except NoSuchNode:
+                pass
+
+
 @asynchronous(timeout=15)
 @inlineCallbacks
 def power_change_failure(system_id, hostname, power_change, message):
@@ -412,6 +461,90 @@ def report_power_state(d, system_id, hostname):
     return d.addCallbacks(cb, eb)
 
 
+class PowerStateBatch:
+    """Report the results of power queries to the region in batches.
+
+    The power state of each node is compared with the one the region gave
+    for it. Only changed power states are stored by the region; unchanged
+    ones only mark the node's power state as updated.
+    """
+
+    def __init__(self, size=POWER_STATE_BATCH_SIZE):
+        self.size = size
+        self.changed = []
+        self.unchanged = []
+        self.sending = []
+
+    def add(self, node, power_state):
+        """Add the power state of `node` to the batch.
+
+        The batch is sent once it holds `size` power states.
+        """
+        update = {"system_id": node["system_id"], "power_state": power_state}
+        if power_state == node["power_state"]:
+            self.unchanged.append(update)
+        else:
+            self.changed.append(update)
+        if len(self.changed) + len(self.unchanged) >= self.size:
+            self.send()
+
+    def send(self):
+        """Send the power states in the batch to the region."""
+        changed, unchanged = self.changed, self.unchanged
+        self.changed, self.unchanged = [], []
+        if len(changed) > 0 or len(unchanged) > 0:
+            d = power_states_update(changed, unchanged)
+            d.addErrback(log.err, "Failed to report power states.")
+            self.sending.append(d)
+
+    def flush(self):
+        """Send the remaining power states.
+
+        :return: A `Deferred` that fires once all the power states in the
+            batch have been sent, successfully or not.
+        """
+        self.send()
+        sending, self.sending = self.sending, []
+        return DeferredList(sending)
+
+    def report(self, d, node):
+        """Add the result of a power query to the batch.
+
+        Like `report_power_state`, but for the batch. A node event is still
+        sent for every failed query.
+
+        :param d: A `Deferred` that will fire with the node's updated power
+            state, or an error condition. The callback/errback values are
+            passed through unaltered.
+        """
+
+        def cb(state):
+            log.debug(
+                "Power state queried for node {system_id}: {state}",
+                system_id=node["system_id"],
+                state=state,
+            )
+            self.add(node, state)
+            return state
+
+        def eb(failure):
+            maaslog.error(
+                "%s: Power state could not be queried: %s"
+                % (node["hostname"], failure.getErrorMessage())
+            )
+            self.add(node, "error")
+            d = send_node_event(
+                EVENT_TYPES.NODE_POWER_QUERY_FAILED,
+                node["system_id"],
+                node["hostname"],
+                failure.getErrorMessage(),
+            )
+            d.addCallback(lambda _: failure)
+            return d
+
+        return d.addCallbacks(cb, eb)
+
+
 def maaslog_report_success(node, power_state):
     """Log change in power state for node."""
     if node["power_state"] != power_state:
@@ -450,10 +583,16 @@ def maaslog_report_failure(node, failure):
         # log.err(failure, "Failed to refresh power state.")
 
 
-def query_node(node, clock):
+def query_node(node, clock, observer=None, batch=None):
     """Calls `get_power_state` on the given node.
 
     Logs to maaslog as errors and power states change.
+
+    :param batch: Optional `PowerStateBatch` to report the node's power state
+        with. Without it, the power state is reported on its own.
+
+    :param observer: Optional callable, called with the node's power state,
+        or the `Failure` from querying it, before that is logged.
     """
     if node["system_id"] in power_action_registry:
         log.debug(
@@ -470,7 +609,17 @@ def query_node(node, clock):
             node["context"],
             clock=clock,
         )
-        d = report_power_state(d, node["system_id"], node["hostname"])
+        if batch is None:
+            d = report_power_state(d, node["system_id"], node["hostname"])
+        else:
+            d = batch.report(d, node)
+        if observer is not None:
+
+            def observe(result):
+                observer(result)
+                return result
+
+            d.addBoth(observe)
         d.addCallbacks(
             partial(maaslog_report_success, node),
             partial(maaslog_report_failure, node),
@@ -478,18 +627,213 @@ def query_node(node, clock):
         return d
 
 
+def get_bmc_key(node):
+    """Return a key identifying the BMC of `node`.
+
+    Nodes sharing a BMC, e.g. VMs on the same VM host, share the key. Nodes
+    without a power address get a key of their own.
+    """
+    power_address = node["context"].get("power_address")
+    if power_address:
+        return node["power_type"], power_address
+    else:
+        return node["power_type"], node["system_id"]
+
+
+class AdaptiveQueryLimit:
+    """Limit the number of concurrent power queries, adapting to the BMCs.
+
+    Starts out allowing `initial` concurrent queries. Each query that
+    completes within `target` seconds allows one more, up to `maximum`; each
+    query that takes longer halves the limit, down to a single query. This
+    way responsive BMCs are queried in parallel, while slow ones aren't
+    piled upon.
+    """
+
+    def __init__(self, initial, maximum, target, clock=reactor):
+        self.limit = max(initial, 1)
+        self.maximum = max(maximum, self.limit)
+        self.target = target
+        self.clock = clock
+        self.running = 0
+        self.waiting = deque()
+
+    def run(self, func, *args, **kwargs):
+        """Call `func` once the limit allows it.
+
+        :return: A deferred firing with the result of `func`.
+        """
+        d = Deferred()
+        self.waiting.append((d, func, args, kwargs))
+        self._start()
+        return d
+
+    def _start(self):
+        while self.waiting and self.running < self.limit:
+            d, func, args, kwargs = self.waiting.popleft()
+            self.running += 1
+            started = self.clock.seconds()
+            result = maybeDeferred(func, *args, **kwargs)
+            result.addBoth(self._finished, started)
+            result.chainDeferred(d)
+
+    def _finished(self, result, started):
+        self.running -= 1
+        if self.clock.seconds() - started <= self.target:
+            self.limit = min(self.limit + 1, self.maximum)
+        else:
+            self.limit = max(self.limit // 2, 1)
+        self._start()
+        return result
+
+
+class PowerQueryScheduler:
+    """Schedule the power queries of the nodes on this rack.
+
+    The scheduler is kept between query rounds, so that it can:
+
+    - limit the number of concurrent queries per power driver, starting at
+      the driver's `query_concurrency` and adapting to how quickly its BMCs
+      respond, up to `query_concurrency_max`;
+    - back off exponentially from BMCs that repeatedly fail to be queried,
+      so that unreachable BMCs don't hold up the reachable ones;
+    - query the nodes whose power state changed recently before the others.
+    """
+
+    def __init__(
+        self,
+        clock=reactor,
+        max_concurrency=None,
+        batch_size=POWER_STATE_BATCH_SIZE,
+    ):
+        """
+        :param max_concurrency: If given, the number of concurrent queries
+            allowed for every power driver, instead of its own.
+        :param batch_size: The number of power states reported to the region
+            at once, or `None` to report each power state on its own.
+        """
+        self.clock = clock
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self._semaphores = {}
+        # BMC key -> (consecutive failures, time of the next attempt).
+        self._backoffs = {}
+        # System ID -> time the power state was last seen changing.
+        self._transitions = {}
+
+    def _get_semaphore(self, power_type):
+        semaphore = self._semaphores.get(power_type)
+        if semaphore is None:
+            if self.max_concurrency is None:
+                driver = PowerDriverRegistry.get_item(power_type)
+                semaphore = AdaptiveQueryLimit(
+                    driver.query_concurrency,
+                    driver.query_concurrency_max,
+                    driver.query_latency_target,
+                    self.clock,
+                )
+            else:
+                semaphore = DeferredSemaphore(self.max_concurrency)
+            self._semaphores[power_type] = semaphore
+        return semaphore
+
+    def is_backed_off(self, node):
+        """Whether querying `node`'s BMC is backed off for now."""
+        backoff = self._backoffs.get(get_bmc_key(node))
+        return backoff is not None and self.clock.seconds() < backoff[1]
+
+    def _recently_changed(self, node):
+        changed = self._transitions.get(node["system_id"])
+        return (
+            changed is not None
+            and self.clock.seconds() - changed < RECENT_TRANSITION_PERIOD
+        )
+
+    def _record_result(self, node, result):
+        """Record the outcome of querying `node`."""
+        now = self.clock.seconds()
+        key = get_bmc_key(node)
+        if not isinstance(result, Failure):
+            self._backoffs.pop(key, None)
+            if result != node["power_state"]:
+                self._transitions[node["system_id"]] = now
+        elif not result.check(NoSuchNode, CancelledError):
+            failures = self._backoffs.get(key, (0, None))[0] + 1
+            delay = min(BMC_BACKOFF_MIN * 2 ** (failures - 1), BMC_BACKOFF_MAX)
+            self._backoffs[key] = failures, now + delay
+
+    def _query(self, node, queued, batch):
+        started = self.clock.seconds()
+        PROMETHEUS_METRICS.update(
+            "maas_rack_power_query_queue_lag",
+            "observe",
+            value=started - queued,
+            labels={"power_type": node["power_type"]},
+        )
+
+        def observe(result):
+            PROMETHEUS_METRICS.update(
+                "maas_rack_power_query_latency",
+                "observe",
+                value=self.clock.seconds() - started,
+                labels={"power_type": node["power_type"]},
+            )
+            self._record_result(node, result)
+
+        return query_node(node, self.clock, observer=observe, batch=batch)
+
+    def query_nodes(self, nodes):
+        """Queries the given nodes for their power state.
+
+        Nodes with an unknown power type, or whose BMC is backed off, are
+        skipped. Nodes' states are reported back to the region, in batches
+        of `batch_size`.
+
+        :return: A deferred, which fires once all nodes have been queried
+            and their states reported, successfully or not.
+        """
+        now = self.clock.seconds()
+        self._transitions = {
+            system_id: changed
+            for system_id, changed in self._transitions.items()
+            if now - changed < RECENT_TRANSITION_PERIOD
+        }
+        nodes = [
+            node for node in nodes if node["power_type"] in PowerDriverRegistry
+        ]
+        # The sort is stable, so the region's ordering is otherwise kept.
+        nodes.sort(key=lambda node: not self._recently_changed(node))
+        if self.batch_size is None:
+            batch = None
+        else:
+            batch = PowerStateBatch(self.batch_size)
+        queries = []
+        for node in nodes:
+            if self.is_backed_off(node):
+                log.debug(
+                    "{hostname}: Skipping query power status, "
+                    "BMC is not responding.",
+                    hostname=node["hostname"],
+                )
+                queries.append(succeed(None))
+            else:
+                semaphore = self._get_semaphore(node["power_type"])
+                queries.append(semaphore.run(self._query, node, now, batch))
+        d = DeferredList(queries, consumeErrors=True)
+        if batch is not None:
+            d.addCallback(callOut, batch.flush)
+        return d
+
+
 def query_all_nodes(nodes, max_concurrency=5, clock=reactor):
     """Queries the given nodes for their power state.
 
-    Nodes' states are reported back to the region.
+    Nodes' states are reported back to the region, one at a time.
 
     :return: A deferred, which fires once all nodes have been queried,
         successfully or not.
     """
-    semaphore = DeferredSemaphore(tokens=max_concurrency)
-    queries = (
-        semaphore.run(query_node, node, clock)
-        for node in nodes
-        if node["power_type"] in PowerDriverRegistry
+    scheduler = PowerQueryScheduler(
+        clock, max_concurrency=max_concurrency, batch_size=None
     )
-    return DeferredList(queries, consumeErrors=True)
+    return scheduler.query_nodes(nodes)
@@ -17,6 +17,7 @@ __all__ = [
     "GetControllerType",
     "GetDiscoveryState",
     "GetDNSConfiguration",
+    "GetExternalServicesConfiguration",
     "GetProxies",
     "GetTimeConfiguration",
     "Identify",
@@ -33,7 +34,10 @@ __all__ = [
     "SendEventMACAddress",
     "UpdateInterfaces",
     "UpdateLastImageSync",
+    "UpdateLease",
+    "UpdateLeases",
     "UpdateNodePowerState",
+    "UpdateNodePowerStates",
 ]
 
 from twisted.protocols import amp
@@ -41,6 +45,7 @@ from twisted.protocols import amp
 from provisioningserver.rpc.arguments import (
     AmpList,
     Bytes,
+    CompressedAmpList,
     ParsedURL,
     StructureAsJSON,
 )
@@ -87,14 +92,18 @@ class RegisterRackController(amp.Command):
 
 
 class ReportBootImages(amp.Command):
-    """Report boot images available on the invoking cluster controller.
+    """Report boot images available on the invoking rack controller.
 
     :since: 1.5
+    :since: 2.10 for `boot_images`, the images as listed by ListBootImagesV2,
+        which the region caches so that it doesn't need to ask the rack
+        controller for them.
     """
 
     arguments = [
-        # The cluster UUID.
+        # The system_id of the rack controller (formerly the cluster UUID).
         (b"uuid", amp.Unicode()),
+        # Not used; the images are reported in `boot_images`.
         (
             b"images",
             AmpList(
@@ -106,6 +115,22 @@ class ReportBootImages(amp.Command):
                 ]
             ),
         ),
+        (
+            b"boot_images",
+            CompressedAmpList(
+                [
+                    (b"osystem", amp.Unicode()),
+                    (b"architecture", amp.Unicode()),
+                    (b"subarchitecture", amp.Unicode()),
+                    (b"release", amp.Unicode()),
+                    (b"label", amp.Unicode()),
+                    (b"purpose", amp.Unicode()),
+                    (b"xinstall_type", amp.Unicode()),
+                    (b"xinstall_path", amp.Unicode()),
+                ],
+                optional=True,
+            ),
+        ),
     ]
     response = []
     errors = []
@@ -344,6 +369,33 @@ class UpdateNodePowerState(amp.Command):
     errors = {NoSuchNode: b"NoSuchNode"}
 
 
+class UpdateNodePowerStates(amp.Command):
+    """Update the power states of a batch of nodes.
+
+    Only the nodes whose power state has changed are given with their power
+    state; the others are only marked as having had their power state
+    updated. Unknown nodes are ignored.
+
+    :since: 2.10
+    """
+
+    arguments = [
+        (
+            b"changed",
+            CompressedAmpList(
+                [
+                    (b"system_id", amp.Unicode()),
+                    (b"power_state", amp.Unicode()),
+                ]
+            ),
+        ),
+        # The system_ids of the nodes whose power state hasn't changed.
+        (b"unchanged", amp.ListOf(amp.Unicode())),
+    ]
+    response = []
+    errors = {}
+
+
 class RegisterEventType(amp.Command):
     """Register an event type.
 
@@ -552,6 +604,36 @@ class UpdateLease(amp.Command):
     errors = {NoSuchCluster: b"NoSuchCluster"}
 
 
+class UpdateLeases(amp.Command):
+    """Report a batch of DHCP lease updates from a cluster controller.
+
+    The updates are applied by the region in the order given, within a
+    single transaction.
+
+    :since: 2.10
+    """
+
+    arguments = [
+        (b"cluster_uuid", amp.Unicode()),
+        (
+            b"updates",
+            CompressedAmpList(
+                [
+                    (b"action", amp.Unicode()),
+                    (b"mac", amp.Unicode()),
+                    (b"ip_family", amp.Unicode()),
+                    (b"ip", amp.Unicode()),
+                    (b"timestamp", amp.Integer()),
+                    (b"lease_time", amp.Integer(optional=True)),
+                    (b"hostname", amp.Unicode(optional=True)),
+                ]
+            ),
+        ),
+    ]
+    response = []
+    errors = {NoSuchCluster: b"NoSuchCluster"}
+
+
 class UpdateServices(amp.Command):
     """Report service statuses that are monitored on the rackd.
 
@@ -647,3 +729,31 @@ class GetSyslogConfiguration(amp.Command):
     arguments = [(b"system_id", amp.Unicode())]
     response = [(b"port", amp.Integer())]
     errors = {NoSuchNode: b"NoSuchNode"}
+
+
+class GetExternalServicesConfiguration(amp.Command):
+    """Get settings to use for configuring all the external services of a
+    given rack controller.
+
+    This combines `GetControllerType`, `GetTimeConfiguration`,
+    `GetDNSConfiguration`, `GetProxyConfiguration` and
+    `GetSyslogConfiguration` into one call. The configuration is only
+    returned if its digest differs from `digest`, the digest returned by the
+    previous call.
+
+    :since: 2.10
+    """
+
+    arguments = [
+        (b"system_id", amp.Unicode()),
+        (b"digest", amp.Unicode(optional=True)),
+    ]
+    response = [
+        (b"digest", amp.Unicode()),
+        # A dict of the responses to the separate calls, keyed by
+        # "controller_type", "time_configuration", "dns_configuration",
+        # "proxy_configuration" and "syslog_configuration". Omitted when
+        # the configuration is unchanged.
+        (b"configuration", StructureAsJSON(optional=True)),
+    ]
+    errors = {NoSuchNode: b"NoSuchNode"}
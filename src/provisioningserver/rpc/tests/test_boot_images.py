@@ -6,7 +6,7 @@
 
 import os
 from random import randint
-from unittest.mock import ANY, sentinel
+from unittest.mock import ANY, call, sentinel
 from urllib.parse import urlparse
 
 from testtools.matchers import Equals, Is
@@ -15,7 +15,11 @@ from twisted.internet.defer import inlineCallbacks, succeed
 from twisted.internet.task import Clock
 
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith, MockNotCalled
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+    MockNotCalled,
+)
 from maastesting.testcase import MAASTestCase, MAASTwistedRunTest
 from provisioningserver import concurrency
 from provisioningserver.boot import tftppath
@@ -23,14 +27,16 @@ from provisioningserver.import_images import boot_resources
 from provisioningserver.rpc import boot_images, region
 from provisioningserver.rpc.boot_images import (
     _run_import,
+    BootImageIndex,
     fix_sources_for_cluster,
+    get_boot_image_index,
     get_hosts_from_sources,
     import_boot_images,
     is_import_boot_images_running,
     list_boot_images,
     reload_boot_images,
 )
-from provisioningserver.rpc.region import UpdateLastImageSync
+from provisioningserver.rpc.region import ReportBootImages, UpdateLastImageSync
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.testing.config import (
     BootSourcesFixture,
@@ -91,6 +97,98 @@ class TestReloadBootImages(MAASTestCase):
         reload_boot_images()
         self.assertEqual(boot_images.CACHED_BOOT_IMAGES, fake_boot_images)
 
+    def test_keeps_CACHED_BOOT_IMAGES_when_unchanged(self):
+        fake_boot_images = [factory.make_name("image") for _ in range(3)]
+        self.patch(boot_images, "CACHED_BOOT_IMAGES", fake_boot_images)
+        mock_list_boot_images = self.patch(tftppath, "list_boot_images")
+        mock_list_boot_images.return_value = list(fake_boot_images)
+        reload_boot_images()
+        self.assertIs(boot_images.CACHED_BOOT_IMAGES, fake_boot_images)
+
+
+def make_boot_image(subarch="generic", supported_subarches=""):
+    return {
+        "osystem": factory.make_name("os"),
+        "release": factory.make_name("release"),
+        "architecture": factory.make_name("arch"),
+        "subarchitecture": subarch,
+        "supported_subarches": supported_subarches,
+        "purpose": factory.make_name("purpose"),
+    }
+
+
+def get_image_params(image, subarch=None):
+    return (
+        image["osystem"],
+        image["release"],
+        image["architecture"],
+        image["subarchitecture"] if subarch is None else subarch,
+        image["purpose"],
+    )
+
+
+class TestBootImageIndex(MAASTestCase):
+    def test_get_image_returns_exact_match(self):
+        images = [make_boot_image() for _ in range(3)]
+        index = BootImageIndex(images)
+        for image in images:
+            self.assertIs(image, index.get_image(*get_image_params(image)))
+
+    def test_get_image_returns_image_by_supported_subarch(self):
+        image = make_boot_image(supported_subarches="hwe-a,hwe-b")
+        index = BootImageIndex([image])
+        self.assertIs(
+            image, index.get_image(*get_image_params(image, subarch="hwe-b"))
+        )
+
+    def test_get_image_prefers_exact_subarch(self):
+        generic = make_boot_image(supported_subarches="generic,hwe-a")
+        hwe = dict(generic, subarchitecture="hwe-a", supported_subarches="")
+        index = BootImageIndex([generic, hwe])
+        self.assertIs(
+            hwe, index.get_image(*get_image_params(generic, subarch="hwe-a"))
+        )
+
+    def test_get_image_returns_first_listed_match(self):
+        image = make_boot_image()
+        duplicate = dict(image)
+        index = BootImageIndex([image, duplicate])
+        self.assertIs(image, index.get_image(*get_image_params(image)))
+
+    def test_get_image_returns_None_for_no_match(self):
+        image = make_boot_image()
+        index = BootImageIndex([image])
+        self.assertIsNone(
+            index.get_image(
+                *get_image_params(image, subarch=factory.make_name("sub"))
+            )
+        )
+
+
+class TestGetBootImageIndex(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patch(boot_images, "CACHED_BOOT_IMAGE_INDEX", None)
+
+    def test_builds_index_for_images(self):
+        images = [make_boot_image()]
+        index = get_boot_image_index(images)
+        self.assertIsInstance(index, BootImageIndex)
+        self.assertIs(images, index.images)
+
+    def test_reuses_index_for_same_images(self):
+        images = [make_boot_image()]
+        self.assertIs(
+            get_boot_image_index(images), get_boot_image_index(images)
+        )
+
+    def test_rebuilds_index_for_new_images(self):
+        index = get_boot_image_index([make_boot_image()])
+        images = [make_boot_image()]
+        new_index = get_boot_image_index(images)
+        self.assertIsNot(index, new_index)
+        self.assertIs(images, new_index.images)
+
 
 class TestGetHostsFromSources(MAASTestCase):
     def test_returns_set_of_hosts_from_sources(self):
@@ -244,7 +342,31 @@ class TestRunImport(MAASTestCase):
         fake = self.patch(boot_resources, "import_images")
         sources, _ = make_sources()
         _run_import(sources=sources, maas_url=factory.make_simple_http_url())
-        self.assertThat(fake, MockCalledOnceWith(sources))
+        self.assertThat(fake, MockCalledOnceWith(sources, peers=None))
+
+    def test_run_import_passes_peers(self):
+        fake = self.patch(boot_resources, "import_images")
+        sources, _ = make_sources()
+        peers = ["http://%s:5248/boot-resources-cache/" % factory.make_name()]
+        _run_import(
+            sources=sources,
+            maas_url=factory.make_simple_http_url(),
+            peers=peers,
+        )
+        self.assertThat(fake, MockCalledOnceWith(sources, peers=peers))
+
+    def test_run_import_sets_no_proxy_for_peers(self):
+        fake = self.patch_boot_resources_function()
+        peer = factory.make_ipv6_address()
+        _run_import(
+            sources=[],
+            maas_url=factory.make_simple_http_url(),
+            http_proxy=factory.make_simple_http_url(),
+            peers=["http://[%s]:5248/boot-resources-cache/" % peer],
+        )
+        self.assertEqual(
+            [peer, "[%s]" % peer], fake.env["no_proxy"].split(",")[-2:]
+        )
 
     def test_run_import_calls_reload_boot_images(self):
         fake_reload = self.patch(boot_images, "reload_boot_images")
@@ -276,6 +398,7 @@ class TestImportBootImages(MAASTestCase):
                 maas_url,
                 http_proxy=None,
                 https_proxy=None,
+                peers=None,
             ),
         )
 
@@ -298,6 +421,7 @@ class TestImportBootImages(MAASTestCase):
                 maas_url,
                 http_proxy=None,
                 https_proxy=None,
+                peers=None,
             ),
         )
 
@@ -321,18 +445,27 @@ class TestImportBootImages(MAASTestCase):
         getRegionClient = self.patch(boot_images, "getRegionClient")
         _run_import = self.patch_autospec(boot_images, "_run_import")
         _run_import.return_value = True
+        self.patch(boot_images, "list_boot_images").return_value = [
+            make_boot_image()
+        ]
         maas_url = factory.make_simple_http_url()
         yield boot_images._import_boot_images(sentinel.sources, maas_url)
         self.assertThat(
             _run_import,
-            MockCalledOnceWith(sentinel.sources, maas_url, None, None),
+            MockCalledOnceWith(sentinel.sources, maas_url, None, None, None),
         )
-        self.assertThat(getRegionClient, MockCalledOnceWith())
-        self.assertThat(get_maas_id, MockCalledOnceWith())
         client = getRegionClient.return_value
         self.assertThat(
             client,
-            MockCalledOnceWith(UpdateLastImageSync, system_id=get_maas_id()),
+            MockCallsMatch(
+                call(UpdateLastImageSync, system_id=get_maas_id()),
+                call(
+                    ReportBootImages,
+                    uuid=get_maas_id(),
+                    images=[],
+                    boot_images=boot_images.list_boot_images(),
+                ),
+            ),
         )
 
     @inlineCallbacks
@@ -342,18 +475,27 @@ class TestImportBootImages(MAASTestCase):
         getRegionClient = self.patch(boot_images, "getRegionClient")
         _run_import = self.patch_autospec(boot_images, "_run_import")
         _run_import.return_value = False
+        self.patch(boot_images, "list_boot_images").return_value = [
+            make_boot_image()
+        ]
         maas_url = factory.make_simple_http_url()
         yield boot_images._import_boot_images(sentinel.sources, maas_url)
         self.assertThat(
             _run_import,
-            MockCalledOnceWith(sentinel.sources, maas_url, None, None),
+            MockCalledOnceWith(sentinel.sources, maas_url, None, None, None),
         )
-        self.assertThat(getRegionClient, MockCalledOnceWith())
-        self.assertThat(get_maas_id, MockCalledOnceWith())
         client = getRegionClient.return_value
         self.assertThat(
             client,
-            MockCalledOnceWith(UpdateLastImageSync, system_id=get_maas_id()),
+            MockCallsMatch(
+                call(UpdateLastImageSync, system_id=get_maas_id()),
+                call(
+                    ReportBootImages,
+                    uuid=get_maas_id(),
+                    images=[],
+                    boot_images=boot_images.list_boot_images(),
+                ),
+            ),
         )
 
     @inlineCallbacks
@@ -362,9 +504,10 @@ class TestImportBootImages(MAASTestCase):
         get_maas_id.return_value = factory.make_string()
         fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
         protocol, connecting = fixture.makeEventLoop(
-            region.UpdateLastImageSync
+            region.UpdateLastImageSync, region.ReportBootImages
         )
         protocol.UpdateLastImageSync.return_value = succeed({})
+        protocol.ReportBootImages.return_value = succeed({})
         self.addCleanup((yield connecting))
         self.patch_autospec(boot_resources, "import_images")
         boot_resources.import_images.return_value = True
@@ -373,20 +516,32 @@ class TestImportBootImages(MAASTestCase):
         yield boot_images.import_boot_images(sources, maas_url)
         self.assertThat(
             boot_resources.import_images,
-            MockCalledOnceWith(fix_sources_for_cluster(sources, maas_url)),
+            MockCalledOnceWith(
+                fix_sources_for_cluster(sources, maas_url), peers=None
+            ),
         )
         self.assertThat(
             protocol.UpdateLastImageSync,
             MockCalledOnceWith(protocol, system_id=get_maas_id()),
         )
+        self.assertThat(
+            protocol.ReportBootImages,
+            MockCalledOnceWith(
+                protocol,
+                uuid=get_maas_id(),
+                images=[],
+                boot_images=ANY,
+            ),
+        )
 
     @inlineCallbacks
     def test_update_last_image_sync_end_to_end_import_not_performed(self):
         fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
         protocol, connecting = fixture.makeEventLoop(
-            region.UpdateLastImageSync
+            region.UpdateLastImageSync, region.ReportBootImages
         )
         protocol.UpdateLastImageSync.return_value = succeed({})
+        protocol.ReportBootImages.return_value = succeed({})
         self.addCleanup((yield connecting))
         self.patch_autospec(boot_resources, "import_images")
         boot_resources.import_images.return_value = False
@@ -395,7 +550,9 @@ class TestImportBootImages(MAASTestCase):
         yield boot_images.import_boot_images(sources, maas_url)
         self.assertThat(
             boot_resources.import_images,
-            MockCalledOnceWith(fix_sources_for_cluster(sources, maas_url)),
+            MockCalledOnceWith(
+                fix_sources_for_cluster(sources, maas_url), peers=None
+            ),
         )
         self.assertThat(protocol.UpdateLastImageSync, MockNotCalled())
 
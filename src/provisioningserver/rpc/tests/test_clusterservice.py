@@ -356,6 +356,7 @@ class TestClusterProtocol_ImportBootImages(MAASTestCase):
                 conn_cluster.service.maas_url,
                 http_proxy=None,
                 https_proxy=None,
+                peers=None,
             ),
         )
 
@@ -387,6 +388,34 @@ class TestClusterProtocol_ImportBootImages(MAASTestCase):
                 conn_cluster.service.maas_url,
                 http_proxy=proxy,
                 https_proxy=proxy,
+                peers=None,
+            ),
+        )
+
+    @inlineCallbacks
+    def test_import_boot_images_calls_import_boot_images_with_peers(self):
+        import_boot_images = self.patch(clusterservice, "import_boot_images")
+
+        peers = ["http://%s:5248/boot-resources-cache/" % factory.make_name()]
+
+        conn_cluster = Cluster()
+        conn_cluster.service = MagicMock()
+        conn_cluster.service.maas_url = factory.make_simple_http_url()
+
+        yield call_responder(
+            conn_cluster,
+            cluster.ImportBootImages,
+            {"sources": [], "peers": peers},
+        )
+
+        self.assertThat(
+            import_boot_images,
+            MockCalledOnceWith(
+                [],
+                conn_cluster.service.maas_url,
+                http_proxy=None,
+                https_proxy=None,
+                peers=peers,
             ),
         )
 
@@ -2747,6 +2776,107 @@ class TestClusterProtocol_ConfigureDHCP(MAASTestCase):
             )
 
 
+class TestClusterProtocol_UpdateDHCPHosts(MAASTestCase):
+
+    scenarios = (
+        (
+            "DHCPv4",
+            {
+                "dhcp_server": (dhcp, "DHCPv4Server"),
+                "command": cluster.UpdateDHCPv4Hosts,
+                "concurrency_lock": concurrency.dhcpv4,
+            },
+        ),
+        (
+            "DHCPv6",
+            {
+                "dhcp_server": (dhcp, "DHCPv6Server"),
+                "command": cluster.UpdateDHCPv6Hosts,
+                "concurrency_lock": concurrency.dhcpv6,
+            },
+        ),
+    )
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def make_host(self):
+        host = make_host()
+        del host["dhcp_snippets"]
+        return host
+
+    def test_is_registered(self):
+        self.assertIsNotNone(
+            Cluster().locateResponder(self.command.commandName)
+        )
+
+    @inlineCallbacks
+    def test_executes_update_hosts(self):
+        DHCPServer = self.patch_autospec(*self.dhcp_server)
+        update_hosts = self.patch_autospec(dhcp, "update_hosts")
+
+        omapi_key = factory.make_name("key")
+        remove = [self.make_host()]
+        add = [self.make_host()]
+        modify = [self.make_host()]
+
+        yield call_responder(
+            Cluster(),
+            self.command,
+            {
+                "omapi_key": omapi_key,
+                "remove": remove,
+                "add": add,
+                "modify": modify,
+            },
+        )
+
+        self.assertThat(DHCPServer, MockCalledOnceWith(omapi_key))
+        self.assertThat(
+            update_hosts,
+            MockCalledOnceWith(DHCPServer.return_value, remove, add, modify),
+        )
+
+    @inlineCallbacks
+    def test_limits_concurrency(self):
+        self.patch_autospec(*self.dhcp_server)
+
+        def check_dhcp_locked(server, remove, add, modify):
+            self.assertTrue(self.concurrency_lock.locked)
+
+        self.patch(dhcp, "update_hosts", check_dhcp_locked)
+
+        self.assertFalse(self.concurrency_lock.locked)
+        yield call_responder(
+            Cluster(),
+            self.command,
+            {
+                "omapi_key": factory.make_name("key"),
+                "remove": [],
+                "add": [],
+                "modify": [],
+            },
+        )
+        self.assertFalse(self.concurrency_lock.locked)
+
+    @inlineCallbacks
+    def test_propagates_CannotConfigureDHCP(self):
+        update_hosts = self.patch_autospec(dhcp, "update_hosts")
+        update_hosts.side_effect = exceptions.CannotConfigureDHCP(
+            "Deliberate failure"
+        )
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield call_responder(
+                Cluster(),
+                self.command,
+                {
+                    "omapi_key": factory.make_name("key"),
+                    "remove": [],
+                    "add": [self.make_host()],
+                    "modify": [],
+                },
+            )
+
+
 class TestClusterProtocol_ValidateDHCP(MAASTestCase):
 
     scenarios = (
@@ -4181,6 +4311,47 @@ class TestClusterProtocol_DecomposeMachine(MAASTestCase):
         )
 
 
+class TestClusterProtocol_RefreshExternalServices(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def test_is_registered(self):
+        protocol = Cluster()
+        responder = protocol.locateResponder(
+            cluster.RefreshExternalServices.commandName
+        )
+        self.assertIsNotNone(responder)
+
+    def test_refreshes_external_service(self):
+        services = self.patch(clusterservice, "services")
+        external = services.getServiceNamed.return_value
+        external.running = True
+        response = call_responder(
+            Cluster(), cluster.RefreshExternalServices, {}
+        )
+        self.assertEqual({}, response.result)
+        services.getServiceNamed.assert_called_once_with("external")
+        external.refresh.assert_called_once_with()
+
+    def test_does_nothing_when_external_service_not_running(self):
+        services = self.patch(clusterservice, "services")
+        external = services.getServiceNamed.return_value
+        external.running = False
+        response = call_responder(
+            Cluster(), cluster.RefreshExternalServices, {}
+        )
+        self.assertEqual({}, response.result)
+        external.refresh.assert_not_called()
+
+    def test_does_nothing_without_external_service(self):
+        services = self.patch(clusterservice, "services")
+        services.getServiceNamed.side_effect = KeyError("external")
+        response = call_responder(
+            Cluster(), cluster.RefreshExternalServices, {}
+        )
+        self.assertEqual({}, response.result)
+
+
 class TestClusterProtocol_DisableAndShutoffRackd(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
@@ -504,6 +504,108 @@ class TestUpdateHosts(MAASTestCase):
         self.assertEqual(str(err), "Fail")
 
 
+class TestUpdateHostsOverOMAPI(MAASTestCase):
+    """Tests for `dhcp.update_hosts`."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    scenarios = (
+        ("DHCPv4", {"server": dhcp.DHCPv4Server}),
+        ("DHCPv6", {"server": dhcp.DHCPv6Server}),
+    )
+
+    def setUp(self):
+        super().setUp()
+        # The dhcp server states are global so we clean them after each test.
+        self.addCleanup(dhcp._current_server_state.clear)
+        self.omapi_key = factory.make_name("omapi_key")
+        self.get_service_state = self.patch(
+            dhcp.service_monitor, "getServiceState"
+        )
+        self.get_service_state.return_value = ServiceState(
+            SERVICE_STATE.ON, "running"
+        )
+        self.update_hosts = self.patch(dhcp, "_update_hosts")
+
+    def make_state(self, hosts):
+        return dhcp.DHCPState(
+            self.omapi_key,
+            [make_failover_peer_config()],
+            [make_shared_network()],
+            hosts,
+            [make_interface()],
+            make_global_dhcp_snippets(),
+        )
+
+    @inlineCallbacks
+    def test_updates_hosts_and_state(self):
+        removed = make_host(dhcp_snippets=[])
+        modified = make_host(dhcp_snippets=make_host_dhcp_snippets())
+        old_state = self.make_state([removed, modified])
+        dhcp._current_server_state[self.server.dhcp_service] = old_state
+        added = make_host(dhcp_snippets=[])
+        del added["dhcp_snippets"]
+        modified_now = dict(modified, ip=factory.make_ip_address())
+        del modified_now["dhcp_snippets"]
+        server = self.server(self.omapi_key)
+
+        yield dhcp.update_hosts(server, [removed], [added], [modified_now])
+
+        self.assertThat(
+            self.update_hosts,
+            MockCalledOnceWith(server, [removed], [added], [modified_now]),
+        )
+        new_state = dhcp._current_server_state[self.server.dhcp_service]
+        self.assertEqual(
+            {
+                added["mac"]: dict(added, dhcp_snippets=[]),
+                modified["mac"]: dict(
+                    modified_now, dhcp_snippets=modified["dhcp_snippets"]
+                ),
+            },
+            new_state.hosts,
+        )
+        self.assertEqual(old_state.shared_networks, new_state.shared_networks)
+
+    @inlineCallbacks
+    def test_fails_when_state_unknown(self):
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield dhcp.update_hosts(self.server(self.omapi_key), [], [], [])
+        self.assertThat(self.update_hosts, MockNotCalled())
+
+    @inlineCallbacks
+    def test_fails_when_omapi_key_differs(self):
+        state = self.make_state([])
+        dhcp._current_server_state[self.server.dhcp_service] = state
+        server = self.server(factory.make_name("omapi_key"))
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield dhcp.update_hosts(server, [], [], [])
+        self.assertThat(self.update_hosts, MockNotCalled())
+
+    @inlineCallbacks
+    def test_fails_when_service_not_running(self):
+        state = self.make_state([])
+        dhcp._current_server_state[self.server.dhcp_service] = state
+        self.get_service_state.return_value = ServiceState(
+            SERVICE_STATE.OFF, "dead"
+        )
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield dhcp.update_hosts(self.server(self.omapi_key), [], [], [])
+        self.assertThat(self.update_hosts, MockNotCalled())
+
+    @inlineCallbacks
+    def test_forgets_state_when_omapi_fails(self):
+        state = self.make_state([])
+        dhcp._current_server_state[self.server.dhcp_service] = state
+        self.update_hosts.side_effect = exceptions.CannotCreateHostMap("x")
+        host = make_host(dhcp_snippets=[])
+        with ExpectedException(exceptions.CannotConfigureDHCP):
+            yield dhcp.update_hosts(
+                self.server(self.omapi_key), [], [host], []
+            )
+        self.assertIsNone(dhcp._current_server_state[self.server.dhcp_service])
+
+
 class TestConfigureDHCP(MAASTestCase):
 
     run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
@@ -26,6 +26,7 @@ from twisted.python.failure import Failure
 
 from maastesting.factory import factory
 from maastesting.matchers import (
+    MockCalledOnce,
     MockCalledOnceWith,
     MockCalledWith,
     MockCallsMatch,
@@ -89,6 +90,47 @@ class TestPowerHelpers(MAASTestCase):
             MockCalledOnceWith(ANY, system_id=system_id, power_state=state),
         )
 
+    def test_power_states_update_calls_UpdateNodePowerStates(self):
+        changed = [
+            {"system_id": factory.make_name("system_id"), "power_state": "on"}
+        ]
+        unchanged = [
+            {"system_id": factory.make_name("system_id"), "power_state": "off"}
+        ]
+        fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        protocol, io = fixture.makeEventLoop(region.UpdateNodePowerStates)
+        d = power.power_states_update(changed, unchanged)
+        io.flush()
+        extract_result(d)
+        self.assertThat(
+            protocol.UpdateNodePowerStates,
+            MockCalledOnceWith(
+                ANY,
+                changed=changed,
+                unchanged=[unchanged[0]["system_id"]],
+            ),
+        )
+
+    def test_power_states_update_falls_back_to_UpdateNodePowerState(self):
+        # The region does not know about UpdateNodePowerStates.
+        changed = [
+            {"system_id": factory.make_name("system_id"), "power_state": "on"}
+        ]
+        unchanged = [
+            {"system_id": factory.make_name("system_id"), "power_state": "off"}
+        ]
+        protocol, io = self.patch_rpc_methods()
+        d = power.power_states_update(changed, unchanged)
+        io.flush()
+        extract_result(d)
+        self.assertThat(
+            protocol.UpdateNodePowerState,
+            MockCallsMatch(
+                call(ANY, **changed[0]),
+                call(ANY, **unchanged[0]),
+            ),
+        )
+
     def test_power_change_success_emits_event(self):
         system_id = factory.make_name("system_id")
         hostname = factory.make_name("hostname")
@@ -1288,3 +1330,440 @@ class TestPowerQueryAsync(MAASTestCase):
             [(True, node1["power_state"]), (True, node2["power_state"])],
             results,
         )
+
+
+class TestGetBMCKey(MAASTestCase):
+    def test_uses_power_address(self):
+        power_address = factory.make_ip_address()
+        node = {
+            "system_id": factory.make_name("system_id"),
+            "power_type": "ipmi",
+            "context": {"power_address": power_address},
+        }
+        self.assertEqual(("ipmi", power_address), power.get_bmc_key(node))
+
+    def test_uses_system_id_without_power_address(self):
+        system_id = factory.make_name("system_id")
+        node = {"system_id": system_id, "power_type": "ipmi", "context": {}}
+        self.assertEqual(("ipmi", system_id), power.get_bmc_key(node))
+
+
+class TestPowerStateBatch(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def setUp(self):
+        super().setUp()
+        self.power_states_update = self.patch(power, "power_states_update")
+        self.power_states_update.return_value = succeed(None)
+
+    def make_node(self, power_state="on"):
+        return {
+            "hostname": factory.make_name("hostname"),
+            "power_state": power_state,
+            "system_id": factory.make_name("system_id"),
+        }
+
+    def test_add_separates_changed_and_unchanged(self):
+        batch = power.PowerStateBatch()
+        node1, node2 = self.make_node("on"), self.make_node("on")
+        batch.add(node1, "off")
+        batch.add(node2, "on")
+        self.assertEqual(
+            [{"system_id": node1["system_id"], "power_state": "off"}],
+            batch.changed,
+        )
+        self.assertEqual(
+            [{"system_id": node2["system_id"], "power_state": "on"}],
+            batch.unchanged,
+        )
+        self.assertThat(self.power_states_update, MockNotCalled())
+
+    def test_add_sends_full_batch(self):
+        batch = power.PowerStateBatch(size=2)
+        node1, node2, node3 = (self.make_node() for _ in range(3))
+        batch.add(node1, "off")
+        batch.add(node2, "on")
+        batch.add(node3, "on")
+        self.assertThat(
+            self.power_states_update,
+            MockCalledOnceWith(
+                [{"system_id": node1["system_id"], "power_state": "off"}],
+                [{"system_id": node2["system_id"], "power_state": "on"}],
+            ),
+        )
+        self.assertEqual([], batch.changed)
+        self.assertEqual(
+            [{"system_id": node3["system_id"], "power_state": "on"}],
+            batch.unchanged,
+        )
+
+    def test_flush_sends_remaining_and_waits_for_all(self):
+        sent = [Deferred(), Deferred()]
+        self.power_states_update.side_effect = sent
+        batch = power.PowerStateBatch(size=1)
+        node1, node2 = self.make_node(), self.make_node()
+        batch.add(node1, "on")
+        batch.changed.append(
+            {"system_id": node2["system_id"], "power_state": "off"}
+        )
+        d = batch.flush()
+        self.assertEqual(2, self.power_states_update.call_count)
+        self.assertFalse(d.called)
+        sent[0].callback(None)
+        self.assertFalse(d.called)
+        sent[1].callback(None)
+        extract_result(d)
+
+    def test_flush_does_not_send_empty_batch(self):
+        batch = power.PowerStateBatch()
+        extract_result(batch.flush())
+        self.assertThat(self.power_states_update, MockNotCalled())
+
+    def test_send_logs_errors(self):
+        self.power_states_update.return_value = fail(
+            factory.make_exception("boom")
+        )
+        batch = power.PowerStateBatch()
+        batch.add(self.make_node(), "on")
+        with TwistedLoggerFixture() as logger:
+            extract_result(batch.flush())
+        self.assertIn("Failed to report power states.", logger.output)
+
+    def test_report_adds_power_state(self):
+        batch = power.PowerStateBatch()
+        node = self.make_node("on")
+        d = batch.report(succeed("off"), node)
+        self.assertEqual("off", extract_result(d))
+        self.assertEqual(
+            [{"system_id": node["system_id"], "power_state": "off"}],
+            batch.changed,
+        )
+
+    def test_report_adds_error_and_sends_event_on_failure(self):
+        send_node_event = self.patch(power, "send_node_event")
+        send_node_event.return_value = succeed(None)
+        batch = power.PowerStateBatch()
+        node = self.make_node("on")
+        error_message = factory.make_name("error")
+        with FakeLogger("maas.power"):
+            d = batch.report(fail(PowerError(error_message)), node)
+        self.assertRaises(PowerError, extract_result, d)
+        self.assertEqual(
+            [{"system_id": node["system_id"], "power_state": "error"}],
+            batch.changed,
+        )
+        self.assertThat(
+            send_node_event,
+            MockCalledOnceWith(
+                EVENT_TYPES.NODE_POWER_QUERY_FAILED,
+                node["system_id"],
+                node["hostname"],
+                error_message,
+            ),
+        )
+
+
+class TestAdaptiveQueryLimit(MAASTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clock = Clock()
+
+    def test_queues_calls_beyond_limit(self):
+        limit = power.AdaptiveQueryLimit(2, 2, 10, self.clock)
+        queries = [Deferred() for _ in range(3)]
+        results = [limit.run(lambda query: query, query) for query in queries]
+        self.assertEqual(2, limit.running)
+        self.assertEqual(1, len(limit.waiting))
+        queries[0].callback(sentinel.result)
+        self.assertIs(sentinel.result, extract_result(results[0]))
+        self.assertEqual(2, limit.running)
+        self.assertEqual(0, len(limit.waiting))
+
+    def test_raises_limit_for_fast_queries_up_to_maximum(self):
+        limit = power.AdaptiveQueryLimit(1, 3, 10, self.clock)
+        for _ in range(5):
+            limit.run(succeed, None)
+        self.assertEqual(3, limit.limit)
+
+    def test_halves_limit_for_slow_queries(self):
+        limit = power.AdaptiveQueryLimit(8, 8, 10, self.clock)
+        query = Deferred()
+        limit.run(lambda: query)
+        self.clock.advance(11)
+        query.callback(None)
+        self.assertEqual(4, limit.limit)
+
+    def test_keeps_at_least_one_query(self):
+        limit = power.AdaptiveQueryLimit(1, 1, 10, self.clock)
+        query = Deferred()
+        limit.run(lambda: query)
+        self.clock.advance(11)
+        query.callback(None)
+        self.assertEqual(1, limit.limit)
+
+    def test_passes_failures_on(self):
+        limit = power.AdaptiveQueryLimit(1, 1, 10, self.clock)
+        d = limit.run(lambda: 1 / 0)
+        self.assertRaises(ZeroDivisionError, extract_result, d)
+        self.assertEqual(0, limit.running)
+
+    def test_ipmi_can_raise_limit(self):
+        driver = PowerDriverRegistry.get_item("ipmi")
+        self.assertGreater(
+            driver.query_concurrency_max, driver.query_concurrency
+        )
+
+
+class TestPowerQueryScheduler(MAASTestCase):
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def setUp(self):
+        super().setUp()
+        self.power_states_update = self.patch(power, "power_states_update")
+        self.power_states_update.return_value = succeed(None)
+        self.patch(power, "send_node_event").return_value = succeed(None)
+        self.metrics = self.patch(power, "PROMETHEUS_METRICS")
+        self.get_power_state = self.patch(power, "get_power_state")
+        self.clock = Clock()
+        self.scheduler = power.PowerQueryScheduler(self.clock)
+
+    def make_node(self, power_type="ipmi", power_state="on"):
+        return {
+            "context": {"power_address": factory.make_ip_address()},
+            "hostname": factory.make_name("hostname"),
+            "power_state": power_state,
+            "power_type": power_type,
+            "system_id": factory.make_name("system_id"),
+        }
+
+    def get_queried_system_ids(self):
+        return [
+            query_call[0][0]
+            for query_call in self.get_power_state.call_args_list
+        ]
+
+    def test_limits_concurrency_per_power_driver(self):
+        self.patch(
+            PowerDriverRegistry.get_item("ipmi"), "query_concurrency", 1
+        )
+        ipmi1, ipmi2 = self.make_node(), self.make_node()
+        virsh = self.make_node(power_type="virsh")
+        queries = {
+            node["system_id"]: Deferred() for node in (ipmi1, ipmi2, virsh)
+        }
+        self.get_power_state.side_effect = (
+            lambda system_id, *args, **kwargs: queries[system_id]
+        )
+
+        d = self.scheduler.query_nodes([ipmi1, ipmi2, virsh])
+        self.assertEqual(
+            [ipmi1["system_id"], virsh["system_id"]],
+            self.get_queried_system_ids(),
+        )
+        queries[ipmi1["system_id"]].callback("on")
+        self.assertEqual(
+            [ipmi1["system_id"], virsh["system_id"], ipmi2["system_id"]],
+            self.get_queried_system_ids(),
+        )
+        queries[ipmi2["system_id"]].callback("on")
+        queries[virsh["system_id"]].callback("on")
+        self.assertEqual(
+            [(True, "on"), (True, "on"), (True, "on")], extract_result(d)
+        )
+
+    def test_max_concurrency_overrides_drivers(self):
+        scheduler = power.PowerQueryScheduler(self.clock, max_concurrency=1)
+        self.get_power_state.return_value = Deferred()
+        scheduler.query_nodes([self.make_node(), self.make_node()])
+        self.assertThat(self.get_power_state, MockCalledOnce())
+
+    def test_backs_off_failing_bmc(self):
+        node = self.make_node()
+        self.get_power_state.side_effect = lambda *args, **kwargs: fail(
+            PowerError("unreachable")
+        )
+
+        with FakeLogger("maas.power"):
+            self.scheduler.query_nodes([node])
+            self.clock.advance(power.BMC_BACKOFF_MIN - 1)
+            self.scheduler.query_nodes([node])
+            self.assertEqual(1, self.get_power_state.call_count)
+            self.clock.advance(1)
+            self.scheduler.query_nodes([node])
+            self.assertEqual(2, self.get_power_state.call_count)
+            # The second failure doubles the backoff.
+            self.clock.advance(power.BMC_BACKOFF_MIN)
+            self.scheduler.query_nodes([node])
+            self.assertEqual(2, self.get_power_state.call_count)
+            self.clock.advance(power.BMC_BACKOFF_MIN)
+            self.scheduler.query_nodes([node])
+            self.assertEqual(3, self.get_power_state.call_count)
+
+    def test_backoff_is_limited(self):
+        node = self.make_node()
+        self.get_power_state.side_effect = lambda *args, **kwargs: fail(
+            PowerError("unreachable")
+        )
+
+        with FakeLogger("maas.power"):
+            for _ in range(20):
+                self.scheduler.query_nodes([node])
+                self.clock.advance(power.BMC_BACKOFF_MAX)
+        self.assertEqual(20, self.get_power_state.call_count)
+
+    def test_backs_off_all_nodes_on_bmc(self):
+        node1, node2 = self.make_node(), self.make_node()
+        node2["context"] = node1["context"]
+        self.get_power_state.side_effect = lambda *args, **kwargs: fail(
+            PowerError("unreachable")
+        )
+
+        with FakeLogger("maas.power"):
+            self.scheduler.query_nodes([node1])
+            self.scheduler.query_nodes([node2])
+        self.assertEqual([node1["system_id"]], self.get_queried_system_ids())
+
+    def test_success_resets_backoff(self):
+        node = self.make_node()
+        self.get_power_state.side_effect = [
+            fail(PowerError("unreachable")),
+            succeed("on"),
+            fail(PowerError("unreachable")),
+        ]
+
+        with FakeLogger("maas.power"):
+            self.scheduler.query_nodes([node])
+            self.clock.advance(power.BMC_BACKOFF_MIN)
+            self.scheduler.query_nodes([node])
+            self.assertFalse(self.scheduler.is_backed_off(node))
+            # The next failure backs off for the minimum time again.
+            self.scheduler.query_nodes([node])
+        self.assertTrue(self.scheduler.is_backed_off(node))
+        self.clock.advance(power.BMC_BACKOFF_MIN)
+        self.assertFalse(self.scheduler.is_backed_off(node))
+
+    def test_does_not_back_off_for_NoSuchNode(self):
+        node = self.make_node()
+        self.get_power_state.return_value = fail(exceptions.NoSuchNode())
+        self.scheduler.query_nodes([node])
+        self.assertFalse(self.scheduler.is_backed_off(node))
+
+    def test_queries_recently_changed_nodes_first(self):
+        node1 = self.make_node(power_state="on")
+        node2 = self.make_node(power_state="on")
+        self.get_power_state.side_effect = [
+            succeed("on"),
+            succeed("off"),
+            succeed("on"),
+            succeed("off"),
+        ]
+
+        self.scheduler.query_nodes([node1, node2])
+        node2["power_state"] = "off"
+        self.scheduler.query_nodes([node1, node2])
+        self.assertEqual(
+            [
+                node1["system_id"],
+                node2["system_id"],
+                node2["system_id"],
+                node1["system_id"],
+            ],
+            self.get_queried_system_ids(),
+        )
+
+    def test_recent_change_priority_expires(self):
+        node1 = self.make_node(power_state="on")
+        node2 = self.make_node(power_state="on")
+        self.get_power_state.side_effect = [
+            succeed("on"),
+            succeed("off"),
+            succeed("on"),
+            succeed("off"),
+        ]
+
+        self.scheduler.query_nodes([node1, node2])
+        node2["power_state"] = "off"
+        self.clock.advance(power.RECENT_TRANSITION_PERIOD)
+        self.scheduler.query_nodes([node1, node2])
+        self.assertEqual(
+            [
+                node1["system_id"],
+                node2["system_id"],
+                node1["system_id"],
+                node2["system_id"],
+            ],
+            self.get_queried_system_ids(),
+        )
+
+    def test_records_queue_lag_and_latency(self):
+        node = self.make_node()
+        query = Deferred()
+        self.get_power_state.return_value = query
+
+        self.scheduler.query_nodes([node])
+        self.clock.advance(3)
+        query.callback("on")
+        self.assertThat(
+            self.metrics.update,
+            MockCallsMatch(
+                call(
+                    "maas_rack_power_query_queue_lag",
+                    "observe",
+                    value=0,
+                    labels={"power_type": "ipmi"},
+                ),
+                call(
+                    "maas_rack_power_query_latency",
+                    "observe",
+                    value=3,
+                    labels={"power_type": "ipmi"},
+                ),
+            ),
+        )
+
+    def test_reports_power_states_in_batches(self):
+        scheduler = power.PowerQueryScheduler(self.clock, batch_size=2)
+        nodes = [self.make_node(power_state="on") for _ in range(3)]
+        self.get_power_state.side_effect = [
+            succeed("off"),
+            succeed("on"),
+            succeed("on"),
+        ]
+
+        d = scheduler.query_nodes(nodes)
+        self.assertEqual(
+            [(True, "off"), (True, "on"), (True, "on")], extract_result(d)
+        )
+        updates = [
+            {"system_id": node["system_id"], "power_state": state}
+            for node, state in zip(nodes, ["off", "on", "on"])
+        ]
+        self.assertThat(
+            self.power_states_update,
+            MockCallsMatch(
+                call([updates[0]], [updates[1]]), call([], [updates[2]])
+            ),
+        )
+
+    def test_reports_power_states_individually_without_batch_size(self):
+        report_power_state = self.patch(power, "report_power_state")
+        report_power_state.side_effect = lambda d, system_id, hostname: d
+        scheduler = power.PowerQueryScheduler(self.clock, batch_size=None)
+        node = self.make_node()
+        query = succeed("on")
+        self.get_power_state.return_value = query
+
+        scheduler.query_nodes([node])
+        self.assertThat(
+            report_power_state,
+            MockCalledOnceWith(query, node["system_id"], node["hostname"]),
+        )
+        self.assertThat(self.power_states_update, MockNotCalled())
+
+    def test_skips_unknown_power_types(self):
+        node = self.make_node(power_type=factory.make_name("power_type"))
+        d = self.scheduler.query_nodes([node])
+        self.assertEqual([], extract_result(d))
+        self.assertThat(self.get_power_state, MockNotCalled())